@@ -1,8 +1,9 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Prestamo,
   EstadoPago,
   ResumenGeneral,
+  ResumenPeriodoArchivo,
   Inversor,
   Cliente
 } from './types';
@@ -14,13 +15,16 @@ import ClientModule from './components/ClientModule';
 import {
   obtenerCalculosPunitorios,
   fetchPrestamos,
+  fetchResumenArchivo,
   crearPrestamoAPI
 } from './services/loanService';
 
 import {
   fetchInversores,
   crearInversorAPI,
-  liquidarInversorAPI
+  liquidarInversorAPI,
+  suscribirCambios,
+  EventoCambio
 } from './services/loanService';
 
 
@@ -28,6 +32,8 @@ type ActiveTab = 'prestamos' | 'clientes' | 'inversores';
 
 const App: React.FC = () => {
   const [prestamos, setPrestamos] = useState<Prestamo[]>([]);
+  // Totales de los préstamos cerrados que el backend archivó
+  const [archivo, setArchivo] = useState<ResumenPeriodoArchivo[]>([]);
   const [clientes, setClientes] = useState<Cliente[]>([]);
   const [inversores, setInversores] = useState<Inversor[]>([]);
   const [activeTab, setActiveTab] = useState<ActiveTab>('prestamos');
@@ -51,6 +57,11 @@ const App: React.FC = () => {
         periodos.add(p.periodo_origen);
       }
     });
+    archivo.forEach(r => {
+      if (r.periodo_origen) {
+        periodos.add(r.periodo_origen);
+      }
+    });
     const sorted = Array.from(periodos).sort().reverse(); // Descendente (más recientes primero)
     return ['ALL', ...sorted]; // 'ALL' al inicio para vista global
   };
@@ -66,8 +77,9 @@ const App: React.FC = () => {
   ============================== */
   const cargarPrestamos = async () => {
     try {
-      const data = await fetchPrestamos();
+      const [data, resumenArchivo] = await Promise.all([fetchPrestamos(), fetchResumenArchivo()]);
       setPrestamos(data);
+      setArchivo(resumenArchivo);
     } catch (err) {
       console.error(err);
     }
@@ -92,6 +104,63 @@ const App: React.FC = () => {
       .catch(console.error);
   }, []);
 
+  /* =============================
+     FEED DE CAMBIOS (SSE)
+     Parchea el estado local en vez de recargar listas completas
+  ============================== */
+  // Ref para leer los clientes actuales sin reabrir la conexión SSE
+  const clientesRef = useRef<Cliente[]>([]);
+  clientesRef.current = clientes;
+
+  useEffect(() => {
+    const aplicarCambio = (evento: EventoCambio) => {
+      const datos = evento.datos ?? {};
+
+      if (evento.entidad === 'prestamo' && evento.accion === 'eliminado') {
+        // Archivado (backend/archivo.py): sale de la cartera activa
+        setPrestamos(prev => prev.filter(p => p.id !== evento.id));
+      } else if (evento.entidad === 'prestamo') {
+        setPrestamos(prev => {
+          const existente = prev.find(p => p.id === evento.id);
+          if (existente) {
+            return prev.map(p => (p.id === evento.id ? { ...p, ...datos } : p));
+          }
+          // Préstamo nuevo: el evento no trae el cliente anidado
+          const cliente = clientesRef.current.find(c => c.id === datos.cliente_id);
+          return [{ ...(datos as Prestamo), cliente } as Prestamo, ...prev];
+        });
+      } else if (evento.entidad === 'cliente') {
+        setClientes(prev =>
+          prev.some(c => c.id === evento.id)
+            ? prev.map(c => (c.id === evento.id ? { ...c, ...datos } : c))
+            : [{ archivos: [], ...(datos as Cliente) }, ...prev]
+        );
+      } else if (evento.entidad === 'archivo') {
+        setClientes(prev =>
+          prev.map(c =>
+            c.id === datos.cliente_id
+              ? { ...c, archivos: [...(c.archivos ?? []).filter(a => a.id !== evento.id), datos as any] }
+              : c
+          )
+        );
+      } else if (evento.entidad === 'inversor') {
+        setInversores(prev =>
+          prev.some(i => i.id === evento.id)
+            ? prev.map(i => (i.id === evento.id ? { ...i, ...datos } : i))
+            : [datos as Inversor, ...prev]
+        );
+      }
+    };
+
+    const resync = () => {
+      cargarPrestamos();
+      cargarClientes();
+      fetchInversores().then(setInversores).catch(console.error);
+    };
+
+    return suscribirCambios(aplicarCambio, resync);
+  }, []);
+
   /* =============================
      PRESTAMOS
   ============================== */
@@ -102,8 +171,8 @@ const App: React.FC = () => {
     fecha_vencimiento: string;
     estado_pago: string;
   }) => {
+    // El feed de cambios (/eventos) agrega el préstamo nuevo a la lista
     await crearPrestamoAPI(data as any);
-    await cargarPrestamos();
   };
 
   const updatePrestamo = (id: number, prestamo: Prestamo) => {
@@ -136,7 +205,7 @@ const App: React.FC = () => {
       ? prestamos
       : prestamos.filter(p => p.periodo_origen === periodoSeleccionado);
 
-    return prestamosFiltrados.reduce(
+    const resumen = prestamosFiltrados.reduce(
       (acc, p) => {
         // Total prestado: suma de monto_prestado de TODOS los préstamos
         // (nunca se descuenta, es el capital total otorgado)
@@ -168,6 +237,17 @@ const App: React.FC = () => {
         cantidad_morosos: 0
       }
     );
+
+    // Préstamos archivados (todos SI o RENOVADO): se suman desde sus totales
+    archivo
+      .filter(r => periodoSeleccionado === 'ALL' || r.periodo_origen === periodoSeleccionado)
+      .forEach(r => {
+        resumen.total_prestado += r.monto_prestado;
+        resumen.total_recuperado += r.monto_cobrado_final;
+        resumen.cantidad_prestamos += r.cantidad - r.cantidad_renovados;
+      });
+
+    return resumen;
   };
 
   return (
@@ -9,6 +9,10 @@ const __dirname = path.dirname(__filename);
 let mainWindow = null;
 let backendProcess = null;
 
+const BACKEND_HEALTH_URL = "http://127.0.0.1:8000/health";
+const HEALTH_INTERVALO_MS = 100;
+const HEALTH_TIMEOUT_MS = 20000;
+
 function startBackend() {
   if (backendProcess) return; // 🔒 evita doble arranque
 
@@ -26,6 +30,22 @@ function startBackend() {
   });
 }
 
+// Espera a que el backend responda /health en vez de un delay fijo.
+// Si se agota el timeout abre la ventana igual (la UI mostrará el error).
+async function waitForBackend() {
+  const limite = Date.now() + HEALTH_TIMEOUT_MS;
+  while (Date.now() < limite) {
+    try {
+      const res = await fetch(BACKEND_HEALTH_URL);
+      if (res.ok) return true;
+    } catch {
+      // todavía no escucha
+    }
+    await new Promise((r) => setTimeout(r, HEALTH_INTERVALO_MS));
+  }
+  return false;
+}
+
 function stopBackend() {
   if (backendProcess) {
     backendProcess.kill();
@@ -54,9 +74,10 @@ function createWindow() {
   });
 }
 
-app.whenReady().then(() => {
+app.whenReady().then(async () => {
   startBackend();
-  setTimeout(createWindow, 1500);
+  await waitForBackend();
+  createWindow();
 });
 
 app.on("window-all-closed", () => {
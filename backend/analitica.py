@@ -0,0 +1,251 @@
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from backend import inquilinos
+
+"""
+analitica.py: cohortes por período de origen (GET /analitica/cohortes).
+
+Para cada mes de originación (periodo_origen) y cada horizonte de
+HORIZONTES días contados desde la fecha de creación de cada préstamo, qué
+parte de los préstamos estaba:
+- pagado     → estado SI y fecha_pago <= creación + horizonte
+- renovado   → estado RENOVADO y fecha_pago <= creación + horizonte
+- bloqueado  → estado BLOQUEADO y ya vencido en el horizonte (el bloqueo
+               no tiene fecha: se toma el vencimiento como cota inferior)
+- vencido    → ya vencido en el horizonte y todavía sin cerrar
+- al_dia     → el resto (todavía no vencía)
+
+Solo cuentan los préstamos con edad >= horizonte ("observados"): un
+préstamo de hace 10 días todavía no dice nada sobre el día 30.
+Incluye los préstamos archivados (archivo.py): las cohortes viejas viven
+casi enteras en prestamos_archivo.
+
+El cálculo es UNA consulta: cada préstamo se cruza con los horizontes,
+se agrupa por (período, horizonte, estado) y el denominador sale de una
+función de ventana (SUM(COUNT(*)) OVER (PARTITION BY período, horizonte)).
+
+Caché: una cohorte queda CERRADA cuando hasta su último préstamo pasó el
+horizonte más largo; desde ahí sus números no cambian (un cobro tardío
+cae fuera de todos los horizontes). Solo el bloqueo puede cambiarlos, y
+crud.bloquear_prestamo invalida esa cohorte. Las cohortes abiertas (los
+últimos meses) se recalculan en cada request.
+"""
+
+HORIZONTES = (7, 14, 30, 60, 90)
+ESTADOS = ("pagado", "renovado", "bloqueado", "vencido", "al_dia")
+
+# Una caché por inquilino ("" = base principal): periodo_origen -> cohorte cerrada
+_caches: dict[str, dict[str, dict]] = {}
+_lock = threading.Lock()
+
+
+def _cache() -> dict[str, dict]:
+    """La caché del inquilino del request en curso (llamar con _lock tomado)."""
+    return _caches.setdefault(inquilinos.clave_actual(), {})
+
+
+def _dias(dialecto: str, hasta: str, desde: str) -> str:
+    """Expresión SQL con los días entre dos fechas, según el motor."""
+    if dialecto == "sqlite":
+        return f"CAST(julianday({hasta}) - julianday({desde}) AS INTEGER)"
+    return f"({hasta} - {desde})"
+
+
+def _menor(dialecto: str, expresion: str, tope: int) -> str:
+    funcion = "MIN" if dialecto == "sqlite" else "LEAST"
+    return f"{funcion}({expresion}, {tope})"
+
+
+def _consulta(dialecto: str, periodos: list[str] | None):
+    dias = lambda hasta, desde: _dias(dialecto, hasta, desde)  # noqa: E731
+    menor = lambda expresion: _menor(dialecto, expresion, max(HORIZONTES) + 1)  # noqa: E731
+    horizontes = " UNION ALL ".join(f"SELECT {h} AS h" for h in HORIZONTES)
+    filtro = "WHERE periodo_origen IN :periodos" if periodos is not None else ""
+    hoy = "CAST(:hoy AS DATE)" if dialecto != "sqlite" else ":hoy"
+    sql = f"""
+        WITH prestamos_todos AS (
+            SELECT periodo_origen, fecha_creacion, fecha_vencimiento, estado_pago, fecha_pago
+            FROM prestamos {filtro}
+            UNION ALL
+            SELECT periodo_origen, fecha_creacion, fecha_vencimiento, estado_pago, fecha_pago
+            FROM prestamos_archivo {filtro}
+        ),
+        base AS (
+            SELECT
+                periodo_origen AS periodo,
+                {dias(hoy, 'fecha_creacion')} AS edad,
+                {dias('fecha_vencimiento', 'fecha_creacion')} AS dias_vencimiento,
+                {dias('fecha_pago', 'fecha_creacion')} AS dias_cierre,
+                estado_pago
+            FROM prestamos_todos
+            WHERE periodo_origen IS NOT NULL AND fecha_creacion IS NOT NULL
+        ),
+        perfiles AS (
+            -- Más allá del horizonte máximo los días ya no distinguen nada:
+            -- recortados, miles de préstamos comparten el mismo perfil
+            SELECT
+                periodo,
+                {menor('edad')} AS edad,
+                {menor('dias_vencimiento')} AS dias_vencimiento,
+                {menor('dias_cierre')} AS dias_cierre,
+                estado_pago,
+                COUNT(*) AS n
+            FROM base
+            GROUP BY 1, 2, 3, 4, 5
+        ),
+        horizontes AS ({horizontes}),
+        estados AS (
+            SELECT
+                perfiles.periodo,
+                horizontes.h,
+                CASE
+                    WHEN perfiles.estado_pago = 'SI' AND perfiles.dias_cierre <= horizontes.h THEN 'pagado'
+                    WHEN perfiles.estado_pago = 'RENOVADO' AND perfiles.dias_cierre <= horizontes.h THEN 'renovado'
+                    WHEN perfiles.dias_vencimiento >= horizontes.h THEN 'al_dia'
+                    WHEN perfiles.estado_pago = 'BLOQUEADO' THEN 'bloqueado'
+                    ELSE 'vencido'
+                END AS estado,
+                perfiles.n
+            FROM perfiles CROSS JOIN horizontes
+            WHERE perfiles.edad >= horizontes.h
+        )
+        SELECT
+            periodo,
+            h,
+            estado,
+            SUM(n) AS cantidad,
+            SUM(SUM(n)) OVER (PARTITION BY periodo, h) AS observados
+        FROM estados
+        GROUP BY periodo, h, estado
+    """
+    consulta = text(sql)
+    if periodos is not None:
+        consulta = consulta.bindparams(bindparam("periodos", expanding=True))
+    return consulta
+
+
+def _cantidades(db: Session) -> dict[str, int]:
+    """Préstamos por cohorte, de las dos tablas (solo el índice de periodo_origen)."""
+    filas = db.execute(text("""
+        SELECT periodo, SUM(n) FROM (
+            SELECT periodo_origen AS periodo, COUNT(*) AS n
+            FROM prestamos WHERE periodo_origen IS NOT NULL GROUP BY periodo_origen
+            UNION ALL
+            SELECT periodo_origen, COUNT(*)
+            FROM prestamos_archivo WHERE periodo_origen IS NOT NULL GROUP BY periodo_origen
+        ) t
+        GROUP BY periodo
+    """))
+    return {periodo: int(n) for periodo, n in filas}
+
+
+def _montos(db: Session, periodos: list[str] | None) -> dict[str, float]:
+    """Capital prestado por cohorte (None = todas)."""
+    filtro = "AND periodo_origen IN :periodos" if periodos is not None else ""
+    consulta = text(f"""
+        SELECT periodo, SUM(monto) FROM (
+            SELECT periodo_origen AS periodo, SUM(monto_prestado) AS monto
+            FROM prestamos WHERE periodo_origen IS NOT NULL {filtro} GROUP BY periodo_origen
+            UNION ALL
+            SELECT periodo_origen, SUM(monto_prestado)
+            FROM prestamos_archivo WHERE periodo_origen IS NOT NULL {filtro} GROUP BY periodo_origen
+        ) t
+        GROUP BY periodo
+    """)
+    parametros = {}
+    if periodos is not None:
+        consulta = consulta.bindparams(bindparam("periodos", expanding=True))
+        parametros["periodos"] = periodos
+    # monto_prestado se guarda en centavos (dinero.Dinero); PostgreSQL suma en NUMERIC
+    return {periodo: int(monto or 0) / 100 for periodo, monto in db.execute(consulta, parametros)}
+
+
+def _esta_cerrada(periodo: str, hoy: date) -> bool:
+    """Todos los préstamos del mes ya superaron el horizonte más largo."""
+    try:
+        anio, mes = (int(x) for x in periodo.split("-"))
+    except ValueError:
+        return False
+    ultimo_dia = date(anio + mes // 12, mes % 12 + 1, 1) - timedelta(days=1)
+    return ultimo_dia + timedelta(days=max(HORIZONTES)) < hoy
+
+
+def _armar(periodo: str, cantidad: int, monto: float, filas: list, cerrada: bool) -> dict:
+    por_horizonte = {h: {"dias": h, "observados": 0, **{e: 0.0 for e in ESTADOS}} for h in HORIZONTES}
+    for _, h, estado, en_estado, observados in filas:
+        fila = por_horizonte[h]
+        fila["observados"] = int(observados)
+        fila[estado] = round(int(en_estado) / int(observados), 4)
+    return {
+        "periodo_origen": periodo,
+        "cantidad": cantidad,
+        "monto_prestado": round(monto, 2),
+        "cerrada": cerrada,
+        "horizontes": list(por_horizonte.values()),
+    }
+
+
+def cohortes(db: Session, hoy: date | None = None) -> list[dict]:
+    """Una entrada por período de origen (el más nuevo primero)."""
+    hoy = hoy or date.today()
+    cantidades = _cantidades(db)
+    periodos = sorted(cantidades, reverse=True)
+
+    with _lock:
+        # Si entró un préstamo con un período viejo, la cantidad ya no coincide
+        cache = _cache()
+        en_cache = {
+            p: cache[p] for p in periodos
+            if p in cache and cache[p]["cantidad"] == cantidades[p]
+        }
+    pendientes = [p for p in periodos if p not in en_cache]
+
+    calculadas: dict[str, list] = {p: [] for p in pendientes}
+    montos: dict[str, float] = {}
+    if pendientes:
+        dialecto = db.get_bind().dialect.name
+        # Primera vez (todo pendiente): sin filtro, una pasada por las tablas
+        filtro = pendientes if len(pendientes) < len(periodos) else None
+        parametros = {"hoy": hoy.isoformat()}
+        if filtro is not None:
+            parametros["periodos"] = filtro
+        for fila in db.execute(_consulta(dialecto, filtro), parametros):
+            if fila[0] in calculadas:
+                calculadas[fila[0]].append(fila)
+        montos = _montos(db, filtro)
+
+    resultado = []
+    nuevas_cerradas = {}
+    for periodo in periodos:
+        if periodo in en_cache:
+            cohorte = en_cache[periodo]
+        else:
+            cerrada = _esta_cerrada(periodo, hoy)
+            cohorte = _armar(periodo, cantidades[periodo], montos.get(periodo, 0.0), calculadas[periodo], cerrada)
+            if cerrada:
+                nuevas_cerradas[periodo] = cohorte
+        resultado.append(cohorte)
+
+    if nuevas_cerradas:
+        with _lock:
+            _cache().update(nuevas_cerradas)
+    return resultado
+
+
+def invalidar(periodo: str | None = None) -> None:
+    """Descarta la cohorte cacheada de `periodo` (None = todas)."""
+    with _lock:
+        if periodo is None:
+            _cache().clear()
+        else:
+            _cache().pop(periodo, None)
+
+
+def descartar(clave: str) -> None:
+    """Libera la caché de un inquilino que se cerró (inquilinos.py)."""
+    with _lock:
+        _caches.pop(clave, None)
@@ -0,0 +1,164 @@
+import os
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import bindparam, insert, select, text
+from sqlalchemy.orm import Session
+
+from backend import auditoria, eventos, models, sincronizacion
+from backend.database import SessionLocal
+
+"""
+archivo.py: archivo de préstamos cerrados.
+
+Los préstamos PAGADOS (estado_pago = 'SI') y RENOVADOS no cambian más,
+pero siguen en `prestamos` y cada listado, cálculo de mora o cobro por
+lote los recorre. Este job los mueve a `prestamos_archivo` cuando tienen
+más de PRESTAMOS_ARCHIVO_DIAS días de cerrados, así la tabla caliente
+queda del tamaño de la cartera activa.
+
+Cada lote (hasta `tamano_lote` préstamos) es UNA transacción:
+- INSERT ... SELECT a prestamos_archivo (mismo id, mismas columnas);
+- suma sus totales a resumen_periodos_archivo (por periodo_origen), de
+  donde salen los totales históricos sin leer el archivo;
+- DELETE de prestamos;
+- tombstones en `cambios` para que el delta sync los saque de la cartera;
+- una fila de auditoría por préstamo (accion "archivado"): el DELETE es de
+  Core y el enganche del flush no lo ve.
+
+Confirmado el lote, cada préstamo sale por eventos.bus como "eliminado" y
+la UI lo saca de la lista sin recargar. Un cliente al que un archivo
+grande le llena la cola recibe `resync`, como siempre.
+
+Si algo falla a mitad, ese lote se deshace entero: nunca queda un
+préstamo en las dos tablas ni un resumen sin su préstamo.
+
+Se corre sola al arrancar (después del backup) o a mano:
+    python -m backend.archivo [dias]
+"""
+
+# Antigüedad mínima (días desde el pago / la renovación). 0 = no archivar.
+DIAS_ARCHIVO = int(os.getenv("PRESTAMOS_ARCHIVO_DIAS", "365"))
+
+TAMANO_LOTE = 500
+
+ESTADOS_CERRADOS = ("SI", "RENOVADO")
+
+_PRESTAMOS = models.Prestamo.__table__
+_ARCHIVO = models.PrestamoArchivado.__table__
+_RESUMEN = models.ResumenPeriodoArchivo.__table__
+
+# Columnas que se copian tal cual (todas las del archivo menos archivado_en)
+_COLUMNAS = [c.name for c in _ARCHIVO.columns if c.name != "archivado_en"]
+
+_SUMAR_RESUMEN = text("""
+    INSERT INTO resumen_periodos_archivo (
+        periodo_origen, cantidad, cantidad_renovados,
+        monto_prestado, total_a_pagar, total_cobrado, monto_cobrado_final
+    )
+    SELECT
+        COALESCE(periodo_origen, ''),
+        COUNT(*),
+        SUM(CASE WHEN estado_pago = 'RENOVADO' THEN 1 ELSE 0 END),
+        SUM(monto_prestado),
+        SUM(total_a_pagar),
+        SUM(total_cobrado),
+        COALESCE(SUM(monto_cobrado_final), 0)
+    FROM prestamos
+    WHERE id IN :ids
+    GROUP BY COALESCE(periodo_origen, '')
+    ON CONFLICT (periodo_origen) DO UPDATE SET
+        cantidad = resumen_periodos_archivo.cantidad + excluded.cantidad,
+        cantidad_renovados = resumen_periodos_archivo.cantidad_renovados + excluded.cantidad_renovados,
+        monto_prestado = resumen_periodos_archivo.monto_prestado + excluded.monto_prestado,
+        total_a_pagar = resumen_periodos_archivo.total_a_pagar + excluded.total_a_pagar,
+        total_cobrado = resumen_periodos_archivo.total_cobrado + excluded.total_cobrado,
+        monto_cobrado_final = resumen_periodos_archivo.monto_cobrado_final + excluded.monto_cobrado_final
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def _candidatos(db: Session, limite: date, tamano_lote: int) -> list[int]:
+    """Ids del próximo lote a archivar."""
+    # El último préstamo nunca se archiva: SQLite reutilizaría su id
+    # (INTEGER PRIMARY KEY sin AUTOINCREMENT) y chocaría con el archivo.
+    ultimo_id = select(_PRESTAMOS.c.id).order_by(_PRESTAMOS.c.id.desc()).limit(1).scalar_subquery()
+    fecha_cierre = _PRESTAMOS.c.fecha_pago
+    return list(db.execute(
+        select(_PRESTAMOS.c.id)
+        .where(
+            _PRESTAMOS.c.estado_pago.in_(ESTADOS_CERRADOS),
+            fecha_cierre.is_not(None),
+            fecha_cierre < limite,
+            _PRESTAMOS.c.id < ultimo_id,
+        )
+        .order_by(_PRESTAMOS.c.id)
+        .limit(tamano_lote)
+    ).scalars())
+
+
+def _archivar_lote(db: Session, ids: list[int], hoy: date) -> None:
+    origen = select(*[_PRESTAMOS.c[c] for c in _COLUMNAS]).where(_PRESTAMOS.c.id.in_(ids))
+    db.execute(insert(_ARCHIVO).from_select(_COLUMNAS, origen))
+    db.execute(_ARCHIVO.update().where(_ARCHIVO.c.id.in_(ids)).values(archivado_en=hoy))
+    db.execute(_SUMAR_RESUMEN, {"ids": ids})
+    db.execute(_PRESTAMOS.delete().where(_PRESTAMOS.c.id.in_(ids)))
+
+    version = sincronizacion.reservar_version(db)
+    db.execute(insert(models.Cambio.__table__), [
+        {"version": version, "entidad": "prestamo", "entidad_id": pid, "eliminado": True}
+        for pid in ids
+    ])
+    for pid in ids:
+        auditoria.registrar(db, "prestamo", pid, {"archivado_en": [None, hoy]}, "archivado")
+
+
+def archivar_cerrados(dias: int = DIAS_ARCHIVO, tamano_lote: int = TAMANO_LOTE,
+                      session_factory=SessionLocal) -> int:
+    """
+    Mueve al archivo los préstamos cerrados hace más de `dias` días.
+    Devuelve cuántos se archivaron.
+    """
+    if dias <= 0:
+        return 0
+
+    hoy = date.today()
+    limite = hoy - timedelta(days=dias)
+    total = 0
+    while True:
+        db = session_factory()
+        try:
+            ids = _candidatos(db, limite, tamano_lote)
+            if not ids:
+                db.rollback()
+                return total
+            _archivar_lote(db, ids, hoy)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        for pid in ids:
+            eventos.bus.publicar("prestamo", pid, None, "eliminado")
+        total += len(ids)
+        if len(ids) < tamano_lote:
+            return total
+
+
+# =========================
+# LECTURAS
+# =========================
+
+def listar_resumen(db: Session) -> list[dict]:
+    """Totales archivados por período (el más nuevo primero)."""
+    filas = db.execute(select(_RESUMEN).order_by(_RESUMEN.c.periodo_origen.desc())).mappings()
+    # '' = préstamos viejos sin período: se exponen como null
+    return [{**fila, "periodo_origen": fila["periodo_origen"] or None} for fila in filas]
+
+
+if __name__ == "__main__":
+    from backend.database import inicializar_esquema
+
+    inicializar_esquema()
+    dias = int(sys.argv[1]) if len(sys.argv) > 1 else DIAS_ARCHIVO
+    print(f"Archivados: {archivar_cerrados(dias)} préstamos cerrados hace más de {dias} días")
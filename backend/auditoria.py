@@ -0,0 +1,332 @@
+import atexit
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+import orjson
+from sqlalchemy import event, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from backend import models, sincronizacion
+from backend.database import SessionLocal
+
+"""
+auditoria.py: quién cambió qué, con los valores de antes y después.
+
+- Un evento after_flush de SessionLocal (el mismo enganche que
+  sincronizacion.py) arma una fila por cada alta, cambio o baja de
+  clientes, archivos, préstamos, inversores y tarifas: cubre todas las
+  escrituras del ORM de crud.py y la subida de archivos de main.py, sin
+  tocarlas.
+  Los cambios guardan solo las columnas modificadas: {campo: [antes, después]}.
+- Las filas se encolan recién en after_commit (lo deshecho no se audita)
+  en una cola en memoria. Un hilo las inserta en lotes de hasta LOTE_MAX,
+  cada INTERVALO_SEGUNDOS o antes si se junta un lote: la escritura del
+  request no paga un INSERT ni un commit más.
+- Con el escritor único (escritura.py) el commit de la unidad es solo un
+  SAVEPOINT: sus filas se encolan cuando se confirma el lote (diferir()).
+- Cada fila va a la base de la sesión que la generó (la principal o la
+  de un inquilino, ver inquilinos.py).
+- Al cerrar (shutdown o salida del intérprete) detener() vacía la cola.
+  Lo que se pierde ante un corte abrupto es a lo sumo lo encolado en el
+  último INTERVALO_SEGUNDOS.
+
+Quién y desde dónde: AuditoriaMiddleware toma la cabecera X-Usuario y el
+método + ruta del request.
+
+GET /auditoria?entidad=prestamo&id=7 lista el historial (índice
+(entidad, entidad_id, id)), del más nuevo al más viejo.
+
+PRESTAMOS_AUDITORIA=0 la desactiva.
+"""
+
+ACTIVA = os.getenv("PRESTAMOS_AUDITORIA", "1") != "0"
+
+LOTE_MAX = 500
+INTERVALO_SEGUNDOS = 0.5
+LIMITE_MAX = 500
+
+CABECERA_USUARIO = b"x-usuario"
+
+# Las de sincronizacion.py más las tarifas, que no llevan row_version
+# (crud.crear_tarifa anota su cambio a mano) pero son lo más sensible
+ENTIDADES = {**sincronizacion.ENTIDADES, models.Tarifa: "tarifa"}
+
+# Columnas de control que cambian en cada escritura y no dicen nada
+IGNORADAS = {"row_version"}
+
+_CLAVE_PENDIENTES = "_auditoria_pendientes"
+
+_usuario: ContextVar[str | None] = ContextVar("auditoria_usuario", default=None)
+_origen: ContextVar[str | None] = ContextVar("auditoria_origen", default=None)
+
+_cola: queue.SimpleQueue = queue.SimpleQueue()  # (engine, fila)
+_hay_lote = threading.Event()
+_detener = threading.Event()
+_lock_hilo = threading.Lock()
+_lock_escritura = threading.Lock()
+_hilo: threading.Thread | None = None
+_reintentos: list[tuple] = []
+_local = threading.local()
+
+escritas = 0
+lotes = 0
+
+
+# =========================
+# CAPTURA
+# =========================
+
+def _columnas(obj):
+    return [a.key for a in inspect(obj).mapper.column_attrs if a.key not in IGNORADAS]
+
+
+def _cambios(obj) -> dict:
+    """Columnas modificadas en este flush: {campo: [antes, después]}."""
+    estado = inspect(obj)
+    cambios = {}
+    for clave in _columnas(obj):
+        historia = estado.attrs[clave].history
+        if historia.added or historia.deleted:
+            antes = historia.deleted[0] if historia.deleted else None
+            despues = historia.added[0] if historia.added else None
+            if antes != despues:
+                cambios[clave] = [antes, despues]
+    return cambios
+
+
+def _fila(accion: str, entidad: str, entidad_id: int, cambios: dict, fecha: datetime) -> dict:
+    return {
+        "fecha": fecha,
+        "entidad": entidad,
+        "entidad_id": entidad_id,
+        "accion": accion,
+        "cambios": orjson.dumps(cambios).decode(),
+        "usuario": _usuario.get(),
+        "origen": _origen.get(),
+    }
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _despues_de_flush(session, flush_context):
+    # En after_flush las listas new/dirty/deleted y el historial de cada
+    # atributo todavía muestran el estado previo al flush (y ya hay ids)
+    if not ACTIVA:
+        return
+    ahora = datetime.now()
+    filas = []
+    for obj in session.new:
+        if type(obj) in ENTIDADES:
+            filas.append(_fila("creado", ENTIDADES[type(obj)], obj.id,
+                               {c: [None, getattr(obj, c)] for c in _columnas(obj)}, ahora))
+    for obj in session.dirty:
+        if type(obj) in ENTIDADES:
+            cambios = _cambios(obj)
+            if cambios:
+                filas.append(_fila("actualizado", ENTIDADES[type(obj)], obj.id, cambios, ahora))
+    for obj in session.deleted:
+        if type(obj) in ENTIDADES:
+            filas.append(_fila("eliminado", ENTIDADES[type(obj)], obj.id,
+                               {c: [getattr(obj, c), None] for c in _columnas(obj)}, ahora))
+    if filas:
+        engine = session.connection().engine
+        session.info.setdefault(_CLAVE_PENDIENTES, []).extend((engine, f) for f in filas)
+
+
+def registrar(session: Session, entidad: str, entidad_id: int, cambios: dict,
+              accion: str = "actualizado") -> None:
+    """
+    Un cambio escrito sin el flush del ORM (SQL de Core, p. ej.
+    crud.cobrar_lote o el archivo de préstamos): queda pendiente como los de
+    after_flush y se encola al confirmar. `cambios` es {campo: [antes, después]}.
+    """
+    if not ACTIVA or not cambios:
+        return
+    engine = session.connection().engine
+    fila = _fila(accion, entidad, entidad_id, cambios, datetime.now())
+    session.info.setdefault(_CLAVE_PENDIENTES, []).append((engine, fila))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _despues_de_commit(session):
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, None)
+    if not pendientes:
+        return
+    diferidos = getattr(_local, "diferidos", None)
+    if diferidos is not None:
+        diferidos.extend(pendientes)
+        return
+    encolar(pendientes)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _despues_de_rollback(session):
+    session.info.pop(_CLAVE_PENDIENTES, None)
+
+
+def encolar(pendientes: list[tuple]) -> None:
+    """Pasa filas (engine, fila) ya confirmadas a la cola del hilo escritor."""
+    if not pendientes:
+        return
+    _asegurar_hilo()
+    for item in pendientes:
+        _cola.put(item)
+    if _cola.qsize() >= LOTE_MAX:
+        _hay_lote.set()
+
+
+@contextmanager
+def diferir():
+    """
+    Dentro del bloque, lo confirmado en ESTE hilo solo se acumula (como
+    eventos.bus.diferir). Quien llama lo encola tras el commit de verdad.
+    """
+    anteriores = getattr(_local, "diferidos", None)
+    pendientes: list[tuple] = []
+    _local.diferidos = pendientes
+    try:
+        yield pendientes
+    finally:
+        _local.diferidos = anteriores
+
+
+class AuditoriaMiddleware:
+    """Deja el usuario (X-Usuario) y el método + ruta del request para las filas."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+        usuario = None
+        for nombre, valor in scope.get("headers", ()):
+            if nombre == CABECERA_USUARIO:
+                usuario = valor.decode("utf-8", "replace").strip()[:100] or None
+                break
+        token_usuario = _usuario.set(usuario)
+        # Sin el prefijo del inquilino (ya va en root_path, ver inquilinos.py)
+        ruta = scope["path"]
+        raiz = scope.get("root_path", "")
+        if raiz and ruta.startswith(raiz):
+            ruta = ruta[len(raiz):]
+        token_origen = _origen.set(f"{scope['method']} {ruta}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _usuario.reset(token_usuario)
+            _origen.reset(token_origen)
+
+
+# =========================
+# ESCRITURA EN LOTES
+# =========================
+
+def _insertar(lote: list[tuple]) -> None:
+    global escritas, lotes
+    por_engine: dict = {}
+    for engine, fila in lote:
+        por_engine.setdefault(engine, []).append(fila)
+    for engine, filas in por_engine.items():
+        with engine.begin() as conn:
+            conn.execute(insert(models.Auditoria.__table__), filas)
+        escritas += len(filas)
+    lotes += 1
+
+
+def vaciar() -> int:
+    """Inserta todo lo encolado hasta ahora. Devuelve cuántas filas."""
+    global _reintentos
+    total = 0
+    with _lock_escritura:
+        while True:
+            lote, _reintentos = _reintentos, []
+            while len(lote) < LOTE_MAX:
+                try:
+                    lote.append(_cola.get_nowait())
+                except queue.Empty:
+                    break
+            if not lote:
+                return total
+            try:
+                _insertar(lote)
+            except Exception as e:
+                # Queda para la próxima pasada (p. ej. base bloqueada un rato)
+                _reintentos = lote
+                print(f"Auditoría: no se pudo escribir un lote de {len(lote)}: {e}")
+                return total
+            total += len(lote)
+
+
+def _bucle() -> None:
+    while not _detener.is_set():
+        _hay_lote.wait(INTERVALO_SEGUNDOS)
+        _hay_lote.clear()
+        vaciar()
+
+
+def _asegurar_hilo() -> None:
+    global _hilo
+    if _hilo is not None and _hilo.is_alive():
+        return
+    with _lock_hilo:
+        if _hilo is not None and _hilo.is_alive():
+            return
+        _detener.clear()
+        _hilo = threading.Thread(target=_bucle, name="auditoria", daemon=True)
+        _hilo.start()
+
+
+def detener() -> None:
+    """Frena el hilo y escribe lo que quede en la cola."""
+    global _hilo
+    _detener.set()
+    _hay_lote.set()
+    if _hilo is not None:
+        _hilo.join(timeout=30)
+        _hilo = None
+    vaciar()
+    if _reintentos or not _cola.empty():
+        print(f"Auditoría: {len(_reintentos) + _cola.qsize()} filas sin escribir al cerrar")
+
+
+# También fuera del servidor (scripts, benchmarks): nada queda en la cola
+atexit.register(detener)
+
+
+# =========================
+# CONSULTA (GET /auditoria)
+# =========================
+
+def _datos(fila: models.Auditoria) -> dict:
+    return {
+        "id": fila.id,
+        "fecha": fila.fecha,
+        "entidad": fila.entidad,
+        "entidad_id": fila.entidad_id,
+        "accion": fila.accion,
+        "cambios": orjson.loads(fila.cambios),
+        "usuario": fila.usuario,
+        "origen": fila.origen,
+    }
+
+
+def listar(db: Session, entidad: str | None = None, entidad_id: int | None = None,
+           limite: int = 100, antes_de: int | None = None) -> list[dict]:
+    """Historial del más nuevo al más viejo; `antes_de` (un id) pagina hacia atrás."""
+    # Lo encolado también: quien acaba de escribir ve su cambio
+    vaciar()
+    consulta = select(models.Auditoria)
+    if entidad is not None:
+        consulta = consulta.where(models.Auditoria.entidad == entidad)
+    if entidad_id is not None:
+        consulta = consulta.where(models.Auditoria.entidad_id == entidad_id)
+    if antes_de is not None:
+        consulta = consulta.where(models.Auditoria.id < antes_de)
+    limite = max(1, min(limite, LIMITE_MAX))
+    filas = db.execute(consulta.order_by(models.Auditoria.id.desc()).limit(limite)).scalars()
+    return [_datos(f) for f in filas]
@@ -0,0 +1,297 @@
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - depende del entorno (Windows)
+    fcntl = None
+    import msvcrt
+
+"""
+coordinacion.py: varios procesos (workers de uvicorn) sobre la misma base.
+
+- bloqueo(engine, nombre): exclusión mutua ENTRE procesos, esperando.
+  database.inicializar_esquema lo usa para que create_all y las
+  migraciones corran una sola vez aunque arranquen N workers juntos.
+- al_ser_lider(engine, funcion): de todos los procesos, uno solo (el líder)
+  corre lo que no se puede duplicar: respaldos, archivo de préstamos,
+  mantenimiento y reanudar reportes. Los demás reintentan cada
+  LIDER_SEGUNDOS y toman la posta si el líder se cae.
+- Relevo de eventos: el bus SSE (eventos.py) es por proceso. Con WORKERS > 1
+  cada worker lee cada RELEVO_SEGUNDOS la tabla `cambios` y publica en su
+  bus lo que confirmaron los otros (lo propio ya se publicó al confirmar;
+  sincronizacion.versiones_propias dice qué versiones son de este proceso).
+  Las bajas ajenas (archivo de préstamos) se avisan con `resync`. Un
+  cambio de tarifas descarta el registro de tarifas.py del proceso.
+
+El bloqueo es un archivo `<base>.<nombre>.lock` (flock / msvcrt) con SQLite
+y un advisory lock de sesión con PostgreSQL: si el proceso muere, lo
+libera el sistema operativo o el servidor. Otros motores: sin coordinación.
+
+WORKERS sale de WEB_CONCURRENCY, la misma variable que usa uvicorn como
+valor por defecto de --workers.
+"""
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+LIDER_SEGUNDOS = 30
+RELEVO_SEGUNDOS = float(os.getenv("PRESTAMOS_RELEVO_SEGUNDOS", "1"))
+
+_detener = threading.Event()
+_hilos: list[threading.Thread] = []
+_lider = None  # _Bloqueo retenido mientras este proceso es el líder
+_lock_lider = threading.Lock()
+
+
+# =========================
+# BLOQUEOS ENTRE PROCESOS
+# =========================
+
+def _clave(nombre: str) -> int:
+    """Clave estable (entre procesos y reinicios) del advisory lock de PostgreSQL."""
+    return zlib.crc32(f"prestamos.{nombre}".encode())
+
+
+def _bloquear_archivo(archivo) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _desbloquear_archivo(archivo) -> None:
+    if fcntl is not None:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+    else:
+        archivo.seek(0)
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _Bloqueo:
+    """Bloqueo exclusivo entre procesos, identificado por nombre."""
+
+    def __init__(self, engine, nombre: str):
+        self.engine = engine
+        self.nombre = nombre
+        self._archivo = None
+        self._conn = None
+
+    def adquirir(self, esperar: bool = True) -> bool:
+        dialecto = self.engine.dialect.name
+        if dialecto == "sqlite":
+            return self._adquirir_archivo(esperar)
+        if dialecto == "postgresql":
+            return self._adquirir_advisory(esperar)
+        return True
+
+    def _adquirir_archivo(self, esperar: bool) -> bool:
+        base = self.engine.url.database
+        if not base or base == ":memory:":
+            return True
+        archivo = open(f"{base}.{self.nombre}.lock", "a+b")
+        try:
+            while not _bloquear_archivo(archivo):
+                if not esperar:
+                    archivo.close()
+                    return False
+                time.sleep(0.1)
+        except BaseException:
+            archivo.close()
+            raise
+        self._archivo = archivo
+        return True
+
+    def _adquirir_advisory(self, esperar: bool) -> bool:
+        # AUTOCOMMIT: el lock es de sesión y la conexión no queda "idle in transaction"
+        conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        funcion = "pg_advisory_lock" if esperar else "pg_try_advisory_lock"
+        try:
+            obtenido = conn.execute(text(f"SELECT {funcion}(:clave)"), {"clave": _clave(self.nombre)}).scalar()
+        except BaseException:
+            conn.close()
+            raise
+        # pg_advisory_lock devuelve void: si volvió, se obtuvo
+        if esperar or obtenido:
+            self._conn = conn
+            return True
+        conn.close()
+        return False
+
+    def liberar(self) -> None:
+        if self._archivo is not None:
+            try:
+                _desbloquear_archivo(self._archivo)
+            finally:
+                self._archivo.close()
+                self._archivo = None
+        if self._conn is not None:
+            try:
+                # Volver al pool NO suelta un lock de sesión: se suelta a mano
+                self._conn.execute(text("SELECT pg_advisory_unlock(:clave)"), {"clave": _clave(self.nombre)})
+            finally:
+                self._conn.close()
+                self._conn = None
+
+
+@contextmanager
+def bloqueo(engine, nombre: str):
+    """Bloque exclusivo entre procesos (espera a que el otro termine)."""
+    cerrojo = _Bloqueo(engine, nombre)
+    cerrojo.adquirir(esperar=True)
+    try:
+        yield
+    finally:
+        cerrojo.liberar()
+
+
+# =========================
+# LÍDER
+# =========================
+
+def _intentar_liderar(engine) -> bool:
+    global _lider
+    with _lock_lider:
+        if _lider is not None:
+            return True
+        cerrojo = _Bloqueo(engine, "lider")
+        if not cerrojo.adquirir(esperar=False):
+            return False
+        _lider = cerrojo
+        return True
+
+
+def es_lider() -> bool:
+    return _lider is not None
+
+
+def al_ser_lider(engine, funcion) -> bool:
+    """
+    Corre `funcion` si este proceso es el líder; si no, la corre cuando
+    llegue a serlo (hilo que reintenta). Devuelve si ya lo era.
+    """
+    _detener.clear()
+    if _intentar_liderar(engine):
+        funcion()
+        return True
+
+    def _esperar():
+        while not _detener.wait(LIDER_SEGUNDOS):
+            if _intentar_liderar(engine):
+                print("Coordinación: este worker pasa a ser el líder")
+                funcion()
+                return
+
+    _iniciar_hilo(_esperar, "lider")
+    return False
+
+
+# =========================
+# RELEVO DE EVENTOS ENTRE WORKERS
+# =========================
+
+def _retransmitir(session_factory, desde: int) -> int:
+    """Publica en el bus los cambios ajenos posteriores a `desde`. Devuelve el nuevo cursor."""
+    from backend import analitica, crud, eventos, models, sincronizacion, tarifas
+
+    relevadas = (
+        ("cliente", "clientes", eventos.CAMPOS_CLIENTE),
+        ("archivo", "archivos", eventos.CAMPOS_ARCHIVO),
+        ("prestamo", "prestamos", eventos.CAMPOS_PRESTAMO),
+        ("inversor", "inversores", eventos.CAMPOS_INVERSOR),
+    )
+    propias = sincronizacion.versiones_propias or set()
+    db = session_factory()
+    try:
+        while True:
+            pagina = crud.listar_cambios(db, desde)
+            for entidad, clave, campos in relevadas:
+                for obj in pagina[clave]:
+                    if obj.row_version in propias:
+                        continue
+                    if entidad == "prestamo" and obj.estado_pago == "BLOQUEADO":
+                        # La caché de cohortes de ESTE proceso no vio el bloqueo
+                        analitica.invalidar(obj.periodo_origen)
+                    eventos.bus.publicar(entidad, obj.id, eventos.datos_de(obj, campos))
+            if pagina["tarifas"]:
+                # El registro de tarifas de ESTE proceso no vio el cambio (si
+                # fue propio ya se invalidó: recargar otra vez es barato)
+                tarifas.invalidar()
+            if pagina["eliminados"]:
+                versiones = db.query(models.Cambio.version).filter(
+                    models.Cambio.version > desde,
+                    models.Cambio.version <= pagina["hasta"],
+                    models.Cambio.eliminado.is_(True),
+                ).distinct()
+                if any(v not in propias for (v,) in versiones):
+                    eventos.bus.forzar_resync()
+            desde = pagina["hasta"]
+            if not pagina["hay_mas"]:
+                break
+    finally:
+        db.close()
+
+    for version in list(propias):
+        if version <= desde:
+            propias.discard(version)
+    return desde
+
+
+def _relevar(session_factory, intervalo: float) -> None:
+    from backend import sincronizacion
+
+    db = session_factory()
+    try:
+        cursor = sincronizacion.version_actual(db)
+    finally:
+        db.close()
+    while not _detener.wait(intervalo):
+        try:
+            cursor = _retransmitir(session_factory, cursor)
+        except Exception as e:
+            print(f"Relevo de eventos falló: {e}")
+
+
+def iniciar_relevo(session_factory, intervalo_segundos: float = RELEVO_SEGUNDOS) -> None:
+    """Con varios workers, empieza a publicar en este proceso lo que escriben los demás."""
+    from backend import sincronizacion
+
+    if WORKERS <= 1 or intervalo_segundos <= 0:
+        return
+    if any(h.name == "relevo" and h.is_alive() for h in _hilos):
+        return
+    _detener.clear()
+    if sincronizacion.versiones_propias is None:
+        sincronizacion.versiones_propias = set()
+    _iniciar_hilo(_relevar, "relevo", session_factory, intervalo_segundos)
+
+
+# =========================
+# CICLO DE VIDA
+# =========================
+
+def _iniciar_hilo(funcion, nombre: str, *args) -> None:
+    hilo = threading.Thread(target=funcion, args=args, name=nombre, daemon=True)
+    _hilos.append(hilo)
+    hilo.start()
+
+
+def detener() -> None:
+    """Al cerrar: corta los hilos y suelta el liderazgo (otro worker lo toma)."""
+    global _lider
+    _detener.set()
+    for hilo in _hilos:
+        hilo.join(timeout=10)
+    _hilos.clear()
+    with _lock_lider:
+        if _lider is not None:
+            _lider.liberar()
+            _lider = None
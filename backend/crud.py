@@ -1,65 +1,94 @@
 
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import date, timedelta
 from math import ceil
 from fastapi import HTTPException
-from . import models, schemas
+from . import models, schemas, eventos, sincronizacion, lecturas, analitica, tarifas, auditoria
+from .dinero import a_centavos, a_pesos, redondear, sumar, restar
 
 """
 crud.py contiene TODA la lógica de acceso a datos.
 Acá NO hay FastAPI ni HTTP, solo base de datos.
+
+Montos: todo monto calculado se redondea a centavos (dinero.redondear) y
+los acumulados se suman en centavos enteros (dinero.sumar / dinero.restar),
+igual que como se guardan en la base.
+
+Eventos: cada escritura publica, DESPUÉS del commit, un evento compacto en
+eventos.bus (feed GET /eventos) para que la UI parchee su estado local.
+
+Listados: GET /prestamos, /clientes e /inversores leen con lecturas.py
+(consultas Core a objetos livianos con __slots__), no con instancias ORM.
+
+Tasas: la de cada plazo sale de la tabla `tarifas` (registro en memoria de
+tarifas.py). Cada préstamo guarda su plazo y la tarifa que se le aplicó.
+
+Concurrencia: las operaciones sobre un préstamo existente (cobrar, agregar
+monto, renovar, bloquear) reciben opcionalmente `version_esperada` (If-Match).
+Si no coincide, o si otra operación confirmó antes (StaleDataError del
+version_id_col), se responde 409 y no se escribe nada.
 """
 
+
+def _publicar_prestamo(prestamo: models.Prestamo, accion: str = "actualizado") -> None:
+    eventos.bus.publicar(
+        "prestamo", prestamo.id, eventos.datos_de(prestamo, eventos.CAMPOS_PRESTAMO), accion
+    )
+
+
+# =========================
+# CONCURRENCIA OPTIMISTA
+# =========================
+
+DETALLE_CONFLICTO = "El préstamo fue modificado por otra operación. Recargue y vuelva a intentar."
+
+
+def _verificar_version(prestamo: models.Prestamo, version_esperada: int | None) -> None:
+    """409 si el cliente trabajó sobre una versión vieja del préstamo (If-Match)."""
+    if version_esperada is not None and prestamo.version != version_esperada:
+        raise HTTPException(status_code=409, detail=DETALLE_CONFLICTO)
+
+
+def _confirmar(db: Session) -> None:
+    """
+    Commit de una escritura sobre préstamos existentes. El UPDATE lleva
+    `AND version = ?`: si otra operación ganó la carrera no afecta filas,
+    SQLAlchemy lanza StaleDataError y se responde 409.
+    """
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DETALLE_CONFLICTO)
+
+
 # =========================
 # BLOQUEAR PRÉSTAMO
 # =========================
-def bloquear_prestamo(db: Session, prestamo_id: int):
+def bloquear_prestamo(db: Session, prestamo_id: int, version_esperada: int | None = None):
     prestamo = db.query(models.Prestamo).filter(models.Prestamo.id == prestamo_id).first()
     if not prestamo:
         return None
+    _verificar_version(prestamo, version_esperada)
     if prestamo.estado_pago == "BLOQUEADO":
+        aplicar_finanzas(prestamo)
         return prestamo  # Ya bloqueado
     # Cambiar estado a BLOQUEADO
     prestamo.estado_pago = "BLOQUEADO"
-    db.commit()
+    _confirmar(db)
+    # Cambia los números de su cohorte aunque ya esté cerrada
+    analitica.invalidar(prestamo.periodo_origen)
     db.refresh(prestamo)
+    aplicar_finanzas(prestamo)
+    _publicar_prestamo(prestamo)
     return prestamo
 
 # =========================
 # FUNCIONES AUXILIARES (CÁLCULOS)
 # =========================
 
-def deducir_plazo_del_prestamo(prestamo: models.Prestamo) -> int:
-    """
-    Deduce el plazo (en días) de un préstamo existente basándose en 
-    la tasa de interés implícita (diferencia entre total_a_pagar y monto_prestado).
-    
-    Tasas conocidas:
-    - 7 días: 20% (monto * 1.2)
-    - 14 días: 40% (monto * 1.4)
-    - 30 días: 100% (monto * 2.0)
-    
-    @param prestamo: Objeto Prestamo de la BD
-    @return: Plazo en días (7, 14, o 30). Si no coincide, retorna 7 por defecto.
-    """
-    if prestamo.monto_prestado <= 0:
-        return 7  # default
-    
-    # Calcular tasa de interés (como ratio)
-    tasa = (prestamo.total_a_pagar - prestamo.monto_prestado) / prestamo.monto_prestado
-    
-    # Comparar con tolerancia pequeña
-    if abs(tasa - 0.20) < 0.01:
-        return 7
-    elif abs(tasa - 0.40) < 0.01:
-        return 14
-    elif abs(tasa - 1.00) < 0.01:
-        return 30
-    
-    # Si no coincide exactamente, devolver 7 por defecto
-    return 7
-
-
 def calcular_mora(prestamo: models.Prestamo) -> tuple[int, bool]:
     """
     Calcula los días de atraso y si el préstamo es moroso.
@@ -133,20 +162,38 @@ def calcular_estado_prestamo(estado_pago: str, es_moroso: bool) -> str:
 # Tasa punitoria diaria (5% diario)
 TASA_PUNITORIA_DIARIA = 0.05
 
+def calcular_total_a_pagar(monto: float, tasa: float) -> float:
+    """
+    Total a pagar: monto * (1 + tasa), redondeado a centavos.
+    La tasa es la pactada o la de la tarifa del plazo (tarifas.py).
+    """
+    return redondear(monto * (1 + tasa))
 
-def calcular_total_a_pagar(monto: float, plazo: int) -> float:
-    """Calcula total a pagar según tasas por plazo (7/14/30)."""
-    tasas = {7: 0.20, 14: 0.40, 30: 1.00}
-    tasa = tasas.get(plazo, 0.20)
-    return monto * (1 + tasa)
+
+def tasa_y_tarifa(db: Session, plazo: int, tasa_interes: float | None, dia: date | None = None):
+    """
+    (tasa, tarifa_id) de un préstamo de `plazo` días que empieza en `dia`.
+    Sin `tasa_interes` se usa la de la tarifa vigente (400 si no hay).
+    tarifa_id solo si la tasa es la de la tarifa; si se pactó otra, None.
+    """
+    tarifa = tarifas.vigente(db, plazo, dia)
+    if tasa_interes is None:
+        if tarifa is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No hay tarifa para {plazo} días: indicar tasa_interes.",
+            )
+        tasa_interes = tarifa.tasa
+    return tasa_interes, (tarifa.id if tarifas.aplica(tarifa, tasa_interes) else None)
 
 
 def calcular_punitorios(prestamo: models.Prestamo) -> tuple[float, float]:
     """Devuelve (punitorio_diario, punitorio_total) basados en total_a_pagar y dias_atraso."""
     total_base = getattr(prestamo, 'total_a_pagar', 0.0) or 0.0
     dias = getattr(prestamo, 'dias_atraso', 0) or 0
-    punitorio_diario = total_base * TASA_PUNITORIA_DIARIA
-    punitorio_total = punitorio_diario * max(0, int(dias))
+    punitorio_diario = redondear(total_base * TASA_PUNITORIA_DIARIA)
+    # El total se acumula en centavos: N días = N × el diario, sin error de float
+    punitorio_total = a_pesos(a_centavos(punitorio_diario) * max(0, int(dias)))
     return punitorio_diario, punitorio_total
 
 
@@ -160,7 +207,7 @@ def calcular_total_actualizado(prestamo: models.Prestamo) -> float:
         return float(getattr(prestamo, 'monto_cobrado_final', prestamo.total_a_pagar) or prestamo.total_a_pagar)
 
     pun_diario, pun_total = calcular_punitorios(prestamo)
-    return float((getattr(prestamo, 'total_a_pagar', 0.0) or 0.0) + pun_total)
+    return sumar(getattr(prestamo, 'total_a_pagar', 0.0), pun_total)
 
 
 def aplicar_finanzas(prestamo: models.Prestamo) -> None:
@@ -201,24 +248,6 @@ def aplicar_finanzas(prestamo: models.Prestamo) -> None:
     setattr(prestamo, 'estado_prestamo', estado_prestamo)
 
 
-def calcular_total_nuevo_monto(monto: float, plazo: int) -> float:
-    """
-    Recalcula el total a pagar basándose en el monto y plazo.
-    Usa la misma lógica de tasas que la creación de préstamos.
-    
-    @param monto: Monto base del préstamo
-    @param plazo: Plazo en días (7, 14, 30)
-    @return: Total a pagar (monto * (1 + tasa))
-    """
-    tasas = {
-        7: 0.20,   # 20%
-        14: 0.40,  # 40%
-        30: 1.00   # 100%
-    }
-    
-    tasa = tasas.get(plazo, 0.20)
-    return monto * (1 + tasa)
-
 # =========================
 # CLIENTES
 # =========================
@@ -231,14 +260,16 @@ def crear_cliente(db: Session, data: schemas.ClienteCreate):
     db.add(cliente)
     db.commit()
     db.refresh(cliente)
+    eventos.bus.publicar("cliente", cliente.id, eventos.datos_de(cliente, eventos.CAMPOS_CLIENTE), "creado")
     return cliente
 
 
 def listar_clientes(db: Session):
     """
-    Devuelve todos los clientes.
+    Devuelve todos los clientes con sus archivos (modelos de lectura,
+    dos consultas en total).
     """
-    return db.query(models.Cliente).order_by(models.Cliente.id.desc()).all()
+    return lecturas.listar_clientes(db)
 
 
 def obtener_cliente(db: Session, cliente_id: int):
@@ -252,6 +283,34 @@ def obtener_cliente(db: Session, cliente_id: int):
     )
 
 
+def obtener_cliente_completo(db: Session, cliente_id: int, incluir_archivados: bool = False):
+    """
+    Detalle de un cliente en una sola respuesta: sus datos y archivos,
+    sus préstamos con los campos financieros y los totales.
+    Tres consultas indexadas por cliente_id (lecturas.cliente_completo).
+    """
+    cliente, prestamos = lecturas.cliente_completo(db, cliente_id, incluir_archivados)
+    if cliente is None:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+
+    for p in prestamos:
+        aplicar_finanzas(p)
+
+    # Abiertos: los que todavía tienen algo por cobrar
+    abiertos = [p for p in prestamos if p.estado_pago not in ("SI", "RENOVADO")]
+    totales = {
+        "cantidad": len(prestamos),
+        "activos": len(abiertos),
+        "morosos": sum(1 for p in abiertos if p.es_moroso),
+        "bloqueados": sum(1 for p in abiertos if p.estado_pago == "BLOQUEADO"),
+        "total_prestado": sumar(*(p.monto_prestado for p in prestamos)),
+        "total_cobrado": sumar(*(p.total_cobrado for p in prestamos)),
+        "total_adeudado": sumar(*(restar(p.total_actualizado, p.total_cobrado) for p in abiertos)),
+        "punitorios": sumar(*(p.punitorio_total for p in abiertos)),
+    }
+    return {"cliente": cliente, "prestamos": prestamos, "totales": totales}
+
+
 # =========================
 # ARCHIVOS CLIENTE
 # =========================
@@ -265,6 +324,7 @@ def agregar_archivo_cliente(db: Session, data: schemas.ClienteArchivoBase):
     db.add(archivo)
     db.commit()
     db.refresh(archivo)
+    eventos.bus.publicar("archivo", archivo.id, eventos.datos_de(archivo, eventos.CAMPOS_ARCHIVO), "creado")
     return archivo
 
 
@@ -291,8 +351,8 @@ def crear_prestamo(db: Session, data: schemas.PrestamoCreate):
     1. Valida que tasa_interes > 0 (si se proporciona)
     2. Calcula periodo_origen automáticamente (YYYY-MM)
     3. Calcula total_a_pagar usando tasa_interes si se proporciona,
-       sino usa la tasa por plazo estándar
-    4. Guarda ambos valores en la base de datos
+       sino usa la tasa de la tarifa del plazo (tarifas.py)
+    4. Guarda tasa, plazo y tarifa aplicada en la base de datos
     """
     # Validación de negocio: el monto debe ser positivo
     if getattr(data, 'monto_prestado', 0) is None or data.monto_prestado <= 0:
@@ -322,16 +382,14 @@ def crear_prestamo(db: Session, data: schemas.PrestamoCreate):
 
     # Calcular total_a_pagar y fecha_vencimiento en el backend
     monto = data.monto_prestado
-    plazo = getattr(data, 'plazo', 7)
+    plazo = data.plazo
+    if plazo is None or plazo <= 0:
+        raise HTTPException(status_code=400, detail="El plazo debe ser mayor a 0.")
     fecha_inicio = getattr(data, 'fecha_inicio', None) or date.today()
 
-    # Si tasa_interes se proporciona, usarla; si no, usar tasa por plazo
-    if tasa_interes is not None:
-        total_a_pagar = monto * (1 + tasa_interes)
-    else:
-        total_a_pagar = calcular_total_a_pagar(monto, plazo)
-        # Deducir la tasa usada para guardarla
-        tasa_interes = (total_a_pagar - monto) / monto
+    # Si tasa_interes se proporciona, usarla; si no, la de la tarifa del plazo
+    tasa_interes, tarifa_id = tasa_y_tarifa(db, plazo, tasa_interes, fecha_inicio)
+    total_a_pagar = calcular_total_a_pagar(monto, tasa_interes)
 
     fecha_vencimiento = fecha_inicio + timedelta(days=plazo)
     
@@ -345,7 +403,9 @@ def crear_prestamo(db: Session, data: schemas.PrestamoCreate):
         fecha_vencimiento=fecha_vencimiento,
         estado_pago=data.estado_pago or 'PENDIENTE',
         periodo_origen=periodo_origen,
-        tasa_interes=tasa_interes
+        tasa_interes=tasa_interes,
+        plazo=plazo,
+        tarifa_id=tarifa_id
     )
 
     # Inicializar métricas: al crear, no hay nada cobrado
@@ -357,18 +417,17 @@ def crear_prestamo(db: Session, data: schemas.PrestamoCreate):
     db.refresh(prestamo)
     # Adjuntar campos calculados de mora y financieros
     aplicar_finanzas(prestamo)
+    _publicar_prestamo(prestamo, "creado")
     return prestamo
 
 
-def listar_prestamos(db: Session):
+def listar_prestamos(db: Session, incluir_archivados: bool = False):
     """
-    Devuelve todos los préstamos.
+    Devuelve todos los préstamos con su cliente (modelos de lectura:
+    una consulta por tabla, sin instancias ORM). Por defecto solo la
+    tabla caliente; `incluir_archivados` suma los de prestamos_archivo.
     """
-    prestamos = (
-        db.query(models.Prestamo)
-        .order_by(models.Prestamo.id.desc())
-        .all()
-    )
+    prestamos = lecturas.listar_prestamos(db, incluir_archivados)
 
     # Adjuntar campos calculados de mora y financieros a cada préstamo
     for p in prestamos:
@@ -377,7 +436,8 @@ def listar_prestamos(db: Session):
     return prestamos
 
 
-def agregar_monto(db: Session, prestamo_id: int, monto_extra: float):
+def agregar_monto(db: Session, prestamo_id: int, monto_extra: float,
+                  version_esperada: int | None = None):
     """
     Agrega dinero a un préstamo existente.
     
@@ -392,6 +452,7 @@ def agregar_monto(db: Session, prestamo_id: int, monto_extra: float):
     @param db: Sesión de la BD
     @param prestamo_id: ID del préstamo a actualizar
     @param monto_extra: Monto adicional a agregar al capital
+    @param version_esperada: Versión vista por el cliente (If-Match), opcional
     @return: Préstamo actualizado o None si no existe
     """
     prestamo = (
@@ -402,52 +463,48 @@ def agregar_monto(db: Session, prestamo_id: int, monto_extra: float):
 
     if not prestamo:
         return None
+    _verificar_version(prestamo, version_esperada)
     if getattr(prestamo, 'estado_pago', None) == 'BLOQUEADO':
         raise HTTPException(status_code=400, detail="Préstamo bloqueado: no se puede modificar")
 
     # 1. Obtener la tasa de interés
     # Prioritario: usar tasa_interes si está guardada
-    # Si no, deducir del plazo
+    # Si no (préstamos viejos), la de su tarifa (tarifa_id, completado por la migración 9)
+    # Si tampoco tiene tarifa, la que ya cobra: (total - monto) / monto
     tasa_interes = getattr(prestamo, 'tasa_interes', None)
-    
-    if tasa_interes is not None and tasa_interes > 0:
-        # Usar la tasa guardada
-        nuevo_monto_prestado = prestamo.monto_prestado + monto_extra
-        nuevo_total_a_pagar = nuevo_monto_prestado * (1 + tasa_interes)
-    else:
-        # Fallback: deducir plazo y usar tasa por plazo
-        plazo = deducir_plazo_del_prestamo(prestamo)
-        nuevo_monto_prestado = prestamo.monto_prestado + monto_extra
-        nuevo_total_a_pagar = calcular_total_nuevo_monto(nuevo_monto_prestado, plazo)
+    if tasa_interes is None or tasa_interes <= 0:
+        tarifa = tarifas.por_id(db, prestamo.tarifa_id)
+        if tarifa is not None:
+            tasa_interes = tarifa.tasa
+        elif prestamo.monto_prestado > 0:
+            tasa_interes = (prestamo.total_a_pagar - prestamo.monto_prestado) / prestamo.monto_prestado
+        else:
+            raise HTTPException(status_code=400, detail="El préstamo no tiene tasa de interés registrada.")
+
+    nuevo_monto_prestado = sumar(prestamo.monto_prestado, monto_extra)
+    nuevo_total_a_pagar = calcular_total_a_pagar(nuevo_monto_prestado, tasa_interes)
     
     # 2. Actualizar el préstamo
     prestamo.monto_prestado = nuevo_monto_prestado
     prestamo.total_a_pagar = nuevo_total_a_pagar
     
     # 3. Recalcular por_cobrar
-    prestamo.por_cobrar = prestamo.total_a_pagar - prestamo.total_cobrado
+    prestamo.por_cobrar = restar(prestamo.total_a_pagar, prestamo.total_cobrado)
     
-    # Guardar cambios
-    db.commit()
+    # Guardar cambios (falla con 409 si otra operación ganó la carrera)
+    _confirmar(db)
     db.refresh(prestamo)
     aplicar_finanzas(prestamo)
+    _publicar_prestamo(prestamo)
     return prestamo
 
 
-def cobrar_prestamo(db: Session, prestamo_id: int, monto_final: float):
+def _aplicar_cobro(prestamo: models.Prestamo, monto_final: float) -> None:
     """
-    Marca un préstamo como cobrado.
-    Actualiza las métricas: total_cobrado y por_cobrar.
-    NO modifica total_prestado bajo ningún concepto.
+    Reglas de cobro sobre un préstamo ya cargado (sin commit).
+    Lanza HTTPException 400 si no se puede cobrar; si no, lo marca cobrado.
+    Compartida por cobrar_prestamo y cobrar_lote.
     """
-    prestamo = (
-        db.query(models.Prestamo)
-        .filter(models.Prestamo.id == prestamo_id)
-        .first()
-    )
-
-    if not prestamo:
-        return None
     if getattr(prestamo, 'estado_pago', None) == 'BLOQUEADO':
         raise HTTPException(status_code=400, detail="Préstamo bloqueado: no se puede cobrar")
 
@@ -457,27 +514,240 @@ def cobrar_prestamo(db: Session, prestamo_id: int, monto_final: float):
 
     if getattr(prestamo, 'estado_pago', None) == 'SI':
         raise HTTPException(status_code=400, detail="No se puede cobrar un préstamo ya pagado.")
+    if getattr(prestamo, 'estado_pago', None) == 'RENOVADO':
+        raise HTTPException(status_code=400, detail="No se puede cobrar un préstamo ya renovado.")
 
     prestamo.estado_pago = "SI"
-    prestamo.monto_cobrado_final = monto_final
+    prestamo.monto_cobrado_final = redondear(monto_final)
     prestamo.fecha_pago = date.today()
 
-    # Actualizar métricas de cobro
-    prestamo.total_cobrado += monto_final
-    prestamo.por_cobrar = max(0, prestamo.total_a_pagar - prestamo.total_cobrado)
+    # Actualizar métricas de cobro (en centavos)
+    prestamo.total_cobrado = sumar(prestamo.total_cobrado, monto_final)
+    prestamo.por_cobrar = max(0, restar(prestamo.total_a_pagar, prestamo.total_cobrado))
 
-    db.commit()
+
+def cobrar_prestamo(db: Session, prestamo_id: int, monto_final: float,
+                    version_esperada: int | None = None):
+    """
+    Marca un préstamo como cobrado.
+    Actualiza las métricas: total_cobrado y por_cobrar.
+    NO modifica total_prestado bajo ningún concepto.
+    """
+    prestamo = (
+        db.query(models.Prestamo)
+        .filter(models.Prestamo.id == prestamo_id)
+        .first()
+    )
+
+    if not prestamo:
+        return None
+    _verificar_version(prestamo, version_esperada)
+    _aplicar_cobro(prestamo, monto_final)
+
+    # Dos cajas cobrando el mismo préstamo: solo una confirma, la otra recibe 409
+    _confirmar(db)
     db.refresh(prestamo)
     aplicar_finanzas(prestamo)
+    _publicar_prestamo(prestamo)
     return prestamo
 
 
+# =========================
+# COBRANZA EN LOTE (CIERRE DE CAJA)
+# =========================
+
+# Máximo de cobros por lote (también acota el IN (...) de la consulta)
+LOTE_COBRANZA_MAX = 1000
+
+_PRESTAMOS = models.Prestamo.__table__
+
+# Columnas que escribe un cobro (_aplicar_cobro), en el orden de la tabla
+_COLUMNAS_COBRO = tuple(
+    c.name for c in _PRESTAMOS.columns
+    if c.name in ("total_cobrado", "por_cobrar", "estado_pago", "fecha_pago", "monto_cobrado_final")
+)
+
+# Un UPDATE para todo el lote (executemany), con la misma condición de
+# versión que el version_id_col del ORM
+_ACTUALIZAR_COBRO = (
+    _PRESTAMOS.update()
+    .where(_PRESTAMOS.c.id == bindparam("b_id"), _PRESTAMOS.c.version == bindparam("b_version"))
+    .values(
+        version=_PRESTAMOS.c.version + 1,
+        row_version=bindparam("b_row_version"),
+        **{c: bindparam(f"b_{c}", type_=_PRESTAMOS.c[c].type) for c in _COLUMNAS_COBRO},
+    )
+)
+
+
+def _filas_para_cobro(db: Session, ids) -> dict:
+    """{id: PrestamoFila} en una consulta Core (sin instancias ORM que el flush escriba)."""
+    filas = lecturas.PrestamoFila.desde_filas(db.execute(
+        select(*lecturas.PrestamoFila.columnas_de(_PRESTAMOS)).where(_PRESTAMOS.c.id.in_(list(ids)))
+    ))
+    return {p.id: p for p in filas}
+
+
+def _cobrar_item(prestamo, item: schemas.CobranzaItemIn) -> tuple:
+    """
+    Aplica a `prestamo` (una PrestamoFila) las reglas de cobrar_prestamo,
+    sin escribir. Devuelve (columnas de antes, esperado, en_mora) o lanza
+    HTTPException con el motivo del rechazo.
+    """
+    if prestamo is None:
+        raise HTTPException(status_code=404, detail="Préstamo no encontrado")
+    _verificar_version(prestamo, item.version)
+    # Lo que se esperaba cobrar hoy (con punitorios), antes del cobro
+    aplicar_finanzas(prestamo)
+    esperado = prestamo.total_actualizado
+    en_mora = prestamo.es_moroso
+    antes = {c: getattr(prestamo, c) for c in _COLUMNAS_COBRO}
+    _aplicar_cobro(prestamo, item.monto)
+    return antes, esperado, en_mora
+
+
+def _parametros_cobro(prestamo, row_version: int) -> dict:
+    parametros = {f"b_{c}": getattr(prestamo, c) for c in _COLUMNAS_COBRO}
+    parametros.update(b_id=prestamo.id, b_version=prestamo.version, b_row_version=row_version)
+    return parametros
+
+
+def _rechazo(item: schemas.CobranzaItemIn, error: HTTPException) -> dict:
+    return {
+        "prestamo_id": item.prestamo_id, "ok": False,
+        "estado_http": error.status_code, "detalle": error.detail,
+    }
+
+
+def _cobrar_de_a_uno(db: Session, cobros: dict, prestamos: dict, resultados: list, row_version: int) -> None:
+    """
+    Después del UPDATE del lote: los préstamos que no coincidieron (otra
+    operación los cambió entre la lectura y el UPDATE) se releen y se
+    cobran de a uno, como cobrar_prestamo. Si vuelven a perder, 409 para
+    ese ítem solo.
+    """
+    escritos = set(db.execute(
+        select(_PRESTAMOS.c.id).where(_PRESTAMOS.c.id.in_(list(cobros)), _PRESTAMOS.c.row_version == row_version)
+    ).scalars())
+    perdidos = [prestamo_id for prestamo_id in cobros if prestamo_id not in escritos]
+    frescos = _filas_para_cobro(db, perdidos)
+    for prestamo_id in perdidos:
+        posicion, item = cobros.pop(prestamo_id)[:2]
+        prestamo = frescos.get(prestamo_id)
+        try:
+            antes, esperado, en_mora = _cobrar_item(prestamo, item)
+            if db.execute(_ACTUALIZAR_COBRO, _parametros_cobro(prestamo, row_version)).rowcount != 1:
+                raise HTTPException(status_code=409, detail=DETALLE_CONFLICTO)
+        except HTTPException as e:
+            resultados[posicion] = _rechazo(item, e)
+            continue
+        cobros[prestamo_id] = (posicion, item, antes, esperado, en_mora)
+        prestamos[prestamo_id] = prestamo
+
+
+def cobrar_lote(db: Session, items: list[schemas.CobranzaItemIn]):
+    """
+    Registra muchos cobros en UNA transacción (cierre de caja).
+
+    - Carga todos los préstamos del lote en UNA consulta (IN), como filas
+      Core: las reglas se aplican en memoria, sin instancias ORM.
+    - Aplica a cada ítem las mismas reglas que cobrar_prestamo; un ítem
+      inválido queda rechazado con su motivo y NO frena al resto.
+    - Escribe los cobros con UN UPDATE ... WHERE id = ? AND version = ?
+      (executemany). Si coinciden menos filas que cobros, otra caja cambió
+      alguno en el medio: solo esos se releen y se cobran de a uno (409 si
+      vuelven a perder). Los demás no se tocan.
+    - row_version, `cambios` y auditoría se registran a mano (el UPDATE no
+      pasa por el flush del ORM). Un solo commit para todo el lote y una
+      sola consulta para releer los préstamos cobrados.
+
+    Devuelve {"resultados": [...], "resumen": {...}} (schemas.CobranzaLoteOut).
+    """
+    if not items:
+        raise HTTPException(status_code=400, detail="El lote de cobranzas está vacío.")
+    if len(items) > LOTE_COBRANZA_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {LOTE_COBRANZA_MAX} cobros por lote (recibidos {len(items)}).",
+        )
+
+    prestamos = _filas_para_cobro(db, {item.prestamo_id for item in items})
+
+    resultados = []
+    # prestamo_id -> (posición en resultados, ítem, columnas de antes, esperado, en_mora)
+    cobros: dict[int, tuple] = {}
+    for item in items:
+        try:
+            antes, esperado, en_mora = _cobrar_item(prestamos.get(item.prestamo_id), item)
+        except HTTPException as e:
+            resultados.append(_rechazo(item, e))
+            continue
+        cobros[item.prestamo_id] = (len(resultados), item, antes, esperado, en_mora)
+        resultados.append({"prestamo_id": item.prestamo_id, "ok": True, "estado_http": 200})
+
+    if cobros:
+        row_version = sincronizacion.reservar_version(db)
+        actualizadas = db.execute(
+            _ACTUALIZAR_COBRO, [_parametros_cobro(prestamos[i], row_version) for i in cobros]
+        ).rowcount
+        if actualizadas != len(cobros) or not db.get_bind().dialect.supports_sane_multi_rowcount:
+            _cobrar_de_a_uno(db, cobros, prestamos, resultados, row_version)
+        sincronizacion.registrar_cambios(db, "prestamo", cobros)
+        for prestamo_id, (_, _, antes, _, _) in cobros.items():
+            prestamo = prestamos[prestamo_id]
+            auditoria.registrar(db, "prestamo", prestamo_id, {
+                c: [antes[c], getattr(prestamo, c)] for c in _COLUMNAS_COBRO if antes[c] != getattr(prestamo, c)
+            })
+    db.commit()
+
+    total_cobrado = 0
+    total_esperado = 0
+    punitorios_cobrados = 0
+    cobrados_con_mora = 0
+    for prestamo_id, (_, item, _, esperado, en_mora) in cobros.items():
+        monto = a_centavos(item.monto)
+        total_cobrado += monto
+        total_esperado += a_centavos(esperado)
+        punitorios_cobrados += max(0, monto - a_centavos(prestamos[prestamo_id].total_a_pagar))
+        cobrados_con_mora += 1 if en_mora else 0
+
+    # Releer los cobrados en una sola consulta, como instancias ORM (PrestamoOut)
+    cobrados = (
+        db.query(models.Prestamo).filter(models.Prestamo.id.in_(list(cobros))).all()
+        if cobros else []
+    )
+    for prestamo in cobrados:
+        aplicar_finanzas(prestamo)
+        _publicar_prestamo(prestamo)
+
+    por_id = {p.id: p for p in cobrados}
+    for resultado in resultados:
+        if resultado["ok"]:
+            resultado["prestamo"] = por_id[resultado["prestamo_id"]]
+
+    return {
+        "resultados": resultados,
+        "resumen": {
+            "fecha": date.today(),
+            "cantidad": len(items),
+            "cobrados": len(cobrados),
+            "rechazados": len(items) - len(cobrados),
+            "total_cobrado": a_pesos(total_cobrado),
+            "total_esperado": a_pesos(total_esperado),
+            "diferencia": a_pesos(total_cobrado - total_esperado),
+            "cobrados_con_mora": cobrados_con_mora,
+            "punitorios_cobrados": a_pesos(punitorios_cobrados),
+        },
+    }
+
+
 def renovar_prestamo(
     db: Session,
     prestamo_id: int,
     monto_renovado: float,
     plazo: int,
-    tasa_interes: float = None
+    tasa_interes: float = None,
+    version_esperada: int | None = None
 ):
     """
     Renueva un préstamo existente.
@@ -497,7 +767,8 @@ def renovar_prestamo(
        - total_a_pagar = nuevo_total_a_pagar
        - estado_pago = "PENDIENTE"
        - periodo_origen = mes actual (YYYY-MM)
-       - tasa_interes = tasa ingresada o deducida del plazo
+       - tasa_interes = tasa ingresada o la de la tarifa del plazo
+       - plazo y tarifa_id (None si la tasa no es la de la tarifa)
     
     Retorna el nuevo préstamo creado.
     """
@@ -510,6 +781,7 @@ def renovar_prestamo(
     
     if not prestamo:
         return None
+    _verificar_version(prestamo, version_esperada)
     if getattr(prestamo, 'estado_pago', None) == 'BLOQUEADO':
         raise HTTPException(status_code=400, detail="Préstamo bloqueado: no se puede renovar")
     
@@ -518,8 +790,10 @@ def renovar_prestamo(
         raise HTTPException(status_code=400, detail="El monto renovado debe ser mayor a 0.")
     if plazo is None or plazo <= 0:
         raise HTTPException(status_code=400, detail="El plazo debe ser mayor a 0.")
-    if tasa_interes is None or tasa_interes <= 0 or tasa_interes > 2.0:
+    if tasa_interes is not None and (tasa_interes <= 0 or tasa_interes > 2.0):
         raise HTTPException(status_code=400, detail="La tasa de interés debe ser mayor a 0 y razonable (<= 2.0)")
+    # Sin tasa ingresada, la de la tarifa del plazo (400 si no hay)
+    tasa_interes, tarifa_id = tasa_y_tarifa(db, plazo, tasa_interes)
 
     if getattr(prestamo, 'estado_pago', None) == 'SI':
         raise HTTPException(status_code=400, detail="No se puede renovar un préstamo ya pagado.")
@@ -529,7 +803,7 @@ def renovar_prestamo(
     # Deuda actual: usar por_cobrar si está disponible, sino calcularla
     deuda_actual = getattr(prestamo, 'por_cobrar', None)
     if deuda_actual is None:
-        deuda_actual = (getattr(prestamo, 'total_a_pagar', 0.0) or 0.0) - (getattr(prestamo, 'total_cobrado', 0.0) or 0.0)
+        deuda_actual = restar(getattr(prestamo, 'total_a_pagar', 0.0), getattr(prestamo, 'total_cobrado', 0.0))
     if monto_renovado > deuda_actual:
         raise HTTPException(
             status_code=400,
@@ -537,7 +811,7 @@ def renovar_prestamo(
         )
 
     # Calcular intereses (solo lo que no es capital)
-    intereses = prestamo.total_a_pagar - prestamo.monto_prestado
+    intereses = restar(prestamo.total_a_pagar, prestamo.monto_prestado)
 
     # Cerrar préstamo original: cobrar intereses, no capital
     prestamo.total_a_pagar = intereses
@@ -548,7 +822,7 @@ def renovar_prestamo(
     prestamo.monto_cobrado_final = intereses
 
     # Calcular nuevo total y nueva fecha de vencimiento en backend
-    nuevo_total = monto_renovado * (1 + tasa_interes)
+    nuevo_total = calcular_total_a_pagar(monto_renovado, tasa_interes)
     nueva_fecha = date.today() + timedelta(days=plazo)
     hoy = date.today()
     periodo_origen = hoy.strftime("%Y-%m")
@@ -563,25 +837,101 @@ def renovar_prestamo(
         estado_pago="PENDIENTE",
         fecha_vencimiento=nueva_fecha,
         periodo_origen=periodo_origen,
-        tasa_interes=tasa_interes
+        tasa_interes=tasa_interes,
+        plazo=plazo,
+        tarifa_id=tarifa_id
     )
 
-    # Guardar ambos en una sola transacción
+    # Guardar ambos en una sola transacción; si el original cambió
+    # en el medio, no se crea el nuevo (409)
     db.add(nuevo_prestamo)
-    db.commit()
+    _confirmar(db)
     db.refresh(prestamo)
     db.refresh(nuevo_prestamo)
 
     # Adjuntar campos calculados de mora y financieros al préstamo nuevo
     aplicar_finanzas(nuevo_prestamo)
 
+    aplicar_finanzas(prestamo)
+    _publicar_prestamo(prestamo)
+    _publicar_prestamo(nuevo_prestamo, "creado")
+
     return nuevo_prestamo
 
 
+# =========================
+# TARIFAS
+# =========================
+
+def listar_tarifas(db: Session, todas: bool = False):
+    """Tarifas vigentes hoy (una por plazo); con `todas`, también las viejas y futuras."""
+    return tarifas.todas(db) if todas else tarifas.vigentes(db)
+
+
+def crear_tarifa(db: Session, data: schemas.TarifaCreate):
+    """
+    Nueva tasa para un plazo desde `vigente_desde` (hoy por defecto).
+    La tarifa abierta de ese plazo se cierra el día anterior: los préstamos
+    que ya la usan la conservan (tarifa_id).
+    """
+    if data.plazo is None or data.plazo <= 0:
+        raise HTTPException(status_code=400, detail="El plazo debe ser mayor a 0.")
+    if data.tasa is None or data.tasa <= 0 or data.tasa > 2.0:
+        raise HTTPException(status_code=400, detail="La tasa de interés debe ser mayor a 0 y razonable (<= 2.0)")
+    desde = data.vigente_desde or date.today()
+
+    abierta = (
+        db.query(models.Tarifa)
+        .filter(models.Tarifa.plazo == data.plazo, models.Tarifa.vigente_hasta.is_(None))
+        .order_by(models.Tarifa.vigente_desde.desc())
+        .first()
+    )
+    if abierta is not None:
+        if abierta.vigente_desde >= desde:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Ya hay una tarifa de {data.plazo} días desde el {abierta.vigente_desde}: "
+                       f"la nueva tiene que empezar después.",
+            )
+        abierta.vigente_hasta = desde - timedelta(days=1)
+
+    tarifa = models.Tarifa(plazo=data.plazo, tasa=data.tasa, vigente_desde=desde)
+    db.add(tarifa)
+    db.flush()
+    # En `cambios` con su versión: GET /cambios las trae y el relevo de los
+    # otros workers (coordinacion.py) descarta su registro de tarifas
+    version = sincronizacion.reservar_version(db)
+    db.add_all(
+        models.Cambio(version=version, entidad="tarifa", entidad_id=t.id, eliminado=False)
+        for t in (abierta, tarifa) if t is not None
+    )
+    db.commit()
+    db.refresh(tarifa)
+    # Recién confirmada: el próximo pedido recarga el registro
+    tarifas.invalidar()
+    return tarifa
+
+
 # =========================
 # INVERSORES
 # =========================
 
+def aplicar_calculos_inversor(inversor) -> None:
+    """Adjunta `dias_trabajados`, `ganancia` y `total_a_devolver` al inversor."""
+    inicio = getattr(inversor, 'fecha_inicio', None)
+    fin = getattr(inversor, 'fecha_fin', None)
+    dias = 0
+    if inicio and fin:
+        dias = max(0, (fin - inicio).days)
+
+    ganancia = redondear((inversor.monto_invertido or 0.0) * (inversor.tasa_diaria or 0.0) * dias)
+    total_a_devolver = sumar(inversor.monto_invertido, ganancia)
+
+    setattr(inversor, 'dias_trabajados', int(dias))
+    setattr(inversor, 'ganancia', float(ganancia))
+    setattr(inversor, 'total_a_devolver', float(total_a_devolver))
+
+
 def crear_inversor(db: Session, data: schemas.InversorCreate):
     """
     Crea un inversor.
@@ -590,34 +940,19 @@ def crear_inversor(db: Session, data: schemas.InversorCreate):
     db.add(inversor)
     db.commit()
     db.refresh(inversor)
+    eventos.bus.publicar("inversor", inversor.id, eventos.datos_de(inversor, eventos.CAMPOS_INVERSOR), "creado")
     return inversor
 
 
 def listar_inversores(db: Session):
     """
-    Lista inversores.
+    Lista inversores (modelos de lectura).
     """
-    inversores = (
-        db.query(models.Inversor)
-        .order_by(models.Inversor.id.desc())
-        .all()
-    )
+    inversores = lecturas.listar_inversores(db)
 
     # Adjuntar cálculos financieros para inversores
     for inv in inversores:
-        # días trabajados
-        inicio = getattr(inv, 'fecha_inicio', None)
-        fin = getattr(inv, 'fecha_fin', None)
-        dias = 0
-        if inicio and fin:
-            dias = max(0, (fin - inicio).days)
-
-        ganancia = (inv.monto_invertido or 0.0) * (inv.tasa_diaria or 0.0) * dias
-        total_a_devolver = (inv.monto_invertido or 0.0) + ganancia
-
-        setattr(inv, 'dias_trabajados', int(dias))
-        setattr(inv, 'ganancia', float(ganancia))
-        setattr(inv, 'total_a_devolver', float(total_a_devolver))
+        aplicar_calculos_inversor(inv)
 
     return inversores
 
@@ -641,17 +976,92 @@ def liquidar_inversor(db: Session, inversor_id: int):
     db.commit()
     db.refresh(inversor)
     # Adjuntar cálculos financieros mínimos
-    inicio = getattr(inversor, 'fecha_inicio', None)
-    fin = getattr(inversor, 'fecha_fin', None)
-    dias = 0
-    if inicio and fin:
-        dias = max(0, (fin - inicio).days)
+    aplicar_calculos_inversor(inversor)
 
-    ganancia = (inversor.monto_invertido or 0.0) * (inversor.tasa_diaria or 0.0) * dias
-    total_a_devolver = (inversor.monto_invertido or 0.0) + ganancia
+    eventos.bus.publicar("inversor", inversor.id, eventos.datos_de(inversor, eventos.CAMPOS_INVERSOR))
+    return inversor
 
-    setattr(inversor, 'dias_trabajados', int(dias))
-    setattr(inversor, 'ganancia', float(ganancia))
-    setattr(inversor, 'total_a_devolver', float(total_a_devolver))
 
-    return inversor
+# =========================
+# SINCRONIZACIÓN (DELTA)
+# =========================
+
+# Tope de entradas del registro de cambios por página
+LIMITE_CAMBIOS_MAX = 2000
+
+
+def listar_cambios(db: Session, desde: int, limite: int = 500):
+    """
+    Devuelve las filas escritas después de la versión `desde`, paginadas
+    sobre la tabla `cambios` (índice por version).
+
+    - Una página nunca corta una versión a la mitad: si la última versión
+      entra parcialmente, se completa (así `hasta` es un cursor seguro).
+    - Si una fila cambió varias veces en la página, viaja una sola vez.
+    - Las bajas viajan en `eliminados` (tombstones).
+    """
+    limite = max(1, min(limite, LIMITE_CAMBIOS_MAX))
+
+    entradas = (
+        db.query(models.Cambio)
+        .filter(models.Cambio.version > desde)
+        .order_by(models.Cambio.version, models.Cambio.id)
+        .limit(limite)
+        .all()
+    )
+
+    hay_mas = False
+    if len(entradas) == limite:
+        ultima = entradas[-1]
+        # Completar la última versión
+        entradas += (
+            db.query(models.Cambio)
+            .filter(models.Cambio.version == ultima.version, models.Cambio.id > ultima.id)
+            .order_by(models.Cambio.id)
+            .all()
+        )
+        hay_mas = db.query(
+            db.query(models.Cambio).filter(models.Cambio.version > ultima.version).exists()
+        ).scalar()
+
+    version_actual = sincronizacion.version_actual(db)
+    hasta = entradas[-1].version if entradas else max(desde, version_actual)
+
+    # Quedarse con el último cambio de cada (entidad, id)
+    ultimos: dict[tuple[str, int], bool] = {}
+    for c in entradas:
+        ultimos[(c.entidad, c.entidad_id)] = c.eliminado
+
+    ids: dict[str, list[int]] = {"cliente": [], "archivo": [], "prestamo": [], "inversor": [], "tarifa": []}
+    eliminados = []
+    for (entidad, entidad_id), eliminado in ultimos.items():
+        if eliminado:
+            eliminados.append({"entidad": entidad, "id": entidad_id})
+        elif entidad in ids:
+            ids[entidad].append(entidad_id)
+
+    def _cargar(modelo, lista):
+        if not lista:
+            return []
+        return db.query(modelo).filter(modelo.id.in_(lista)).order_by(modelo.id).all()
+
+    prestamos = _cargar(models.Prestamo, ids["prestamo"])
+    for p in prestamos:
+        aplicar_finanzas(p)
+
+    inversores = _cargar(models.Inversor, ids["inversor"])
+    for inv in inversores:
+        aplicar_calculos_inversor(inv)
+
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "hay_mas": bool(hay_mas),
+        "version_actual": version_actual,
+        "clientes": _cargar(models.Cliente, ids["cliente"]),
+        "archivos": _cargar(models.ClienteArchivo, ids["archivo"]),
+        "prestamos": prestamos,
+        "inversores": inversores,
+        "tarifas": _cargar(models.Tarifa, ids["tarifa"]),
+        "eliminados": eliminados,
+    }
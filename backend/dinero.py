@@ -0,0 +1,69 @@
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy.types import TypeDecorator, BigInteger
+
+"""
+dinero.py: representación de montos de dinero.
+
+Regla:
+- En la base los montos se guardan como CENTAVOS ENTEROS (INTEGER).
+- En Python y en la API siguen siendo pesos (float), para no cambiar
+  schemas ni frontend.
+- Todo monto calculado se redondea a centavos con UNA sola regla:
+  medio centavo hacia arriba (ROUND_HALF_UP) sobre la representación
+  decimal corta del número (1.005 → 1.01, 2.675 → 2.68).
+
+Así los SUM() de SQLite son sumas de enteros (exactas y más baratas) y
+coinciden con los totales que calcula crud.py.
+"""
+
+_CENTAVO = Decimal("0.01")
+
+
+def a_centavos(valor) -> int | None:
+    """Pesos (float/int/Decimal/str) → centavos enteros con redondeo determinístico."""
+    if valor is None:
+        return None
+    if isinstance(valor, int):
+        return valor * 100
+    decimal = valor if isinstance(valor, Decimal) else Decimal(str(valor))
+    return int(decimal.quantize(_CENTAVO, rounding=ROUND_HALF_UP) * 100)
+
+
+def a_pesos(centavos: int | None) -> float | None:
+    """Centavos enteros → pesos (float)."""
+    if centavos is None:
+        return None
+    # int(): los SUM() de PostgreSQL llegan como Decimal
+    return int(centavos) / 100
+
+
+def redondear(valor) -> float | None:
+    """Redondea un monto en pesos a centavos usando la regla del sistema."""
+    return a_pesos(a_centavos(valor))
+
+
+def sumar(*montos) -> float:
+    """Suma exacta de montos en pesos (se hace en centavos enteros)."""
+    return a_pesos(sum(a_centavos(m or 0) for m in montos))
+
+
+def restar(a, b) -> float:
+    """a - b exacto, en centavos enteros."""
+    return a_pesos(a_centavos(a or 0) - a_centavos(b or 0))
+
+
+class Dinero(TypeDecorator):
+    """
+    Columna de dinero: INTEGER de centavos en la base, float de pesos en Python.
+    BIGINT: en PostgreSQL un INTEGER (32 bits) desborda pasados los 21
+    millones de pesos (totales del archivo); en SQLite es lo mismo.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return a_centavos(value)
+
+    def process_result_value(self, value, dialect):
+        return a_pesos(value)
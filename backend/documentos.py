@@ -0,0 +1,129 @@
+import os
+import time
+import zipfile
+
+from sqlalchemy.orm import Session
+
+from backend import models
+
+"""
+documentos.py: los archivos subidos de uno o varios clientes en un ZIP.
+
+GET /clientes/{id}/archivos.zip y GET /clientes/archivos.zip?ids=1&ids=2
+arman el ZIP mientras lo envían, a partir de las filas de cliente_archivos:
+
+- sin archivos temporales: zipfile escribe en una salida que solo junta
+  lo último escrito y el generador lo entrega enseguida;
+- sin cargar archivos enteros: cada uno se lee de a BLOQUE_BYTES, así la
+  memoria no depende del tamaño de los archivos ni de cuántos sean;
+- sin recomprimir (ZIP_STORED): DNI, selfies y comprobantes son JPG, PNG
+  o PDF, que ya vienen comprimidos. Cada bloque va tal cual del archivo
+  a la respuesta: se lee sin el buffer de Python (buffering=0) y zipfile
+  solo le calcula el CRC, sin copiarlo.
+
+Las filas se leen antes de empezar a responder (la sesión del request se
+cierra al terminar la ruta); durante el envío solo se toca el disco.
+
+Si falta un archivo en disco (borrado a mano, otra máquina) el ZIP sale
+igual, con un FALTANTES.txt que lista lo que no se encontró.
+"""
+
+BLOQUE_BYTES = 256 * 1024
+
+# Tope de clientes por ZIP en la variante de varios clientes
+MAX_CLIENTES = 500
+
+PREFIJO_URL = "/uploads/"
+
+
+class _Salida:
+    """Archivo de solo escritura: guarda lo escrito hasta que el generador lo retira."""
+
+    def __init__(self):
+        self._partes: list[bytes] = []
+
+    def write(self, datos) -> int:
+        self._partes.append(datos)
+        return len(datos)
+
+    def flush(self) -> None:
+        pass
+
+    def retirar(self) -> list:
+        partes, self._partes = self._partes, []
+        return partes
+
+
+def ruta_fisica(url: str, raiz_uploads: str) -> str | None:
+    """
+    /uploads/clientes/7/dni_frente.jpg → <raiz_uploads>/clientes/7/dni_frente.jpg
+    (main.py guarda la URL con el nombre tal cual, sin codificar).
+    None si la URL no es de /uploads o se sale de la carpeta (nombres con ..).
+    """
+    if not url.startswith(PREFIJO_URL):
+        return None
+    raiz = os.path.realpath(raiz_uploads)
+    ruta = os.path.realpath(os.path.join(raiz, url[len(PREFIJO_URL):]))
+    if os.path.commonpath([raiz, ruta]) != raiz:
+        return None
+    return ruta
+
+
+def entradas(db: Session, cliente_ids: list[int], raiz_uploads: str, por_cliente: bool) -> list[tuple]:
+    """
+    (nombre dentro del ZIP, ruta en disco o None) de los archivos de los
+    clientes, en orden de subida. Con `por_cliente` cada cliente va en su
+    carpeta (cliente_7/...).
+    """
+    filas = (
+        db.query(models.ClienteArchivo.cliente_id, models.ClienteArchivo.url)
+        .filter(models.ClienteArchivo.cliente_id.in_(cliente_ids))
+        .order_by(models.ClienteArchivo.cliente_id, models.ClienteArchivo.id)
+        .all()
+    )
+    resultado = []
+    vistos = set()
+    for cliente_id, url in filas:
+        # Volver a subir el mismo tipo y nombre pisa el archivo: una sola entrada
+        if url in vistos:
+            continue
+        vistos.add(url)
+        nombre = os.path.basename(url) or f"archivo_{len(resultado) + 1}"
+        if por_cliente:
+            nombre = f"cliente_{cliente_id}/{nombre}"
+        resultado.append((nombre, ruta_fisica(url, raiz_uploads)))
+    return resultado
+
+
+def _fecha_zip(segundos: float) -> tuple:
+    # El formato ZIP no representa fechas anteriores a 1980
+    return max(time.localtime(segundos)[:6], (1980, 1, 1, 0, 0, 0))
+
+
+def generar_zip(archivos: list[tuple]):
+    """Genera el ZIP por partes a partir de (nombre, ruta) (ver entradas())."""
+    salida = _Salida()
+    faltantes = []
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as zf:
+        for nombre, ruta in archivos:
+            try:
+                origen = open(ruta, "rb", buffering=0) if ruta else None
+            except OSError:
+                origen = None
+            if origen is None:
+                faltantes.append(nombre)
+                continue
+            with origen:
+                estado = os.fstat(origen.fileno())
+                info = zipfile.ZipInfo(nombre, date_time=_fecha_zip(estado.st_mtime))
+                info.compress_type = zipfile.ZIP_STORED
+                # Con el tamaño de antemano zipfile decide si hace falta ZIP64
+                info.file_size = estado.st_size
+                with zf.open(info, "w") as destino:
+                    while bloque := origen.read(BLOQUE_BYTES):
+                        destino.write(bloque)
+                        yield from salida.retirar()
+            yield from salida.retirar()
+        if faltantes:
+            zf.writestr("FALTANTES.txt", "No se encontraron en disco:\n" + "\n".join(faltantes) + "\n")
+    yield from salida.retirar()
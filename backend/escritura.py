@@ -0,0 +1,191 @@
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from backend import eventos
+
+"""
+escritura.py: escritor único con group commit (opcional).
+
+Sin esto, cada escritura de crud.py hace su propio commit en el hilo del
+threadpool que atendió el request: en SQLite todas compiten por el mismo
+lock (SQLITE_BUSY) y cada una paga su fsync.
+
+Con PRESTAMOS_ESCRITOR_UNICO=1:
+- Las rutas de escritura encolan una "unidad" (una función `operacion(db)`)
+  y esperan su resultado.
+- UN hilo escritor toma todas las unidades que haya en cola (hasta
+  LOTE_MAX), abre UNA transacción y corre cada unidad dentro de su propio
+  SAVEPOINT. El commit de crud.py solo libera ese savepoint.
+- Al final hay UN commit (un fsync) para todo el lote.
+
+Aislamiento: si una unidad falla (400, 409, error inesperado) solo se
+deshace su savepoint y la excepción vuelve a SU request; el resto del lote
+se confirma. Si falla el commit del lote, cada unidad se reintenta sola.
+
+Los eventos del feed (eventos.py) y las filas de auditoría (auditoria.py) se
+publican recién después del commit.
+"""
+
+ESCRITOR_ACTIVO = os.getenv("PRESTAMOS_ESCRITOR_UNICO", "0") == "1"
+
+# Máximo de unidades por transacción
+LOTE_MAX = int(os.getenv("PRESTAMOS_ESCRITOR_LOTE", "64"))
+
+# Espera opcional para juntar más unidades (segundos). 0 = tomar solo lo que
+# ya está en cola: los requests se acumulan solos mientras dura el fsync.
+ESPERA_LOTE = float(os.getenv("PRESTAMOS_ESCRITOR_ESPERA_MS", "0")) / 1000
+
+_FIN = object()
+
+
+class _Unidad:
+    __slots__ = ("operacion", "contexto", "futuro")
+
+    def __init__(self, operacion):
+        self.operacion = operacion
+        # Se corre con el contexto del request (métricas de SQL por ruta)
+        self.contexto = contextvars.copy_context()
+        self.futuro: Future = Future()
+
+
+class Escritor:
+    def __init__(self, engine, session_factory, lote_max: int = LOTE_MAX,
+                 espera: float = ESPERA_LOTE):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.lote_max = max(1, lote_max)
+        self.espera = espera
+        self._cola: queue.Queue = queue.Queue()
+        self._hilo: threading.Thread | None = None
+        self._lock = threading.Lock()
+        # Contadores (se leen para benchmarks / diagnóstico)
+        self.lotes = 0
+        self.unidades = 0
+        self.reintentos_individuales = 0
+
+    # ---------- ciclo de vida ----------
+
+    def iniciar(self) -> None:
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._bucle, name="escritor-unico", daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout: float = 10.0) -> None:
+        """Procesa lo que quedó en cola y termina el hilo."""
+        with self._lock:
+            hilo = self._hilo
+            self._hilo = None
+        if hilo is None:
+            return
+        self._cola.put(_FIN)
+        hilo.join(timeout)
+
+    # ---------- API ----------
+
+    def enviar(self, operacion) -> Future:
+        """Encola `operacion(db)`. El Future se resuelve después del commit."""
+        if self._hilo is None:
+            self.iniciar()
+        unidad = _Unidad(operacion)
+        self._cola.put(unidad)
+        return unidad.futuro
+
+    def ejecutar(self, operacion):
+        """Encola y espera: devuelve el resultado o relanza la excepción de la unidad."""
+        return self.enviar(operacion).result()
+
+    # ---------- hilo escritor ----------
+
+    def _bucle(self) -> None:
+        terminar = False
+        while not terminar:
+            primera = self._cola.get()
+            if primera is _FIN:
+                break
+            lote = [primera]
+            while len(lote) < self.lote_max:
+                try:
+                    siguiente = (
+                        self._cola.get(timeout=self.espera) if self.espera
+                        else self._cola.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if siguiente is _FIN:
+                    terminar = True
+                    break
+                lote.append(siguiente)
+            self._procesar(lote)
+
+    def _correr_unidad(self, conn, unidad: _Unidad):
+        """Corre una unidad en su SAVEPOINT. Devuelve (ok, valor, eventos_pendientes, auditadas)."""
+        from backend import auditoria
+
+        db = self.session_factory(bind=conn, join_transaction_mode="create_savepoint")
+        with eventos.bus.diferir() as pendientes, auditoria.diferir() as auditadas:
+            try:
+                valor = unidad.contexto.run(unidad.operacion, db)
+                if db.in_transaction():
+                    db.commit()
+                return True, valor, pendientes, auditadas
+            except BaseException as e:
+                db.rollback()
+                return False, e, [], []
+            finally:
+                db.close()
+
+    def _procesar(self, lote: list[_Unidad]) -> None:
+        from backend import auditoria
+
+        try:
+            with self.engine.connect() as conn:
+                if conn.dialect.name == "sqlite":
+                    # IMMEDIATE: el lock de escritura se toma al empezar el lote
+                    conn.exec_driver_sql("BEGIN IMMEDIATE")
+                resultados = [self._correr_unidad(conn, u) for u in lote]
+                conn.commit()
+        except BaseException as e:
+            if len(lote) > 1:
+                # Falló el commit del lote: aislar reintentando de a una
+                self.reintentos_individuales += len(lote)
+                for unidad in lote:
+                    self._procesar([unidad])
+            else:
+                lote[0].futuro.set_exception(e)
+            return
+
+        self.lotes += 1
+        self.unidades += len(lote)
+        for unidad, (ok, valor, pendientes, auditadas) in zip(lote, resultados):
+            if ok:
+                for evento in pendientes:
+                    eventos.bus.publicar(*evento)
+                auditoria.encolar(auditadas)
+                unidad.futuro.set_result(valor)
+            else:
+                unidad.futuro.set_exception(valor)
+
+
+_escritor: Escritor | None = None
+_lock_global = threading.Lock()
+
+
+def obtener() -> Escritor:
+    """Escritor del proceso (se crea la primera vez)."""
+    global _escritor
+    if _escritor is None:
+        with _lock_global:
+            if _escritor is None:
+                from backend.database import SessionLocal, engine
+                _escritor = Escritor(engine, SessionLocal)
+    return _escritor
+
+
+def detener() -> None:
+    if _escritor is not None:
+        _escritor.detener()
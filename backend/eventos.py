@@ -0,0 +1,230 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import orjson
+
+"""
+eventos.py: pub/sub en proceso para el feed de cambios (GET /eventos, SSE).
+
+- crud.py publica UN evento compacto después de cada commit de escritura:
+  {"seq": 42, "entidad": "prestamo", "accion": "actualizado", "id": 7, "datos": {...}}
+  (archivo.py, uno "eliminado" sin datos por préstamo archivado).
+- Cada conexión SSE es un Suscriptor con una cola ACOTADA. Si un cliente
+  lento la llena, se vacía y recibe un evento `resync` (debe recargar).
+- Se guarda un historial corto para reanudar con Last-Event-ID sin
+  recargar listas; si el id pedido ya salió del historial → `resync`.
+
+publicar() se llama desde hilos del threadpool: la entrega a cada cola se
+agenda en el event loop del suscriptor con call_soon_threadsafe.
+
+Con el escritor único (escritura.py) el commit real ocurre después de que
+crud.py publicó: ese hilo usa `bus.diferir()` y publica los eventos recién
+cuando el lote quedó confirmado (o los descarta si falló).
+
+Cada inquilino (inquilinos.py) tiene su propio Bus: `bus` apunta al del
+request en curso (usar()) o, fuera de un request de inquilino, al principal.
+"""
+
+MAX_COLA = 256
+MAX_HISTORIAL = 1000
+
+# Cada cuánto se manda un comentario para mantener viva la conexión
+HEARTBEAT_SEGUNDOS = 15.0
+
+RESYNC = b"event: resync\ndata: {}\n\n"
+HEARTBEAT = b": ping\n\n"
+
+# Campos que viajan en cada evento, por entidad
+CAMPOS_PRESTAMO = (
+    "id", "cliente_id", "monto_prestado", "total_a_pagar", "total_cobrado", "por_cobrar",
+    "fecha_creacion", "fecha_vencimiento", "fecha_pago", "monto_cobrado_final",
+    "estado_pago", "estado_prestamo", "dias_atraso", "es_moroso",
+    "punitorio_diario", "punitorio_total", "total_actualizado",
+    "periodo_origen", "tasa_interes", "plazo", "tarifa_id", "row_version", "version",
+)
+CAMPOS_CLIENTE = (
+    "id", "nombre_completo", "dni", "direccion", "telefono",
+    "telefono_respaldo_1", "telefono_respaldo_2", "observaciones", "row_version",
+)
+CAMPOS_ARCHIVO = ("id", "cliente_id", "tipo", "url", "row_version")
+CAMPOS_INVERSOR = (
+    "id", "nombre", "monto_invertido", "tasa_diaria", "fecha_inicio", "fecha_fin",
+    "estado", "monto_devuelto", "dias_trabajados", "ganancia", "total_a_devolver",
+    "row_version",
+)
+
+
+def datos_de(obj, campos: tuple) -> dict:
+    """Extrae `campos` de un objeto ORM (incluye atributos calculados por crud)."""
+    return {campo: getattr(obj, campo, None) for campo in campos}
+
+
+class Suscriptor:
+    __slots__ = ("cola", "loop")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_cola: int):
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=max_cola)
+        self.loop = loop
+
+    def entregar(self, mensaje: bytes) -> None:
+        """Corre en el event loop del suscriptor."""
+        try:
+            self.cola.put_nowait(mensaje)
+        except asyncio.QueueFull:
+            # Cliente demasiado lento: descartar lo pendiente y pedir recarga
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            self.cola.put_nowait(RESYNC)
+
+
+class Bus:
+    def __init__(self, max_cola: int = MAX_COLA, max_historial: int = MAX_HISTORIAL):
+        self._lock = threading.Lock()
+        self._suscriptores: set[Suscriptor] = set()
+        self._historial: deque[tuple[int, bytes]] = deque(maxlen=max_historial)
+        self._seq = 0
+        self.max_cola = max_cola
+        self._local = threading.local()
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def suscribir(self) -> Suscriptor:
+        sub = Suscriptor(asyncio.get_running_loop(), self.max_cola)
+        with self._lock:
+            self._suscriptores.add(sub)
+        return sub
+
+    def desuscribir(self, sub: Suscriptor) -> None:
+        with self._lock:
+            self._suscriptores.discard(sub)
+
+    def publicar(self, entidad: str, id: int, datos: dict | None = None,
+                 accion: str = "actualizado") -> int:
+        """Publica un cambio ya confirmado en la base. Devuelve su número de secuencia."""
+        diferidos = getattr(self._local, "diferidos", None)
+        if diferidos is not None:
+            diferidos.append((entidad, id, datos, accion))
+            return 0
+
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            evento = {"seq": seq, "entidad": entidad, "accion": accion, "id": id, "datos": datos}
+            # Se codifica UNA vez para todos los suscriptores
+            mensaje = b"id: %d\nevent: cambio\ndata: %s\n\n" % (seq, orjson.dumps(evento))
+            self._historial.append((seq, mensaje))
+            suscriptores = list(self._suscriptores)
+
+        for sub in suscriptores:
+            try:
+                sub.loop.call_soon_threadsafe(sub.entregar, mensaje)
+            except RuntimeError:
+                # Loop cerrado: la conexión ya no existe
+                self.desuscribir(sub)
+        return seq
+
+    def forzar_resync(self) -> None:
+        """
+        Pide a todos los clientes que recarguen (cambios que este proceso no
+        puede detallar, p. ej. bajas relevadas de otro worker). También vacía
+        el historial: quien reconecte con un Last-Event-ID viejo recibe `resync`.
+        """
+        with self._lock:
+            self._seq += 1
+            self._historial.clear()
+            suscriptores = list(self._suscriptores)
+        for sub in suscriptores:
+            try:
+                sub.loop.call_soon_threadsafe(sub.entregar, RESYNC)
+            except RuntimeError:
+                self.desuscribir(sub)
+
+    @contextmanager
+    def diferir(self):
+        """
+        Dentro del bloque, publicar() en ESTE hilo solo acumula. Devuelve la
+        lista de pendientes; quien llama decide si publicarlos (tras el commit).
+        """
+        anteriores = getattr(self._local, "diferidos", None)
+        pendientes: list[tuple] = []
+        self._local.diferidos = pendientes
+        try:
+            yield pendientes
+        finally:
+            self._local.diferidos = anteriores
+
+    def desde(self, ultimo_seq: int) -> list[bytes] | None:
+        """
+        Mensajes posteriores a `ultimo_seq`, o None si ya no están todos en
+        el historial (el cliente tiene que resincronizar).
+        """
+        with self._lock:
+            if ultimo_seq >= self._seq:
+                return []
+            if not self._historial or self._historial[0][0] > ultimo_seq + 1:
+                return None
+            return [m for s, m in self._historial if s > ultimo_seq]
+
+
+_principal = Bus()
+_del_contexto: ContextVar[Bus | None] = ContextVar("bus_de_eventos", default=None)
+
+
+def actual() -> Bus:
+    """El bus del inquilino del request en curso, o el principal."""
+    return _del_contexto.get() or _principal
+
+
+@contextmanager
+def usar(destino: Bus):
+    """Dentro del bloque (y en lo que se lance desde él), `bus` es `destino`."""
+    token = _del_contexto.set(destino)
+    try:
+        yield destino
+    finally:
+        _del_contexto.reset(token)
+
+
+class _BusActual:
+    """`eventos.bus`: delega cada llamada en actual()."""
+
+    def __getattr__(self, nombre):
+        return getattr(actual(), nombre)
+
+
+bus = _BusActual()
+
+
+async def stream_sse(request, ultimo_id: str | None = None, heartbeat: float = HEARTBEAT_SEGUNDOS):
+    """Generador para StreamingResponse(media_type="text/event-stream")."""
+    bus = actual()
+    sub = bus.suscribir()
+    try:
+        # Reanudación con Last-Event-ID
+        if ultimo_id and ultimo_id.isdigit():
+            pendientes = bus.desde(int(ultimo_id))
+            if pendientes is None:
+                yield RESYNC
+            else:
+                for mensaje in pendientes:
+                    yield mensaje
+        else:
+            # Conexión nueva: informar la secuencia actual como punto de partida
+            yield b"id: %d\nevent: hola\ndata: {}\n\n" % bus.seq
+
+        while True:
+            try:
+                mensaje = await asyncio.wait_for(sub.cola.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield HEARTBEAT
+                continue
+            yield mensaje
+    finally:
+        bus.desuscribir(sub)
@@ -0,0 +1,289 @@
+import typing
+
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend import models
+
+"""
+lecturas.py: modelos de lectura para los listados (GET /prestamos,
+/clientes, /inversores) y las tarifas que cachea tarifas.py.
+
+Los listados no modifican nada, así que no necesitan instancias ORM
+(identity map, seguimiento de cambios, carga perezosa de relaciones):
+- Se seleccionan SOLO las columnas necesarias con SQLAlchemy Core.
+- Cada fila se vuelca en un objeto con __slots__ (sin __dict__).
+- Las relaciones se resuelven con UNA consulta por tabla (no N+1):
+  los clientes y sus archivos se cargan una vez y se comparten.
+
+Los objetos tienen los mismos nombres de atributo que los modelos, así
+que crud.aplicar_finanzas, eventos.datos_de y los schemas de pydantic
+(from_attributes) los leen sin cambios.
+
+Serialización: a_dicts() arma los dicts de salida directamente a partir
+de los campos del schema (sin validar fila por fila con pydantic, que
+además revalidaría el mismo cliente en cada uno de sus préstamos). Los
+valores ya vienen con el tipo correcto de la base y de crud.py; los
+objetos anidados compartidos se convierten una sola vez.
+"""
+
+
+class _Fila:
+    """Base de las filas de lectura: columnas de la consulta + campos calculados."""
+
+    __slots__ = ()
+
+    # Columnas que vienen de la consulta, en el orden del SELECT
+    COLUMNAS: tuple = ()
+    # Atributos extra con su valor inicial
+    EXTRAS: dict = {}
+
+    @classmethod
+    def desde_filas(cls, filas) -> list:
+        crear = object.__new__
+        columnas = cls.COLUMNAS
+        extras = tuple(cls.EXTRAS.items())
+        resultado = []
+        for fila in filas:
+            obj = crear(cls)
+            for campo, valor in zip(columnas, fila):
+                setattr(obj, campo, valor)
+            for campo, valor in extras:
+                setattr(obj, campo, valor() if callable(valor) else valor)
+            resultado.append(obj)
+        return resultado
+
+    @classmethod
+    def columnas_de(cls, tabla) -> list:
+        return [tabla.c[nombre] for nombre in cls.COLUMNAS]
+
+
+class ArchivoFila(_Fila):
+    COLUMNAS = ("id", "cliente_id", "tipo", "url", "row_version")
+    __slots__ = COLUMNAS
+
+
+class ClienteFila(_Fila):
+    COLUMNAS = (
+        "id", "nombre_completo", "dni", "direccion", "telefono",
+        "telefono_respaldo_1", "telefono_respaldo_2", "observaciones", "row_version",
+    )
+    EXTRAS = {"archivos": list}
+    __slots__ = COLUMNAS + tuple(EXTRAS)
+
+
+class PrestamoFila(_Fila):
+    COLUMNAS = (
+        "id", "cliente_id", "monto_prestado", "total_a_pagar", "total_cobrado", "por_cobrar",
+        "fecha_creacion", "fecha_vencimiento", "estado_pago", "fecha_pago",
+        "monto_cobrado_final", "periodo_origen", "tasa_interes", "plazo", "tarifa_id",
+        "row_version", "version",
+    )
+    # Los completa crud.aplicar_finanzas
+    EXTRAS = {
+        "cliente": None,
+        "dias_atraso": 0,
+        "es_moroso": False,
+        "punitorio_diario": 0.0,
+        "punitorio_total": 0.0,
+        "total_actualizado": 0.0,
+        "estado_prestamo": "PENDIENTE",
+    }
+    __slots__ = COLUMNAS + tuple(EXTRAS)
+
+
+class InversorFila(_Fila):
+    COLUMNAS = (
+        "id", "nombre", "monto_invertido", "tasa_diaria", "fecha_inicio", "fecha_fin",
+        "estado", "monto_devuelto", "row_version",
+    )
+    # Los completa crud.aplicar_calculos_inversor
+    EXTRAS = {"dias_trabajados": 0, "ganancia": 0.0, "total_a_devolver": 0.0}
+    __slots__ = COLUMNAS + tuple(EXTRAS)
+
+
+class TarifaFila(_Fila):
+    """Fila de tarifas: la cachea tarifas.py y se comparte entre requests (no modificar)."""
+    COLUMNAS = ("id", "plazo", "tasa", "vigente_desde", "vigente_hasta")
+    __slots__ = COLUMNAS
+
+
+_PRESTAMOS = models.Prestamo.__table__
+_PRESTAMOS_ARCHIVO = models.PrestamoArchivado.__table__
+_CLIENTES = models.Cliente.__table__
+_ARCHIVOS = models.ClienteArchivo.__table__
+_INVERSORES = models.Inversor.__table__
+_TARIFAS = models.Tarifa.__table__
+
+
+# =========================
+# CONSULTAS
+# =========================
+
+def _clientes_con_archivos(db: Session, filtro_ids=None) -> list[ClienteFila]:
+    """
+    Clientes (más nuevos primero) con sus archivos ya adjuntos.
+    Dos consultas en total. `filtro_ids` es una subconsulta opcional de ids.
+    """
+    consulta = select(*ClienteFila.columnas_de(_CLIENTES)).order_by(_CLIENTES.c.id.desc())
+    consulta_archivos = select(*ArchivoFila.columnas_de(_ARCHIVOS)).order_by(_ARCHIVOS.c.id)
+    if filtro_ids is not None:
+        consulta = consulta.where(_CLIENTES.c.id.in_(filtro_ids))
+        consulta_archivos = consulta_archivos.where(_ARCHIVOS.c.cliente_id.in_(filtro_ids))
+
+    clientes = ClienteFila.desde_filas(db.execute(consulta))
+    por_id = {c.id: c for c in clientes}
+    for archivo in ArchivoFila.desde_filas(db.execute(consulta_archivos)):
+        cliente = por_id.get(archivo.cliente_id)
+        if cliente is not None:
+            cliente.archivos.append(archivo)
+    return clientes
+
+
+def listar_clientes(db: Session) -> list[ClienteFila]:
+    return _clientes_con_archivos(db)
+
+
+def listar_prestamos(db: Session, incluir_archivados: bool = False) -> list[PrestamoFila]:
+    """
+    Préstamos (más nuevos primero) con su cliente. Cada cliente se
+    construye una sola vez y lo comparten todos sus préstamos.
+    Sin campos financieros: los agrega crud.aplicar_finanzas.
+    Con `incluir_archivados` se suman los de prestamos_archivo (archivo.py).
+    """
+    prestamos = PrestamoFila.desde_filas(db.execute(
+        select(*PrestamoFila.columnas_de(_PRESTAMOS)).order_by(_PRESTAMOS.c.id.desc())
+    ))
+    con_prestamos = select(_PRESTAMOS.c.cliente_id)
+    if incluir_archivados:
+        prestamos += PrestamoFila.desde_filas(db.execute(
+            select(*PrestamoFila.columnas_de(_PRESTAMOS_ARCHIVO))
+        ))
+        prestamos.sort(key=lambda p: p.id, reverse=True)
+        con_prestamos = con_prestamos.union(select(_PRESTAMOS_ARCHIVO.c.cliente_id))
+    if not prestamos:
+        return prestamos
+
+    if not incluir_archivados:
+        con_prestamos = con_prestamos.distinct()
+    clientes = {c.id: c for c in _clientes_con_archivos(db, con_prestamos)}
+    for prestamo in prestamos:
+        prestamo.cliente = clientes.get(prestamo.cliente_id)
+    return prestamos
+
+
+def cliente_completo(db: Session, cliente_id: int,
+                     incluir_archivados: bool = False) -> tuple[ClienteFila | None, list[PrestamoFila]]:
+    """
+    Un cliente con sus archivos, y sus préstamos (más nuevos primero).
+    Tres consultas por clave primaria / índice de
+    cliente_id: el costo depende de cuántos préstamos tiene el cliente,
+    no del tamaño de la cartera. (None, []) si el cliente no existe.
+    """
+    filas = ClienteFila.desde_filas(db.execute(
+        select(*ClienteFila.columnas_de(_CLIENTES)).where(_CLIENTES.c.id == cliente_id)
+    ))
+    if not filas:
+        return None, []
+    cliente = filas[0]
+    cliente.archivos = ArchivoFila.desde_filas(db.execute(
+        select(*ArchivoFila.columnas_de(_ARCHIVOS))
+        .where(_ARCHIVOS.c.cliente_id == cliente_id)
+        .order_by(_ARCHIVOS.c.id)
+    ))
+
+    consulta = select(*PrestamoFila.columnas_de(_PRESTAMOS)).where(_PRESTAMOS.c.cliente_id == cliente_id)
+    if incluir_archivados:
+        consulta = consulta.union_all(
+            select(*PrestamoFila.columnas_de(_PRESTAMOS_ARCHIVO))
+            .where(_PRESTAMOS_ARCHIVO.c.cliente_id == cliente_id)
+        )
+    prestamos = PrestamoFila.desde_filas(db.execute(consulta))
+    prestamos.sort(key=lambda p: p.id, reverse=True)
+    for prestamo in prestamos:
+        prestamo.cliente = cliente
+    return cliente, prestamos
+
+
+def listar_inversores(db: Session) -> list[InversorFila]:
+    """Inversores (más nuevos primero), sin los campos calculados."""
+    return InversorFila.desde_filas(db.execute(
+        select(*InversorFila.columnas_de(_INVERSORES)).order_by(_INVERSORES.c.id.desc())
+    ))
+
+
+def listar_tarifas(db: Session) -> list[TarifaFila]:
+    """Todas las tarifas (vigentes, viejas y futuras), por plazo y fecha."""
+    return TarifaFila.desde_filas(db.execute(
+        select(*TarifaFila.columnas_de(_TARIFAS)).order_by(_TARIFAS.c.plazo, _TARIFAS.c.vigente_desde)
+    ))
+
+
+# =========================
+# SERIALIZACIÓN DIRECTA
+# =========================
+
+_planes: dict[type, tuple] = {}
+
+
+def _modelo_anidado(anotacion) -> tuple[type | None, bool]:
+    """(schema anidado, es_lista) para la anotación de un campo, o (None, False)."""
+    origen = typing.get_origin(anotacion)
+    argumentos = typing.get_args(anotacion)
+    if origen is list and argumentos:
+        interno, _ = _modelo_anidado(argumentos[0])
+        return interno, interno is not None
+    if origen is typing.Union:
+        for argumento in argumentos:
+            interno, es_lista = _modelo_anidado(argumento)
+            if interno is not None:
+                return interno, es_lista
+        return None, False
+    if isinstance(anotacion, type) and issubclass(anotacion, BaseModel):
+        return anotacion, False
+    return None, False
+
+
+def _plan(schema) -> tuple:
+    """Por cada campo del schema: (nombre, default, schema_anidado, es_lista)."""
+    plan = _planes.get(schema)
+    if plan is None:
+        plan = []
+        for nombre, campo in schema.model_fields.items():
+            anidado, es_lista = _modelo_anidado(campo.annotation)
+            default = None if campo.is_required() else campo.get_default(call_default_factory=True)
+            plan.append((nombre, default, anidado, es_lista))
+        plan = _planes[schema] = tuple(plan)
+    return plan
+
+
+def a_dicts(filas: list, schema) -> list[dict]:
+    """
+    Convierte filas de lectura en los dicts que produciría `schema`
+    (mismos campos, mismo orden). Listos para orjson.
+    """
+    memo: dict[int, dict] = {}
+
+    def convertir(obj, esquema):
+        clave = id(obj)
+        hecho = memo.get(clave)
+        if hecho is not None:
+            return hecho
+        salida = {}
+        for nombre, default, anidado, es_lista in _plan(esquema):
+            valor = getattr(obj, nombre, default)
+            if anidado is not None and valor is not None:
+                if es_lista:
+                    valor = [convertir(v, anidado) for v in valor]
+                else:
+                    valor = convertir(valor, anidado)
+            salida[nombre] = valor
+        memo[clave] = salida
+        return salida
+
+    return [convertir(fila, schema) for fila in filas]
+
+
+def son_filas_de_lectura(items) -> bool:
+    return bool(items) and isinstance(items[0], _Fila)
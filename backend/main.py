@@ -2,13 +2,16 @@
 import os
 import shutil
 import sys
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
+import threading
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Request, Response, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
-from backend.database import SessionLocal, engine, backup_database
-from backend import models, crud, schemas
+from backend.database import SessionLocal, engine, inicializar_esquema, esquema_listo
+from backend import models, crud, schemas, metricas, eventos, escritura, archivo, respaldos, analitica, simulacion, reportes, mantenimiento, coordinacion, inquilinos, auditoria, documentos, recordatorios
+from backend.respuestas import CompresionMiddleware, responder_listado
 
 """
 main.py
@@ -17,16 +20,21 @@ main.py
 """
 
 # =========================
-# CREACIÓN DE TABLAS
+# APP FASTAPI
 # =========================
 
-models.Base.metadata.create_all(bind=engine)
+# orjson serializa las respuestas bastante más rápido que json estándar
+app = FastAPI(title="Sistema de Préstamos Privados", default_response_class=ORJSONResponse)
 
 # =========================
-# APP FASTAPI
+# MÉTRICAS (GET /metrics)
 # =========================
 
-app = FastAPI(title="Sistema de Préstamos Privados")
+# Va antes de declarar rutas: instala la clase de ruta instrumentada
+metricas.instalar(app, engine)
+
+# Mantenimiento de SQLite: escucha el uso del engine para saber cuándo está ocioso
+mantenimiento.instalar(engine)
 
 # =========================
 # CORS
@@ -38,8 +46,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El frontend lee la versión del préstamo para mandarla en If-Match
+    expose_headers=["ETag"],
 )
 
+# Compresión br/gzip negociada para respuestas grandes (los listados)
+app.add_middleware(CompresionMiddleware)
+
+# Quién hizo cada escritura (X-Usuario) y desde qué ruta, para auditoria.py.
+# Va antes que la de inquilinos (más adentro): ve la ruta ya sin el prefijo
+app.add_middleware(auditoria.AuditoriaMiddleware)
+
+# Varias carteras en un backend: /t/{inquilino}/... o X-Inquilino (ver inquilinos.py).
+# Va última: es la más externa, así CORS y compresión ven la ruta sin prefijo
+app.add_middleware(inquilinos.InquilinoMiddleware)
+
 # =========================
 # RUTAS DE DATOS (PRODUCCIÓN)
 # =========================
@@ -58,26 +79,108 @@ CLIENT_UPLOAD_DIR = os.path.join(UPLOAD_ROOT, "clientes")
 
 os.makedirs(CLIENT_UPLOAD_DIR, exist_ok=True)
 
-app.mount("/uploads", StaticFiles(directory=UPLOAD_ROOT), name="uploads")
+# Los del inquilino del request, o los de la base principal
+app.mount("/uploads", inquilinos.Uploads(UPLOAD_ROOT), name="uploads")
 
 # =========================
 # DEPENDENCIA DB
 # =========================
 
 def get_db():
-    db = SessionLocal()
+    inquilino = inquilinos.actual()
+    if inquilino is not None:
+        db = inquilino.sesion()
+    else:
+        # Si llega un request mientras se crea el esquema, esperar (o crearlo acá)
+        if not esquema_listo.is_set():
+            inicializar_esquema()
+        db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+# =========================
+# ESCRITURAS (ESCRITOR ÚNICO OPCIONAL)
+# =========================
+
+def escribir(db: Session, schema, operacion):
+    """
+    Corre `operacion(db)`, una escritura de crud.py.
+
+    Con PRESTAMOS_ESCRITOR_UNICO=1 se encola en el hilo escritor (group
+    commit, ver escritura.py) y el resultado se pasa a `schema` ahí mismo,
+    antes de que se cierre la sesión del escritor.
+    El escritor es de la base principal: los inquilinos escriben directo.
+    """
+    if not escritura.ESCRITOR_ACTIVO or inquilinos.actual() is not None:
+        return operacion(db)
+
+    def unidad(sesion):
+        resultado = operacion(sesion)
+        return None if resultado is None else schema.model_validate(resultado)
+
+    return escritura.obtener().ejecutar(unidad)
+
+# =========================
+# CONCURRENCIA OPTIMISTA (If-Match / ETag)
+# =========================
+
+def version_if_match(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """
+    If-Match: "3" (o W/"3", o 3) → 3. Sin header o con "*" no hay condición.
+    La versión es la columna `version` del préstamo (también viaja en el ETag).
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    valor = if_match.strip()
+    if valor.startswith("W/"):
+        valor = valor[2:]
+    valor = valor.strip('"')
+    if not valor.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match inválido: se espera la versión del préstamo")
+    return int(valor)
+
+
+def _con_etag(response: Response, prestamo):
+    if prestamo is not None:
+        response.headers["ETag"] = f'"{prestamo.version}"'
+    return prestamo
+
+# =========================
+# HEALTH (READINESS)
+# =========================
+
+@app.get("/health")
+def health():
+    """
+    Lo consulta Electron al arrancar. No toca la base: solo informa si
+    el esquema ya está listo para atender requests.
+    """
+    if not esquema_listo.is_set():
+        raise HTTPException(status_code=503, detail="Iniciando")
+    return {"estado": "ok"}
+
 # =========================
 # CLIENTES
 # =========================
 
 @app.get("/clientes", response_model=list[schemas.ClienteOut])
-def listar_clientes(db: Session = Depends(get_db)):
-    return crud.listar_clientes(db)
+def listar_clientes(request: Request, formato: Optional[str] = None, db: Session = Depends(get_db)):
+    return responder_listado(request, crud.listar_clientes(db), schemas.ClienteOut, formato)
+
+# Antes de /clientes/{cliente_id}: si no, "archivos.zip" se toma como un id
+@app.get("/clientes/archivos.zip")
+def descargar_archivos_clientes(ids: list[int] = Query(...), db: Session = Depends(get_db)):
+    """Archivos de varios clientes en un ZIP, una carpeta por cliente (ver documentos.py)."""
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > documentos.MAX_CLIENTES:
+        raise HTTPException(status_code=400, detail=f"Máximo {documentos.MAX_CLIENTES} clientes por ZIP")
+    encontrados = {c for (c,) in db.query(models.Cliente.id).filter(models.Cliente.id.in_(ids))}
+    faltan = [i for i in ids if i not in encontrados]
+    if faltan:
+        raise HTTPException(status_code=404, detail=f"Clientes no encontrados: {', '.join(map(str, faltan))}")
+    return _responder_zip(documentos.entradas(db, ids, _uploads_actual(), por_cliente=True), "clientes_archivos.zip")
 
 @app.get("/clientes/{cliente_id}", response_model=schemas.ClienteOut)
 def obtener_cliente(cliente_id: int, db: Session = Depends(get_db)):
@@ -86,9 +189,13 @@ def obtener_cliente(cliente_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     return cliente
 
+@app.get("/clientes/{cliente_id}/completo", response_model=schemas.ClienteCompletoOut)
+def obtener_cliente_completo(cliente_id: int, incluir_archivados: bool = False, db: Session = Depends(get_db)):
+    return crud.obtener_cliente_completo(db, cliente_id, incluir_archivados)
+
 @app.post("/clientes", response_model=schemas.ClienteOut)
 def crear_cliente(data: schemas.ClienteCreate, db: Session = Depends(get_db)):
-    return crud.crear_cliente(db, data)
+    return escribir(db, schemas.ClienteOut, lambda s: crud.crear_cliente(s, data))
 
 # =========================
 # ARCHIVOS CLIENTE
@@ -105,7 +212,9 @@ def subir_archivo_cliente(
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
-    cliente_dir = os.path.join(CLIENT_UPLOAD_DIR, str(cliente_id))
+    inquilino = inquilinos.actual()
+    raiz = os.path.join(inquilino.uploads, "clientes") if inquilino is not None else CLIENT_UPLOAD_DIR
+    cliente_dir = os.path.join(raiz, str(cliente_id))
     os.makedirs(cliente_dir, exist_ok=True)
 
     filename = f"{tipo}_{file.filename}"
@@ -126,101 +235,426 @@ def subir_archivo_cliente(
     db.add(archivo)
     db.commit()
     db.refresh(archivo)
+    eventos.bus.publicar("archivo", archivo.id, eventos.datos_de(archivo, eventos.CAMPOS_ARCHIVO), "creado")
     return archivo
 
+def _uploads_actual() -> str:
+    inquilino = inquilinos.actual()
+    return inquilino.uploads if inquilino is not None else UPLOAD_ROOT
+
+def _responder_zip(archivos: list[tuple], nombre: str) -> StreamingResponse:
+    return StreamingResponse(
+        documentos.generar_zip(archivos),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+@app.get("/clientes/{cliente_id}/archivos.zip")
+def descargar_archivos_cliente(cliente_id: int, db: Session = Depends(get_db)):
+    """Todos los archivos del cliente en un ZIP armado al vuelo (ver documentos.py)."""
+    if not crud.obtener_cliente(db, cliente_id):
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    archivos = documentos.entradas(db, [cliente_id], _uploads_actual(), por_cliente=False)
+    return _responder_zip(archivos, f"cliente_{cliente_id}_archivos.zip")
+
 # =========================
 # PRÉSTAMOS
 # =========================
 
 @app.get("/prestamos", response_model=list[schemas.PrestamoOut])
-def listar_prestamos(db: Session = Depends(get_db)):
-    return crud.listar_prestamos(db)
+def listar_prestamos(
+    request: Request,
+    formato: Optional[str] = None,
+    incluir_archivados: bool = False,
+    db: Session = Depends(get_db),
+):
+    return responder_listado(
+        request, crud.listar_prestamos(db, incluir_archivados), schemas.PrestamoOut, formato,
+        relaciones={"cliente": "clientes"},
+    )
+
+@app.get("/prestamos/archivo/resumen", response_model=list[schemas.ResumenPeriodoArchivoOut])
+def resumen_archivo(db: Session = Depends(get_db)):
+    """Totales por período de los préstamos archivados (ver archivo.py)."""
+    return archivo.listar_resumen(db)
+
+@app.post("/prestamos/archivo", response_model=schemas.ArchivadoOut)
+def archivar_prestamos(dias: int = archivo.DIAS_ARCHIVO):
+    """Corre el archivo ya (además del que corre al arrancar)."""
+    if dias < 1:
+        raise HTTPException(status_code=400, detail="dias debe ser >= 1")
+    return {"archivados": _archivar(dias)}
 
 @app.post("/prestamos", response_model=schemas.PrestamoOut)
-def crear_prestamo(data: schemas.PrestamoCreate, db: Session = Depends(get_db)):
-    return crud.crear_prestamo(db, data)
+def crear_prestamo(data: schemas.PrestamoCreate, response: Response, db: Session = Depends(get_db)):
+    return _con_etag(response, escribir(db, schemas.PrestamoOut, lambda s: crud.crear_prestamo(s, data)))
 
 @app.put("/prestamos/{prestamo_id}/agregar-monto", response_model=schemas.PrestamoOut)
-def agregar_monto(prestamo_id: int, data: schemas.AgregarMontoIn, db: Session = Depends(get_db)):
-    prestamo = crud.agregar_monto(db, prestamo_id, data.monto_extra)
+def agregar_monto(
+    prestamo_id: int,
+    data: schemas.AgregarMontoIn,
+    response: Response,
+    version: Optional[int] = Depends(version_if_match),
+    db: Session = Depends(get_db),
+):
+    prestamo = escribir(db, schemas.PrestamoOut, lambda s: crud.agregar_monto(
+        s, prestamo_id, data.monto_extra, version
+    ))
     if not prestamo:
         raise HTTPException(status_code=404, detail="Préstamo no encontrado")
-    return prestamo
+    return _con_etag(response, prestamo)
 
 @app.put("/prestamos/{prestamo_id}/cobrar", response_model=schemas.PrestamoOut)
-def cobrar_prestamo(prestamo_id: int, data: schemas.CobrarPrestamo, db: Session = Depends(get_db)):
-    prestamo = crud.cobrar_prestamo(db, prestamo_id, data.monto_cobrado_final)
+def cobrar_prestamo(
+    prestamo_id: int,
+    data: schemas.CobrarPrestamo,
+    response: Response,
+    version: Optional[int] = Depends(version_if_match),
+    db: Session = Depends(get_db),
+):
+    prestamo = escribir(db, schemas.PrestamoOut, lambda s: crud.cobrar_prestamo(
+        s, prestamo_id, data.monto_cobrado_final, version
+    ))
     if not prestamo:
         raise HTTPException(status_code=404, detail="Préstamo no encontrado")
-    return prestamo
+    return _con_etag(response, prestamo)
 
 @app.post("/prestamos/{prestamo_id}/renovar", response_model=schemas.PrestamoOut)
-def renovar_prestamo(prestamo_id: int, data: schemas.RenovarPrestamoIn, db: Session = Depends(get_db)):
+def renovar_prestamo(
+    prestamo_id: int,
+    data: schemas.RenovarPrestamoIn,
+    response: Response,
+    version: Optional[int] = Depends(version_if_match),
+    db: Session = Depends(get_db),
+):
     try:
         # ahora el backend calcula el total y la nueva fecha a partir del plazo
         # y opcionalmente usa tasa_interes personalizada
-        nuevo_prestamo = crud.renovar_prestamo(
-            db,
+        nuevo_prestamo = escribir(db, schemas.PrestamoOut, lambda s: crud.renovar_prestamo(
+            s,
             prestamo_id,
             data.monto_renovado,
             data.plazo,
-            getattr(data, 'tasa_interes', None)
-        )
+            getattr(data, 'tasa_interes', None),
+            version,
+        ))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
     if not nuevo_prestamo:
         raise HTTPException(status_code=404, detail="Préstamo no encontrado")
 
-    return nuevo_prestamo
+    # El ETag es el del préstamo NUEVO (el que se devuelve)
+    return _con_etag(response, nuevo_prestamo)
+
+@app.post("/cobranzas/lote", response_model=schemas.CobranzaLoteOut)
+def cobrar_lote(data: list[schemas.CobranzaItemIn], db: Session = Depends(get_db)):
+    """
+    Cierre de caja: muchos cobros en una transacción, con resultado por
+    ítem (los rechazados no frenan al resto) y el resumen de la caja.
+    """
+    resultado = escribir(db, schemas.CobranzaLoteOut, lambda s: crud.cobrar_lote(s, data))
+    if inquilinos.actual() is None:
+        mantenimiento.avisar_cambios(len(data))
+    return resultado
 
 # =========================
 # INVERSORES
 # =========================
 
 @app.get("/inversores", response_model=list[schemas.InversorOut])
-def listar_inversores(db: Session = Depends(get_db)):
-    return crud.listar_inversores(db)
+def listar_inversores(request: Request, formato: Optional[str] = None, db: Session = Depends(get_db)):
+    return responder_listado(request, crud.listar_inversores(db), schemas.InversorOut, formato)
 
 @app.post("/inversores", response_model=schemas.InversorOut)
 def crear_inversor(data: schemas.InversorCreate, db: Session = Depends(get_db)):
-    return crud.crear_inversor(db, data)
+    return escribir(db, schemas.InversorOut, lambda s: crud.crear_inversor(s, data))
 
 @app.put("/inversores/{inversor_id}/liquidar", response_model=schemas.InversorOut)
 def liquidar_inversor(inversor_id: int, db: Session = Depends(get_db)):
-    inversor = crud.liquidar_inversor(db, inversor_id)
+    inversor = escribir(db, schemas.InversorOut, lambda s: crud.liquidar_inversor(s, inversor_id))
     if not inversor:
         raise HTTPException(status_code=404, detail="Inversor no encontrado")
     return inversor
 
+# =========================
+# TARIFAS
+# =========================
+
+@app.get("/tarifas", response_model=list[schemas.TarifaOut])
+def listar_tarifas(todas: bool = False, db: Session = Depends(get_db)):
+    """Tasa de cada plazo vigente hoy (de memoria, ver tarifas.py); `todas` suma las viejas y futuras."""
+    return crud.listar_tarifas(db, todas)
+
+@app.post("/tarifas", response_model=schemas.TarifaOut)
+def crear_tarifa(data: schemas.TarifaCreate, db: Session = Depends(get_db)):
+    # Directo, no por el escritor único: el registro en memoria se invalida
+    # después del commit real, no del savepoint de la unidad
+    return crud.crear_tarifa(db, data)
+
 # =========================
 # BLOQUEAR PRÉSTAMO
 # =========================
 
 @app.post("/prestamos/{prestamo_id}/bloquear", response_model=schemas.PrestamoOut)
-def bloquear_prestamo(prestamo_id: int, db: Session = Depends(get_db)):
-    prestamo = crud.bloquear_prestamo(db, prestamo_id)
+def bloquear_prestamo(
+    prestamo_id: int,
+    response: Response,
+    version: Optional[int] = Depends(version_if_match),
+    db: Session = Depends(get_db),
+):
+    prestamo = escribir(db, schemas.PrestamoOut, lambda s: crud.bloquear_prestamo(s, prestamo_id, version))
     if not prestamo:
         raise HTTPException(status_code=404, detail="Préstamo no encontrado")
-    return prestamo
+    return _con_etag(response, prestamo)
+# =========================
+# ANALÍTICA
+# =========================
+
+@app.get("/analitica/cohortes", response_model=list[schemas.CohorteOut])
+def cohortes(db: Session = Depends(get_db)):
+    """Curvas de pago / renovación / bloqueo / mora por período de origen."""
+    return analitica.cohortes(db)
+
+@app.post("/simulacion", response_model=schemas.SimulacionOut, status_code=202)
+def iniciar_simulacion(data: schemas.SimulacionIn, db: Session = Depends(get_db)):
+    """
+    Lanza una simulación Monte Carlo de la cartera activa en segundo plano
+    (ver simulacion.py). Consultar el avance con GET /simulacion/{id}.
+    """
+    if data.prob_default + data.prob_renovacion > 1:
+        raise HTTPException(status_code=400, detail="prob_default + prob_renovacion no puede superar 1")
+    if not simulacion.disponible():
+        raise HTTPException(status_code=503, detail="La simulación requiere NumPy")
+    # Sobre la cartera del request, como los reportes
+    return simulacion.iniciar(db, data.model_dump(), session_factory=inquilinos.sesiones())
+
+@app.get("/simulacion/{simulacion_id}", response_model=schemas.SimulacionOut)
+def obtener_simulacion(simulacion_id: str, db: Session = Depends(get_db)):
+    datos = simulacion.obtener(db, simulacion_id)
+    if datos is None:
+        raise HTTPException(status_code=404, detail="Simulación no encontrada")
+    return datos
+
+# =========================
+# REPORTES EN SEGUNDO PLANO
+# =========================
+
+@app.post("/reportes", response_model=schemas.ReporteOut, status_code=202)
+def crear_reporte(data: schemas.ReporteIn, db: Session = Depends(get_db)):
+    """
+    Encola un reporte (ver reportes.py). Consultar el estado con
+    GET /reportes/{id} y bajar el CSV con GET /reportes/{id}/descarga.
+    """
+    if data.tipo == "cartera_mensual" and not data.periodo:
+        raise HTTPException(status_code=400, detail="cartera_mensual requiere periodo (YYYY-MM)")
+    return reportes.encolar(
+        db, data.tipo, data.model_dump(exclude={"tipo"}, exclude_none=True),
+        session_factory=inquilinos.sesiones(),
+    )
+
+@app.get("/reportes", response_model=list[schemas.ReporteOut])
+def listar_reportes(db: Session = Depends(get_db)):
+    return reportes.listar(db)
+
+@app.get("/reportes/{reporte_id}", response_model=schemas.ReporteOut)
+def obtener_reporte(reporte_id: str, db: Session = Depends(get_db)):
+    datos = reportes.obtener(db, reporte_id)
+    if datos is None:
+        raise HTTPException(status_code=404, detail="Reporte no encontrado")
+    return datos
+
+@app.get("/reportes/{reporte_id}/descarga")
+def descargar_reporte(reporte_id: str, db: Session = Depends(get_db)):
+    datos = reportes.obtener(db, reporte_id)
+    if datos is None:
+        raise HTTPException(status_code=404, detail="Reporte no encontrado")
+    if datos["estado"] != "terminado":
+        raise HTTPException(status_code=409, detail=f"El reporte está {datos['estado']}")
+    # FileResponse manda el archivo por partes, sin cargarlo en memoria
+    return FileResponse(
+        reportes.ruta_archivo(reporte_id),
+        media_type="text/csv",
+        filename=reportes.nombre_descarga(datos),
+    )
+
+# =========================
+# RECORDATORIOS DE PAGO
+# =========================
+
+# get_db solo para esperar el esquema: el envío usa sus propias sesiones, por lotes
+@app.get("/recordatorios", dependencies=[Depends(get_db)])
+def exportar_recordatorios(dias: int = recordatorios.DIAS, formato: str = "csv"):
+    """
+    Un recordatorio por cliente con préstamos vencidos o que vencen en los
+    próximos `dias`, en CSV o JSONL, enviado mientras se genera (ver recordatorios.py).
+    """
+    if formato not in recordatorios.FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato inválido (csv o jsonl)")
+    if not 0 <= dias <= recordatorios.DIAS_MAX:
+        raise HTTPException(status_code=400, detail=f"dias debe estar entre 0 y {recordatorios.DIAS_MAX}")
+    return StreamingResponse(
+        recordatorios.exportar(inquilinos.sesiones(), dias, formato),
+        media_type=recordatorios.FORMATOS[formato][1],
+        headers={"Content-Disposition": f'attachment; filename="{recordatorios.nombre_archivo(formato)}"'},
+    )
+
+# =========================
+# MANTENIMIENTO DE LA BASE
+# =========================
+
+def solo_base_principal():
+    """mantenimiento.py trabaja sobre la base principal, no sobre la de un inquilino."""
+    if inquilinos.actual() is not None:
+        raise HTTPException(status_code=404, detail="Solo disponible en la base principal")
+
+@app.get("/mantenimiento", response_model=schemas.MantenimientoOut, dependencies=[Depends(solo_base_principal)])
+def estado_mantenimiento():
+    """Última ejecución, duración y resultado de cada tarea (ver mantenimiento.py)."""
+    return mantenimiento.estado()
+
+@app.post("/mantenimiento/{tarea}", response_model=schemas.TareaMantenimientoOut,
+          dependencies=[Depends(solo_base_principal)])
+def ejecutar_mantenimiento(tarea: str):
+    """Corre una tarea ya (analyze, optimize, incremental_vacuum, quick_check)."""
+    if tarea not in mantenimiento.TAREAS:
+        raise HTTPException(status_code=404, detail="Tarea de mantenimiento desconocida")
+    return mantenimiento.ejecutar(tarea)
+
+# =========================
+# AUDITORÍA
+# =========================
+
+@app.get("/auditoria", response_model=list[schemas.AuditoriaOut])
+def listar_auditoria(
+    entidad: Optional[str] = None,
+    id: Optional[int] = None,
+    limite: int = 100,
+    antes_de: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Historial de cambios, del más nuevo al más viejo (ver auditoria.py).
+    Para la página siguiente: antes_de = id de la última fila recibida.
+    """
+    if entidad is not None and entidad not in auditoria.ENTIDADES.values():
+        raise HTTPException(status_code=400, detail="Entidad desconocida")
+    return auditoria.listar(db, entidad, id, limite, antes_de)
+
+# =========================
+# DELTA SYNC
+# =========================
+
+@app.get("/cambios", response_model=schemas.CambiosOut)
+def listar_cambios(desde: int = 0, limite: int = 500, db: Session = Depends(get_db)):
+    """
+    Filas cambiadas desde la versión `desde` (0 = todo).
+    El cliente guarda `hasta` y repite mientras `hay_mas` sea True.
+    """
+    if desde < 0:
+        raise HTTPException(status_code=400, detail="desde debe ser >= 0")
+    return crud.listar_cambios(db, desde, limite)
+
+# =========================
+# FEED DE CAMBIOS (SSE)
+# =========================
+
+@app.get("/eventos")
+async def stream_eventos(request: Request):
+    """
+    Server-Sent Events con los cambios confirmados (ver eventos.py).
+    El navegador reenvía Last-Event-ID al reconectar y se reanuda desde ahí.
+    """
+    return StreamingResponse(
+        eventos.stream_sse(request, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # =========================
 # STARTUP
 # =========================
 
+def _archivar(dias: int) -> int:
+    archivados = archivo.archivar_cerrados(dias, session_factory=inquilinos.sesiones())
+    # Los clientes de /eventos ya recibieron cada préstamo como "eliminado"
+    if archivados and inquilinos.actual() is None:
+        mantenimiento.avisar_cambios(archivados)
+    return archivados
+
+
+def _tareas_del_lider():
+    # Con varios workers (uvicorn --workers) las corre uno solo: coordinacion.py
+    print("Iniciando aplicación – respaldo incremental")
+    respaldos.crear_respaldo()
+    respaldos.compactar()
+    respaldos.iniciar_periodico()
+    archivados = _archivar(archivo.DIAS_ARCHIVO)
+    if archivados:
+        print(f"Archivo: {archivados} préstamos cerrados movidos a prestamos_archivo")
+    reanudados = reportes.reanudar()
+    if reanudados:
+        print(f"Reportes: {reanudados} pendientes vueltos a encolar")
+    reanudadas = simulacion.reanudar()
+    if reanudadas:
+        print(f"Simulación: {reanudadas} pendientes vueltas a correr")
+    mantenimiento.iniciar()
+
+
+def _tareas_de_arranque():
+    inicializar_esquema()
+    coordinacion.iniciar_relevo(SessionLocal)
+    coordinacion.al_ser_lider(engine, _tareas_del_lider)
+    inquilinos.iniciar()
+
+
 @app.on_event("startup")
 def on_startup():
-    print("Iniciando aplicación – creando backup")
-    backup_database()
+    # Esquema y backup en segundo plano: el servidor empieza a escuchar ya
+    threading.Thread(target=_tareas_de_arranque, name="arranque", daemon=True).start()
+    if escritura.ESCRITOR_ACTIVO:
+        escritura.obtener().iniciar()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # Confirmar lo que haya quedado en la cola del escritor
+    escritura.detener()
+    # Último incremento con lo cambiado desde el respaldo anterior
+    respaldos.detener_periodico()
+    simulacion.detener()
+    reportes.detener()
+    mantenimiento.detener()
+    coordinacion.detener()
+    # Lo que quede en la cola de auditoría, antes de cerrar las bases de los inquilinos
+    auditoria.detener()
+    inquilinos.detener()
 
 # =========================
 # ENTRYPOINT (OBLIGATORIO PARA EXE)
 # =========================
 
 if __name__ == "__main__":
+    import multiprocessing
     import uvicorn
-    uvicorn.run(
-        app,
-        host="127.0.0.1",
-        port=8000,
-        log_level="info"
-    )
+
+    # El EXE (PyInstaller) relanza este mismo ejecutable para los procesos
+    # de la simulación: sin esto cada uno levantaría otro servidor
+    multiprocessing.freeze_support()
+    if coordinacion.WORKERS > 1:
+        # Varios workers: uvicorn necesita la app como "módulo:atributo"
+        # para importarla en cada proceso (con el objeto arranca uno solo)
+        uvicorn.run(
+            "backend.main:app",
+            host="127.0.0.1",
+            port=8000,
+            workers=coordinacion.WORKERS,
+            log_level="info"
+        )
+    else:
+        uvicorn.run(
+            app,
+            host="127.0.0.1",
+            port=8000,
+            log_level="info"
+        )
@@ -0,0 +1,304 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+"""
+mantenimiento.py: mantenimiento automático de prestamos.db.
+
+Un hilo revisa cada INTERVALO_SEGUNDOS qué hace falta:
+
+- analyze: ANALYZE con `analysis_limit` (estadísticas aproximadas, rápido
+  aun con tablas grandes) cuando hubo muchas escrituras desde el último:
+  UMBRAL_CAMBIOS transacciones (sync_estado.version) o cambios masivos
+  avisados con avisar_cambios() (archivo de préstamos, cobranzas por lote).
+  También si la base nunca se analizó.
+- optimize: PRAGMA optimize cada OPTIMIZE_HORAS.
+- incremental_vacuum: si las páginas libres llegan a umbral_libres() (el
+  LIBRES_FRACCION del archivo, nunca menos de LIBRES_MINIMO) y el servidor
+  está ocioso, las devuelve al sistema de a PAGINAS_POR_PASO; corta en
+  cuanto vuelve a haber requests. Solo recupera páginas enteras: el
+  espacio suelto dentro de páginas a medio usar lo reutilizan las
+  próximas escrituras. Necesita auto_vacuum = INCREMENTAL
+  (database.py para bases nuevas, migración 7 para las existentes).
+- quick_check: PRAGMA quick_check cada QUICK_CHECK_HORAS, también solo
+  con el servidor ocioso. Si falla, queda en el estado y en el log.
+
+"Ocioso" = nadie pidió una conexión al pool en OCIOSO_SEGUNDOS (evento
+checkout del engine; las conexiones de este módulo no cuentan).
+
+GET /mantenimiento muestra, por tarea, la última ejecución, cuánto tardó
+y su resultado, más el tamaño del archivo y las páginas libres.
+POST /mantenimiento/{tarea} la corre en el momento.
+
+En motores que no son SQLite las tareas responden "no aplica".
+"""
+
+INTERVALO_SEGUNDOS = int(os.getenv("PRESTAMOS_MANTENIMIENTO_SEGUNDOS", "60"))
+OCIOSO_SEGUNDOS = 30
+
+UMBRAL_CAMBIOS = 500
+LIMITE_ANALISIS = 1000  # filas por índice que mira ANALYZE
+
+OPTIMIZE_HORAS = 6
+QUICK_CHECK_HORAS = 24
+
+# Páginas libres para vacuum: una fracción del archivo, con un piso para
+# no despertar por un puñado de páginas en bases chicas
+LIBRES_FRACCION = 0.05
+LIBRES_MINIMO = 64
+PAGINAS_POR_PASO = 128
+
+TAREAS = ("analyze", "optimize", "incremental_vacuum", "quick_check")
+
+_engine = None
+_lock = threading.Lock()
+_detener = threading.Event()
+_hilo: threading.Thread | None = None
+
+_ultima_actividad = time.monotonic()
+# Marca las conexiones que pide este módulo (no son actividad)
+_local = threading.local()
+_cambios_avisados = 0
+_version_analizada: int | None = None
+
+_estado = {t: {"ultima": None, "duracion_ms": None, "resultado": None, "ejecuciones": 0} for t in TAREAS}
+_historial: deque = deque(maxlen=50)
+
+
+# =========================
+# ACTIVIDAD
+# =========================
+
+def _al_pedir_conexion(*_args) -> None:
+    global _ultima_actividad
+    if not getattr(_local, "propia", False):
+        _ultima_actividad = time.monotonic()
+
+
+def instalar(engine) -> None:
+    """Registra el engine a mantener y escucha su uso para detectar ocio."""
+    global _engine
+    _engine = engine
+    event.listen(engine, "checkout", _al_pedir_conexion)
+
+
+def ocioso() -> bool:
+    return time.monotonic() - _ultima_actividad >= OCIOSO_SEGUNDOS
+
+
+def avisar_cambios(filas: int) -> None:
+    """Un proceso masivo tocó `filas` filas: adelanta el próximo ANALYZE."""
+    global _cambios_avisados
+    _cambios_avisados += filas
+
+
+# =========================
+# TAREAS
+# =========================
+
+def _analyze(conn, _inicio: float) -> str:
+    global _cambios_avisados, _version_analizada
+    conn.exec_driver_sql(f"PRAGMA analysis_limit = {LIMITE_ANALISIS}")
+    conn.exec_driver_sql("ANALYZE")
+    _cambios_avisados = 0
+    _version_analizada = _version_de_datos(conn)
+    return "ok"
+
+
+def _optimize(conn, _inicio: float) -> str:
+    conn.exec_driver_sql("PRAGMA optimize")
+    return "ok"
+
+
+def _incremental_vacuum(conn, inicio: float) -> str:
+    if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+        return "auto_vacuum no es INCREMENTAL"
+    # pysqlite hace un solo sqlite3_step por execute, y cada paso del PRAGMA
+    # libera UNA página: se repite dentro de una transacción por tanda
+    cursor = conn.connection.driver_connection.cursor()
+    liberadas = 0
+    try:
+        while True:
+            libres = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            if not libres:
+                break
+            # Cada tanda es una transacción corta: entre tandas pueden escribir otros
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                for _ in range(min(libres, PAGINAS_POR_PASO)):
+                    cursor.execute("PRAGMA incremental_vacuum(1)")
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            liberadas += min(libres, PAGINAS_POR_PASO)
+            if _ultima_actividad > inicio or _detener.is_set():
+                break
+        restantes = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        cursor.close()
+    return f"{liberadas} páginas liberadas, {restantes} libres"
+
+
+def _quick_check(conn, _inicio: float) -> str:
+    filas = [fila[0] for fila in conn.exec_driver_sql("PRAGMA quick_check").fetchall()]
+    if filas == ["ok"]:
+        return "ok"
+    resultado = "; ".join(filas[:5])
+    print(f"Mantenimiento: quick_check encontró problemas: {resultado}")
+    return resultado
+
+
+_FUNCIONES = {
+    "analyze": _analyze,
+    "optimize": _optimize,
+    "incremental_vacuum": _incremental_vacuum,
+    "quick_check": _quick_check,
+}
+
+
+@contextmanager
+def _conexion():
+    _local.propia = True
+    try:
+        conn = _engine.connect()
+    finally:
+        _local.propia = False
+    with conn:
+        # AUTOCOMMIT: VACUUM y algunos PRAGMA no pueden correr en una transacción
+        yield conn.execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _version_de_datos(conn) -> int:
+    return conn.exec_driver_sql("SELECT COALESCE(MAX(version), 0) FROM sync_estado").scalar()
+
+
+def ejecutar(tarea: str) -> dict:
+    """Corre `tarea` (una a la vez) y registra duración y resultado."""
+    if _engine.dialect.name != "sqlite":
+        return {"tarea": tarea, "inicio": datetime.now(), "duracion_ms": 0.0, "resultado": "no aplica"}
+    with _lock:
+        inicio = time.monotonic()
+        cronometro = time.perf_counter()
+        fecha = datetime.now()
+        try:
+            with _conexion() as conn:
+                resultado = _FUNCIONES[tarea](conn, inicio)
+        except Exception as e:
+            resultado = f"error: {type(e).__name__}: {e}"
+        duracion = round((time.perf_counter() - cronometro) * 1000, 1)
+        estado = _estado[tarea]
+        estado.update(ultima=fecha, duracion_ms=duracion, resultado=resultado)
+        estado["ejecuciones"] += 1
+        registro = {"tarea": tarea, "inicio": fecha, "duracion_ms": duracion, "resultado": resultado}
+        _historial.append(registro)
+        return registro
+
+
+# =========================
+# PLANIFICACIÓN
+# =========================
+
+def _horas_desde(tarea: str) -> float:
+    ultima = _estado[tarea]["ultima"]
+    if ultima is None:
+        return float("inf")
+    return (datetime.now() - ultima).total_seconds() / 3600
+
+
+def umbral_libres(paginas: int) -> int:
+    """Páginas libres a partir de las cuales conviene un incremental_vacuum."""
+    return max(LIBRES_MINIMO, int(paginas * LIBRES_FRACCION))
+
+
+def _pendientes() -> list[str]:
+    """Las tareas que tocan ahora, en orden."""
+    with _conexion() as conn:
+        sin_estadisticas = not conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).first()
+        version = _version_de_datos(conn)
+        libres = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        paginas = conn.exec_driver_sql("PRAGMA page_count").scalar()
+
+    tareas = []
+    escrituras = version - (_version_analizada if _version_analizada is not None else version)
+    if sin_estadisticas or _cambios_avisados >= UMBRAL_CAMBIOS or escrituras >= UMBRAL_CAMBIOS:
+        tareas.append("analyze")
+    elif _horas_desde("optimize") >= OPTIMIZE_HORAS:
+        tareas.append("optimize")
+    if ocioso():
+        if libres >= umbral_libres(paginas):
+            tareas.append("incremental_vacuum")
+        if _horas_desde("quick_check") >= QUICK_CHECK_HORAS:
+            tareas.append("quick_check")
+    return tareas
+
+
+def _bucle(intervalo: float) -> None:
+    global _version_analizada
+    while not _detener.wait(intervalo):
+        try:
+            if _version_analizada is None:
+                # Referencia al arrancar: se cuentan las escrituras desde acá
+                with _conexion() as conn:
+                    _version_analizada = _version_de_datos(conn)
+            for tarea in _pendientes():
+                if _detener.is_set():
+                    break
+                ejecutar(tarea)
+        except Exception as e:
+            print(f"Mantenimiento falló: {e}")
+
+
+def iniciar(intervalo_segundos: float = INTERVALO_SEGUNDOS) -> None:
+    global _hilo
+    if _engine is None or _engine.dialect.name != "sqlite":
+        return
+    if intervalo_segundos <= 0 or (_hilo is not None and _hilo.is_alive()):
+        return
+    _detener.clear()
+    hilo = threading.Thread(target=_bucle, args=(intervalo_segundos,), name="mantenimiento", daemon=True)
+    hilo.start()
+    # Recién ahora: un detener() que llegue antes no debe hacer join de un hilo sin arrancar
+    _hilo = hilo
+
+
+def detener() -> None:
+    global _hilo
+    _detener.set()
+    if _hilo is not None:
+        _hilo.join(timeout=30)
+        _hilo = None
+
+
+# =========================
+# ESTADO (GET /mantenimiento)
+# =========================
+
+def estado() -> dict:
+    archivo = None
+    if _engine is not None and _engine.dialect.name == "sqlite":
+        with _conexion() as conn:
+            pragma = lambda nombre: conn.exec_driver_sql(f"PRAGMA {nombre}").scalar()  # noqa: E731
+            paginas, tamano = pragma("page_count"), pragma("page_size")
+            archivo = {
+                "bytes": paginas * tamano,
+                "paginas": paginas,
+                "paginas_libres": pragma("freelist_count"),
+                "tamano_pagina": tamano,
+                "auto_vacuum": {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(pragma("auto_vacuum"), "?"),
+            }
+    return {
+        "activo": _hilo is not None and _hilo.is_alive(),
+        "ocioso": ocioso(),
+        "cambios_avisados": _cambios_avisados,
+        "archivo": archivo,
+        "tareas": [{"tarea": t, **_estado[t]} for t in TAREAS],
+        "historial": list(reversed(_historial)),
+    }
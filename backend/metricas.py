@@ -0,0 +1,365 @@
+import functools
+import inspect
+import io
+import os
+import threading
+import time
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+from fastapi.routing import APIRoute
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+
+"""
+metricas.py
+- Latencia por ruta (histogramas)
+- Sentencias SQL y tiempo de SQL por request (eventos del engine)
+- Filas serializadas por ruta
+- Exposición en GET /metrics (formato texto de Prometheus)
+- Perfilado opt-in de UN request (?profile=1 o header X-Profile: 1)
+
+Configuración por variables de entorno:
+- PRESTAMOS_METRICAS=0   → no se instala nada (overhead cero)
+- PRESTAMOS_PERFILADO=1  → habilita ?profile=1 (desactivado por defecto)
+"""
+
+METRICAS_ACTIVAS = os.getenv("PRESTAMOS_METRICAS", "1") != "0"
+PERFILADO_PERMITIDO = os.getenv("PRESTAMOS_PERFILADO", "0") == "1"
+
+# Límites del histograma de latencia (segundos)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Cantidad máxima de sentencias SQL distintas que se siguen individualmente
+MAX_SENTENCIAS = 200
+
+
+# =========================
+# ESTADO POR REQUEST
+# =========================
+
+class EstadoRequest:
+    """Acumuladores del request en curso (compartidos con el threadpool)."""
+
+    __slots__ = ("sql_cantidad", "sql_segundos", "filas", "perfilar", "perfiles")
+
+    def __init__(self, perfilar: bool = False):
+        self.sql_cantidad = 0
+        self.sql_segundos = 0.0
+        self.filas = 0
+        self.perfilar = perfilar
+        self.perfiles = []
+
+
+_estado_actual: ContextVar[EstadoRequest | None] = ContextVar("estado_request", default=None)
+
+
+# =========================
+# REGISTRO GLOBAL
+# =========================
+
+class Histograma:
+    __slots__ = ("buckets", "suma", "cantidad")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS_LATENCIA)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor: float) -> None:
+        for i, limite in enumerate(BUCKETS_LATENCIA):
+            if valor <= limite:
+                self.buckets[i] += 1
+                break
+        self.suma += valor
+        self.cantidad += 1
+
+
+class Registro:
+    """Métricas acumuladas del proceso. Todas las escrituras van bajo lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias: dict[tuple[str, str], Histograma] = {}
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.sql_por_ruta: dict[tuple[str, str], list] = {}   # [sentencias, segundos]
+        self.filas_por_ruta: dict[tuple[str, str], int] = {}
+        self.sentencias: dict[str, list] = {}                  # sql → [veces, segundos]
+
+    def registrar_request(self, metodo: str, ruta: str, estado_http: int,
+                          duracion: float, req: EstadoRequest) -> None:
+        clave = (metodo, ruta)
+        with self._lock:
+            hist = self.latencias.get(clave)
+            if hist is None:
+                hist = self.latencias[clave] = Histograma()
+            hist.observar(duracion)
+
+            clave_estado = (metodo, ruta, estado_http)
+            self.requests[clave_estado] = self.requests.get(clave_estado, 0) + 1
+
+            sql = self.sql_por_ruta.setdefault(clave, [0, 0.0])
+            sql[0] += req.sql_cantidad
+            sql[1] += req.sql_segundos
+
+            self.filas_por_ruta[clave] = self.filas_por_ruta.get(clave, 0) + req.filas
+
+    def registrar_sentencia(self, sql: str, duracion: float) -> None:
+        with self._lock:
+            acumulado = self.sentencias.get(sql)
+            if acumulado is None:
+                if len(self.sentencias) >= MAX_SENTENCIAS:
+                    return
+                acumulado = self.sentencias[sql] = [0, 0.0]
+            acumulado[0] += 1
+            acumulado[1] += duracion
+
+    def exportar(self) -> str:
+        """Serializa el registro en formato de exposición de Prometheus."""
+        lineas = []
+        with self._lock:
+            lineas.append("# HELP prestamos_http_requests_total Requests HTTP atendidos.")
+            lineas.append("# TYPE prestamos_http_requests_total counter")
+            for (metodo, ruta, estado), n in sorted(self.requests.items()):
+                lineas.append(
+                    f'prestamos_http_requests_total{{metodo="{metodo}",ruta="{_escapar(ruta)}",estado="{estado}"}} {n}'
+                )
+
+            lineas.append("# HELP prestamos_http_request_duration_seconds Latencia por ruta.")
+            lineas.append("# TYPE prestamos_http_request_duration_seconds histogram")
+            for (metodo, ruta), hist in sorted(self.latencias.items()):
+                etiquetas = f'metodo="{metodo}",ruta="{_escapar(ruta)}"'
+                acumulado = 0
+                for limite, n in zip(BUCKETS_LATENCIA, hist.buckets):
+                    acumulado += n
+                    lineas.append(
+                        f'prestamos_http_request_duration_seconds_bucket{{{etiquetas},le="{limite}"}} {acumulado}'
+                    )
+                lineas.append(
+                    f'prestamos_http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} {hist.cantidad}'
+                )
+                lineas.append(f"prestamos_http_request_duration_seconds_sum{{{etiquetas}}} {hist.suma:.6f}")
+                lineas.append(f"prestamos_http_request_duration_seconds_count{{{etiquetas}}} {hist.cantidad}")
+
+            lineas.append("# HELP prestamos_sql_statements_total Sentencias SQL ejecutadas por ruta.")
+            lineas.append("# TYPE prestamos_sql_statements_total counter")
+            for (metodo, ruta), (n, _) in sorted(self.sql_por_ruta.items()):
+                lineas.append(f'prestamos_sql_statements_total{{metodo="{metodo}",ruta="{_escapar(ruta)}"}} {n}')
+
+            lineas.append("# HELP prestamos_sql_duration_seconds_total Tiempo en SQL por ruta.")
+            lineas.append("# TYPE prestamos_sql_duration_seconds_total counter")
+            for (metodo, ruta), (_, seg) in sorted(self.sql_por_ruta.items()):
+                lineas.append(
+                    f'prestamos_sql_duration_seconds_total{{metodo="{metodo}",ruta="{_escapar(ruta)}"}} {seg:.6f}'
+                )
+
+            lineas.append("# HELP prestamos_rows_serialized_total Filas devueltas por ruta.")
+            lineas.append("# TYPE prestamos_rows_serialized_total counter")
+            for (metodo, ruta), n in sorted(self.filas_por_ruta.items()):
+                lineas.append(f'prestamos_rows_serialized_total{{metodo="{metodo}",ruta="{_escapar(ruta)}"}} {n}')
+
+            lineas.append("# HELP prestamos_sql_statement_seconds_total Tiempo acumulado por sentencia SQL.")
+            lineas.append("# TYPE prestamos_sql_statement_seconds_total counter")
+            for sql, (n, seg) in sorted(self.sentencias.items(), key=lambda kv: -kv[1][1]):
+                etiqueta = _escapar(" ".join(sql.split())[:160])
+                lineas.append(f'prestamos_sql_statement_seconds_total{{sql="{etiqueta}"}} {seg:.6f}')
+                lineas.append(f'prestamos_sql_statement_calls_total{{sql="{etiqueta}"}} {n}')
+
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# =========================
+# EVENTOS SQL
+# =========================
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metricas_inicio", []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    pila = conn.info.get("_metricas_inicio")
+    if not pila:
+        return
+    duracion = time.perf_counter() - pila.pop()
+
+    req = _estado_actual.get()
+    if req is not None:
+        req.sql_cantidad += 1
+        req.sql_segundos += duracion
+    registro.registrar_sentencia(statement, duracion)
+
+
+def instrumentar_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+
+
+# =========================
+# RUTAS INSTRUMENTADAS
+# =========================
+
+def contar_filas(cantidad: int) -> None:
+    """Suma filas al request en curso (rutas que devuelven una Response ya codificada)."""
+    req = _estado_actual.get()
+    if req is not None:
+        req.filas += cantidad
+
+
+def _contar_filas(resultado) -> None:
+    if isinstance(resultado, list):
+        contar_filas(len(resultado))
+
+
+def _envolver_endpoint(endpoint):
+    """
+    Envuelve el endpoint para contar filas devueltas y, si el request pidió
+    perfilado, perfilar el hilo del threadpool donde corre el endpoint.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def envoltura_async(*args, **kwargs):
+            resultado = await endpoint(*args, **kwargs)
+            _contar_filas(resultado)
+            return resultado
+        return envoltura_async
+
+    @functools.wraps(endpoint)
+    def envoltura(*args, **kwargs):
+        req = _estado_actual.get()
+        if req is not None and req.perfilar:
+            import cProfile
+            perfil = cProfile.Profile()
+            perfil.enable()
+            try:
+                resultado = endpoint(*args, **kwargs)
+            finally:
+                perfil.disable()
+                req.perfiles.append(perfil)
+        else:
+            resultado = endpoint(*args, **kwargs)
+        _contar_filas(resultado)
+        return resultado
+    return envoltura
+
+
+class RutaInstrumentada(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _envolver_endpoint(endpoint), **kwargs)
+
+
+# =========================
+# MIDDLEWARE ASGI
+# =========================
+
+def _pide_perfil(scope) -> bool:
+    for nombre, valor in scope.get("headers", ()):
+        if nombre == b"x-profile" and valor not in (b"", b"0"):
+            return True
+    query = scope.get("query_string", b"")
+    if b"profile" not in query:
+        return False
+    valores = parse_qs(query.decode("latin-1")).get("profile", [])
+    return any(v not in ("", "0") for v in valores)
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware) para no agregar
+    una tarea ni copias de body por request.
+    """
+
+    def __init__(self, app, permitir_perfil: bool = False):
+        self.app = app
+        self.permitir_perfil = permitir_perfil
+        self._lock_perfil = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        perfilar = self.permitir_perfil and _pide_perfil(scope)
+        req = EstadoRequest(perfilar=perfilar)
+        token = _estado_actual.set(req)
+        estado_http = 500
+
+        async def send_instrumentado(mensaje):
+            nonlocal estado_http
+            if mensaje["type"] == "http.response.start":
+                estado_http = mensaje["status"]
+            if not perfilar:
+                await send(mensaje)
+
+        perfil_loop = None
+        if perfilar and self._lock_perfil.acquire(blocking=False):
+            import cProfile
+            perfil_loop = cProfile.Profile()
+            perfil_loop.enable()
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_instrumentado)
+        finally:
+            duracion = time.perf_counter() - inicio
+            if perfil_loop is not None:
+                perfil_loop.disable()
+                self._lock_perfil.release()
+            _estado_actual.reset(token)
+
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            registro.registrar_request(scope["method"], ruta, estado_http, duracion, req)
+
+        if perfilar:
+            reporte = _reporte_perfil(perfil_loop, req, duracion, estado_http)
+            await PlainTextResponse(reporte)(scope, receive, send)
+
+
+def _reporte_perfil(perfil_loop, req: EstadoRequest, duracion: float, estado_http: int) -> str:
+    salida = io.StringIO()
+    salida.write(
+        f"duracion_total={duracion * 1000:.2f}ms estado={estado_http} "
+        f"sql={req.sql_cantidad} ({req.sql_segundos * 1000:.2f}ms) filas={req.filas}\n\n"
+    )
+    perfiles = [p for p in [perfil_loop, *req.perfiles] if p is not None]
+    if not perfiles:
+        salida.write("(sin datos de perfil: otro request se estaba perfilando)\n")
+        return salida.getvalue()
+
+    import pstats
+
+    stats = pstats.Stats(perfiles[0], stream=salida)
+    for p in perfiles[1:]:
+        stats.add(p)
+    stats.sort_stats("cumulative").print_stats(60)
+    return salida.getvalue()
+
+
+# =========================
+# INSTALACIÓN
+# =========================
+
+def instalar(app, engine) -> None:
+    """
+    Activa la instrumentación sobre `app` y `engine`.
+    Debe llamarse ANTES de declarar las rutas (usa route_class).
+    """
+    if not METRICAS_ACTIVAS:
+        return
+
+    instrumentar_engine(engine)
+    app.router.route_class = RutaInstrumentada
+    app.add_middleware(MetricasMiddleware, permitir_perfil=PERFILADO_PERMITIDO)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(
+            registro.exportar(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
@@ -0,0 +1,473 @@
+from contextlib import contextmanager
+from datetime import date
+
+from sqlalchemy import inspect, text
+
+from backend import coordinacion
+from backend.dinero import a_centavos
+
+"""
+migraciones.py: evolución automática del esquema de una base existente.
+
+- create_all solo crea tablas que faltan; NO altera tablas existentes.
+  Los cambios sobre tablas ya creadas viven acá.
+- La versión aplicada se guarda en `PRAGMA user_version` (SQLite) o en la
+  tabla `esquema_version` (otros motores).
+- Las migraciones 1, 2 y 7 arreglan bases SQLite de versiones viejas de la
+  app; en otros motores la base siempre nace con el esquema final
+  (create_all) y se marca al día.
+- Cada migración es idempotente: verifica el estado real antes de tocar
+  nada, así una base nueva (creada por create_all) pasa sin cambios.
+- Los datos se copian por lotes y la copia es reanudable: si el proceso
+  se corta a mitad, la próxima ejecución sigue desde el último id copiado.
+
+Se ejecuta desde database.inicializar_esquema(), en segundo plano al arrancar.
+"""
+
+TAMANO_LOTE = 1000
+
+
+# =========================
+# AUXILIARES
+# =========================
+
+def _es_sqlite(engine) -> bool:
+    return engine.dialect.name == "sqlite"
+
+
+def _columnas(conn, tabla: str) -> dict[str, str]:
+    """{nombre: tipo declarado} de una tabla (vacío si no existe)."""
+    inspector = inspect(conn)
+    if not inspector.has_table(tabla):
+        return {}
+    return {c["name"]: str(c["type"]).upper() for c in inspector.get_columns(tabla)}
+
+
+@contextmanager
+def _transaccion(engine):
+    """
+    Transacción explícita. pysqlite no abre transacción antes de DDL,
+    así que se emite BEGIN a mano para que DROP + RENAME sean atómicos.
+    Los demás drivers ya la abren solos.
+    """
+    with engine.connect() as conn:
+        if _es_sqlite(engine):
+            conn.exec_driver_sql("BEGIN")
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def _reconstruir_con_centavos(engine, tabla: str, ddl: str, columnas: list[str],
+                              columnas_dinero: set[str], tamano_lote: int) -> int:
+    """
+    Copia `tabla` a una tabla nueva (definida por `ddl`) convirtiendo
+    `columnas_dinero` de pesos REAL a centavos INTEGER, y la reemplaza.
+    Devuelve la cantidad de filas copiadas en esta ejecución.
+    """
+    nueva = f"{tabla}__centavos"
+    lista = ", ".join(columnas)
+    marcadores = ", ".join("?" for _ in columnas)
+    indices_dinero = [i for i, c in enumerate(columnas) if c in columnas_dinero]
+
+    with _transaccion(engine) as conn:
+        conn.exec_driver_sql(ddl.format(tabla=nueva))
+
+    copiadas = 0
+    while True:
+        with _transaccion(engine) as conn:
+            ultimo = conn.exec_driver_sql(f"SELECT COALESCE(MAX(id), 0) FROM {nueva}").scalar()
+            filas = conn.exec_driver_sql(
+                f"SELECT {lista} FROM {tabla} WHERE id > ? ORDER BY id LIMIT ?",
+                (ultimo, tamano_lote),
+            ).fetchall()
+            if not filas:
+                break
+            convertidas = []
+            for fila in filas:
+                fila = list(fila)
+                for i in indices_dinero:
+                    fila[i] = a_centavos(fila[i])
+                convertidas.append(tuple(fila))
+            conn.exec_driver_sql(
+                f"INSERT INTO {nueva} ({lista}) VALUES ({marcadores})", convertidas
+            )
+            copiadas += len(convertidas)
+
+    with _transaccion(engine) as conn:
+        conn.exec_driver_sql(f"DROP TABLE {tabla}")
+        conn.exec_driver_sql(f"ALTER TABLE {nueva} RENAME TO {tabla}")
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{tabla}_id ON {tabla} (id)")
+
+    return copiadas
+
+
+# =========================
+# MIGRACIONES
+# =========================
+
+def _m001_periodo_y_tasa(engine, tamano_lote: int) -> None:
+    """FASE 1 (antes en migrate.py): periodo_origen y tasa_interes en prestamos."""
+    if not _es_sqlite(engine):
+        return
+    with _transaccion(engine) as conn:
+        columnas = _columnas(conn, "prestamos")
+        if not columnas:
+            return
+        if "periodo_origen" not in columnas:
+            conn.exec_driver_sql("ALTER TABLE prestamos ADD COLUMN periodo_origen TEXT")
+            conn.exec_driver_sql(
+                "UPDATE prestamos SET periodo_origen = strftime('%Y-%m', fecha_creacion) "
+                "WHERE periodo_origen IS NULL AND fecha_creacion IS NOT NULL"
+            )
+        if "tasa_interes" not in columnas:
+            conn.exec_driver_sql("ALTER TABLE prestamos ADD COLUMN tasa_interes REAL")
+
+
+DDL_PRESTAMOS_CENTAVOS = """
+CREATE TABLE IF NOT EXISTS {tabla} (
+    id INTEGER NOT NULL PRIMARY KEY,
+    cliente_id INTEGER NOT NULL REFERENCES clientes (id) ON DELETE CASCADE,
+    monto_prestado INTEGER NOT NULL,
+    total_a_pagar INTEGER NOT NULL,
+    total_cobrado INTEGER NOT NULL,
+    por_cobrar INTEGER NOT NULL,
+    fecha_creacion DATE,
+    fecha_vencimiento DATE NOT NULL,
+    estado_pago VARCHAR NOT NULL,
+    fecha_pago DATE,
+    monto_cobrado_final INTEGER,
+    periodo_origen VARCHAR,
+    tasa_interes FLOAT
+)
+"""
+
+DDL_INVERSORES_CENTAVOS = """
+CREATE TABLE IF NOT EXISTS {tabla} (
+    id INTEGER NOT NULL PRIMARY KEY,
+    nombre VARCHAR NOT NULL,
+    monto_invertido INTEGER NOT NULL,
+    tasa_diaria FLOAT NOT NULL,
+    fecha_inicio DATE NOT NULL,
+    fecha_fin DATE NOT NULL,
+    estado VARCHAR NOT NULL,
+    monto_devuelto INTEGER
+)
+"""
+
+
+def _m002_montos_en_centavos(engine, tamano_lote: int) -> None:
+    """Montos de prestamos e inversores: REAL (pesos) → INTEGER (centavos)."""
+    if not _es_sqlite(engine):
+        return
+    with engine.connect() as conn:
+        tipo_prestamos = _columnas(conn, "prestamos").get("monto_prestado")
+        tipo_inversores = _columnas(conn, "inversores").get("monto_invertido")
+
+    if tipo_prestamos and "INT" not in tipo_prestamos:
+        _reconstruir_con_centavos(
+            engine, "prestamos", DDL_PRESTAMOS_CENTAVOS,
+            [
+                "id", "cliente_id", "monto_prestado", "total_a_pagar", "total_cobrado",
+                "por_cobrar", "fecha_creacion", "fecha_vencimiento", "estado_pago",
+                "fecha_pago", "monto_cobrado_final", "periodo_origen", "tasa_interes",
+            ],
+            {"monto_prestado", "total_a_pagar", "total_cobrado", "por_cobrar", "monto_cobrado_final"},
+            tamano_lote,
+        )
+
+    if tipo_inversores and "INT" not in tipo_inversores:
+        _reconstruir_con_centavos(
+            engine, "inversores", DDL_INVERSORES_CENTAVOS,
+            [
+                "id", "nombre", "monto_invertido", "tasa_diaria",
+                "fecha_inicio", "fecha_fin", "estado", "monto_devuelto",
+            ],
+            {"monto_invertido", "monto_devuelto"},
+            tamano_lote,
+        )
+
+
+TABLAS_SINCRONIZADAS = {
+    "clientes": "cliente",
+    "cliente_archivos": "archivo",
+    "prestamos": "prestamo",
+    "inversores": "inversor",
+}
+
+
+def _m003_row_version(engine, tamano_lote: int) -> None:
+    """
+    row_version en las tablas sincronizadas + registro inicial de cambios.
+    Las filas existentes quedan todas en la versión 1, así un cliente que
+    sincroniza desde 0 las recibe.
+    """
+    with _transaccion(engine) as conn:
+        for tabla in TABLAS_SINCRONIZADAS:
+            columnas = _columnas(conn, tabla)
+            if columnas and "row_version" not in columnas:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {tabla} ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0"
+                )
+            if columnas:
+                conn.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS ix_{tabla}_row_version ON {tabla} (row_version)"
+                )
+
+        ya_registrado = conn.exec_driver_sql("SELECT COUNT(*) FROM cambios").scalar()
+        if ya_registrado:
+            return
+
+        hay_filas = False
+        for tabla, entidad in TABLAS_SINCRONIZADAS.items():
+            conn.exec_driver_sql(f"UPDATE {tabla} SET row_version = 1 WHERE row_version = 0")
+            insertadas = conn.exec_driver_sql(
+                f"INSERT INTO cambios (version, entidad, entidad_id, eliminado) "
+                f"SELECT 1, '{entidad}', id, FALSE FROM {tabla} ORDER BY id"
+            ).rowcount
+            hay_filas = hay_filas or insertadas > 0
+
+        if hay_filas:
+            actualizadas = conn.exec_driver_sql(
+                "UPDATE sync_estado SET version = 1 WHERE id = 1 AND version < 1"
+            ).rowcount
+            if not actualizadas and not conn.exec_driver_sql(
+                "SELECT COUNT(*) FROM sync_estado WHERE id = 1"
+            ).scalar():
+                conn.exec_driver_sql("INSERT INTO sync_estado (id, version) VALUES (1, 1)")
+
+
+def _m004_version_prestamos(engine, tamano_lote: int) -> None:
+    """Columna `version` de prestamos (concurrencia optimista)."""
+    with _transaccion(engine) as conn:
+        columnas = _columnas(conn, "prestamos")
+        if columnas and "version" not in columnas:
+            conn.exec_driver_sql(
+                "ALTER TABLE prestamos ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
+
+
+def _m005_indice_periodo_prestamos(engine, tamano_lote: int) -> None:
+    """Índice por periodo_origen (cohortes de analitica.py)."""
+    with _transaccion(engine) as conn:
+        if _columnas(conn, "prestamos"):
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_prestamos_periodo_origen ON prestamos (periodo_origen)"
+            )
+
+
+def _m006_indices_cliente_id(engine, tamano_lote: int) -> None:
+    """Índices por cliente_id (detalle de cliente: GET /clientes/{id}/completo)."""
+    with _transaccion(engine) as conn:
+        for tabla in ("prestamos", "cliente_archivos"):
+            if _columnas(conn, tabla):
+                conn.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS ix_{tabla}_cliente_id ON {tabla} (cliente_id)"
+                )
+
+
+def _m007_auto_vacuum_incremental(engine, tamano_lote: int) -> None:
+    """
+    auto_vacuum = INCREMENTAL en bases existentes. El modo solo cambia con
+    un VACUUM completo (reescribe el archivo una vez, con bloqueo
+    exclusivo); desde ahí mantenimiento.py libera páginas de a poco.
+    """
+    if not _es_sqlite(engine):
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            return
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+
+
+def _m008_indice_estado_cliente(engine, tamano_lote: int) -> None:
+    """Índice (estado_pago, cliente_id): préstamos abiertos por cliente (recordatorios.py)."""
+    with _transaccion(engine) as conn:
+        if _columnas(conn, "prestamos"):
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_prestamos_estado_cliente ON prestamos (estado_pago, cliente_id)"
+            )
+
+
+# Tasas por plazo de antes de la tabla tarifas (estaban fijas en crud.py).
+# Rigen desde TARIFAS_DESDE para que cubran todos los préstamos existentes.
+TARIFAS_INICIALES = {7: 0.20, 14: 0.40, 30: 1.00}
+TARIFAS_DESDE = date(2000, 1, 1)
+
+
+def sembrar_tarifas(conn) -> None:
+    """Carga TARIFAS_INICIALES si la tabla tarifas está vacía (base nueva o recién migrada)."""
+    if conn.execute(text("SELECT COUNT(*) FROM tarifas")).scalar():
+        return
+    conn.execute(
+        text("INSERT INTO tarifas (plazo, tasa, vigente_desde) VALUES (:plazo, :tasa, :desde)"),
+        [{"plazo": p, "tasa": t, "desde": TARIFAS_DESDE} for p, t in TARIFAS_INICIALES.items()],
+    )
+
+
+def _fecha(valor) -> date | None:
+    # SQLite devuelve las fechas como texto en consultas sin ORM
+    if valor is None or isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def _plazo_y_tarifa(fila, tarifas: list) -> tuple:
+    """
+    (plazo, tarifa_id) de un préstamo existente:
+    - plazo: vencimiento - creación, si es el de alguna tarifa. Si no (préstamo
+      con fecha de inicio distinta de su alta), el de la única tarifa que
+      reproduce su tasa; si tampoco, los días entre fechas tal cual.
+    - tarifa_id: la tarifa de ese plazo vigente al crearse, si su tasa es
+      la del préstamo. Sin tasa guardada (préstamos viejos), si reproduce
+      el total al centavo.
+    """
+    _, creacion, vencimiento, monto, total, tasa, estado = fila
+    creacion, vencimiento = _fecha(creacion), _fecha(vencimiento)
+    candidatas = [
+        t for t in tarifas
+        if creacion is None or (t[2] <= creacion and (t[3] is None or creacion <= t[3]))
+    ]
+
+    def reproduce(t) -> bool:
+        if tasa is not None:
+            return abs(t[1] - tasa) < 1e-9
+        # Renovados: total_a_pagar ya es solo el interés cobrado
+        return estado != "RENOVADO" and abs(round(monto * (1 + t[1])) - total) <= 1
+
+    dias = (vencimiento - creacion).days if creacion and vencimiento else None
+    if dias in {t[0] for t in candidatas}:
+        plazo = dias
+    else:
+        por_tasa = {t[0] for t in candidatas if reproduce(t)}
+        plazo = por_tasa.pop() if len(por_tasa) == 1 else (dias if dias and dias > 0 else None)
+
+    tarifa_id = next((t[4] for t in candidatas if t[0] == plazo and reproduce(t)), None)
+    return plazo, tarifa_id
+
+
+def _m009_plazo_y_tarifa(engine, tamano_lote: int) -> None:
+    """
+    Tabla tarifas (con las tasas que estaban fijas en el código) y columnas
+    plazo / tarifa_id en prestamos y prestamos_archivo, completadas por
+    lotes. Reanudable: solo se recorren las filas con plazo NULL.
+    """
+    with _transaccion(engine) as conn:
+        tablas = [t for t in ("prestamos", "prestamos_archivo") if _columnas(conn, t)]
+        for tabla in tablas:
+            columnas = _columnas(conn, tabla)
+            if "plazo" not in columnas:
+                conn.exec_driver_sql(f"ALTER TABLE {tabla} ADD COLUMN plazo INTEGER")
+            if "tarifa_id" not in columnas:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {tabla} ADD COLUMN tarifa_id INTEGER REFERENCES tarifas (id)"
+                )
+        sembrar_tarifas(conn)
+        # (plazo, tasa, desde, hasta, id)
+        tarifas = [
+            (p, t, _fecha(d), _fecha(h), i) for p, t, d, h, i in conn.execute(text(
+                "SELECT plazo, tasa, vigente_desde, vigente_hasta, id FROM tarifas"
+            ))
+        ]
+
+    for tabla in tablas:
+        ultimo = 0
+        while True:
+            with _transaccion(engine) as conn:
+                filas = conn.execute(text(
+                    f"SELECT id, fecha_creacion, fecha_vencimiento, monto_prestado, total_a_pagar, "
+                    f"tasa_interes, estado_pago FROM {tabla} "
+                    f"WHERE plazo IS NULL AND id > :ultimo ORDER BY id LIMIT :lote"
+                ), {"ultimo": ultimo, "lote": tamano_lote}).fetchall()
+                if not filas:
+                    break
+                completadas = []
+                for fila in filas:
+                    plazo, tarifa_id = _plazo_y_tarifa(fila, tarifas)
+                    if plazo is not None:
+                        completadas.append({"id": fila[0], "plazo": plazo, "tarifa_id": tarifa_id})
+                if completadas:
+                    conn.execute(
+                        text(f"UPDATE {tabla} SET plazo = :plazo, tarifa_id = :tarifa_id WHERE id = :id"),
+                        completadas,
+                    )
+                ultimo = filas[-1][0]
+
+
+def _m010_indice_auditoria_entidad(engine, tamano_lote: int) -> None:
+    """
+    Índice (entidad, entidad_id, id): el historial de una entidad
+    (GET /auditoria) sale ya ordenado por id, sin filtrar ni ordenar aparte.
+    """
+    with _transaccion(engine) as conn:
+        if _columnas(conn, "auditoria"):
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_auditoria_entidad ON auditoria (entidad, entidad_id, id)"
+            )
+
+
+# (número, nombre, función). Agregar siempre al final, nunca renumerar.
+MIGRACIONES = [
+    (1, "periodo_origen_y_tasa_interes", _m001_periodo_y_tasa),
+    (2, "montos_en_centavos", _m002_montos_en_centavos),
+    (3, "row_version_y_cambios", _m003_row_version),
+    (4, "version_prestamos", _m004_version_prestamos),
+    (5, "indice_periodo_prestamos", _m005_indice_periodo_prestamos),
+    (6, "indices_cliente_id", _m006_indices_cliente_id),
+    (7, "auto_vacuum_incremental", _m007_auto_vacuum_incremental),
+    (8, "indice_estado_cliente", _m008_indice_estado_cliente),
+    (9, "plazo_y_tarifa", _m009_plazo_y_tarifa),
+    (10, "indice_auditoria_entidad", _m010_indice_auditoria_entidad),
+]
+
+
+# =========================
+# VERSIÓN APLICADA
+# =========================
+
+def version_actual(engine) -> int:
+    with engine.connect() as conn:
+        if _es_sqlite(engine):
+            return conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+        if not inspect(conn).has_table("esquema_version"):
+            return 0
+        return conn.exec_driver_sql("SELECT MAX(version) FROM esquema_version").scalar() or 0
+
+
+def _registrar(engine, numero: int) -> None:
+    with _transaccion(engine) as conn:
+        if _es_sqlite(engine):
+            conn.exec_driver_sql(f"PRAGMA user_version = {int(numero)}")
+            return
+        conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS esquema_version (version INTEGER NOT NULL)")
+        conn.exec_driver_sql("DELETE FROM esquema_version")
+        conn.exec_driver_sql(f"INSERT INTO esquema_version (version) VALUES ({int(numero)})")
+
+
+def marcar_al_dia(engine) -> None:
+    """Base recién creada por create_all: ya tiene el esquema final."""
+    _registrar(engine, MIGRACIONES[-1][0])
+
+
+@contextmanager
+def bloqueo(engine):
+    """Un solo proceso a la vez crea tablas y migra (varios workers arrancando juntos)."""
+    with coordinacion.bloqueo(engine, "migraciones"):
+        yield
+
+
+def aplicar_pendientes(engine, tamano_lote: int = TAMANO_LOTE) -> list[str]:
+    """Aplica en orden las migraciones no registradas. Devuelve sus nombres."""
+    aplicadas = []
+    version = version_actual(engine)
+    for numero, nombre, migracion in MIGRACIONES:
+        if numero <= version:
+            continue
+        migracion(engine, tamano_lote)
+        _registrar(engine, numero)
+        aplicadas.append(nombre)
+    return aplicadas
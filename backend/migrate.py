@@ -12,6 +12,9 @@ RESTRICCIONES:
 - NO modificar datos financieros
 - NO recalcular montos
 - NO cambiar estados
+
+NOTA: esta migración ahora también se aplica sola al arrancar el backend
+(migraciones.py, migración 1). El script queda para correrla a mano.
 """
 
 import sqlite3
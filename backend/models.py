@@ -4,11 +4,15 @@ from sqlalchemy import (
     String,
     Float,
     Date,
+    DateTime,
     Text,
-    ForeignKey
+    Boolean,
+    ForeignKey,
+    Index
 )
 from sqlalchemy.orm import relationship
 from backend.database import Base
+from backend.dinero import Dinero
 from datetime import date
 
 
@@ -20,6 +24,16 @@ Regla mental:
 - models.py = estructura de datos (qué se guarda)
 - NO lógica de negocio
 - NO validaciones de frontend
+
+Montos de dinero: columnas `Dinero` (centavos enteros en la base,
+pesos en Python). Ver dinero.py.
+
+row_version: versión global de sincronización de la última escritura
+sobre la fila. La asigna sincronizacion.py en cada flush; no setear a mano.
+
+Prestamo.version: control de concurrencia optimista (version_id_col).
+Cada UPDATE se emite como `... WHERE id = ? AND version = ?`; si otra
+caja modificó el préstamo en el medio, SQLAlchemy lanza StaleDataError.
 """
 
 # =========================
@@ -52,6 +66,9 @@ class Cliente(Base):
     # Notas internas
     observaciones = Column(Text, nullable=True)
 
+    # Sincronización (delta sync)
+    row_version = Column(Integer, nullable=False, default=0, index=True)
+
     # =========================
     # Relaciones
     # =========================
@@ -95,7 +112,8 @@ class ClienteArchivo(Base):
     cliente_id = Column(
         Integer,
         ForeignKey("clientes.id", ondelete="CASCADE"),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     # Tipo lógico del archivo (controlado desde frontend)
@@ -105,6 +123,9 @@ class ClienteArchivo(Base):
     # Ruta física o URL del archivo
     url = Column(String, nullable=False)
 
+    # Sincronización (delta sync)
+    row_version = Column(Integer, nullable=False, default=0, index=True)
+
     # Relación inversa
     cliente = relationship("Cliente", back_populates="archivos")
 
@@ -120,6 +141,8 @@ class Prestamo(Base):
     """
 
     __tablename__ = "prestamos"
+    # Abiertos por cliente: recordatorios de pago (recordatorios.py)
+    __table_args__ = (Index("ix_prestamos_estado_cliente", "estado_pago", "cliente_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -127,16 +150,17 @@ class Prestamo(Base):
     cliente_id = Column(
         Integer,
         ForeignKey("clientes.id", ondelete="CASCADE"),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     # Datos económicos
-    monto_prestado = Column(Float, nullable=False)
-    total_a_pagar = Column(Float, nullable=False)
+    monto_prestado = Column(Dinero, nullable=False)
+    total_a_pagar = Column(Dinero, nullable=False)
 
     # Métricas de cobro
-    total_cobrado = Column(Float, nullable=False, default=0.0)
-    por_cobrar = Column(Float, nullable=False, default=0.0)
+    total_cobrado = Column(Dinero, nullable=False, default=0.0)
+    por_cobrar = Column(Dinero, nullable=False, default=0.0)
 
     # Estado del préstamo
     fecha_creacion = Column(Date, nullable=True, default=date.today)
@@ -146,15 +170,123 @@ class Prestamo(Base):
 
     # Datos al momento del cobro
     fecha_pago = Column(Date, nullable=True)
-    monto_cobrado_final = Column(Float, nullable=True)
+    monto_cobrado_final = Column(Dinero, nullable=True)
 
     # Nuevos campos: período y tasa variable
-    periodo_origen = Column(String, nullable=True)  # Formato YYYY-MM
+    periodo_origen = Column(String, nullable=True, index=True)  # Formato YYYY-MM
     tasa_interes = Column(Float, nullable=True)  # Tasa decimal (ej: 0.20 para 20%)
 
+    # Plazo pactado (días) y tarifa aplicada; tarifa_id = NULL si la tasa
+    # se pactó a mano (no coincide con la tarifa del plazo)
+    plazo = Column(Integer, nullable=True)
+    tarifa_id = Column(Integer, ForeignKey("tarifas.id"), nullable=True)
+
+    # Sincronización (delta sync)
+    row_version = Column(Integer, nullable=False, default=0, index=True)
+
+    # Concurrencia optimista: lo incrementa SQLAlchemy en cada UPDATE
+    version = Column(Integer, nullable=False, default=1)
+
     # Relación inversa
     cliente = relationship("Cliente", back_populates="prestamos")
 
+    __mapper_args__ = {"version_id_col": version}
+
+
+# =========================
+# ARCHIVO DE PRÉSTAMOS CERRADOS
+# =========================
+class PrestamoArchivado(Base):
+    """
+    Tabla: prestamos_archivo
+
+    Préstamos PAGADOS / RENOVADOS viejos, movidos fuera de `prestamos`
+    por archivo.py. Mismas columnas (y mismo id) que tenían en la tabla
+    caliente; ya no cambian.
+    """
+
+    __tablename__ = "prestamos_archivo"
+
+    id = Column(Integer, primary_key=True)
+
+    cliente_id = Column(
+        Integer,
+        ForeignKey("clientes.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    monto_prestado = Column(Dinero, nullable=False)
+    total_a_pagar = Column(Dinero, nullable=False)
+    total_cobrado = Column(Dinero, nullable=False, default=0.0)
+    por_cobrar = Column(Dinero, nullable=False, default=0.0)
+
+    fecha_creacion = Column(Date, nullable=True)
+    fecha_vencimiento = Column(Date, nullable=False)
+    estado_pago = Column(String, nullable=False)
+
+    fecha_pago = Column(Date, nullable=True)
+    monto_cobrado_final = Column(Dinero, nullable=True)
+
+    periodo_origen = Column(String, nullable=True, index=True)
+    tasa_interes = Column(Float, nullable=True)
+
+    plazo = Column(Integer, nullable=True)
+    tarifa_id = Column(Integer, ForeignKey("tarifas.id"), nullable=True)
+
+    row_version = Column(Integer, nullable=False, default=0)
+    version = Column(Integer, nullable=False, default=1)
+
+    # Cuándo se archivó
+    archivado_en = Column(Date, nullable=False, default=date.today)
+
+
+class ResumenPeriodoArchivo(Base):
+    """
+    Tabla: resumen_periodos_archivo
+
+    Totales por período de origen de los préstamos archivados. Se
+    actualiza en la misma transacción que mueve cada lote, así los
+    totales históricos no necesitan recorrer el archivo.
+    periodo_origen = '' para préstamos viejos sin período.
+    """
+
+    __tablename__ = "resumen_periodos_archivo"
+
+    periodo_origen = Column(String, primary_key=True)
+
+    cantidad = Column(Integer, nullable=False, default=0)
+    cantidad_renovados = Column(Integer, nullable=False, default=0)
+
+    monto_prestado = Column(Dinero, nullable=False, default=0.0)
+    total_a_pagar = Column(Dinero, nullable=False, default=0.0)
+    total_cobrado = Column(Dinero, nullable=False, default=0.0)
+    monto_cobrado_final = Column(Dinero, nullable=False, default=0.0)
+
+
+# =========================
+# TARIFAS
+# =========================
+class Tarifa(Base):
+    """
+    Tabla: tarifas
+
+    Tasa de interés de cada plazo y desde/hasta cuándo rige. Para cambiar
+    la tasa de un plazo se cierra la tarifa vigente (vigente_hasta) y se
+    agrega otra: los préstamos viejos siguen apuntando a la suya.
+    En memoria la sirve tarifas.py.
+    """
+
+    __tablename__ = "tarifas"
+
+    id = Column(Integer, primary_key=True)
+
+    plazo = Column(Integer, nullable=False, index=True)  # días
+    tasa = Column(Float, nullable=False)  # Tasa decimal (ej: 0.20 para 20%)
+
+    vigente_desde = Column(Date, nullable=False)
+    vigente_hasta = Column(Date, nullable=True)  # inclusive; NULL = sigue vigente
+
 
 # =========================
 # INVERSORES
@@ -171,7 +303,7 @@ class Inversor(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     nombre = Column(String, nullable=False)
-    monto_invertido = Column(Float, nullable=False)
+    monto_invertido = Column(Dinero, nullable=False)
 
     tasa_diaria = Column(Float, nullable=False)
 
@@ -181,4 +313,136 @@ class Inversor(Base):
     estado = Column(String, nullable=False)
     # ej: ACTIVO / LIQUIDADO
 
-    monto_devuelto = Column(Float, nullable=True)
+    monto_devuelto = Column(Dinero, nullable=True)
+
+    # Sincronización (delta sync)
+    row_version = Column(Integer, nullable=False, default=0, index=True)
+
+
+# =========================
+# SINCRONIZACIÓN
+# =========================
+class SyncEstado(Base):
+    """
+    Tabla: sync_estado
+
+    Una sola fila (id=1) con el contador global de versiones.
+    Se incrementa una vez por transacción de escritura.
+    """
+
+    __tablename__ = "sync_estado"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class Cambio(Base):
+    """
+    Tabla: cambios
+
+    Registro de cambios para GET /cambios?desde=<version>.
+    Una fila por entidad escrita en cada versión; las bajas quedan
+    como tombstones (eliminado = True).
+    """
+
+    __tablename__ = "cambios"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+
+    entidad = Column(String, nullable=False)
+    # ej: cliente, archivo, prestamo, inversor
+    entidad_id = Column(Integer, nullable=False)
+
+    eliminado = Column(Boolean, nullable=False, default=False)
+
+
+# =========================
+# REPORTES
+# =========================
+class Reporte(Base):
+    """
+    Tabla: reportes
+
+    Cola de reportes pesados (reportes.py). Cada fila es un trabajo: se
+    crea `pendiente`, pasa a `corriendo` y termina `terminado` (con el
+    CSV en disco) o `error`. Los pendientes sobreviven un reinicio.
+    """
+
+    __tablename__ = "reportes"
+
+    id = Column(String, primary_key=True)
+
+    tipo = Column(String, nullable=False)
+    # ej: cartera_mensual, liquidacion_inversores
+    parametros = Column(Text, nullable=False, default="{}")  # JSON
+
+    estado = Column(String, nullable=False, default="pendiente", index=True)
+    # pendiente | corriendo | terminado | error
+
+    creado = Column(DateTime, nullable=False)
+    terminado = Column(DateTime, nullable=True)
+
+    filas = Column(Integer, nullable=True)
+    bytes = Column(Integer, nullable=True)
+    duracion_ms = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+
+
+# =========================
+# SIMULACIONES
+# =========================
+class Simulacion(Base):
+    """
+    Tabla: simulaciones
+
+    Trabajos de POST /simulacion (simulacion.py). Como los reportes, viven
+    en la base y no en la memoria del proceso: con varios workers el GET
+    puede caer en cualquiera. El progreso lo actualiza el worker que corre.
+    """
+
+    __tablename__ = "simulaciones"
+
+    id = Column(String, primary_key=True)
+
+    parametros = Column(Text, nullable=False, default="{}")  # JSON
+
+    estado = Column(String, nullable=False, default="pendiente", index=True)
+    # pendiente | corriendo | terminado | error
+    progreso = Column(Float, nullable=False, default=0.0)  # 0 a 1
+
+    creado = Column(DateTime, nullable=False)
+    resultado = Column(Text, nullable=True)  # JSON, al terminar
+    duracion_ms = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+
+
+# =========================
+# AUDITORÍA
+# =========================
+
+class Auditoria(Base):
+    """
+    Tabla: auditoria
+
+    Registro append-only de cada alta, cambio y baja de clientes, archivos,
+    préstamos, inversores y tarifas (auditoria.py). Nunca se actualiza ni
+    se borra.
+    """
+
+    __tablename__ = "auditoria"
+    __table_args__ = (Index("ix_auditoria_entidad", "entidad", "entidad_id", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    fecha = Column(DateTime, nullable=False)
+
+    entidad = Column(String, nullable=False)
+    # ej: cliente, archivo, prestamo, inversor
+    entidad_id = Column(Integer, nullable=False, index=True)
+
+    accion = Column(String, nullable=False)
+    # creado | actualizado | eliminado | archivado (pasó a prestamos_archivo)
+    cambios = Column(Text, nullable=False)  # JSON {campo: [antes, después]}
+
+    usuario = Column(String, nullable=True)  # cabecera X-Usuario
+    origen = Column(String, nullable=True)  # ej: PUT /prestamos/7/bloquear
@@ -0,0 +1,259 @@
+import argparse
+import codecs
+import csv
+import io
+import os
+import sys
+from datetime import date, timedelta
+from itertools import groupby
+
+import orjson
+from sqlalchemy import select, tuple_
+
+from backend import crud, lecturas, models
+from backend.database import BASE_DIR, SessionLocal
+from backend.dinero import sumar
+
+"""
+recordatorios.py: avisos de cobro de cada mañana (vencen pronto o vencidos).
+
+Un pipeline de generadores, de punta a punta sin listas intermedias:
+
+  _lotes → prestamos_a_recordar → por_cliente → recordatorio → a_csv / a_jsonl
+
+- _lotes: préstamos PENDIENTE que vencen hasta `hoy + dias` (los vencidos
+  incluidos), unidos a su cliente, de a TAMANO_LOTE en orden
+  (cliente_id, id). Paginación por clave sobre el índice
+  (estado_pago, cliente_id) y una sesión corta por lote, como reportes.py:
+  ninguna lectura larga frena a los que escriben.
+- prestamos_a_recordar: le aplica crud.aplicar_finanzas a cada préstamo
+  (días de atraso, punitorios, total actualizado).
+- por_cliente: agrupa los préstamos consecutivos del mismo cliente (ya
+  vienen ordenados): en memoria hay un lote y un cliente a la vez.
+- recordatorio: arma el mensaje con lo que debe, punitorios incluidos.
+- a_csv / a_jsonl: lo serializan por bloques.
+
+La misma salida va a un archivo (escribir_outbox, para la tarea de cada
+mañana) o al cliente HTTP (GET /recordatorios) mientras se genera.
+
+    python -m backend.recordatorios --dias 3 --formato jsonl
+"""
+
+TAMANO_LOTE = 2000
+DIAS = 3
+DIAS_MAX = 60
+
+# Bloques de salida de ~64 KB: ni una escritura por fila ni todo junto
+BLOQUE_BYTES = 64 * 1024
+
+OUTBOX_DIR = os.path.join(BASE_DIR, "recordatorios")
+
+_PRESTAMOS = models.Prestamo.__table__
+_CLIENTES = models.Cliente.__table__
+
+# Columnas del cliente que acompañan a cada préstamo, en el orden del SELECT
+_COLUMNAS_CLIENTE = ("id", "nombre_completo", "telefono", "telefono_respaldo_1", "telefono_respaldo_2")
+
+COLUMNAS = [
+    "cliente_id", "cliente", "telefono", "telefono_respaldo_1", "telefono_respaldo_2",
+    "prestamos", "vencidos", "dias_atraso_max", "punitorios", "total", "mensaje",
+]
+
+
+# =========================
+# PIPELINE
+# =========================
+
+def _lotes(session_factory, hasta: date):
+    """Lotes de filas (columnas de PrestamoFila + _COLUMNAS_CLIENTE), en orden (cliente_id, id)."""
+    columnas = lecturas.PrestamoFila.columnas_de(_PRESTAMOS) + [_CLIENTES.c[n] for n in _COLUMNAS_CLIENTE]
+    consulta = (
+        select(*columnas)
+        .join(_CLIENTES, _CLIENTES.c.id == _PRESTAMOS.c.cliente_id)
+        .where(_PRESTAMOS.c.estado_pago == "PENDIENTE", _PRESTAMOS.c.fecha_vencimiento <= hasta)
+        .order_by(_PRESTAMOS.c.cliente_id, _PRESTAMOS.c.id)
+        .limit(TAMANO_LOTE)
+    )
+    ultimo = None
+    while True:
+        db = session_factory()
+        try:
+            pagina = consulta
+            if ultimo is not None:
+                pagina = consulta.where(tuple_(_PRESTAMOS.c.cliente_id, _PRESTAMOS.c.id) > ultimo)
+            filas = db.execute(pagina).all()
+        finally:
+            db.close()
+        if filas:
+            yield filas
+        if len(filas) < TAMANO_LOTE:
+            return
+        ultimo = (filas[-1].cliente_id, filas[-1].id)
+
+
+def prestamos_a_recordar(session_factory, dias: int = DIAS, hoy: date | None = None):
+    """(cliente, préstamo con finanzas) de lo que vence hasta hoy + `dias`."""
+    hoy = hoy or date.today()
+    n = len(lecturas.PrestamoFila.COLUMNAS)
+    for filas in _lotes(session_factory, hoy + timedelta(days=dias)):
+        prestamos = lecturas.PrestamoFila.desde_filas(f[:n] for f in filas)
+        for fila, prestamo in zip(filas, prestamos):
+            crud.aplicar_finanzas(prestamo)
+            yield fila[n:], prestamo
+
+
+def por_cliente(pares):
+    """(cliente, [préstamos]) por cada cliente, a partir de pares ordenados por cliente."""
+    for _, grupo in groupby(pares, key=lambda par: par[0][0]):
+        grupo = list(grupo)
+        yield grupo[0][0], [prestamo for _, prestamo in grupo]
+
+
+def _pesos(valor: float) -> str:
+    """12345.5 → $ 12.345,50"""
+    return "$ " + f"{valor:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _linea(prestamo, hoy: date) -> str:
+    vence = prestamo.fecha_vencimiento
+    if prestamo.dias_atraso:
+        cuando = f"vencido hace {prestamo.dias_atraso} día{'s' if prestamo.dias_atraso != 1 else ''}"
+        punitorios = f" (incluye {_pesos(prestamo.punitorio_total)} de punitorios)"
+    else:
+        cuando = "vence hoy" if vence == hoy else f"vence el {vence:%d/%m}"
+        punitorios = ""
+    return f"- Préstamo #{prestamo.id}, {cuando}: {_pesos(prestamo.total_actualizado)}{punitorios}"
+
+
+def recordatorio(cliente: tuple, prestamos: list, hoy: date) -> dict:
+    """Fila del outbox de un cliente, con el texto del mensaje."""
+    cliente_id, nombre, telefono, respaldo_1, respaldo_2 = cliente
+    total = sumar(*(p.total_actualizado for p in prestamos))
+    punitorios = sumar(*(p.punitorio_total for p in prestamos))
+    lineas = [f"Hola {nombre}, te recordamos los pagos pendientes:"]
+    lineas += [_linea(p, hoy) for p in prestamos]
+    lineas.append(f"Total a pagar hoy: {_pesos(total)}")
+    return {
+        "cliente_id": cliente_id,
+        "cliente": nombre,
+        "telefono": telefono,
+        "telefono_respaldo_1": respaldo_1,
+        "telefono_respaldo_2": respaldo_2,
+        "prestamos": [p.id for p in prestamos],
+        "vencidos": sum(1 for p in prestamos if p.es_moroso),
+        "dias_atraso_max": max(p.dias_atraso for p in prestamos),
+        "punitorios": punitorios,
+        "total": total,
+        "mensaje": "\n".join(lineas),
+    }
+
+
+def generar(session_factory=SessionLocal, dias: int = DIAS, hoy: date | None = None):
+    """Un recordatorio (dict) por cliente con algo que vence hasta hoy + `dias`."""
+    hoy = hoy or date.today()
+    for cliente, prestamos in por_cliente(prestamos_a_recordar(session_factory, dias, hoy)):
+        yield recordatorio(cliente, prestamos, hoy)
+
+
+# =========================
+# SALIDA
+# =========================
+
+def _en_bloques(partes):
+    """Junta partes chicas (bytes) en bloques de ~BLOQUE_BYTES."""
+    bloque, tamano = [], 0
+    for parte in partes:
+        bloque.append(parte)
+        tamano += len(parte)
+        if tamano >= BLOQUE_BYTES:
+            yield b"".join(bloque)
+            bloque, tamano = [], 0
+    if bloque:
+        yield b"".join(bloque)
+
+
+def a_csv(recordatorios):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    def _fila(valores) -> bytes:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerow(valores)
+        return buffer.getvalue().encode("utf-8")
+
+    def _filas():
+        # Con BOM (como utf-8-sig en reportes.py): Excel reconoce los acentos
+        yield codecs.BOM_UTF8 + _fila(COLUMNAS)
+        for r in recordatorios:
+            yield _fila([
+                " ".join(map(str, r[c])) if c == "prestamos" else r[c] for c in COLUMNAS
+            ])
+
+    return _en_bloques(_filas())
+
+
+def a_jsonl(recordatorios):
+    return _en_bloques(orjson.dumps(r) + b"\n" for r in recordatorios)
+
+
+# formato → (serializador, media type, extensión)
+FORMATOS = {
+    "csv": (a_csv, "text/csv; charset=utf-8", "csv"),
+    "jsonl": (a_jsonl, "application/x-ndjson", "jsonl"),
+}
+
+
+def exportar(session_factory=SessionLocal, dias: int = DIAS, formato: str = "csv", hoy: date | None = None):
+    """Bloques de bytes del outbox en `formato`, a medida que se generan."""
+    serializar = FORMATOS[formato][0]
+    return serializar(generar(session_factory, dias, hoy))
+
+
+def nombre_archivo(formato: str, hoy: date | None = None) -> str:
+    return f"recordatorios_{(hoy or date.today()).isoformat()}.{FORMATOS[formato][2]}"
+
+
+def escribir_outbox(session_factory=SessionLocal, dias: int = DIAS, formato: str = "csv",
+                    destino: str | None = None) -> str:
+    """
+    Escribe el outbox del día en OUTBOX_DIR (o `destino`) y devuelve la ruta.
+    Se escribe a un `.parcial` que se renombra al final, como los reportes:
+    quien lo levante nunca ve un archivo a medias.
+    """
+    hoy = date.today()
+    destino = destino or os.path.join(OUTBOX_DIR, nombre_archivo(formato, hoy))
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    parcial = f"{destino}.{os.getpid()}.parcial"
+    try:
+        with open(parcial, "wb") as f:
+            for bloque in exportar(session_factory, dias, formato, hoy):
+                f.write(bloque)
+        os.replace(parcial, destino)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+    return destino
+
+
+# =========================
+# CLI (tarea de cada mañana)
+# =========================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Outbox de recordatorios de pago")
+    parser.add_argument("--dias", type=int, default=DIAS, help="Incluir lo que vence en los próximos N días")
+    parser.add_argument("--formato", choices=sorted(FORMATOS), default="csv")
+    parser.add_argument("--destino", default=None, help=f"Archivo de salida (por defecto en {OUTBOX_DIR})")
+    args = parser.parse_args(argv)
+
+    from backend.database import inicializar_esquema
+
+    inicializar_esquema()
+    print(escribir_outbox(dias=args.dias, formato=args.formato, destino=args.destino))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
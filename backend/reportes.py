@@ -0,0 +1,419 @@
+import csv
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from backend import crud, lecturas, models
+from backend.database import BASE_DIR
+from backend.dinero import a_centavos, a_pesos, restar
+
+"""
+reportes.py: reportes pesados en segundo plano (POST /reportes).
+
+Un reporte es una fila de la tabla `reportes` (models.Reporte) y un CSV
+en REPORTES_DIR. POST /reportes crea la fila `pendiente` y la manda al
+pool de hilos; GET /reportes/{id} informa el estado y, al terminar,
+GET /reportes/{id}/descarga sirve el archivo.
+
+Tipos:
+- cartera_mensual: todos los préstamos de un periodo_origen (también los
+  archivados) con los campos de crud.aplicar_finanzas, y al final un
+  resumen por estado_prestamo.
+- liquidacion_inversores: lo de crud.listar_inversores (días, ganancia,
+  total a devolver) más lo devuelto y lo pendiente, con una fila TOTAL.
+
+Para no frenar los requests interactivos:
+- La lectura va por lotes de TAMANO_LOTE (paginación por id), cada lote
+  en su propia sesión: ninguna transacción de lectura larga bloquea a los
+  que escriben (la base no está en WAL).
+- Después de cada lote el hilo duerme PAUSA_RELATIVA veces lo que tardó
+  (leerlo y escribirlo): suelta el GIL y la CPU, así un request que llega
+  mientras tanto compite con el reporte solo una parte del tiempo.
+- El CSV se escribe fila por fila a un archivo `.parcial` que se renombra
+  al terminar: la memoria no crece con el reporte y nunca se descarga un
+  archivo a medias.
+
+Los pendientes sobreviven a un reinicio: reanudar() (al arrancar) vuelve
+a encolarlos, y los que quedaron `corriendo` arrancan de nuevo. Los
+terminados se borran después de RETENCION_DIAS.
+
+La simulación (simulacion.py) sigue con su propio pool de procesos: es
+cálculo NumPy puro, no lectura de la base.
+"""
+
+HILOS = int(os.getenv("PRESTAMOS_REPORTES_HILOS", "1"))
+RETENCION_DIAS = int(os.getenv("PRESTAMOS_REPORTES_DIAS", "7"))
+
+TAMANO_LOTE = 250
+# 1.0 = el reporte usa como mucho la mitad de un núcleo
+PAUSA_RELATIVA = float(os.getenv("PRESTAMOS_REPORTES_PAUSA", "1.0"))
+
+REPORTES_DIR = os.path.join(BASE_DIR, "reportes")
+
+_PRESTAMOS = models.Prestamo.__table__
+_PRESTAMOS_ARCHIVO = models.PrestamoArchivado.__table__
+_CLIENTES = models.Cliente.__table__
+
+
+class _Interrumpido(Exception):
+    """El servidor se está cerrando: el reporte vuelve a `pendiente`."""
+
+
+_pool: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+_detener = threading.Event()
+# reporte_id -> filas escritas hasta ahora (solo los que están corriendo)
+_en_curso: dict[str, int] = {}
+
+
+def _verificar_detencion() -> None:
+    if _detener.is_set():
+        raise _Interrumpido()
+
+
+# =========================
+# CARTERA MENSUAL
+# =========================
+
+COLUMNAS_CARTERA = [
+    "prestamo_id", "archivado", "cliente_id", "cliente", "dni",
+    "fecha_creacion", "fecha_vencimiento", "fecha_pago",
+    "monto_prestado", "total_a_pagar", "total_cobrado",
+    "estado_pago", "estado_prestamo", "dias_atraso",
+    "punitorio_total", "total_actualizado", "saldo",
+]
+
+COLUMNAS_RESUMEN = ["resumen", "cantidad", "monto_prestado", "total_cobrado", "punitorios", "saldo"]
+
+
+def _lotes_prestamos(session_factory, tabla, periodo: str):
+    """
+    Préstamos de `periodo` en lotes de TAMANO_LOTE (por id), cada lote con
+    sus clientes {id: (nombre, dni)}. Una sesión corta por lote.
+    """
+    ultimo = 0
+    while True:
+        _verificar_detencion()
+        inicio = time.perf_counter()
+        db = session_factory()
+        try:
+            prestamos = lecturas.PrestamoFila.desde_filas(db.execute(
+                select(*lecturas.PrestamoFila.columnas_de(tabla))
+                .where(tabla.c.periodo_origen == periodo, tabla.c.id > ultimo)
+                .order_by(tabla.c.id)
+                .limit(TAMANO_LOTE)
+            ))
+            clientes = {}
+            if prestamos:
+                clientes = {
+                    fila.id: (fila.nombre_completo, fila.dni)
+                    for fila in db.execute(
+                        select(_CLIENTES.c.id, _CLIENTES.c.nombre_completo, _CLIENTES.c.dni)
+                        .where(_CLIENTES.c.id.in_({p.cliente_id for p in prestamos}))
+                    )
+                }
+        finally:
+            db.close()
+        if not prestamos:
+            return
+        yield prestamos, clientes
+        if len(prestamos) < TAMANO_LOTE:
+            return
+        ultimo = prestamos[-1].id
+        # Incluye lo que tardó el consumidor en escribir el lote
+        time.sleep((time.perf_counter() - inicio) * PAUSA_RELATIVA)
+
+
+def _cartera_mensual(session_factory, parametros: dict):
+    periodo = parametros["periodo"]
+    yield COLUMNAS_CARTERA
+
+    # estado_prestamo -> [cantidad, prestado, cobrado, punitorios, saldo] (centavos)
+    totales: dict[str, list[int]] = {}
+    # Primero el archivo: son los préstamos más viejos (ids más bajos)
+    for tabla, archivado in ((_PRESTAMOS_ARCHIVO, "SI"), (_PRESTAMOS, "NO")):
+        for prestamos, clientes in _lotes_prestamos(session_factory, tabla, periodo):
+            for p in prestamos:
+                crud.aplicar_finanzas(p)
+                abierto = p.estado_pago not in ("SI", "RENOVADO")
+                saldo = restar(p.total_actualizado, p.total_cobrado) if abierto else 0.0
+                nombre, dni = clientes.get(p.cliente_id, ("", ""))
+                yield [
+                    p.id, archivado, p.cliente_id, nombre, dni,
+                    p.fecha_creacion, p.fecha_vencimiento, p.fecha_pago or "",
+                    p.monto_prestado, p.total_a_pagar, p.total_cobrado,
+                    p.estado_pago, p.estado_prestamo, p.dias_atraso,
+                    p.punitorio_total, p.total_actualizado, saldo,
+                ]
+                t = totales.setdefault(p.estado_prestamo, [0, 0, 0, 0, 0])
+                t[0] += 1
+                t[1] += a_centavos(p.monto_prestado)
+                t[2] += a_centavos(p.total_cobrado or 0)
+                t[3] += a_centavos(p.punitorio_total)
+                t[4] += a_centavos(saldo)
+
+    yield []
+    yield COLUMNAS_RESUMEN
+    general = [0, 0, 0, 0, 0]
+    for estado in sorted(totales):
+        t = totales[estado]
+        general = [a + b for a, b in zip(general, t)]
+        yield [estado, t[0], *(a_pesos(v) for v in t[1:])]
+    yield ["TOTAL", general[0], *(a_pesos(v) for v in general[1:])]
+
+
+# =========================
+# LIQUIDACIÓN DE INVERSORES
+# =========================
+
+COLUMNAS_INVERSORES = [
+    "inversor_id", "nombre", "estado", "fecha_inicio", "fecha_fin",
+    "monto_invertido", "tasa_diaria", "dias_trabajados", "ganancia",
+    "total_a_devolver", "monto_devuelto", "pendiente",
+]
+
+
+def _liquidacion_inversores(session_factory, parametros: dict):
+    db = session_factory()
+    try:
+        inversores = crud.listar_inversores(db)
+    finally:
+        db.close()
+    estado = parametros.get("estado")
+
+    yield COLUMNAS_INVERSORES
+    # [invertido, ganancia, a devolver, devuelto, pendiente] (centavos)
+    totales = [0, 0, 0, 0, 0]
+    for inv in sorted(inversores, key=lambda i: i.id):
+        _verificar_detencion()
+        if estado and inv.estado != estado:
+            continue
+        devuelto = inv.monto_devuelto or 0.0
+        pendiente = 0.0 if inv.estado == "LIQUIDADO" else max(0.0, restar(inv.total_a_devolver, devuelto))
+        yield [
+            inv.id, inv.nombre, inv.estado, inv.fecha_inicio, inv.fecha_fin,
+            inv.monto_invertido, inv.tasa_diaria, inv.dias_trabajados, inv.ganancia,
+            inv.total_a_devolver, devuelto, pendiente,
+        ]
+        for i, valor in enumerate((inv.monto_invertido, inv.ganancia, inv.total_a_devolver, devuelto, pendiente)):
+            totales[i] += a_centavos(valor)
+
+    yield ["", "TOTAL", "", "", "", a_pesos(totales[0]), "", "", *(a_pesos(v) for v in totales[1:])]
+
+
+# tipo -> generador de filas (la primera es el encabezado)
+REPORTES = {
+    "cartera_mensual": _cartera_mensual,
+    "liquidacion_inversores": _liquidacion_inversores,
+}
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+
+def ruta_archivo(reporte_id: str) -> str:
+    return os.path.join(REPORTES_DIR, f"{reporte_id}.csv")
+
+
+def _actualizar(session_factory, reporte_id: str, **valores) -> None:
+    db = session_factory()
+    try:
+        db.execute(update(models.Reporte).where(models.Reporte.id == reporte_id).values(**valores))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _ejecutar(reporte_id: str, session_factory) -> None:
+    db = session_factory()
+    try:
+        # Tomarlo es un UPDATE condicional: con varios workers (o un reanudar()
+        # que lo volvió a encolar) solo uno lo pasa de pendiente a corriendo
+        tomado = db.execute(
+            update(models.Reporte)
+            .where(models.Reporte.id == reporte_id, models.Reporte.estado == "pendiente")
+            .values(estado="corriendo")
+        ).rowcount
+        db.commit()
+        if not tomado:
+            return
+        reporte = db.get(models.Reporte, reporte_id)
+        tipo, parametros = reporte.tipo, json.loads(reporte.parametros)
+    finally:
+        db.close()
+
+    inicio = time.perf_counter()
+    destino = ruta_archivo(reporte_id)
+    # Por proceso: si un líder nuevo lo re-encoló (coordinacion.py), dos
+    # workers podrían escribirlo a la vez; el último os.replace gana
+    parcial = f"{destino}.{os.getpid()}.parcial"
+    _en_curso[reporte_id] = 0
+    try:
+        os.makedirs(REPORTES_DIR, exist_ok=True)
+        escritas = 0
+        # utf-8-sig: Excel reconoce la codificación (nombres con acentos)
+        with open(parcial, "w", newline="", encoding="utf-8-sig") as f:
+            escritor = csv.writer(f)
+            for fila in REPORTES[tipo](session_factory, parametros):
+                escritor.writerow(fila)
+                escritas += 1
+                _en_curso[reporte_id] = escritas - 1
+        os.replace(parcial, destino)
+        cambios = {
+            "estado": "terminado",
+            "filas": escritas - 1,  # sin el encabezado
+            "bytes": os.path.getsize(destino),
+        }
+    except _Interrumpido:
+        cambios = {"estado": "pendiente"}
+    except Exception as e:
+        cambios = {"estado": "error", "error": f"{type(e).__name__}: {e}"}
+    finally:
+        _en_curso.pop(reporte_id, None)
+        if os.path.exists(parcial):
+            os.remove(parcial)
+
+    if cambios["estado"] != "pendiente":
+        cambios["terminado"] = datetime.now()
+        cambios["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    _actualizar(session_factory, reporte_id, **cambios)
+
+
+def _obtener_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _detener.clear()
+            _pool = ThreadPoolExecutor(max_workers=HILOS, thread_name_prefix="reporte")
+        return _pool
+
+
+def _enviar(reporte_id: str, session_factory) -> None:
+    _obtener_pool().submit(_ejecutar, reporte_id, session_factory)
+
+
+def encolar(db: Session, tipo: str, parametros: dict, session_factory=None) -> dict:
+    """Registra el reporte como `pendiente` y lo manda al pool. No bloquea."""
+    if session_factory is None:
+        from backend.database import SessionLocal
+        session_factory = SessionLocal
+    reporte = models.Reporte(
+        id=uuid.uuid4().hex,
+        tipo=tipo,
+        parametros=json.dumps(parametros, default=str),
+        estado="pendiente",
+        creado=datetime.now(),
+    )
+    db.add(reporte)
+    db.commit()
+    db.refresh(reporte)
+    datos = _datos(reporte)
+    _enviar(reporte.id, session_factory)
+    return datos
+
+
+def _datos(reporte: models.Reporte) -> dict:
+    filas = _en_curso.get(reporte.id, reporte.filas)
+    return {
+        "id": reporte.id,
+        "tipo": reporte.tipo,
+        "parametros": json.loads(reporte.parametros),
+        "estado": reporte.estado,
+        "creado": reporte.creado,
+        "terminado": reporte.terminado,
+        "filas": filas,
+        "bytes": reporte.bytes,
+        "duracion_ms": reporte.duracion_ms,
+        "error": reporte.error,
+        "descarga": f"/reportes/{reporte.id}/descarga" if reporte.estado == "terminado" else None,
+    }
+
+
+def obtener(db: Session, reporte_id: str) -> dict | None:
+    reporte = db.get(models.Reporte, reporte_id)
+    return _datos(reporte) if reporte is not None else None
+
+
+def listar(db: Session, limite: int = 50) -> list[dict]:
+    """Los últimos `limite` reportes (más nuevos primero)."""
+    reportes = db.execute(
+        select(models.Reporte).order_by(models.Reporte.creado.desc()).limit(limite)
+    ).scalars()
+    return [_datos(r) for r in reportes]
+
+
+def nombre_descarga(datos: dict) -> str:
+    parametros = datos["parametros"]
+    sufijo = parametros.get("periodo") or datos["creado"].strftime("%Y-%m-%d")
+    return f"{datos['tipo']}_{sufijo}.csv"
+
+
+# =========================
+# ARRANQUE Y CIERRE
+# =========================
+
+def _purgar(db: Session) -> int:
+    """Borra los reportes terminados (y sus archivos) más viejos que RETENCION_DIAS."""
+    limite = datetime.now() - timedelta(days=RETENCION_DIAS)
+    viejos = db.execute(
+        select(models.Reporte).where(
+            models.Reporte.estado.in_(("terminado", "error")),
+            models.Reporte.creado < limite,
+        )
+    ).scalars().all()
+    for reporte in viejos:
+        ruta = ruta_archivo(reporte.id)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        db.delete(reporte)
+    db.commit()
+    return len(viejos)
+
+
+def reanudar(session_factory=None) -> int:
+    """
+    Al arrancar: purga los viejos y vuelve a encolar los pendientes (y los
+    que quedaron `corriendo` por un cierre abrupto). Devuelve cuántos.
+    """
+    if session_factory is None:
+        from backend.database import SessionLocal
+        session_factory = SessionLocal
+    db = session_factory()
+    try:
+        _purgar(db)
+        db.execute(
+            update(models.Reporte).where(models.Reporte.estado == "corriendo").values(estado="pendiente")
+        )
+        db.commit()
+        pendientes = db.execute(
+            select(models.Reporte.id)
+            .where(models.Reporte.estado == "pendiente")
+            .order_by(models.Reporte.creado)
+        ).scalars().all()
+    finally:
+        db.close()
+    for reporte_id in pendientes:
+        _enviar(reporte_id, session_factory)
+    return len(pendientes)
+
+
+def detener() -> None:
+    """
+    Corta el pool. El reporte en curso vuelve a `pendiente` en el próximo
+    lote; los encolados siguen `pendiente` en la tabla y reanudar() los
+    retoma en el próximo arranque.
+    """
+    global _pool
+    _detener.set()
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
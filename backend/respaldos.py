@@ -0,0 +1,514 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from backend.database import BACKUP_DIR, DB_PATH, ES_SQLITE
+
+"""
+respaldos.py: backups incrementales a nivel de página, con restauración a
+un momento dado.
+
+backup_database() copiaba la base entera en cada arranque: el disco usado
+crecía con tamaño × reinicios y lo que cambiaba entre reinicios no quedaba
+protegido. Ahora:
+
+- La primera vez se guarda una BASE (copia de todas las páginas).
+- Cada respaldo posterior (al arrancar, cada PRESTAMOS_RESPALDO_MINUTOS y
+  al cerrar) guarda solo las páginas que cambiaron desde el anterior: se
+  compara un hash por página contra el del respaldo previo (hashes.bin).
+  Lo que se ESCRIBE es proporcional a lo que cambió, no al tamaño de la base.
+- Cada incremento registra la cantidad de páginas y el sha256 de la base
+  completa en ese momento, para verificar las restauraciones.
+- restaurar(hasta) reconstruye la base tal como estaba en el último
+  respaldo <= `hasta`: base + incrementos en orden.
+- compactar() aplica a la base los incrementos más viejos que la
+  retención y los borra (ya no se puede volver a antes de eso).
+
+Consistencia: la base usa rollback journal, así que mientras se leen las
+páginas se mantiene abierta una transacción de lectura (lock SHARED):
+ningún commit puede modificar el archivo en ese intervalo. En modo WAL el
+archivo principal no tiene los últimos commits; ahí se toma primero una
+copia con la API de backup de SQLite y se leen las páginas de esa copia.
+
+Estructura en BACKUP_DIR/incremental/:
+    base.db, base.json        → base (archivo SQLite válido) y sus datos
+    inc_<fecha>.bin / .json   → páginas cambiadas: [nº de página (4 bytes) + página]...
+    hashes.bin                → hash de cada página del último respaldo
+
+Uso manual:
+    python -m backend.respaldos crear
+    python -m backend.respaldos listar
+    python -m backend.respaldos restaurar --hasta 2026-10-19T12:00 --destino restaurada.db
+    python -m backend.respaldos verificar
+    python -m backend.respaldos compactar --retencion-dias 30
+"""
+
+DIRECTORIO = os.path.join(BACKUP_DIR, "incremental")
+
+# Cada cuánto se toma un incremento con la app abierta (0 = solo al arrancar/cerrar)
+INTERVALO_MINUTOS = float(os.getenv("PRESTAMOS_RESPALDO_MINUTOS", "15"))
+
+# Hasta cuándo se puede volver atrás; lo anterior se compacta en la base
+RETENCION_DIAS = int(os.getenv("PRESTAMOS_RESPALDO_RETENCION_DIAS", "30"))
+
+_BYTES_HASH = 16
+_FORMATO_FECHA = "%Y%m%d_%H%M%S_%f"
+
+_lock = threading.Lock()
+
+
+# =========================
+# ARCHIVOS DEL RESPALDO
+# =========================
+
+def _ruta(*partes) -> str:
+    return os.path.join(DIRECTORIO, *partes)
+
+
+def _leer_json(ruta: str) -> dict:
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _escribir_atomico(ruta: str, contenido: bytes) -> None:
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+def _escribir_json(ruta: str, datos: dict) -> None:
+    _escribir_atomico(ruta, json.dumps(datos, indent=2).encode("utf-8"))
+
+
+def _hash_pagina(pagina: bytes) -> bytes:
+    return hashlib.blake2b(pagina, digest_size=_BYTES_HASH).digest()
+
+
+def listar_incrementos() -> list[dict]:
+    """Incrementos completos (con su .json), del más viejo al más nuevo."""
+    if not os.path.isdir(DIRECTORIO):
+        return []
+    incrementos = []
+    for nombre in sorted(os.listdir(DIRECTORIO)):
+        if nombre.startswith("inc_") and nombre.endswith(".json"):
+            datos = _leer_json(_ruta(nombre))
+            datos["nombre"] = nombre[:-len(".json")]
+            incrementos.append(datos)
+    return incrementos
+
+
+def base_actual() -> dict | None:
+    ruta = _ruta("base.json")
+    return _leer_json(ruta) if os.path.exists(ruta) else None
+
+
+# =========================
+# LECTURA CONSISTENTE
+# =========================
+
+def _tamano_pagina(cabecera: bytes) -> int:
+    tamano = struct.unpack(">H", cabecera[16:18])[0]
+    return 65536 if tamano == 1 else tamano
+
+
+def _recorrer_paginas(ruta: str):
+    """(tamaño de página, iterador de páginas) del archivo SQLite `ruta`."""
+    f = open(ruta, "rb")
+    tamano = _tamano_pagina(f.read(100))
+    f.seek(0)
+
+    def paginas():
+        try:
+            while True:
+                pagina = f.read(tamano)
+                if not pagina:
+                    return
+                yield pagina
+        finally:
+            f.close()
+
+    return tamano, paginas()
+
+
+class _Instantanea:
+    """
+    Contexto que entrega una ruta con un estado consistente de la base:
+    el archivo mismo bajo un lock SHARED, o una copia si la base está en WAL.
+    """
+
+    def __init__(self, ruta_db: str):
+        self.ruta_db = ruta_db
+        self.conn = None
+        self.copia = None
+
+    def __enter__(self) -> str:
+        self.conn = sqlite3.connect(self.ruta_db, timeout=30, isolation_level=None)
+        modo = self.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if modo.lower() == "wal":
+            self.copia = _ruta("instantanea.db.tmp")
+            destino = sqlite3.connect(self.copia)
+            try:
+                self.conn.backup(destino)
+            finally:
+                destino.close()
+            return self.copia
+        # El lock SHARED dura hasta el final de la transacción
+        self.conn.execute("BEGIN")
+        self.conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        return self.ruta_db
+
+    def __exit__(self, *exc):
+        if self.conn is not None:
+            if self.conn.in_transaction:
+                self.conn.execute("COMMIT")
+            self.conn.close()
+        if self.copia and os.path.exists(self.copia):
+            os.remove(self.copia)
+        return False
+
+
+# =========================
+# CREAR
+# =========================
+
+def _crear_base(ruta: str, ahora: datetime) -> dict:
+    tamano, paginas = _recorrer_paginas(ruta)
+    sha = hashlib.sha256()
+    hashes = bytearray()
+    cantidad = 0
+    temporal = _ruta("base.db.tmp")
+    with open(temporal, "wb") as destino:
+        for pagina in paginas:
+            destino.write(pagina)
+            sha.update(pagina)
+            hashes += _hash_pagina(pagina)
+            cantidad += 1
+        destino.flush()
+        os.fsync(destino.fileno())
+
+    # Una base nueva invalida los incrementos de la anterior
+    for incremento in listar_incrementos():
+        _borrar_incremento(incremento["nombre"])
+    os.replace(temporal, _ruta("base.db"))
+    datos = {
+        "creado": ahora.isoformat(),
+        "tamano_pagina": tamano,
+        "paginas": cantidad,
+        "sha256": sha.hexdigest(),
+    }
+    _escribir_json(_ruta("base.json"), datos)
+    _escribir_atomico(_ruta("hashes.bin"), bytes(hashes))
+    return {"tipo": "base", "paginas_escritas": cantidad, "bytes_escritos": cantidad * tamano, **datos}
+
+
+def _crear_incremento(ruta: str, base: dict, ahora: datetime) -> dict | None:
+    tamano, paginas = _recorrer_paginas(ruta)
+    if tamano != base["tamano_pagina"]:
+        return None  # Cambió el tamaño de página (VACUUM): hace falta base nueva
+
+    with open(_ruta("hashes.bin"), "rb") as f:
+        anteriores = f.read()
+
+    nombre = "inc_" + ahora.strftime(_FORMATO_FECHA)
+    temporal = _ruta(nombre + ".bin.tmp")
+    sha = hashlib.sha256()
+    hashes = bytearray()
+    cambiadas = 0
+    cantidad = 0
+    with open(temporal, "wb") as destino:
+        for numero, pagina in enumerate(paginas, start=1):
+            h = _hash_pagina(pagina)
+            inicio = (numero - 1) * _BYTES_HASH
+            if anteriores[inicio:inicio + _BYTES_HASH] != h:
+                destino.write(struct.pack(">I", numero))
+                destino.write(pagina)
+                cambiadas += 1
+            sha.update(pagina)
+            hashes += h
+            cantidad = numero
+        destino.flush()
+        os.fsync(destino.fileno())
+
+    datos = {
+        "creado": ahora.isoformat(),
+        "tamano_pagina": tamano,
+        "paginas": cantidad,
+        "paginas_cambiadas": cambiadas,
+        "sha256": sha.hexdigest(),
+    }
+    ultimo = (listar_incrementos() or [base])[-1]
+    if ultimo["sha256"] == datos["sha256"]:
+        # Sin cambios desde el respaldo anterior
+        os.remove(temporal)
+        return {"tipo": "sin_cambios", "paginas_escritas": 0, "bytes_escritos": 0, **datos}
+
+    os.replace(temporal, _ruta(nombre + ".bin"))
+    # El .json marca el incremento como completo
+    _escribir_json(_ruta(nombre + ".json"), datos)
+    _escribir_atomico(_ruta("hashes.bin"), bytes(hashes))
+    return {
+        "tipo": "incremento",
+        "nombre": nombre,
+        "paginas_escritas": cambiadas,
+        "bytes_escritos": cambiadas * (tamano + 4),
+        **datos,
+    }
+
+
+def crear_respaldo(ruta_db: str = DB_PATH) -> dict | None:
+    """
+    Guarda un incremento con las páginas cambiadas (o la base, si no hay).
+    Devuelve un resumen de lo escrito, o None si la base todavía no existe
+    (o si la app usa otro motor: ahí los backups son los del servidor).
+    """
+    if not ES_SQLITE or not os.path.exists(ruta_db):
+        return None
+    with _lock:
+        os.makedirs(DIRECTORIO, exist_ok=True)
+        ahora = datetime.now()
+        with _Instantanea(ruta_db) as ruta:
+            base = base_actual()
+            resultado = None
+            if base is not None and os.path.exists(_ruta("hashes.bin")):
+                resultado = _crear_incremento(ruta, base, ahora)
+            if resultado is None:
+                resultado = _crear_base(ruta, ahora)
+        return resultado
+
+
+# =========================
+# RESTAURAR / VERIFICAR
+# =========================
+
+def _aplicar_incremento(destino, incremento: dict) -> None:
+    tamano = incremento["tamano_pagina"]
+    registro = 4 + tamano
+    with open(_ruta(incremento["nombre"] + ".bin"), "rb") as f:
+        while True:
+            bloque = f.read(registro)
+            if len(bloque) < registro:
+                break
+            numero = struct.unpack(">I", bloque[:4])[0]
+            destino.seek((numero - 1) * tamano)
+            destino.write(bloque[4:])
+    destino.truncate(incremento["paginas"] * tamano)
+
+
+def _sha256_archivo(ruta: str) -> str:
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def puntos_de_restauracion() -> list[dict]:
+    """Momentos a los que se puede volver: la base y cada incremento."""
+    base = base_actual()
+    if base is None:
+        return []
+    return [{"nombre": "base", **base}] + listar_incrementos()
+
+
+def restaurar(destino: str, hasta: datetime | None = None) -> dict:
+    """
+    Reconstruye en `destino` la base tal como estaba en el último respaldo
+    tomado en o antes de `hasta` (None = el más reciente). Verifica el
+    sha256 contra el registrado. Nunca toca la base en uso.
+    """
+    with _lock:
+        puntos = puntos_de_restauracion()
+        if not puntos:
+            raise FileNotFoundError("No hay respaldos incrementales")
+        if hasta is not None:
+            puntos = [p for p in puntos if datetime.fromisoformat(p["creado"]) <= hasta]
+            if not puntos:
+                raise ValueError(f"No hay respaldos anteriores a {hasta.isoformat()}")
+
+        if os.path.abspath(destino) == os.path.abspath(DB_PATH):
+            raise ValueError("El destino no puede ser la base en uso")
+        temporal = destino + ".tmp"
+        shutil.copyfile(_ruta("base.db"), temporal)
+        with open(temporal, "r+b") as f:
+            for incremento in puntos[1:]:
+                _aplicar_incremento(f, incremento)
+
+        objetivo = puntos[-1]
+        sha = _sha256_archivo(temporal)
+        if sha != objetivo["sha256"]:
+            os.remove(temporal)
+            raise RuntimeError(f"Checksum distinto al restaurar {objetivo['nombre']}")
+        os.replace(temporal, destino)
+        return {"restaurado": objetivo["nombre"], "creado": objetivo["creado"], "sha256": sha}
+
+
+def verificar(directorio_temporal: str | None = None) -> list[dict]:
+    """
+    Restaura cada punto disponible y compara su checksum e integridad.
+    Devuelve un resultado por punto (ok True/False).
+    """
+    directorio_temporal = directorio_temporal or DIRECTORIO
+    resultados = []
+    for punto in puntos_de_restauracion():
+        destino = os.path.join(directorio_temporal, "verificacion.db")
+        try:
+            restaurar(destino, datetime.fromisoformat(punto["creado"]))
+            conn = sqlite3.connect(destino)
+            try:
+                integridad = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            finally:
+                conn.close()
+            resultados.append({"punto": punto["nombre"], "ok": integridad == "ok", "detalle": integridad})
+        except Exception as e:
+            resultados.append({"punto": punto["nombre"], "ok": False, "detalle": str(e)})
+        finally:
+            if os.path.exists(destino):
+                os.remove(destino)
+    return resultados
+
+
+# =========================
+# RETENCIÓN
+# =========================
+
+def _borrar_incremento(nombre: str) -> None:
+    # Primero el .json: sin él el incremento ya no cuenta como completo
+    for extension in (".json", ".bin"):
+        ruta = _ruta(nombre + extension)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+
+def compactar(retencion_dias: int = RETENCION_DIAS) -> int:
+    """
+    Aplica a la base los incrementos más viejos que la retención y los
+    borra. Devuelve cuántos se compactaron.
+    """
+    with _lock:
+        base = base_actual()
+        if base is None:
+            return 0
+        limite = datetime.now() - timedelta(days=retencion_dias)
+        viejos = [i for i in listar_incrementos() if datetime.fromisoformat(i["creado"]) < limite]
+        if not viejos:
+            return 0
+
+        temporal = _ruta("base.db.tmp")
+        shutil.copyfile(_ruta("base.db"), temporal)
+        with open(temporal, "r+b") as f:
+            for incremento in viejos:
+                _aplicar_incremento(f, incremento)
+            f.flush()
+            os.fsync(f.fileno())
+
+        ultimo = viejos[-1]
+        if _sha256_archivo(temporal) != ultimo["sha256"]:
+            os.remove(temporal)
+            raise RuntimeError("Checksum distinto al compactar: se conserva la base anterior")
+        os.replace(temporal, _ruta("base.db"))
+        _escribir_json(_ruta("base.json"), {
+            "creado": ultimo["creado"],
+            "tamano_pagina": ultimo["tamano_pagina"],
+            "paginas": ultimo["paginas"],
+            "sha256": ultimo["sha256"],
+        })
+        for incremento in viejos:
+            _borrar_incremento(incremento["nombre"])
+        return len(viejos)
+
+
+# =========================
+# RESPALDO PERIÓDICO
+# =========================
+
+_detener = threading.Event()
+_hilo: threading.Thread | None = None
+# Solo el proceso que arrancó los respaldos (el líder, con varios workers)
+# toma el incremento al cerrar
+_activo = False
+
+
+def _bucle(intervalo: float) -> None:
+    while not _detener.wait(intervalo):
+        try:
+            crear_respaldo()
+            compactar()
+        except Exception as e:
+            print(f"Respaldo incremental falló: {e}")
+
+
+def iniciar_periodico(intervalo_minutos: float = INTERVALO_MINUTOS) -> None:
+    global _hilo, _activo
+    if not ES_SQLITE:
+        return
+    _activo = True
+    if intervalo_minutos <= 0 or (_hilo is not None and _hilo.is_alive()):
+        return
+    _detener.clear()
+    _hilo = threading.Thread(target=_bucle, args=(intervalo_minutos * 60,), name="respaldos", daemon=True)
+    _hilo.start()
+
+
+def detener_periodico() -> None:
+    """Frena el hilo y toma un último incremento (lo cambiado desde el anterior)."""
+    global _hilo, _activo
+    _detener.set()
+    if _hilo is not None:
+        _hilo.join(timeout=30)
+        _hilo = None
+    if not _activo:
+        return
+    _activo = False
+    try:
+        crear_respaldo()
+    except Exception as e:
+        print(f"Respaldo incremental al cerrar falló: {e}")
+
+
+# =========================
+# CLI
+# =========================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backups incrementales de prestamos.db")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("crear")
+    sub.add_parser("listar")
+    p_restaurar = sub.add_parser("restaurar")
+    p_restaurar.add_argument("--hasta", default=None, help="Fecha/hora ISO (por defecto: el más reciente)")
+    p_restaurar.add_argument("--destino", required=True)
+    sub.add_parser("verificar")
+    p_compactar = sub.add_parser("compactar")
+    p_compactar.add_argument("--retencion-dias", type=int, default=RETENCION_DIAS)
+    args = parser.parse_args(argv)
+
+    if args.comando == "crear":
+        print(json.dumps(crear_respaldo(), indent=2))
+    elif args.comando == "listar":
+        for punto in puntos_de_restauracion():
+            print(f"{punto['creado']}  {punto['nombre']:<32} {punto['paginas']:>8} páginas")
+    elif args.comando == "restaurar":
+        hasta = datetime.fromisoformat(args.hasta) if args.hasta else None
+        print(json.dumps(restaurar(args.destino, hasta), indent=2))
+    elif args.comando == "verificar":
+        resultados = verificar()
+        for r in resultados:
+            print(f"{'OK ' if r['ok'] else 'MAL'} {r['punto']}: {r['detalle']}")
+        return 0 if all(r["ok"] for r in resultados) else 1
+    elif args.comando == "compactar":
+        print(f"Compactados: {compactar(args.retencion_dias)} incrementos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import gzip
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter
+
+from backend import lecturas, metricas
+
+"""
+respuestas.py
+- Codificación compacta de respuestas
+- Compresión negociada (br / gzip) para payloads grandes
+- Formatos alternativos para los listados: columnar JSON y MessagePack
+
+Formatos de listado (query `?formato=` o header Accept):
+- json      → lista de objetos (default, lo que consume el frontend)
+- columnar  → {"filas": N, "columnas": {"id": [...], "monto_prestado": [...]},
+               "clientes": {"<id>": {...}}}   (cada cliente UNA sola vez)
+- msgpack   → mismo contenido que columnar, en MessagePack
+              (Accept: application/msgpack)
+
+brotli y msgpack son opcionales: si no están instalados se usa gzip y
+`formato=msgpack` responde 406.
+"""
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende del entorno
+    msgpack = None
+
+# Por debajo de este tamaño comprimir cuesta más de lo que ahorra
+COMPRESION_MINIMO_BYTES = 1024
+
+TIPOS_MSGPACK = ("application/msgpack", "application/x-msgpack")
+
+FORMATOS_LISTADO = ("json", "columnar", "msgpack")
+
+
+# =========================
+# COMPRESIÓN
+# =========================
+
+def _codificaciones_aceptadas(scope) -> set[str]:
+    for nombre, valor in scope.get("headers", ()):
+        if nombre == b"accept-encoding":
+            return {
+                parte.split(";")[0].strip()
+                for parte in valor.decode("latin-1").lower().split(",")
+            }
+    return set()
+
+
+def _vary_con_encoding(headers) -> bytes:
+    """
+    El Vary de la respuesta más Accept-Encoding. Se suma a lo que ya había
+    (p. ej. Vary: Origin de CORS): reemplazarlo haría que un caché sirva
+    la respuesta de un origen a otro.
+    """
+    valores = [
+        parte.strip()
+        for nombre, valor in headers if nombre == b"vary"
+        for parte in valor.decode("latin-1").split(",") if parte.strip()
+    ]
+    if "*" in valores or any(v.lower() == "accept-encoding" for v in valores):
+        return ", ".join(valores).encode("latin-1")
+    return ", ".join(valores + ["Accept-Encoding"]).encode("latin-1")
+
+
+class CompresionMiddleware:
+    """
+    Comprime respuestas de un solo bloque (las de la API) según Accept-Encoding.
+
+    Las respuestas en streaming (archivos, eventos) pasan intactas: comprimirlas
+    obligaría a bufferizar o rompería el envío incremental.
+    """
+
+    def __init__(self, app, minimo: int = COMPRESION_MINIMO_BYTES):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        aceptadas = _codificaciones_aceptadas(scope)
+        if "br" in aceptadas and brotli is not None:
+            codificacion = "br"
+        elif "gzip" in aceptadas:
+            codificacion = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+
+        async def send_comprimido(mensaje):
+            nonlocal inicio
+            if mensaje["type"] == "http.response.start":
+                inicio = mensaje
+                return
+            if mensaje["type"] != "http.response.body" or inicio is None:
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get("body", b"")
+            headers = inicio.get("headers", [])
+            ya_codificada = any(n == b"content-encoding" for n, _ in headers)
+
+            if mensaje.get("more_body") or ya_codificada or len(cuerpo) < self.minimo:
+                # Streaming, ya comprimida o muy chica: enviar tal cual
+                await send(inicio)
+                inicio = None
+                await send(mensaje)
+                return
+
+            if codificacion == "br":
+                comprimido = brotli.compress(cuerpo, quality=4)
+            else:
+                comprimido = gzip.compress(cuerpo, compresslevel=3)
+
+            nuevos_headers = [
+                (n, v) for n, v in headers if n not in (b"content-length", b"vary")
+            ]
+            nuevos_headers += [
+                (b"content-encoding", codificacion.encode()),
+                (b"content-length", str(len(comprimido)).encode()),
+                (b"vary", _vary_con_encoding(headers)),
+            ]
+            await send({**inicio, "headers": nuevos_headers})
+            inicio = None
+            await send({"type": "http.response.body", "body": comprimido})
+
+        await self.app(scope, receive, send_comprimido)
+
+
+# =========================
+# FORMATOS DE LISTADO
+# =========================
+
+_adaptadores: dict[type, TypeAdapter] = {}
+
+
+def _adaptador(schema) -> TypeAdapter:
+    adaptador = _adaptadores.get(schema)
+    if adaptador is None:
+        adaptador = _adaptadores[schema] = TypeAdapter(list[schema])
+    return adaptador
+
+
+def _a_msgpack(valor):
+    """Tipos que MessagePack no conoce, igual que en JSON (orjson): fechas en ISO 8601."""
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"No se puede codificar {type(valor).__name__} en MessagePack")
+
+
+def formato_pedido(request: Request, formato: Optional[str]) -> str:
+    """Resuelve el formato a partir de `?formato=` y, si falta, del header Accept."""
+    if formato:
+        return formato.lower()
+    accept = request.headers.get("accept", "")
+    if any(t in accept for t in TIPOS_MSGPACK):
+        return "msgpack"
+    return "json"
+
+
+def columnarizar(filas: list[dict], relaciones: Optional[dict[str, str]] = None) -> dict:
+    """
+    Pasa una lista de objetos a columnas. Los objetos anidados indicados en
+    `relaciones` ({campo: tabla}) se sacan a una tabla aparte indexada por id,
+    así un cliente con 50 préstamos se envía una vez y no 50.
+    """
+    relaciones = relaciones or {}
+    columnas: dict[str, list] = {}
+    tablas: dict[str, dict] = {tabla: {} for tabla in relaciones.values()}
+
+    if filas:
+        campos = [c for c in filas[0] if c not in relaciones]
+        for campo in campos:
+            columnas[campo] = [fila[campo] for fila in filas]
+        for campo, tabla in relaciones.items():
+            destino = tablas[tabla]
+            for fila in filas:
+                anidado = fila.get(campo)
+                if anidado is not None:
+                    destino.setdefault(str(anidado["id"]), anidado)
+
+    return {"filas": len(filas), "columnas": columnas, **tablas}
+
+
+def responder_listado(
+    request: Request,
+    items: list,
+    schema,
+    formato: Optional[str] = None,
+    relaciones: Optional[dict[str, str]] = None,
+):
+    """
+    Devuelve una Response ya codificada en el formato pedido.
+
+    - Filas de lectura (lecturas.py): se pasan a dicts con los campos de
+      `schema` y van directo a orjson, sin validar fila por fila.
+    - Cualquier otra cosa: en json se devuelve tal cual (FastAPI valida con
+      el response_model de la ruta); en columnar/msgpack se valida con `schema`.
+    """
+    formato = formato_pedido(request, formato)
+    if formato not in FORMATOS_LISTADO:
+        return ORJSONResponse(
+            {"detail": f"Formato no soportado: {formato}. Opciones: {', '.join(FORMATOS_LISTADO)}"},
+            status_code=400,
+        )
+
+    if formato == "msgpack" and msgpack is None:
+        return ORJSONResponse({"detail": "MessagePack no disponible en este servidor"}, status_code=406)
+
+    directo = lecturas.son_filas_de_lectura(items)
+    if formato == "json" and not directo:
+        # La valida y serializa FastAPI; metricas cuenta la lista al salir del endpoint
+        return items
+    # Sale una Response: metricas no ve la lista, se cuentan acá
+    metricas.contar_filas(len(items))
+    if formato == "json":
+        return ORJSONResponse(lecturas.a_dicts(items, schema))
+
+    if directo:
+        filas = lecturas.a_dicts(items, schema)
+    else:
+        adaptador = _adaptador(schema)
+        filas = adaptador.dump_python(
+            adaptador.validate_python(items, from_attributes=True), mode="json"
+        )
+    contenido = columnarizar(filas, relaciones)
+
+    if formato == "msgpack":
+        return Response(
+            msgpack.packb(contenido, use_bin_type=True, default=_a_msgpack),
+            media_type="application/msgpack",
+        )
+    return ORJSONResponse(contenido)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from datetime import date
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Literal, Optional, List
 
 """
 schemas.py define cómo se ENTRAN y SALEN los datos por la API.
@@ -37,6 +37,7 @@ class ClienteArchivoBase(BaseModel):
 class ClienteArchivoOut(ClienteArchivoBase):
     id: int
     cliente_id: int
+    row_version: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -49,6 +50,16 @@ class ClienteArchivoOut(ClienteArchivoBase):
 class ClienteOut(ClienteBase):
     id: int
     archivos: List[ClienteArchivoOut] = Field(default_factory=list)
+    row_version: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ClienteResumenOut(ClienteBase):
+    """Cliente sin archivos anidados (los archivos viajan aparte)."""
+    id: int
+    row_version: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -69,18 +80,18 @@ class PrestamoBase(BaseModel):
 class PrestamoCreate(BaseModel):
     cliente_id: int
     monto_prestado: float
-    plazo: int  # 7, 14 o 30
+    plazo: int  # días (la tasa por defecto es la de la tarifa del plazo: GET /tarifas)
     fecha_inicio: Optional[date] = None
     estado_pago: Optional[str] = 'PENDIENTE'  # Puede ser BLOQUEADO solo por backend
     tasa_interes: Optional[float] = None  # Tasa decimal (ej: 0.20 para 20%)
 
 
-class PrestamoOut(PrestamoBase):
+class PrestamoResumenOut(PrestamoBase):
+    """Préstamo con campos derivados, sin el cliente anidado."""
     id: int
     fecha_creacion: date
     fecha_pago: Optional[date] = None
     monto_cobrado_final: Optional[float] = None
-    cliente: ClienteOut
     estado_prestamo: str = 'PENDIENTE'  # Campo derivado calculado por el backend
     dias_atraso: int = 0
     es_moroso: bool = False
@@ -89,6 +100,35 @@ class PrestamoOut(PrestamoBase):
     total_actualizado: float = 0.0
     periodo_origen: Optional[str] = None  # Formato YYYY-MM
     tasa_interes: Optional[float] = None  # Tasa decimal
+    plazo: Optional[int] = None  # días (None en préstamos viejos que no se pudieron completar)
+    tarifa_id: Optional[int] = None  # None si la tasa se pactó a mano
+    row_version: Optional[int] = None
+    version: Optional[int] = None  # Para If-Match en cobrar / agregar-monto / renovar / bloquear
+
+    class Config:
+        from_attributes = True
+
+
+class PrestamoOut(PrestamoResumenOut):
+    cliente: ClienteOut
+
+
+class ClienteTotalesOut(BaseModel):
+    cantidad: int
+    activos: int  # sin pagar ni renovar (incluye bloqueados)
+    morosos: int
+    bloqueados: int
+    total_prestado: float
+    total_cobrado: float
+    total_adeudado: float  # total_actualizado - total_cobrado de los activos
+    punitorios: float
+
+
+class ClienteCompletoOut(BaseModel):
+    """GET /clientes/{id}/completo: todo lo que muestra el detalle de cliente."""
+    cliente: ClienteOut
+    prestamos: List[PrestamoResumenOut]
+    totales: ClienteTotalesOut
 
     class Config:
         from_attributes = True
@@ -112,6 +152,172 @@ class RenovarPrestamoIn(BaseModel):
     tasa_interes: Optional[float] = None  # Tasa decimal (ej: 0.20 para 20%)
 
 
+# =========================
+# COBRANZA EN LOTE (CIERRE DE CAJA)
+# =========================
+
+class CobranzaItemIn(BaseModel):
+    prestamo_id: int
+    monto: float
+    version: Optional[int] = None  # Como If-Match: 409 para este ítem si no coincide
+
+
+class CobranzaItemOut(BaseModel):
+    prestamo_id: int
+    ok: bool
+    estado_http: int  # 200 cobrado, 400 regla de negocio, 404 no existe, 409 versión
+    detalle: Optional[str] = None
+    prestamo: Optional[PrestamoResumenOut] = None
+
+
+class CierreCajaOut(BaseModel):
+    fecha: date
+    cantidad: int
+    cobrados: int
+    rechazados: int
+    total_cobrado: float
+    total_esperado: float  # total_actualizado (con punitorios) de lo cobrado
+    diferencia: float  # total_cobrado - total_esperado
+    cobrados_con_mora: int
+    punitorios_cobrados: float  # lo cobrado por encima de total_a_pagar
+
+
+class ResumenPeriodoArchivoOut(BaseModel):
+    periodo_origen: Optional[str]
+    cantidad: int
+    cantidad_renovados: int
+    monto_prestado: float
+    total_a_pagar: float
+    total_cobrado: float
+    monto_cobrado_final: float
+
+
+class ArchivadoOut(BaseModel):
+    archivados: int
+
+
+class HorizonteCohorteOut(BaseModel):
+    dias: int
+    observados: int  # préstamos con al menos `dias` de antigüedad
+    # Proporciones (0 a 1) de los observados
+    pagado: float
+    renovado: float
+    bloqueado: float
+    vencido: float
+    al_dia: float
+
+
+class CohorteOut(BaseModel):
+    periodo_origen: str
+    cantidad: int
+    monto_prestado: float
+    cerrada: bool  # sus números ya no cambian (se sirve de caché)
+    horizontes: list[HorizonteCohorteOut]
+
+
+class SimulacionIn(BaseModel):
+    escenarios: int = Field(20_000, ge=100, le=200_000)
+    horizonte_dias: int = Field(90, ge=1, le=730)
+    prob_default: float = Field(0.10, ge=0, le=1)
+    prob_renovacion: float = Field(0.15, ge=0, le=1)
+    volatilidad: float = Field(0.5, ge=0, le=3)  # dispersión del factor sistémico
+    dias_atraso_medio: float = Field(2.0, ge=0, le=365)
+    tasa_recupero: float = Field(0.0, ge=0, le=1)  # fracción de lo adeudado que se recupera en default
+    caja_inicial: float = Field(0.0, ge=0)
+    semilla: Optional[int] = None
+
+
+class DistribucionOut(BaseModel):
+    p50: float
+    p75: float
+    p90: float
+    p95: float
+    p99: float
+    media: float
+    maximo: float
+
+
+class SimulacionResultadoOut(BaseModel):
+    prestamos: int
+    capital_en_cartera: float
+    adeudado: float
+    obligaciones_inversores: float  # vencen en el horizonte
+    perdida: DistribucionOut  # capital no recuperado
+    cobros: DistribucionOut  # cobrado dentro del horizonte
+    faltante: DistribucionOut  # obligaciones - caja inicial - cobros (si es positivo)
+    prob_faltante: float
+
+
+class SimulacionOut(BaseModel):
+    id: str
+    estado: str  # pendiente | corriendo | terminado | error
+    progreso: float  # 0 a 1
+    parametros: dict
+    resultado: Optional[SimulacionResultadoOut] = None
+    error: Optional[str] = None
+    duracion_ms: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ReporteIn(BaseModel):
+    tipo: Literal["cartera_mensual", "liquidacion_inversores"]
+    periodo: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}$")  # cartera_mensual (YYYY-MM)
+    estado: Optional[str] = None  # liquidacion_inversores: ACTIVO / LIQUIDADO (None = todos)
+
+
+class ReporteOut(BaseModel):
+    id: str
+    tipo: str
+    parametros: dict
+    estado: str  # pendiente | corriendo | terminado | error
+    creado: datetime
+    terminado: Optional[datetime] = None
+    filas: Optional[int] = None  # escritas hasta ahora mientras corre
+    bytes: Optional[int] = None
+    duracion_ms: Optional[float] = None
+    error: Optional[str] = None
+    descarga: Optional[str] = None  # URL del CSV cuando está terminado
+
+
+class TareaMantenimientoOut(BaseModel):
+    tarea: str
+    inicio: datetime
+    duracion_ms: float
+    resultado: str
+
+
+class EstadoTareaOut(BaseModel):
+    tarea: str
+    ultima: Optional[datetime] = None
+    duracion_ms: Optional[float] = None
+    resultado: Optional[str] = None
+    ejecuciones: int
+
+
+class ArchivoBaseOut(BaseModel):
+    bytes: int
+    paginas: int
+    paginas_libres: int
+    tamano_pagina: int
+    auto_vacuum: str
+
+
+class MantenimientoOut(BaseModel):
+    activo: bool
+    ocioso: bool
+    cambios_avisados: int
+    archivo: Optional[ArchivoBaseOut] = None
+    tareas: List[EstadoTareaOut]
+    historial: List[TareaMantenimientoOut]  # más nuevas primero
+
+
+class CobranzaLoteOut(BaseModel):
+    resultados: List[CobranzaItemOut]
+    resumen: CierreCajaOut
+
+
 # =========================
 # INVERSORES
 # =========================
@@ -135,6 +341,71 @@ class InversorOut(InversorBase):
     dias_trabajados: Optional[int] = None
     ganancia: Optional[float] = None
     total_a_devolver: Optional[float] = None
+    row_version: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+# =========================
+# TARIFAS
+# =========================
+
+class TarifaCreate(BaseModel):
+    plazo: int  # días
+    tasa: float  # Tasa decimal (ej: 0.20 para 20%)
+    vigente_desde: Optional[date] = None  # hoy por defecto
+
+
+class TarifaOut(BaseModel):
+    id: int
+    plazo: int
+    tasa: float
+    vigente_desde: date
+    vigente_hasta: Optional[date] = None
 
     class Config:
         from_attributes = True
+
+
+# =========================
+# SINCRONIZACIÓN (DELTA)
+# =========================
+
+class EliminadoOut(BaseModel):
+    entidad: str
+    id: int
+
+
+class CambiosOut(BaseModel):
+    """
+    Respuesta de GET /cambios?desde=<version>.
+    Guardar `hasta` y pedir la próxima página con desde=hasta
+    mientras `hay_mas` sea True.
+    """
+    desde: int
+    hasta: int
+    hay_mas: bool
+    version_actual: int
+    clientes: List[ClienteResumenOut] = Field(default_factory=list)
+    archivos: List[ClienteArchivoOut] = Field(default_factory=list)
+    prestamos: List[PrestamoResumenOut] = Field(default_factory=list)
+    inversores: List[InversorOut] = Field(default_factory=list)
+    tarifas: List[TarifaOut] = Field(default_factory=list)
+    eliminados: List[EliminadoOut] = Field(default_factory=list)
+
+
+# =========================
+# AUDITORÍA
+# =========================
+
+class AuditoriaOut(BaseModel):
+    """Una fila de GET /auditoria: cambios = {campo: [antes, después]}."""
+    id: int
+    fecha: datetime
+    entidad: str
+    entidad_id: int
+    accion: str
+    cambios: dict
+    usuario: Optional[str] = None
+    origen: Optional[str] = None
@@ -0,0 +1,425 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime, timedelta
+
+"""
+simulacion.py: estrés de cartera por Monte Carlo (POST /simulacion).
+
+Pregunta: con la cartera activa de hoy y lo que hay que devolverle a los
+inversores, ¿cuánto se puede perder y cuánta caja puede faltar dentro de
+`horizonte_dias`, si cambian las tasas de default y de renovación?
+
+Cada escenario sortea, para CADA préstamo activo (no SI / RENOVADO):
+- default (prob. `prob_default`, movida por un factor sistémico común a
+  todo el escenario: en un mes malo caen muchos juntos) → se recupera
+  `tasa_recupero` de lo adeudado y se pierde el resto del capital;
+- renovación (prob. `prob_renovacion`) → se cobran solo los intereses,
+  como en crud.renovar_prestamo; el capital sigue en la calle;
+- pago → lo adeudado más punitorios por los días de atraso (ya acumulados
+  + un atraso sorteado), con las reglas de crud.calcular_punitorios
+  (TASA_PUNITORIA_DIARIA sobre total_a_pagar, redondeado a centavos).
+Los BLOQUEADOS se toman como default seguro.
+
+El cobro cuenta para la caja solo si ocurre dentro del horizonte. El
+faltante es lo que vence a inversores ACTIVOS en el horizonte
+(crud.aplicar_calculos_inversor) menos caja inicial y cobros.
+
+Ejecución: todo vectorizado con NumPy (matriz escenarios × préstamos, por
+bloques para acotar la memoria) y repartido en un ProcessPoolExecutor: el
+cálculo no toma el GIL de los workers de la API. Cada simulación es un
+trabajo en segundo plano; POST devuelve su id y GET /simulacion/{id}
+informa el progreso y, al terminar, los percentiles.
+
+Los trabajos son filas de la tabla `simulaciones` (models.Simulacion), en
+la base de la cartera del request, como los reportes: con varios workers
+el GET puede caer en otro proceso que el que corre. El coordinador guarda
+el progreso cada PROGRESO_SEGUNDOS y el resultado al terminar; una
+simulación cortada por un reinicio vuelve a correr (reanudar()).
+
+NumPy está en requirements.txt (y PyInstaller lo incluye en el EXE); si
+falta igual, POST /simulacion responde 503. Se importa
+recién al usarlo (no al importar el módulo): main.py importa este módulo
+al arrancar y NumPy solo suma ~60 ms al arranque en frío.
+"""
+
+PERCENTILES = (50, 75, 90, 95, 99)
+
+# Celdas (escenarios × préstamos) por bloque: ~16 MB por matriz de float64
+CELDAS_POR_BLOQUE = 2_000_000
+
+PROCESOS = int(os.getenv("PRESTAMOS_SIMULACION_PROCESOS", "0")) or max(1, (os.cpu_count() or 2) - 1)
+
+# Simulaciones terminadas que se conservan para consultar
+MAX_TRABAJOS = 50
+
+# Cada cuánto el coordinador guarda el progreso en la tabla
+PROGRESO_SEGUNDOS = 0.5
+
+
+def disponible() -> bool:
+    try:
+        import numpy  # noqa: F401
+    except ImportError:  # pragma: no cover - depende del entorno
+        return False
+    return True
+
+
+# =========================
+# CÁLCULO (corre en los procesos del pool)
+# =========================
+
+def _simular_bloque(cartera: dict, obligaciones: float, parametros: dict,
+                    escenarios: int, semilla: int):
+    """
+    Simula `escenarios` escenarios. Devuelve (perdida, cobros, faltante),
+    un array de largo `escenarios` cada uno. Función de módulo: se pickea
+    para el pool de procesos.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(semilla)
+    n = len(cartera["capital"])
+    horizonte = parametros["horizonte_dias"]
+    tasa_punitoria = parametros["tasa_punitoria_diaria"]
+
+    # Factor sistémico: prob. de default del escenario (lognormal, media = prob_default)
+    sigma = parametros["volatilidad"]
+    choque = np.exp(sigma * rng.standard_normal(escenarios) - sigma ** 2 / 2)
+    prob_default = np.clip(parametros["prob_default"] * choque, 0.0, 1.0)[:, None]
+    prob_renovacion = parametros["prob_renovacion"]
+
+    sorteo = rng.random((escenarios, n))
+    bloqueado = cartera["bloqueado"][None, :]
+    default = (sorteo < prob_default) | bloqueado
+    renueva = ~default & (sorteo < prob_default + prob_renovacion)
+    paga = ~default & ~renueva
+
+    # Atraso sorteado (geométrico, media `dias_atraso_medio`) sobre el ya acumulado
+    media = parametros["dias_atraso_medio"]
+    extra = rng.geometric(1.0 / (media + 1.0), size=(escenarios, n)) - 1 if media > 0 else 0
+    atraso = cartera["dias_atraso"][None, :] + extra
+    punitorio_diario = np.round(cartera["total_a_pagar"] * tasa_punitoria, 2)[None, :]
+    cobro_pago = cartera["adeudado"][None, :] + punitorio_diario * atraso
+
+    recupero = parametros["tasa_recupero"] * cartera["adeudado"][None, :]
+    cobro = np.where(paga, cobro_pago, np.where(renueva, cartera["intereses"][None, :], recupero))
+
+    # Día (desde hoy) en que entra la plata: vencimiento + atraso nuevo
+    dia_cobro = np.maximum(cartera["dias_a_vencer"][None, :], 0) + np.where(paga, extra, 0)
+    cobros_en_horizonte = np.where(dia_cobro <= horizonte, cobro, 0.0).sum(axis=1)
+
+    perdida = np.where(default, np.maximum(cartera["capital"][None, :] - recupero, 0.0), 0.0).sum(axis=1)
+    faltante = np.maximum(obligaciones - parametros["caja_inicial"] - cobros_en_horizonte, 0.0)
+    return perdida, cobros_en_horizonte, faltante
+
+
+# =========================
+# DATOS DE ENTRADA
+# =========================
+
+def cargar_cartera(db, hoy: date) -> dict:
+    """Arrays de la cartera activa (una consulta Core, sin ORM)."""
+    import numpy as np
+    from sqlalchemy import select
+    from backend import models
+
+    tabla = models.Prestamo.__table__
+    filas = db.execute(
+        select(
+            tabla.c.monto_prestado, tabla.c.total_a_pagar, tabla.c.total_cobrado,
+            tabla.c.fecha_vencimiento, tabla.c.estado_pago,
+        ).where(tabla.c.estado_pago.not_in(("SI", "RENOVADO")))
+    ).all()
+
+    capital = np.array([f[0] for f in filas], dtype=np.float64)
+    total = np.array([f[1] for f in filas], dtype=np.float64)
+    cobrado = np.array([f[2] or 0.0 for f in filas], dtype=np.float64)
+    dias_a_vencer = np.array([(f[3] - hoy).days for f in filas], dtype=np.int64)
+    return {
+        "capital": capital,
+        "total_a_pagar": total,
+        "adeudado": np.maximum(total - cobrado, 0.0),
+        "intereses": np.maximum(total - capital, 0.0),
+        "dias_a_vencer": dias_a_vencer,
+        "dias_atraso": np.maximum(-dias_a_vencer, 0),
+        "bloqueado": np.array([f[4] == "BLOQUEADO" for f in filas], dtype=bool),
+    }
+
+
+def obligaciones_inversores(db, hoy: date, horizonte_dias: int) -> float:
+    """Lo que vence a inversores ACTIVOS dentro del horizonte (capital + ganancia)."""
+    from backend import crud, lecturas
+
+    limite = hoy + timedelta(days=horizonte_dias)
+    total = 0.0
+    for inversor in lecturas.listar_inversores(db):
+        if inversor.estado != "ACTIVO":
+            continue
+        if inversor.fecha_fin is not None and inversor.fecha_fin > limite:
+            continue
+        crud.aplicar_calculos_inversor(inversor)
+        total += inversor.total_a_devolver
+    return total
+
+
+# =========================
+# TRABAJOS EN SEGUNDO PLANO
+# =========================
+
+class _Interrumpida(Exception):
+    """El servidor se está cerrando: la simulación vuelve a `pendiente`."""
+
+
+_lock = threading.Lock()
+_detener = threading.Event()
+_pool: ProcessPoolExecutor | None = None
+
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _detener.clear()
+            # spawn: no heredar por fork los hilos y conexiones del servidor
+            _pool = ProcessPoolExecutor(max_workers=PROCESOS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def detener() -> None:
+    """Corta el pool. La simulación en curso vuelve a `pendiente` y reanudar() la retoma."""
+    global _pool
+    _detener.set()
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _percentiles(valores) -> dict:
+    import numpy as np
+
+    resultado = {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(valores, PERCENTILES))}
+    resultado["media"] = round(float(valores.mean()), 2)
+    resultado["maximo"] = round(float(valores.max()), 2)
+    return resultado
+
+
+def _actualizar(session_factory, simulacion_id: str, **valores) -> None:
+    from sqlalchemy import update
+    from backend import models
+
+    db = session_factory()
+    try:
+        db.execute(update(models.Simulacion).where(models.Simulacion.id == simulacion_id).values(**valores))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _tomar(simulacion_id: str, session_factory) -> dict | None:
+    """
+    Pasa la simulación de pendiente a corriendo con un UPDATE condicional
+    (como reportes.py): con varios workers, o un reanudar() que la volvió a
+    encolar, la corre uno solo. Devuelve sus parámetros, o None si ya la tomó otro.
+    """
+    from sqlalchemy import update
+    from backend import models
+
+    db = session_factory()
+    try:
+        tomada = db.execute(
+            update(models.Simulacion)
+            .where(models.Simulacion.id == simulacion_id, models.Simulacion.estado == "pendiente")
+            .values(estado="corriendo", progreso=0.0)
+        ).rowcount
+        db.commit()
+        if not tomada:
+            return None
+        return json.loads(db.get(models.Simulacion, simulacion_id).parametros)
+    finally:
+        db.close()
+
+
+def _simular(simulacion_id: str, parametros: dict, session_factory) -> dict:
+    import numpy as np
+
+    hoy = date.today()
+    db = session_factory()
+    try:
+        cartera = cargar_cartera(db, hoy)
+        obligaciones = obligaciones_inversores(db, hoy, parametros["horizonte_dias"])
+    finally:
+        db.close()
+
+    total = parametros["escenarios"]
+    n = len(cartera["capital"])
+    por_bloque = max(1, min(total, CELDAS_POR_BLOQUE // max(1, n)))
+    semillas = np.random.SeedSequence(parametros.get("semilla"))
+    bloques = []
+    restantes = total
+    for hija in semillas.spawn((total + por_bloque - 1) // por_bloque):
+        bloques.append((min(por_bloque, restantes), int(hija.generate_state(1)[0])))
+        restantes -= por_bloque
+
+    pool = _obtener_pool()
+    futuros = {
+        pool.submit(_simular_bloque, cartera, obligaciones, parametros, cantidad, semilla): cantidad
+        for cantidad, semilla in bloques
+    }
+    perdidas, cobros, faltantes = [], [], []
+    hechos = 0
+    guardado = time.monotonic()
+    pendientes = set(futuros)
+    while pendientes:
+        # shutdown(cancel_futures=True) no despierta a quien espera: se mira cada vuelta
+        if _detener.is_set():
+            raise _Interrumpida()
+        listos, pendientes = wait(pendientes, timeout=PROGRESO_SEGUNDOS, return_when=FIRST_COMPLETED)
+        for futuro in listos:
+            perdida, cobro, faltante = futuro.result()
+            perdidas.append(perdida)
+            cobros.append(cobro)
+            faltantes.append(faltante)
+            hechos += futuros[futuro]
+        # Un UPDATE cada PROGRESO_SEGUNDOS, no uno por bloque
+        if pendientes and time.monotonic() - guardado >= PROGRESO_SEGUNDOS:
+            _actualizar(session_factory, simulacion_id, progreso=round(hechos / total, 4))
+            guardado = time.monotonic()
+
+    perdida = np.concatenate(perdidas)
+    cobro = np.concatenate(cobros)
+    faltante = np.concatenate(faltantes)
+    return {
+        "prestamos": n,
+        "capital_en_cartera": round(float(cartera["capital"].sum()), 2),
+        "adeudado": round(float(cartera["adeudado"].sum()), 2),
+        "obligaciones_inversores": round(obligaciones, 2),
+        "perdida": _percentiles(perdida),
+        "cobros": _percentiles(cobro),
+        "faltante": _percentiles(faltante),
+        "prob_faltante": round(float((faltante > 0).mean()), 4),
+    }
+
+
+def _correr(simulacion_id: str, session_factory) -> None:
+    parametros = _tomar(simulacion_id, session_factory)
+    if parametros is None:
+        return
+
+    inicio = time.perf_counter()
+    try:
+        resultado = _simular(simulacion_id, parametros, session_factory)
+        cambios = {"estado": "terminado", "progreso": 1.0, "resultado": json.dumps(resultado)}
+    except _Interrumpida:
+        cambios = {"estado": "pendiente", "progreso": 0.0}
+    except Exception as e:
+        cambios = {"estado": "error", "error": f"{type(e).__name__}: {e}"}
+    if cambios["estado"] != "pendiente":
+        cambios["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    _actualizar(session_factory, simulacion_id, **cambios)
+
+
+def _enviar(simulacion_id: str, session_factory) -> None:
+    threading.Thread(
+        target=_correr, args=(simulacion_id, session_factory), name=f"simulacion-{simulacion_id[:8]}", daemon=True
+    ).start()
+
+
+def _recortar(db) -> None:
+    """Conserva las últimas MAX_TRABAJOS terminadas (las que corren nunca se borran)."""
+    from sqlalchemy import delete, select
+    from backend import models
+
+    viejas = db.execute(
+        select(models.Simulacion.id)
+        .where(models.Simulacion.estado.in_(("terminado", "error")))
+        .order_by(models.Simulacion.creado.desc())
+        .offset(MAX_TRABAJOS)
+    ).scalars().all()
+    if viejas:
+        db.execute(delete(models.Simulacion).where(models.Simulacion.id.in_(viejas)))
+
+
+def _datos(simulacion) -> dict:
+    return {
+        "id": simulacion.id,
+        "estado": simulacion.estado,
+        "progreso": simulacion.progreso,
+        "parametros": json.loads(simulacion.parametros),
+        "resultado": json.loads(simulacion.resultado) if simulacion.resultado else None,
+        "error": simulacion.error,
+        "duracion_ms": simulacion.duracion_ms,
+    }
+
+
+def iniciar(db, parametros: dict, session_factory=None) -> dict:
+    """
+    Registra la simulación como `pendiente` en `db` y la corre en un hilo
+    coordinador. No bloquea. `db` y `session_factory` son los de la cartera
+    del request (get_db / inquilinos.sesiones()): la fila queda en la base
+    del inquilino y solo él la ve.
+    """
+    from backend import crud, models
+
+    if session_factory is None:
+        from backend.database import SessionLocal
+        session_factory = SessionLocal
+    simulacion = models.Simulacion(
+        id=uuid.uuid4().hex,
+        parametros=json.dumps({**parametros, "tasa_punitoria_diaria": crud.TASA_PUNITORIA_DIARIA}),
+        estado="pendiente",
+        progreso=0.0,
+        creado=datetime.now(),
+    )
+    _recortar(db)
+    db.add(simulacion)
+    db.commit()
+    db.refresh(simulacion)
+    datos = _datos(simulacion)
+    _enviar(simulacion.id, session_factory)
+    return datos
+
+
+def obtener(db, simulacion_id: str) -> dict | None:
+    from backend import models
+
+    simulacion = db.get(models.Simulacion, simulacion_id)
+    return _datos(simulacion) if simulacion is not None else None
+
+
+def reanudar(session_factory=None) -> int:
+    """
+    Al arrancar: vuelve a correr las pendientes y las que quedaron
+    `corriendo` por un cierre abrupto. Devuelve cuántas.
+    """
+    from sqlalchemy import select, update
+    from backend import models
+
+    if session_factory is None:
+        from backend.database import SessionLocal
+        session_factory = SessionLocal
+    db = session_factory()
+    try:
+        db.execute(
+            update(models.Simulacion)
+            .where(models.Simulacion.estado == "corriendo")
+            .values(estado="pendiente", progreso=0.0)
+        )
+        db.commit()
+        pendientes = db.execute(
+            select(models.Simulacion.id)
+            .where(models.Simulacion.estado == "pendiente")
+            .order_by(models.Simulacion.creado)
+        ).scalars().all()
+    finally:
+        db.close()
+    if pendientes and not disponible():
+        return 0
+    for simulacion_id in pendientes:
+        _enviar(simulacion_id, session_factory)
+    return len(pendientes)
@@ -0,0 +1,130 @@
+from sqlalchemy import event, insert, text
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.database import SessionLocal
+
+"""
+sincronizacion.py: versionado de filas para el delta sync (GET /cambios).
+
+Cómo funciona:
+- sync_estado guarda un contador global. Cada transacción que escribe
+  clientes / archivos / préstamos / inversores lo incrementa UNA vez
+  (UPDATE ... SET version = version + 1) y usa ese número como versión.
+  Como el UPDATE toma el lock de escritura, las versiones quedan en el
+  mismo orden que los commits: un cliente que leyó hasta N nunca se pierde
+  una fila confirmada después con versión <= N.
+- before_flush asigna `row_version` a las filas nuevas o modificadas.
+- after_flush agrega una fila por entidad en `cambios` (y tombstones para
+  las bajas), que es lo que recorre GET /cambios página por página.
+
+Se engancha a SessionLocal al importarse (crud.py lo importa), así que
+cubre todas las escrituras del ORM, incluida la subida de archivos de main.py.
+"""
+
+ENTIDADES = {
+    models.Cliente: "cliente",
+    models.ClienteArchivo: "archivo",
+    models.Prestamo: "prestamo",
+    models.Inversor: "inversor",
+}
+
+_CLAVE_VERSION = "_sync_version"
+_CLAVE_PENDIENTES = "_sync_pendientes"
+
+# Versiones reservadas por ESTE proceso. Con varios workers el relevo de
+# coordinacion.py las usa para no volver a publicar lo propio (y las
+# descarta una vez relevadas). None = no se registran.
+versiones_propias: set[int] | None = None
+
+
+def version_actual(db: Session) -> int:
+    return db.execute(text("SELECT version FROM sync_estado WHERE id = 1")).scalar() or 0
+
+
+def reservar_version(session: Session) -> int:
+    """Reserva (una sola vez por transacción) la próxima versión global."""
+    version = session.info.get(_CLAVE_VERSION)
+    if version is not None:
+        return version
+
+    conn = session.connection()
+    actualizadas = conn.execute(
+        text("UPDATE sync_estado SET version = version + 1 WHERE id = 1")
+    ).rowcount
+    if not actualizadas:
+        # Solo en bases sin inicializar_esquema (que ya crea la fila)
+        conn.execute(text("INSERT INTO sync_estado (id, version) VALUES (1, 1)"))
+    version = conn.execute(text("SELECT version FROM sync_estado WHERE id = 1")).scalar()
+
+    session.info[_CLAVE_VERSION] = version
+    if versiones_propias is not None:
+        versiones_propias.add(version)
+    return version
+
+
+def registrar_cambios(session: Session, entidad: str, ids) -> None:
+    """
+    Filas de `cambios` para escrituras que no pasan por el flush del ORM
+    (UPDATE de Core, p. ej. crud.cobrar_lote). Quien escribe ya puso en
+    row_version la versión de reservar_version(session).
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    version = reservar_version(session)
+    session.connection().execute(insert(models.Cambio.__table__), [
+        {"version": version, "entidad": entidad, "entidad_id": entidad_id, "eliminado": False}
+        for entidad_id in ids
+    ])
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _antes_de_flush(session, flush_context, instances):
+    escritos = [
+        o for o in session.new if type(o) in ENTIDADES
+    ] + [
+        o for o in session.dirty
+        if type(o) in ENTIDADES and session.is_modified(o, include_collections=False)
+    ]
+    eliminados = [o for o in session.deleted if type(o) in ENTIDADES]
+    if not escritos and not eliminados:
+        return
+
+    version = reservar_version(session)
+    for obj in escritos:
+        obj.row_version = version
+
+    pendientes = session.info.setdefault(_CLAVE_PENDIENTES, [])
+    pendientes.extend((obj, False) for obj in escritos)
+    # Las bajas se registran con el id ya conocido (la fila deja de existir)
+    pendientes.extend(((ENTIDADES[type(obj)], obj.id), True) for obj in eliminados)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _despues_de_flush(session, flush_context):
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, None)
+    if not pendientes:
+        return
+
+    version = session.info[_CLAVE_VERSION]
+    filas = []
+    for item, eliminado in pendientes:
+        if eliminado:
+            entidad, entidad_id = item
+        else:
+            entidad, entidad_id = ENTIDADES[type(item)], item.id
+        filas.append({
+            "version": version,
+            "entidad": entidad,
+            "entidad_id": entidad_id,
+            "eliminado": eliminado,
+        })
+    session.connection().execute(insert(models.Cambio.__table__), filas)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+@event.listens_for(SessionLocal, "after_rollback")
+def _fin_de_transaccion(session):
+    session.info.pop(_CLAVE_VERSION, None)
+    session.info.pop(_CLAVE_PENDIENTES, None)
@@ -0,0 +1,140 @@
+import threading
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from backend import inquilinos, lecturas
+
+"""
+tarifas.py: registro en memoria de la tabla `tarifas` (tasa por plazo).
+
+Las tasas ya no están escritas en el código (crud.py, el frontend): salen
+de la tabla, que se lee entera (son unas pocas filas) la primera vez que
+se necesita y queda en memoria. Desde ahí cada búsqueda es un dict:
+- vigente(db, plazo): la tarifa de `plazo` que rige hoy (o en `dia`);
+- por_id(db, tarifa_id): la tarifa que quedó guardada en un préstamo.
+
+Los préstamos guardan plazo y tarifa_id al crearse o renovarse, así que
+ya no hace falta adivinar el plazo a partir del total.
+
+Invalidación: crud.crear_tarifa llama a invalidar() después de confirmar
+y el próximo pedido recarga. Con varios workers cada proceso tiene su
+copia: crear_tarifa deja el cambio en la tabla `cambios` y el relevo de
+coordinacion.py, que la lee cada RELEVO_SEGUNDOS, llama a invalidar() en
+los demás. Ninguna búsqueda consulta la base para ver si cambió.
+
+El relevo es de la base principal (inquilinos.py): en la cartera de un
+inquilino, otro worker ve la tarifa nueva cuando cierra la cartera ociosa
+y la vuelve a abrir.
+
+Un registro por inquilino ("" = base principal), como las cohortes de
+analitica.py; inquilinos.py lo descarta al cerrar la cartera.
+"""
+
+
+class _Registro:
+    """Las tarifas de una base, indexadas. No se modifica: invalidar() lo reemplaza."""
+
+    __slots__ = ("por_id", "por_plazo", "_hoy")
+
+    def __init__(self, filas: list):
+        self.por_id = {t.id: t for t in filas}
+        # plazo -> tarifas de ese plazo, la más nueva primero
+        self.por_plazo: dict[int, list] = {}
+        for t in sorted(filas, key=lambda t: t.vigente_desde, reverse=True):
+            self.por_plazo.setdefault(t.plazo, []).append(t)
+        # (día, {plazo: tarifa vigente ese día}); se arma una vez por día
+        self._hoy: tuple = (None, {})
+
+    def vigente_el(self, plazo: int, dia: date):
+        for t in self.por_plazo.get(plazo, ()):
+            if t.vigente_desde <= dia and (t.vigente_hasta is None or dia <= t.vigente_hasta):
+                return t
+        return None
+
+    def vigentes_el(self, dia: date) -> dict:
+        dia_armado, vigentes = self._hoy
+        if dia_armado != dia:
+            vigentes = {}
+            for plazo in sorted(self.por_plazo):
+                tarifa = self.vigente_el(plazo, dia)
+                if tarifa is not None:
+                    vigentes[plazo] = tarifa
+            # Una sola asignación: otro hilo ve el par viejo o el nuevo entero
+            self._hoy = (dia, vigentes)
+        return vigentes
+
+
+_registros: dict[str, _Registro] = {}
+# Se incrementa en cada invalidar(): una carga que empezó antes no se guarda
+_generaciones: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _registro(db: Session) -> _Registro:
+    clave = inquilinos.clave_actual()
+    with _lock:
+        registro = _registros.get(clave)
+        generacion = _generaciones.get(clave, 0)
+    if registro is not None:
+        return registro
+
+    registro = _Registro(lecturas.listar_tarifas(db))
+    with _lock:
+        if _generaciones.get(clave, 0) == generacion:
+            _registros[clave] = registro
+    return registro
+
+
+# =========================
+# CONSULTAS
+# =========================
+
+def vigente(db: Session, plazo: int, dia: date | None = None):
+    """La tarifa de `plazo` que rige en `dia` (hoy por defecto), o None si no hay."""
+    hoy = date.today()
+    registro = _registro(db)
+    if dia is None or dia == hoy:
+        return registro.vigentes_el(hoy).get(plazo)
+    return registro.vigente_el(plazo, dia)
+
+
+def vigentes(db: Session, dia: date | None = None) -> list:
+    """Las tarifas que rigen en `dia` (hoy por defecto), una por plazo, por plazo."""
+    return list(_registro(db).vigentes_el(dia or date.today()).values())
+
+
+def por_id(db: Session, tarifa_id: int | None):
+    if tarifa_id is None:
+        return None
+    return _registro(db).por_id.get(tarifa_id)
+
+
+def todas(db: Session) -> list:
+    """Todas las tarifas, también las que ya no rigen, por plazo y fecha."""
+    registro = _registro(db)
+    return sorted(registro.por_id.values(), key=lambda t: (t.plazo, t.vigente_desde))
+
+
+def aplica(tarifa, tasa: float | None) -> bool:
+    """Si `tasa` es la de `tarifa` (la tasa no se pactó a mano)."""
+    return tarifa is not None and tasa is not None and abs(tarifa.tasa - tasa) < 1e-9
+
+
+# =========================
+# INVALIDACIÓN
+# =========================
+
+def invalidar() -> None:
+    """Descarta el registro del inquilino en curso (llamar después del commit)."""
+    clave = inquilinos.clave_actual()
+    with _lock:
+        _generaciones[clave] = _generaciones.get(clave, 0) + 1
+        _registros.pop(clave, None)
+
+
+def descartar(clave: str) -> None:
+    """Libera el registro de un inquilino que se cerró (inquilinos.py)."""
+    with _lock:
+        _registros.pop(clave, None)
+        _generaciones.pop(clave, None)
@@ -0,0 +1,15 @@
+"""
+benchmarks/
+- Mediciones de rendimiento de los caminos críticos del backend
+- Generador determinístico de carteras sintéticas
+- Resultados en JSON para comparar entre commits
+
+Uso típico (desde la raíz del proyecto):
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_backend --clientes 500 --prestamos 5000
+    python -m benchmarks.comparar benchmarks/resultados/a.json benchmarks/resultados/b.json
+
+Los benchmarks NUNCA tocan la base real: cada corrida usa un directorio
+temporal propio (ver entorno.py).
+"""
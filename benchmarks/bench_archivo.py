@@ -0,0 +1,142 @@
+import argparse
+import sys
+import time
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_archivo.py: costo de los listados antes y después de archivar los
+préstamos cerrados viejos (backend/archivo.py).
+
+Genera una cartera de varios años, mide GET /prestamos (camino de
+crud.listar_prestamos) sobre la tabla completa, corre el archivo y vuelve
+a medir sobre la tabla caliente. Después verifica que los totales no
+cambiaron:
+- incluir_archivados=true devuelve exactamente los mismos préstamos;
+- tabla caliente + resumen_periodos_archivo dan los mismos totales por
+  período que la cartera original;
+- cada préstamo archivado dejó su fila de auditoría ("archivado") y salió
+  por eventos.bus como "eliminado".
+
+Ejemplo:
+    python -m benchmarks.bench_archivo --prestamos 50000 --meses 48
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Listados antes y después del archivo de préstamos")
+    parser.add_argument("--clientes", type=int, default=1_000)
+    parser.add_argument("--prestamos", type=int, default=30_000)
+    parser.add_argument("--meses", type=int, default=48, help="Antigüedad de la cartera sintética")
+    parser.add_argument("--dias", type=int, default=365, help="Antigüedad mínima para archivar")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    from backend import archivo, auditoria, crud, eventos, models
+    from backend.database import SessionLocal, inicializar_esquema
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    generar_cartera(
+        db, clientes=args.clientes, prestamos=args.prestamos, inversores=0,
+        archivos_por_cliente=1, meses=args.meses,
+    )
+    db.close()
+    print(f"Cartera sintética en {directorio}")
+
+    def _totales(prestamos) -> dict:
+        por_periodo: dict = {}
+        for p in prestamos:
+            t = por_periodo.setdefault(p.periodo_origen, [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += p.monto_prestado
+            t[2] += p.monto_cobrado_final or 0.0
+        return {k: (n, round(a, 2), round(b, 2)) for k, (n, a, b) in por_periodo.items()}
+
+    def _medir(nombre: str, incluir_archivados: bool = False) -> dict:
+        tiempos = []
+        for _ in range(args.repeticiones):
+            sesion = SessionLocal()
+            try:
+                inicio = time.perf_counter()
+                filas = len(crud.listar_prestamos(sesion, incluir_archivados))
+                tiempos.append(time.perf_counter() - inicio)
+            finally:
+                sesion.close()
+        r = resumir(tiempos)
+        r["filas"] = filas
+        print(f"  {nombre:<22} {filas:>8,} filas   mediana {r['mediana_ms']:>9.2f} ms")
+        return r
+
+    resultados = {"archivo.listado.antes": _medir("antes")}
+    db = SessionLocal()
+    antes = crud.listar_prestamos(db)
+    db.close()
+    ids_antes = sorted(p.id for p in antes)
+    totales_antes = _totales(antes)
+
+    # diferir(): los eventos de este hilo se juntan en vez de publicarse
+    with eventos.bus.diferir() as publicados:
+        inicio = time.perf_counter()
+        archivados = archivo.archivar_cerrados(args.dias)
+        segundos = time.perf_counter() - inicio
+    print(f"  archivo: {archivados:,} préstamos en {segundos:.2f} s")
+    resultados["archivo.job"] = {"archivados": archivados, "segundos": round(segundos, 3)}
+
+    resultados["archivo.listado.despues"] = _medir("después")
+    resultados["archivo.listado.con_archivados"] = _medir("con archivados", True)
+
+    fallas = []
+    db = SessionLocal()
+    try:
+        completos = crud.listar_prestamos(db, incluir_archivados=True)
+        if sorted(p.id for p in completos) != ids_antes:
+            fallas.append("incluir_archivados no devuelve los mismos préstamos")
+
+        totales = _totales(crud.listar_prestamos(db))
+        for r in archivo.listar_resumen(db):
+            t = totales.setdefault(r["periodo_origen"], (0, 0.0, 0.0))
+            totales[r["periodo_origen"]] = (
+                t[0] + r["cantidad"],
+                round(t[1] + r["monto_prestado"], 2),
+                round(t[2] + r["monto_cobrado_final"], 2),
+            )
+        if totales != totales_antes:
+            fallas.append("los totales por período cambiaron después de archivar")
+
+        ids_archivados = set(ids_antes) - {p.id for p in crud.listar_prestamos(db)}
+        eliminados = {i for entidad, i, _, accion in publicados
+                      if entidad == "prestamo" and accion == "eliminado"}
+        if eliminados != ids_archivados:
+            fallas.append(f"{len(ids_archivados ^ eliminados)} préstamos archivados sin su evento")
+        auditoria.vaciar()
+        auditados = {i for (i,) in db.query(models.Auditoria.entidad_id).filter(
+            models.Auditoria.entidad == "prestamo", models.Auditoria.accion == "archivado",
+        )}
+        if auditados != ids_archivados:
+            fallas.append(f"{len(ids_archivados ^ auditados)} préstamos archivados sin su fila de auditoría")
+    finally:
+        db.close()
+
+    if fallas:
+        for falla in fallas:
+            print(f"  ¡{falla}!")
+        return 1
+    print("  Totales por período idénticos; auditoría y eventos completos.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
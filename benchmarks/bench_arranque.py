@@ -0,0 +1,132 @@
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_arranque.py: tiempo de arranque en frío del backend.
+
+Mide, en procesos nuevos (como lo lanza Electron):
+- importacion        → `import backend.main`
+- primera_respuesta  → desde el spawn hasta el primer 200 de /health
+- primer_listado     → desde el spawn hasta el primer 200 de /prestamos
+
+Funciona como chequeo: con --max-primera-respuesta-ms sale con código 1
+si la mediana supera el límite.
+
+    python -m benchmarks.bench_arranque --repeticiones 5 --max-primera-respuesta-ms 3000
+"""
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODIGO_IMPORTACION = (
+    "import time; t = time.perf_counter(); import backend.main; "
+    "print(time.perf_counter() - t)"
+)
+
+CODIGO_SERVIDOR = (
+    "import sys, uvicorn; from backend.main import app; "
+    "uvicorn.run(app, host='127.0.0.1', port=int(sys.argv[1]), log_level='warning')"
+)
+
+
+def _entorno_aislado() -> dict:
+    env = dict(os.environ)
+    env["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="prestamos_arranque_")
+    env["PYTHONPATH"] = RAIZ + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_200(url: str, limite: float) -> float | None:
+    while time.perf_counter() < limite:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if r.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def medir_importacion() -> float:
+    salida = subprocess.run(
+        [sys.executable, "-c", CODIGO_IMPORTACION],
+        env=_entorno_aislado(), cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def medir_servidor(timeout: float = 30.0) -> tuple[float, float]:
+    puerto = _puerto_libre()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-c", CODIGO_SERVIDOR, str(puerto)],
+        env=_entorno_aislado(), cwd=RAIZ,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        limite = inicio + timeout
+        health = _esperar_200(f"http://127.0.0.1:{puerto}/health", limite)
+        listado = _esperar_200(f"http://127.0.0.1:{puerto}/prestamos", limite)
+        if health is None or listado is None:
+            raise RuntimeError("El backend no respondió dentro del timeout")
+        return health - inicio, listado - inicio
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=10)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--max-importacion-ms", type=float, default=None)
+    parser.add_argument("--max-primera-respuesta-ms", type=float, default=None)
+    parser.add_argument("--salida", default=None)
+    args = parser.parse_args(argv)
+
+    importaciones, healths, listados = [], [], []
+    for _ in range(args.repeticiones):
+        importaciones.append(medir_importacion())
+        health, listado = medir_servidor()
+        healths.append(health)
+        listados.append(listado)
+
+    resultados = {
+        "arranque.importacion": resumir(importaciones),
+        "arranque.primera_respuesta": resumir(healths),
+        "arranque.primer_listado": resumir(listados),
+    }
+    for nombre, r in resultados.items():
+        print(f"  {nombre:<28} mediana {r['mediana_ms']:>10.1f} ms   max {r['max_ms']:>10.1f} ms")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    print(f"Resultados guardados en {guardar_resultados(resultados, parametros, args.salida)}")
+
+    fallas = []
+    if args.max_importacion_ms is not None and \
+            resultados["arranque.importacion"]["mediana_ms"] > args.max_importacion_ms:
+        fallas.append("importacion")
+    if args.max_primera_respuesta_ms is not None and \
+            resultados["arranque.primera_respuesta"]["mediana_ms"] > args.max_primera_respuesta_ms:
+        fallas.append("primera_respuesta")
+    for f in fallas:
+        print(f"✗ {f} supera el límite")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
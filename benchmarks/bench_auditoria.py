@@ -0,0 +1,164 @@
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_auditoria.py: costo de la auditoría en el camino de escritura
+(backend/auditoria.py).
+
+1. Genera una cartera sintética.
+2. Hace --operaciones escrituras por HTTP (POST /prestamos y
+   PUT /prestamos/{id}/cobrar alternados), intercalando de a una con la
+   auditoría encendida y apagada para que el ruido afecte igual a los dos.
+3. Reporta la latencia de cada modo y cuánto agrega la auditoría (mediana).
+
+Verifica que:
+- cada escritura auditada dejó su fila (creado / actualizado), con el
+  usuario de X-Usuario, la ruta de origen y los valores de antes y después;
+- las no auditadas no dejaron nada;
+- un cambio de tarifa (POST /tarifas) deja el alta de la nueva y el
+  cierre (vigente_hasta) de la anterior;
+- el sobrecosto de la mediana no pasa de --tolerancia (%).
+
+Termina con código 1 si algo no se cumple.
+
+Ejemplo:
+    python -m benchmarks.bench_auditoria --operaciones 2000
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Sobrecosto de la auditoría en las escrituras")
+    parser.add_argument("--operaciones", type=int, default=1_000, help="Escrituras por modo")
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--tolerancia", type=float, default=5.0, help="Sobrecosto máximo de la mediana (%%)")
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    from fastapi.testclient import TestClient
+    from backend import auditoria
+    from backend.database import SessionLocal, inicializar_esquema
+    from backend.main import app
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    cartera = generar_cartera(db, clientes=args.clientes, prestamos=args.operaciones * 3,
+                              inversores=0, archivos_por_cliente=0)
+    db.close()
+    habilitados = cartera["cliente_ids_habilitados"]
+    pendientes = iter(cartera["prestamo_ids_pendientes"])
+    print(f"Base en {directorio}: {args.operaciones} escrituras por modo")
+
+    tiempos = {True: [], False: []}
+    hechas = {True: [], False: []}  # (entidad_id, accion, ruta)
+    fallas = []
+    cabeceras = {"X-Usuario": "bench"}
+    with TestClient(app) as cliente:
+        for i in range(args.operaciones * 2):
+            activa = i % 2 == 0
+            auditoria.ACTIVA = activa
+            if (i // 2) % 2:
+                pid = next(pendientes)
+                ruta = f"/prestamos/{pid}/cobrar"
+                inicio = time.perf_counter()
+                r = cliente.put(ruta, json={"monto_cobrado_final": 1_000}, headers=cabeceras)
+                tiempos[activa].append(time.perf_counter() - inicio)
+                accion = "actualizado"
+            else:
+                ruta = "/prestamos"
+                inicio = time.perf_counter()
+                r = cliente.post(ruta, headers=cabeceras, json={
+                    "cliente_id": habilitados[i % len(habilitados)], "monto_prestado": 5_000, "plazo": 14,
+                })
+                tiempos[activa].append(time.perf_counter() - inicio)
+                accion = "creado"
+            if r.status_code != 200:
+                fallas.append(f"{ruta}: {r.status_code} {r.text[:100]}")
+                continue
+            hechas[activa].append((r.json()["id"], accion, ruta))
+        auditoria.ACTIVA = True
+
+        # Del lado de la API: lo encolado se escribe antes de responder
+        for pid, accion, ruta in hechas[True][:50]:
+            filas = cliente.get("/auditoria", params={"entidad": "prestamo", "id": pid}).json()
+            propias = [f for f in filas if f["accion"] == accion and f["origen"] == f"{'PUT' if accion == 'actualizado' else 'POST'} {ruta}"]
+            if not propias or propias[0]["usuario"] != "bench":
+                fallas.append(f"préstamo {pid}: sin fila de auditoría de {ruta}")
+            elif accion == "actualizado" and "total_cobrado" not in propias[0]["cambios"]:
+                fallas.append(f"préstamo {pid}: el cobro no registró total_cobrado")
+
+        # Cambio de tarifa: desde mañana, así no altera lo medido
+        anterior = next(t for t in cliente.get("/tarifas").json() if t["plazo"] == 14)
+        desde = date.today() + timedelta(days=1)
+        r = cliente.post("/tarifas", headers=cabeceras,
+                         json={"plazo": 14, "tasa": 0.45, "vigente_desde": desde.isoformat()})
+        if r.status_code != 200:
+            fallas.append(f"POST /tarifas: {r.status_code} {r.text[:100]}")
+        else:
+            def historial(tarifa_id):
+                h = cliente.get("/auditoria", params={"entidad": "tarifa", "id": tarifa_id})
+                return h.json() if h.status_code == 200 else []
+
+            alta, cierre = historial(r.json()["id"]), historial(anterior["id"])
+            if not any(f["accion"] == "creado" and f["usuario"] == "bench"
+                       and f["cambios"].get("tasa") == [None, 0.45] for f in alta):
+                fallas.append("la tarifa nueva no dejó su alta en la auditoría")
+            esperado = [None, (desde - timedelta(days=1)).isoformat()]
+            if not any(f["accion"] == "actualizado" and f["origen"] == "POST /tarifas"
+                       and f["cambios"].get("vigente_hasta") == esperado for f in cierre):
+                fallas.append("el cierre de la tarifa anterior no quedó en la auditoría")
+
+    auditoria.vaciar()
+    db = SessionLocal()
+    from backend import models
+    auditadas = {
+        (f.entidad_id, f.accion) for f in db.query(models.Auditoria).filter(models.Auditoria.entidad == "prestamo")
+    }
+    db.close()
+    faltan = [h for h in hechas[True] if (h[0], h[1]) not in auditadas]
+    sobran = [h for h in hechas[False] if (h[0], h[1]) in auditadas]
+    if faltan:
+        fallas.append(f"{len(faltan)} escrituras auditadas sin su fila")
+    if sobran:
+        fallas.append(f"{len(sobran)} escrituras sin auditar con fila")
+
+    resultados = {
+        "auditoria.sin": resumir(tiempos[False]),
+        "auditoria.con": resumir(tiempos[True]),
+        "auditoria.escritor": {"filas": auditoria.escritas, "lotes": auditoria.lotes},
+    }
+    sin, con = resultados["auditoria.sin"]["mediana_ms"], resultados["auditoria.con"]["mediana_ms"]
+    sobrecosto = (con - sin) / sin * 100
+    resultados["auditoria.sobrecosto_pct"] = round(sobrecosto, 2)
+    for nombre in ("sin", "con"):
+        m = resultados[f"auditoria.{nombre}"]
+        print(f"  {nombre:<4} n={m['n']:>5}  mediana {m['mediana_ms']:>8.3f} ms  p95 {m['p95_ms']:>8.3f} ms")
+    print(f"  sobrecosto de la mediana: {sobrecosto:+.2f} %  "
+          f"({auditoria.escritas} filas en {auditoria.lotes} lotes)")
+    if sobrecosto > args.tolerancia:
+        fallas.append(f"la auditoría agrega {sobrecosto:.1f} % (máximo {args.tolerancia} %)")
+
+    if fallas:
+        for falla in fallas[:10]:
+            print(f"  ¡{falla}!")
+        return 1
+    print("  Auditoría completa y barata.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
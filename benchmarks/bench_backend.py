@@ -0,0 +1,137 @@
+import argparse
+import itertools
+import sys
+
+from benchmarks import entorno
+from benchmarks.medicion import medir, guardar_resultados
+
+"""
+bench_backend.py: escenarios de los caminos críticos del backend.
+
+Cada escenario se mide dos veces:
+- crud.*  → función de crud.py con una sesión directa (consultas + cálculos)
+- http.*  → mismo caso vía FastAPI TestClient (suma validación y serialización)
+
+La diferencia entre ambos muestra cuánto cuesta la capa HTTP/pydantic.
+
+Ejemplo:
+    python -m benchmarks.bench_backend --clientes 1000 --prestamos 20000 --repeticiones 10
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks del backend de préstamos")
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--prestamos", type=int, default=5_000)
+    parser.add_argument("--inversores", type=int, default=50)
+    parser.add_argument("--archivos-por-cliente", type=int, default=2)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--solo", default=None, help="Prefijo de escenarios a correr (ej: crud. o http.listar)")
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+
+    # El aislamiento tiene que ocurrir antes de importar el backend
+    directorio = entorno.aislar()
+
+    from fastapi.testclient import TestClient
+    from backend import crud, schemas
+    from backend.database import SessionLocal, inicializar_esquema
+    from backend.main import app
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    cartera = generar_cartera(
+        db,
+        clientes=args.clientes,
+        prestamos=args.prestamos,
+        inversores=args.inversores,
+        archivos_por_cliente=args.archivos_por_cliente,
+        semilla=args.semilla,
+    )
+    print(
+        f"Cartera sintética en {directorio}: "
+        f"{cartera['clientes']} clientes, {cartera['prestamos']} préstamos, "
+        f"{cartera['inversores']} inversores, {cartera['archivos']} archivos"
+    )
+
+    cliente = TestClient(app)
+    habilitados = itertools.cycle(cartera["cliente_ids_habilitados"])
+    # Los escenarios de escritura consumen préstamos pendientes distintos
+    pendientes = iter(cartera["prestamo_ids_pendientes"])
+
+    def _crud(fn):
+        def paso(_):
+            fn()
+            db.expunge_all()
+        return paso
+
+    def _http(metodo, ruta_fn, json_fn=None):
+        def paso(i):
+            r = cliente.request(metodo, ruta_fn(i), json=json_fn(i) if json_fn else None)
+            r.raise_for_status()
+        return paso
+
+    escenarios = {
+        # Lecturas
+        "crud.listar_prestamos": _crud(lambda: crud.listar_prestamos(db)),
+        "crud.listar_clientes": _crud(lambda: [c.archivos for c in crud.listar_clientes(db)]),
+        "crud.listar_inversores": _crud(lambda: crud.listar_inversores(db)),
+        "http.listar_prestamos": _http("GET", lambda i: "/prestamos"),
+        "http.listar_clientes": _http("GET", lambda i: "/clientes"),
+        "http.listar_inversores": _http("GET", lambda i: "/inversores"),
+        # Escrituras
+        "crud.crear_prestamo": _crud(lambda: crud.crear_prestamo(
+            db, schemas.PrestamoCreate(cliente_id=next(habilitados), monto_prestado=50_000, plazo=14)
+        )),
+        "http.crear_prestamo": _http(
+            "POST", lambda i: "/prestamos",
+            lambda i: {"cliente_id": next(habilitados), "monto_prestado": 50_000, "plazo": 14},
+        ),
+        "crud.cobrar_prestamo": _crud(lambda: crud.cobrar_prestamo(db, next(pendientes), 60_000)),
+        "http.cobrar_prestamo": _http(
+            "PUT", lambda i: f"/prestamos/{next(pendientes)}/cobrar",
+            lambda i: {"monto_cobrado_final": 60_000},
+        ),
+        # Cierre de caja: 100 cobros por request (comparar con 100 × cobrar_prestamo)
+        "crud.cobrar_lote_100": _crud(lambda: crud.cobrar_lote(db, [
+            schemas.CobranzaItemIn(prestamo_id=next(pendientes), monto=60_000) for _ in range(100)
+        ])),
+        "http.cobrar_lote_100": _http(
+            "POST", lambda i: "/cobranzas/lote",
+            lambda i: [{"prestamo_id": next(pendientes), "monto": 60_000} for _ in range(100)],
+        ),
+        "crud.renovar_prestamo": _crud(lambda: crud.renovar_prestamo(db, next(pendientes), 10_000, 14, 0.40)),
+        "http.renovar_prestamo": _http(
+            "POST", lambda i: f"/prestamos/{next(pendientes)}/renovar",
+            lambda i: {"monto_renovado": 10_000, "plazo": 14, "tasa_interes": 0.40},
+        ),
+    }
+
+    resultados = {}
+    for nombre, paso in escenarios.items():
+        if args.solo and not nombre.startswith(args.solo):
+            continue
+        try:
+            resultados[nombre] = medir(paso, repeticiones=args.repeticiones)
+        except StopIteration:
+            print(f"  {nombre}: sin préstamos pendientes suficientes, se omite")
+            continue
+        r = resultados[nombre]
+        print(f"  {nombre:<28} mediana {r['mediana_ms']:>10.3f} ms   p95 {r['p95_ms']:>10.3f} ms")
+
+    db.close()
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_carga.py: cuántas cajas y tableros simultáneos aguanta un backend.
+
+Levanta el backend de verdad (uvicorn en localhost, con --workers) sobre
+una cartera sintética y lo carga con --usuarios operadores simultáneos.
+Cada operador repite una mezcla realista de operaciones, cada una con su
+peso en MEZCLA:
+- lecturas de tablero: listados, detalle de cliente, cohortes y /cambios;
+- escrituras de caja: POST /prestamos, cobrar, renovar y agregar-monto;
+- subida de archivos.
+
+Con --usuarios 1,4,16,32 corre un escalón de --duracion segundos por
+nivel. Por nivel y por ruta reporta:
+- throughput (requests/s);
+- latencia p50, p95 y p99;
+- cuántas respuestas fueron ok, conflicto (409), rechazo (otros 4xx),
+  ocupado (429/503), error (5xx) o falla de conexión / timeout.
+
+También cuenta los "database is locked" que el servidor dejó en su log.
+`sostenidos` es el nivel más alto con p95 total bajo --p95-max-ms y
+menos de 1 % de errores.
+
+El JSON (benchmarks/resultados/) tiene una entrada por nivel y ruta, p. ej.
+"carga.u16.PUT /prestamos/{id}/cobrar". Dos configuraciones se comparan con
+comparar.py (--metrica p95_ms, p99_ms...).
+
+El generador corre en esta misma máquina y también usa CPU. Para medir sin
+esa interferencia, levantar el backend en otra y usar --url: no se genera
+cartera, se usa la que haya.
+
+Ejemplos:
+    python -m benchmarks.bench_carga --usuarios 1,4,16,32 --duracion 20
+    python -m benchmarks.bench_carga --workers 4 --escritor-unico
+    python -m benchmarks.bench_carga --url http://192.168.0.10:8000 --usuarios 8
+"""
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Peso de cada operación en la mezcla (proporción de requests)
+MEZCLA = {
+    "GET /prestamos": 8,
+    "GET /clientes": 4,
+    "GET /clientes/{id}/completo": 14,
+    "GET /analitica/cohortes": 4,
+    "GET /cambios": 10,
+    "POST /prestamos": 15,
+    "PUT /prestamos/{id}/cobrar": 15,
+    "POST /prestamos/{id}/renovar": 6,
+    "PUT /prestamos/{id}/agregar-monto": 10,
+    "POST /clientes/{id}/archivos": 4,
+}
+
+RESULTADOS = ("ok", "conflicto", "rechazo", "ocupado", "error", "falla")
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Carga concurrente de operadores sobre el backend real")
+    parser.add_argument("--usuarios", default="1,4,16", help="Niveles de concurrencia, separados por coma")
+    parser.add_argument("--duracion", type=float, default=15.0, help="Segundos por nivel")
+    parser.add_argument("--pausa-ms", type=float, default=0.0,
+                        help="Pausa media entre operaciones de un operador (0 = sin pausa)")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--escritor-unico", action="store_true", help="PRESTAMOS_ESCRITOR_UNICO=1")
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--prestamos", type=int, default=5_000)
+    parser.add_argument("--archivo-kb", type=int, default=200, help="Tamaño de cada archivo subido")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por request (s)")
+    parser.add_argument("--p95-max-ms", type=float, default=500.0,
+                        help="p95 total por encima del cual un nivel se considera degradado")
+    parser.add_argument("--url", default=None, help="Backend ya levantado (no genera cartera)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+# =========================
+# SERVIDOR
+# =========================
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_200(url: str, limite: float) -> bool:
+    while time.perf_counter() < limite:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if r.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def _levantar(args, directorio: str) -> tuple[subprocess.Popen, str, str]:
+    puerto = _puerto_libre()
+    env = dict(os.environ)
+    env["PYTHONPATH"] = RAIZ + os.pathsep + env.get("PYTHONPATH", "")
+    env["WEB_CONCURRENCY"] = str(args.workers)
+    if args.escritor_unico:
+        env["PRESTAMOS_ESCRITOR_UNICO"] = "1"
+    log = os.path.join(directorio, "servidor.log")
+    with open(log, "wb") as salida:
+        proceso = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+             "--port", str(puerto), "--workers", str(args.workers),
+             "--log-level", "warning", "--no-access-log"],
+            env=env, cwd=RAIZ, stdout=salida, stderr=subprocess.STDOUT,
+        )
+    return proceso, f"http://127.0.0.1:{puerto}", log
+
+
+def _bloqueos_en_log(log: str | None) -> int:
+    if log is None or not os.path.exists(log):
+        return 0
+    with open(log, "rb") as f:
+        return f.read().count(b"database is locked")
+
+
+# =========================
+# OPERADORES
+# =========================
+
+class _Estado:
+    """Ids que comparten los operadores: clientes habilitados y préstamos pendientes."""
+
+    def __init__(self, clientes: list[int], pendientes: list[int], archivo: bytes):
+        self.clientes = clientes
+        self.pendientes = pendientes
+        self.archivo = archivo
+
+    def tomar_pendiente(self, rng: random.Random) -> int | None:
+        """Saca un préstamo pendiente (cobrar y renovar lo cierran)."""
+        if not self.pendientes:
+            return None
+        i = rng.randrange(len(self.pendientes))
+        self.pendientes[i], self.pendientes[-1] = self.pendientes[-1], self.pendientes[i]
+        return self.pendientes.pop()
+
+    def agregar_pendiente(self, respuesta) -> None:
+        self.pendientes.append(respuesta.json()["id"])
+
+
+def _peticion(ruta: str, estado: _Estado, rng: random.Random, cursor: list[int]):
+    """(método, url, kwargs, al_responder) de una operación, o None si no hay con qué hacerla."""
+    cliente_id = rng.choice(estado.clientes)
+    if ruta == "GET /prestamos":
+        return "GET", "/prestamos", {}, None
+    if ruta == "GET /clientes":
+        return "GET", "/clientes", {}, None
+    if ruta == "GET /clientes/{id}/completo":
+        return "GET", f"/clientes/{cliente_id}/completo", {}, None
+    if ruta == "GET /analitica/cohortes":
+        return "GET", "/analitica/cohortes", {}, None
+    if ruta == "GET /cambios":
+        # Cada tablero sigue su propio cursor, como el frontend
+        def _avanzar(r):
+            cursor[0] = r.json()["hasta"]
+        return "GET", "/cambios", {"params": {"desde": cursor[0]}}, _avanzar
+    if ruta == "POST /prestamos":
+        datos = {"cliente_id": cliente_id, "monto_prestado": rng.choice((5_000, 10_000, 20_000)), "plazo": 14}
+        return "POST", "/prestamos", {"json": datos}, estado.agregar_pendiente
+    if ruta == "POST /clientes/{id}/archivos":
+        archivos = {"file": ("comprobante.jpg", estado.archivo, "image/jpeg")}
+        return "POST", f"/clientes/{cliente_id}/archivos", {"params": {"tipo": "comprobante"}, "files": archivos}, None
+    if ruta == "PUT /prestamos/{id}/agregar-monto":
+        if not estado.pendientes:
+            return None
+        pid = rng.choice(estado.pendientes)
+        return "PUT", f"/prestamos/{pid}/agregar-monto", {"json": {"monto_extra": 1_000}}, None
+    pid = estado.tomar_pendiente(rng)
+    if pid is None:
+        return None
+    if ruta == "PUT /prestamos/{id}/cobrar":
+        return "PUT", f"/prestamos/{pid}/cobrar", {"json": {"monto_cobrado_final": 1_000}}, None
+    datos = {"monto_renovado": 500, "plazo": 14, "tasa_interes": 0.2}
+    return "POST", f"/prestamos/{pid}/renovar", {"json": datos}, estado.agregar_pendiente
+
+
+def _clasificar(codigo) -> str:
+    if isinstance(codigo, str):
+        return "falla"
+    if codigo < 400:
+        return "ok"
+    if codigo == 409:
+        return "conflicto"
+    if codigo in (429, 503):
+        return "ocupado"
+    if codigo < 500:
+        return "rechazo"
+    return "error"
+
+
+async def _operador(cliente, estado: _Estado, rng: random.Random, fin: float,
+                    pausa_s: float, registro: dict) -> None:
+    import httpx
+
+    rutas, pesos = list(MEZCLA), list(MEZCLA.values())
+    cursor = [0]
+    while time.perf_counter() < fin:
+        ruta = rng.choices(rutas, pesos)[0]
+        peticion = _peticion(ruta, estado, rng, cursor)
+        if peticion is None:
+            continue
+        metodo, url, kwargs, al_responder = peticion
+        inicio = time.perf_counter()
+        try:
+            r = await cliente.request(metodo, url, **kwargs)
+            codigo = r.status_code
+        except httpx.TimeoutException:
+            codigo = "timeout"
+        except httpx.TransportError:
+            codigo = "conexion"
+        duracion = time.perf_counter() - inicio
+        registro.setdefault(ruta, []).append((duracion, _clasificar(codigo)))
+        if codigo == 200 and al_responder is not None:
+            al_responder(r)
+        if pausa_s:
+            await asyncio.sleep(rng.expovariate(1 / pausa_s))
+
+
+async def _nivel(url: str, usuarios: int, args, estado: _Estado) -> tuple[dict, float]:
+    import httpx
+
+    registro: dict[str, list] = {}
+    limites = httpx.Limits(max_connections=usuarios, max_keepalive_connections=usuarios)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limites) as cliente:
+        inicio = time.perf_counter()
+        fin = inicio + args.duracion
+        await asyncio.gather(*(
+            _operador(cliente, estado, random.Random(args.semilla * 1_000 + u), fin,
+                      args.pausa_ms / 1000, registro)
+            for u in range(usuarios)
+        ))
+        transcurrido = time.perf_counter() - inicio
+    return registro, transcurrido
+
+
+def _resumen(muestras: list[tuple], segundos: float) -> dict:
+    resumen = resumir(d for d, _ in muestras)
+    resumen["rps"] = round(len(muestras) / segundos, 2)
+    for resultado in RESULTADOS:
+        resumen[resultado] = sum(1 for _, r in muestras if r == resultado)
+    return resumen
+
+
+# =========================
+# CARTERA
+# =========================
+
+def _sembrar(args) -> None:
+    from backend.database import SessionLocal, engine, inicializar_esquema
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    generar_cartera(db, clientes=args.clientes, prestamos=args.prestamos, inversores=20,
+                    archivos_por_cliente=1, semilla=args.semilla)
+    db.close()
+    engine.dispose()
+
+
+def _descubrir(url: str, archivo: bytes) -> _Estado:
+    """Clientes habilitados y préstamos pendientes, pedidos a la API (sirve también con --url)."""
+    import httpx
+
+    with httpx.Client(base_url=url, timeout=120) as cliente:
+        clientes = [c["id"] for c in cliente.get("/clientes").raise_for_status().json()]
+        prestamos = cliente.get("/prestamos").raise_for_status().json()
+    bloqueados = {p["cliente_id"] for p in prestamos if p["estado_pago"] == "BLOQUEADO"}
+    pendientes = [p["id"] for p in prestamos if p["estado_pago"] == "PENDIENTE"]
+    return _Estado([c for c in clientes if c not in bloqueados], pendientes, archivo)
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    niveles = [int(n) for n in args.usuarios.split(",") if n.strip()]
+
+    proceso, log = None, None
+    if args.url is None:
+        directorio = entorno.aislar()
+        _sembrar(args)
+        proceso, url, log = _levantar(args, directorio)
+        print(f"Cartera de {args.prestamos:,} préstamos en {directorio}; "
+              f"uvicorn con {args.workers} worker(s) en {url}")
+    else:
+        url = args.url.rstrip("/")
+        print(f"Backend en {url}")
+
+    try:
+        if not _esperar_200(f"{url}/health", time.perf_counter() + 120):
+            print("  ¡El backend no respondió /health!")
+            return 1
+        estado = _descubrir(url, random.Random(args.semilla).randbytes(args.archivo_kb * 1024))
+        print(f"  {len(estado.clientes)} clientes habilitados, {len(estado.pendientes)} préstamos pendientes")
+
+        resultados = {}
+        sostenidos = 0
+        for usuarios in niveles:
+            bloqueos_antes = _bloqueos_en_log(log)
+            registro, segundos = asyncio.run(_nivel(url, usuarios, args, estado))
+            todas = [m for muestras in registro.values() for m in muestras]
+            total = _resumen(todas, segundos)
+            total["sqlite_busy"] = _bloqueos_en_log(log) - bloqueos_antes
+            resultados[f"carga.u{usuarios}.total"] = total
+            for ruta in MEZCLA:
+                if ruta in registro:
+                    resultados[f"carga.u{usuarios}.{ruta}"] = _resumen(registro[ruta], segundos)
+
+            errores = total["error"] + total["falla"]
+            degradado = total["p95_ms"] > args.p95_max_ms or errores > 0.01 * total["n"]
+            if not degradado:
+                sostenidos = max(sostenidos, usuarios)
+            print(f"\n  {usuarios} usuarios: {total['rps']:.1f} req/s  p50 {total['mediana_ms']:.1f}  "
+                  f"p95 {total['p95_ms']:.1f}  p99 {total['p99_ms']:.1f} ms  "
+                  f"({total['conflicto']} 409, {total['ocupado']} ocupado, {errores} errores, "
+                  f"{total['sqlite_busy']} busy){'  ← degradado' if degradado else ''}")
+            for ruta in MEZCLA:
+                m = resultados.get(f"carga.u{usuarios}.{ruta}")
+                if m:
+                    print(f"    {ruta:<36} {m['rps']:>7.1f}/s  p50 {m['mediana_ms']:>8.1f}  "
+                          f"p95 {m['p95_ms']:>8.1f}  p99 {m['p99_ms']:>8.1f} ms  "
+                          f"no-ok {m['n'] - m['ok']}")
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+    resultados["carga.sostenidos"] = {"usuarios": sostenidos, "p95_max_ms": args.p95_max_ms}
+    print(f"\n  Sostenidos sin degradar: {sostenidos} usuarios (p95 < {args.p95_max_ms:.0f} ms, < 1 % errores)")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0 if sostenidos else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
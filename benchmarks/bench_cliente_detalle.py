@@ -0,0 +1,87 @@
+import argparse
+import sys
+import time
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_cliente_detalle.py: costo del detalle de un cliente.
+
+Antes el detalle necesitaba GET /clientes/{id} y el listado completo de
+GET /prestamos (filtrado en el navegador): crecía con la cartera entera.
+GET /clientes/{id}/completo (crud.obtener_cliente_completo) hace tres
+consultas indexadas por cliente_id y solo depende de los préstamos del
+cliente.
+
+Mide los dos caminos para los mismos clientes y verifica que devuelven
+los mismos préstamos. Correrlo con distintos --prestamos muestra que el
+endpoint nuevo no cambia con el tamaño de la cartera.
+
+Ejemplo:
+    python -m benchmarks.bench_cliente_detalle --prestamos 100000
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Detalle de cliente: listado completo vs endpoint compuesto")
+    parser.add_argument("--clientes", type=int, default=2_000)
+    parser.add_argument("--prestamos", type=int, default=50_000)
+    parser.add_argument("--muestras", type=int, default=20, help="Clientes medidos")
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    from backend import crud
+    from backend.database import SessionLocal, inicializar_esquema
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    cartera = generar_cartera(db, clientes=args.clientes, prestamos=args.prestamos, inversores=0,
+                              archivos_por_cliente=2)
+    db.close()
+    print(f"Cartera sintética en {directorio}")
+    clientes = cartera["cliente_ids_habilitados"][:args.muestras]
+
+    def _antes(db, cliente_id: int) -> list[int]:
+        crud.obtener_cliente(db, cliente_id)
+        return [p.id for p in crud.listar_prestamos(db) if p.cliente_id == cliente_id]
+
+    def _despues(db, cliente_id: int) -> list[int]:
+        return [p.id for p in crud.obtener_cliente_completo(db, cliente_id)["prestamos"]]
+
+    resultados = {}
+    devueltos = {}
+    for nombre, funcion in (("antes", _antes), ("completo", _despues)):
+        tiempos = []
+        for cliente_id in clientes:
+            db = SessionLocal()
+            try:
+                inicio = time.perf_counter()
+                ids = funcion(db, cliente_id)
+                tiempos.append(time.perf_counter() - inicio)
+            finally:
+                db.close()
+            devueltos.setdefault(cliente_id, []).append(sorted(ids))
+        r = resumir(tiempos)
+        resultados[f"cliente_detalle.{nombre}"] = r
+        print(f"  {nombre:<10} mediana {r['mediana_ms']:>9.2f} ms")
+
+    distintos = [c for c, (a, b) in devueltos.items() if a != b]
+    if distintos:
+        print(f"  ¡{len(distintos)} clientes con préstamos distintos entre los dos caminos!")
+        return 1
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
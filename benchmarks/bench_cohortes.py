@@ -0,0 +1,157 @@
+import argparse
+import sys
+import time
+from datetime import date
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_cohortes.py: GET /analitica/cohortes sobre una cartera de varios años
+(backend/analitica.py).
+
+- frio     → primera consulta: se calculan todas las cohortes
+- caliente → cohortes cerradas desde caché; solo se recalculan las abiertas
+
+Además compara el resultado contra un cálculo de referencia en Python
+(mismas reglas, préstamo por préstamo). Si no coinciden termina con código 1.
+
+Ejemplo:
+    python -m benchmarks.bench_cohortes --prestamos 200000 --meses 60
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Cohortes por período de origen")
+    parser.add_argument("--clientes", type=int, default=2_000)
+    parser.add_argument("--prestamos", type=int, default=100_000)
+    parser.add_argument("--meses", type=int, default=48)
+    parser.add_argument("--archivar", action="store_true", help="Archivar antes (cohortes viejas en prestamos_archivo)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def _referencia(filas, hoy: date, horizontes) -> dict:
+    """{(periodo, h): {estado: cantidad}} préstamo por préstamo."""
+    conteo: dict = {}
+    for periodo, creacion, vencimiento, estado, pago in filas:
+        if periodo is None or creacion is None:
+            continue
+        for h in horizontes:
+            if (hoy - creacion).days < h:
+                continue
+            cierre = (pago - creacion).days if pago else None
+            if estado == "SI" and cierre is not None and cierre <= h:
+                clave = "pagado"
+            elif estado == "RENOVADO" and cierre is not None and cierre <= h:
+                clave = "renovado"
+            elif (vencimiento - creacion).days >= h:
+                clave = "al_dia"
+            elif estado == "BLOQUEADO":
+                clave = "bloqueado"
+            else:
+                clave = "vencido"
+            destino = conteo.setdefault((periodo, h), {})
+            destino[clave] = destino.get(clave, 0) + 1
+    return conteo
+
+
+def diferencias(cohortes: list[dict], filas, hoy: date, horizontes, estados) -> int:
+    """
+    Cuántos valores de `cohortes` (analitica.cohortes) no coinciden con la
+    referencia calculada sobre `filas`. También lo usa verificar_postgres.
+    """
+    referencia = _referencia(filas, hoy, horizontes)
+    fallas = 0
+    cantidades: dict = {}
+    for fila in filas:
+        cantidades[fila[0]] = cantidades.get(fila[0], 0) + 1
+    for cohorte in cohortes:
+        if cohorte["cantidad"] != cantidades.get(cohorte["periodo_origen"]):
+            fallas += 1
+        for horizonte in cohorte["horizontes"]:
+            esperado = referencia.get((cohorte["periodo_origen"], horizonte["dias"]), {})
+            observados = sum(esperado.values())
+            if observados != horizonte["observados"]:
+                fallas += 1
+                continue
+            for estado in estados:
+                proporcion = round(esperado.get(estado, 0) / observados, 4) if observados else 0.0
+                if proporcion != horizonte[estado]:
+                    fallas += 1
+    return fallas
+
+
+def filas_de_referencia(db) -> list:
+    """(periodo, creación, vencimiento, estado, pago) de prestamos y prestamos_archivo."""
+    from sqlalchemy import select, union_all
+    from backend import models
+
+    columnas = ("periodo_origen", "fecha_creacion", "fecha_vencimiento", "estado_pago", "fecha_pago")
+    tablas = (models.Prestamo.__table__, models.PrestamoArchivado.__table__)
+    return db.execute(union_all(*[select(*[t.c[c] for c in columnas]) for t in tablas])).all()
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    from backend import analitica, archivo
+    from backend.database import SessionLocal, inicializar_esquema
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    generar_cartera(
+        db, clientes=args.clientes, prestamos=args.prestamos, inversores=0,
+        archivos_por_cliente=0, meses=args.meses,
+    )
+    db.close()
+    if args.archivar:
+        print(f"  archivados: {archivo.archivar_cerrados(365):,}")
+    print(f"Cartera sintética en {directorio}")
+
+    def _correr():
+        sesion = SessionLocal()
+        try:
+            return analitica.cohortes(sesion)
+        finally:
+            sesion.close()
+
+    resultados = {}
+    for modo in ("frio", "caliente"):
+        tiempos = []
+        for _ in range(args.repeticiones):
+            if modo == "frio":
+                analitica.invalidar()
+            inicio = time.perf_counter()
+            cohortes = _correr()
+            tiempos.append(time.perf_counter() - inicio)
+        r = resumir(tiempos)
+        r["cohortes"] = len(cohortes)
+        r["cerradas"] = sum(c["cerrada"] for c in cohortes)
+        resultados[f"cohortes.{modo}"] = r
+        print(
+            f"  {modo:<9} {len(cohortes):>4} cohortes ({r['cerradas']} cerradas)   "
+            f"mediana {r['mediana_ms']:>8.2f} ms   p95 {r['p95_ms']:>8.2f} ms"
+        )
+
+    # Verificación contra la referencia
+    db = SessionLocal()
+    filas = filas_de_referencia(db)
+    db.close()
+    fallas = diferencias(cohortes, filas, date.today(), analitica.HORIZONTES, analitica.ESTADOS)
+    if fallas:
+        print(f"  ¡{fallas} valores no coinciden con la referencia!")
+        return 1
+    print("  Coincide con el cálculo de referencia.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+import zipfile
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_documentos.py: ZIP de los archivos de clientes armado al vuelo
+(backend/documentos.py).
+
+1. Crea --clientes clientes y les sube --archivos archivos de --mb MB
+   cada uno por POST /clientes/{id}/archivos (contenido aleatorio, como
+   una foto: no se comprime).
+2. Descarga GET /clientes/{id}/archivos.zip de cada uno y el ZIP de todos
+   juntos (GET /clientes/archivos.zip?ids=...) y mide el tiempo y el MB/s.
+3. Genera el ZIP de todos sin HTTP midiendo con tracemalloc el pico de
+   memoria de Python: debe depender del bloque de lectura, no del total.
+
+Verifica que los ZIP abren, pasan testzip() y traen exactamente los bytes
+subidos, que un archivo borrado del disco aparece en FALTANTES.txt y que
+no quedaron archivos temporales. Termina con código 1 si algo no se cumple.
+
+Ejemplo:
+    python -m benchmarks.bench_documentos --clientes 20 --archivos 4 --mb 2
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="ZIP de archivos de clientes en streaming")
+    parser.add_argument("--clientes", type=int, default=10)
+    parser.add_argument("--archivos", type=int, default=3, help="Archivos por cliente")
+    parser.add_argument("--mb", type=float, default=2.0, help="Tamaño de cada archivo (MB)")
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def _archivos_en(directorio: str) -> set[str]:
+    return {os.path.join(r, f) for r, _, fs in os.walk(directorio) for f in fs}
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    from fastapi.testclient import TestClient
+    from backend import documentos
+    from backend.database import SessionLocal
+    from backend.main import app, UPLOAD_ROOT
+
+    tamano = int(args.mb * 1e6)
+    fallas = []
+    subidos: dict[int, dict[str, bytes]] = {}
+    resultados = {}
+    with TestClient(app) as cliente:
+        for c in range(args.clientes):
+            r = cliente.post("/clientes", json={
+                "nombre_completo": f"Cliente {c}", "dni": str(c), "direccion": "-", "telefono": "-",
+            })
+            cid = r.json()["id"]
+            subidos[cid] = {}
+            for a in range(args.archivos):
+                contenido = os.urandom(tamano)
+                r = cliente.post(f"/clientes/{cid}/archivos", params={"tipo": f"doc{a}"},
+                                 files={"file": (f"foto_{a}.jpg", contenido)})
+                r.raise_for_status()
+                subidos[cid][f"doc{a}_foto_{a}.jpg"] = contenido
+        total_mb = args.clientes * args.archivos * tamano / 1e6
+        print(f"{args.clientes} clientes x {args.archivos} archivos de {args.mb} MB en {directorio}")
+        antes = _archivos_en(directorio)
+
+        tiempos = []
+        for cid, esperados in subidos.items():
+            inicio = time.perf_counter()
+            r = cliente.get(f"/clientes/{cid}/archivos.zip")
+            tiempos.append(time.perf_counter() - inicio)
+            zf = zipfile.ZipFile(io.BytesIO(r.content))
+            if zf.testzip() is not None or {n: zf.read(n) for n in zf.namelist()} != esperados:
+                fallas.append(f"el ZIP del cliente {cid} no coincide con lo subido")
+        resultados["documentos.cliente"] = resumir(tiempos)
+
+        ids = list(subidos)
+        inicio = time.perf_counter()
+        r = cliente.get("/clientes/archivos.zip", params={"ids": ids})
+        duracion = time.perf_counter() - inicio
+        zf = zipfile.ZipFile(io.BytesIO(r.content))
+        esperados = {f"cliente_{cid}/{n}": b for cid, archivos in subidos.items() for n, b in archivos.items()}
+        if zf.testzip() is not None or {n: zf.read(n) for n in zf.namelist()} != esperados:
+            fallas.append("el ZIP de varios clientes no coincide con lo subido")
+        resultados["documentos.varios"] = {"segundos": round(duracion, 3), "mb_s": round(total_mb / duracion, 1)}
+
+        if cliente.get("/clientes/archivos.zip", params={"ids": [ids[0], 999_999]}).status_code != 404:
+            fallas.append("un cliente inexistente no dio 404")
+
+        # Un archivo borrado del disco no corta la descarga
+        borrado = os.path.join(UPLOAD_ROOT, "clientes", str(ids[0]), "doc0_foto_0.jpg")
+        os.remove(borrado)
+        zf = zipfile.ZipFile(io.BytesIO(cliente.get(f"/clientes/{ids[0]}/archivos.zip").content))
+        if "doc0_foto_0.jpg" not in zf.read("FALTANTES.txt").decode():
+            fallas.append("el archivo borrado no aparece en FALTANTES.txt")
+        if _archivos_en(directorio) != antes - {borrado}:
+            fallas.append("la descarga dejó archivos en disco")
+
+    # Pico de memoria de Python generando el ZIP completo, sin HTTP
+    db = SessionLocal()
+    archivos = documentos.entradas(db, ids, UPLOAD_ROOT, por_cliente=True)
+    db.close()
+    tracemalloc.start()
+    enviados = sum(len(parte) for parte in documentos.generar_zip(archivos))
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    resultados["documentos.memoria"] = {"zip_mb": round(enviados / 1e6, 1), "pico_mb": round(pico / 1e6, 2)}
+    if pico > 4 * max(documentos.BLOQUE_BYTES, 1 << 20):
+        fallas.append(f"pico de memoria de {pico / 1e6:.1f} MB para un ZIP de {enviados / 1e6:.0f} MB")
+
+    m = resultados["documentos.cliente"]
+    print(f"  un cliente       n={m['n']:>4}  mediana {m['mediana_ms']:>8.2f} ms  p95 {m['p95_ms']:>8.2f} ms")
+    v = resultados["documentos.varios"]
+    print(f"  todos ({total_mb:.0f} MB)  {v['segundos']:.2f} s  ({v['mb_s']} MB/s)")
+    mem = resultados["documentos.memoria"]
+    print(f"  memoria: pico {mem['pico_mb']} MB para un ZIP de {mem['zip_mb']} MB")
+
+    if fallas:
+        for falla in fallas:
+            print(f"  ¡{falla}!")
+        return 1
+    print("  ZIP completo, íntegro y en memoria acotada.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
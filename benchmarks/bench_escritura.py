@@ -0,0 +1,142 @@
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_escritura.py: throughput de escrituras concurrentes, con y sin el
+escritor único con group commit (backend/escritura.py).
+
+Cada hilo simula un worker del threadpool de FastAPI y hace una mezcla de
+crear_prestamo y cobrar_prestamo sobre préstamos distintos:
+- directo   → cada operación con su sesión y su commit (comportamiento por defecto)
+- escritor  → cada operación se encola en el escritor único y espera el commit del lote
+
+Se reporta operaciones/s, latencia por operación, errores (SQLITE_BUSY u
+otros) y cuántos commits hizo el escritor (un fsync por lote).
+
+El fsync domina solo si la base está en disco real: con --directorio se
+elige dónde crearla (por defecto un temporal, que puede ser tmpfs).
+
+Ejemplo:
+    python -m benchmarks.bench_escritura --hilos 32 --operaciones 200
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Throughput de escritura: directo vs escritor único")
+    parser.add_argument("--hilos", type=int, default=16)
+    parser.add_argument("--operaciones", type=int, default=100, help="Operaciones por hilo y por modo")
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--directorio", default=None, help="Directorio de la base (disco real para medir fsync)")
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar(args.directorio)
+
+    from sqlalchemy.exc import OperationalError
+    from backend import crud, schemas
+    from backend.database import SessionLocal, engine, inicializar_esquema
+    from backend.escritura import Escritor
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    total_por_modo = args.hilos * args.operaciones
+    db = SessionLocal()
+    cartera = generar_cartera(
+        db, clientes=args.clientes, prestamos=total_por_modo * 3,
+        inversores=0, archivos_por_cliente=0,
+    )
+    db.close()
+    habilitados = cartera["cliente_ids_habilitados"]
+    pendientes = iter(cartera["prestamo_ids_pendientes"])
+    print(f"Base en {directorio}: {args.hilos} hilos x {args.operaciones} operaciones por modo")
+
+    def _operaciones_del_hilo(h: int) -> list:
+        ops = []
+        for i in range(args.operaciones):
+            if i % 2:
+                pid = next(pendientes)
+                ops.append(lambda s, pid=pid: crud.cobrar_prestamo(s, pid, 1_000))
+            else:
+                cid = habilitados[(h * args.operaciones + i) % len(habilitados)]
+                ops.append(lambda s, cid=cid: crud.crear_prestamo(
+                    s, schemas.PrestamoCreate(cliente_id=cid, monto_prestado=5_000, plazo=14)
+                ))
+        return ops
+
+    def _directo(op):
+        s = SessionLocal()
+        try:
+            op(s)
+        finally:
+            s.close()
+
+    def _correr(modo: str, ejecutar) -> dict:
+        trabajos = [_operaciones_del_hilo(h) for h in range(args.hilos)]
+        latencias: list[float] = []
+        errores: dict[str, int] = {}
+        lock = threading.Lock()
+        barrera = threading.Barrier(args.hilos)
+
+        def _hilo(ops):
+            propias, propios_errores = [], {}
+            barrera.wait()
+            for op in ops:
+                t0 = time.perf_counter()
+                try:
+                    ejecutar(op)
+                except OperationalError:
+                    propios_errores["bloqueada"] = propios_errores.get("bloqueada", 0) + 1
+                except Exception as e:
+                    clave = type(e).__name__
+                    propios_errores[clave] = propios_errores.get(clave, 0) + 1
+                propias.append(time.perf_counter() - t0)
+            with lock:
+                latencias.extend(propias)
+                for k, n in propios_errores.items():
+                    errores[k] = errores.get(k, 0) + n
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.hilos) as pool:
+            list(pool.map(_hilo, trabajos))
+        duracion = time.perf_counter() - inicio
+
+        resultado = resumir(latencias)
+        resultado["ops_por_segundo"] = round(len(latencias) / duracion, 1)
+        resultado["segundos"] = round(duracion, 3)
+        resultado["errores"] = errores
+        print(
+            f"  {modo:<10} {resultado['ops_por_segundo']:>9.1f} ops/s   "
+            f"mediana {resultado['mediana_ms']:>8.2f} ms   p95 {resultado['p95_ms']:>8.2f} ms   "
+            f"errores {sum(errores.values())}"
+        )
+        return resultado
+
+    resultados = {"escritura.directo": _correr("directo", _directo)}
+
+    escritor = Escritor(engine, SessionLocal)
+    escritor.iniciar()
+    resultados["escritura.escritor"] = _correr("escritor", escritor.ejecutar)
+    escritor.detener()
+    resultados["escritura.escritor"]["commits"] = escritor.lotes
+    print(
+        f"  escritor: {escritor.unidades} operaciones en {escritor.lotes} commits "
+        f"({escritor.unidades / max(1, escritor.lotes):.1f} por commit)"
+    )
+
+    parametros = {k: v for k, v in vars(args).items() if k not in ("salida", "directorio")}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import argparse
+import sys
+
+from benchmarks import entorno
+from benchmarks.medicion import medir, guardar_resultados
+
+"""
+bench_formatos.py: costo de serialización y bytes en el cable de los listados.
+
+Compara, para /prestamos, /clientes e /inversores:
+- json / columnar / msgpack
+- sin compresión / gzip / br
+La columna `bytes` es el tamaño del cuerpo tal como viaja (content-length).
+
+Al final verifica que el cuerpo msgpack decodificado sea igual al columnar
+JSON y que GET /metrics cuente las filas de cada listado.
+
+    python -m benchmarks.bench_formatos --prestamos 20000
+"""
+
+RUTAS = ("/prestamos", "/clientes", "/inversores")
+FORMATOS = ("json", "columnar", "msgpack")
+CODIFICACIONES = ("identity", "gzip", "br")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de formatos de respuesta")
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--prestamos", type=int, default=5_000)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--salida", default=None)
+    args = parser.parse_args(argv)
+
+    entorno.aislar()
+
+    from fastapi.testclient import TestClient
+    from backend.database import SessionLocal, inicializar_esquema
+    from backend.main import app
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    with SessionLocal() as db:
+        generar_cartera(db, clientes=args.clientes, prestamos=args.prestamos, semilla=args.semilla)
+
+    cliente = TestClient(app)
+    resultados = {}
+
+    for ruta in RUTAS:
+        for formato in FORMATOS:
+            for codificacion in CODIFICACIONES:
+                headers = {"Accept-Encoding": codificacion}
+                url = f"{ruta}?formato={formato}"
+
+                r = cliente.get(url, headers=headers)
+                if r.status_code != 200:
+                    print(f"  {url} [{codificacion}]: {r.status_code}, se omite")
+                    continue
+                if codificacion != "identity" and r.headers.get("content-encoding") != codificacion:
+                    print(f"  {url} [{codificacion}]: codificación no disponible, se omite")
+                    continue
+
+                def paso(_):
+                    cliente.get(url, headers=headers).raise_for_status()
+
+                nombre = f"{ruta.strip('/')}.{formato}.{codificacion}"
+                resultados[nombre] = medir(paso, repeticiones=args.repeticiones)
+                resultados[nombre]["bytes"] = int(r.headers.get("content-length", len(r.content)))
+                res = resultados[nombre]
+                print(f"  {nombre:<34} mediana {res['mediana_ms']:>9.2f} ms   {res['bytes']:>12,} bytes")
+
+    # ---------- msgpack decodificado y filas contadas ----------
+    import msgpack
+
+    fallas = []
+    for ruta in RUTAS:
+        columnar = cliente.get(f"{ruta}?formato=columnar")
+        empaquetado = cliente.get(ruta, headers={"Accept": "application/msgpack"})
+        if empaquetado.status_code != 200:
+            fallas.append(f"{ruta} en msgpack respondió {empaquetado.status_code}")
+        elif msgpack.unpackb(empaquetado.content, raw=False) != columnar.json():
+            fallas.append(f"{ruta} en msgpack no coincide con columnar")
+
+    metricas = cliente.get("/metrics").text
+    for ruta in RUTAS:
+        prefijo = f'prestamos_rows_serialized_total{{metodo="GET",ruta="{ruta}"}} '
+        filas = [int(l[len(prefijo):]) for l in metricas.splitlines() if l.startswith(prefijo)]
+        if not filas or filas[0] == 0:
+            fallas.append(f"/metrics no cuenta las filas de {ruta}")
+
+    if fallas:
+        for falla in fallas:
+            print(f"  ¡{falla}!")
+        return 1
+    print("  msgpack coincide con columnar; /metrics cuenta las filas.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    print(f"Resultados guardados en {guardar_resultados(resultados, parametros, args.salida)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
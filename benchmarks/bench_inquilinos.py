@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+import time
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_inquilinos.py: muchas carteras en un backend (backend/inquilinos.py).
+
+1. Crea --inquilinos carteras con un cliente cada una (con su nombre).
+2. Las recorre --vueltas veces, una request GET /t/{inquilino}/clientes
+   por cartera, con un LRU de --activos: la mayoría de las requests
+   abren un inquilino cerrado (engine nuevo), el resto lo reusa.
+3. Mide la latencia en frío (inquilino cerrado) y en caliente, y la
+   memoria (RSS) y los descriptores abiertos del proceso después de cada
+   vuelta: con el LRU no deben crecer con la cantidad de inquilinos.
+
+Verifica que cada inquilino ve solo su cliente y que nunca quedan más de
+--activos abiertos. Termina con código 1 si algo no se cumple.
+
+Ejemplo:
+    python -m benchmarks.bench_inquilinos --inquilinos 60 --activos 8
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Multi-inquilino: costo de abrir carteras y memoria acotada")
+    parser.add_argument("--inquilinos", type=int, default=40)
+    parser.add_argument("--activos", type=int, default=8, help="Tamaño del LRU de inquilinos abiertos")
+    parser.add_argument("--vueltas", type=int, default=3)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def _rss_mb() -> float | None:
+    """RSS actual (solo Linux, /proc)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return None
+
+
+def _descriptores() -> int | None:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+    os.environ["PRESTAMOS_INQUILINOS_ACTIVOS"] = str(args.activos)
+
+    from fastapi.testclient import TestClient
+    from backend import inquilinos
+    from backend.main import app
+
+    claves = [f"cartera-{i:03d}" for i in range(args.inquilinos)]
+    for clave in claves:
+        inquilinos.crear(clave)
+    print(f"{len(claves)} inquilinos en {directorio}")
+
+    fallas = []
+    frio, caliente = [], []
+    memoria = []
+    with TestClient(app) as cliente:
+        for clave in claves:
+            r = cliente.post(f"/t/{clave}/clientes", json={
+                "nombre_completo": clave, "dni": "1", "direccion": "-", "telefono": "-",
+            })
+            r.raise_for_status()
+
+        for vuelta in range(args.vueltas):
+            # Dos pasadas por el mismo inquilino: la segunda siempre lo encuentra abierto
+            for clave in claves:
+                for tiempos in (frio, caliente):
+                    inicio = time.perf_counter()
+                    r = cliente.get(f"/t/{clave}/clientes")
+                    tiempos.append(time.perf_counter() - inicio)
+                    nombres = [c["nombre_completo"] for c in r.json()]
+                    if nombres != [clave]:
+                        fallas.append(f"{clave} ve {nombres}")
+                abiertos = len(inquilinos.registro.estado()["abiertos"])
+                if abiertos > args.activos:
+                    fallas.append(f"{abiertos} inquilinos abiertos (máximo {args.activos})")
+            memoria.append({"vuelta": vuelta + 1, "rss_mb": _rss_mb(), "descriptores": _descriptores()})
+
+        estado = inquilinos.registro.estado()
+
+    resultados = {
+        "inquilinos.frio": resumir(frio),
+        "inquilinos.caliente": resumir(caliente),
+        "inquilinos.memoria": memoria,
+        "inquilinos.registro": {"aperturas": estado["aperturas"], "cierres": estado["cierres"]},
+    }
+    for nombre in ("frio", "caliente"):
+        m = resultados[f"inquilinos.{nombre}"]
+        print(f"  {nombre:<9} n={m['n']:>5}  mediana {m['mediana_ms']:>8.2f} ms  p95 {m['p95_ms']:>8.2f} ms")
+    for m in memoria:
+        rss = f"{m['rss_mb']:.1f} MB" if m["rss_mb"] is not None else "n/d"
+        print(f"  vuelta {m['vuelta']}: RSS {rss}, descriptores {m['descriptores']}")
+    print(f"  {estado['aperturas']} aperturas, {estado['cierres']} cierres")
+
+    if fallas:
+        for falla in fallas[:10]:
+            print(f"  ¡{falla}!")
+        return 1
+    print("  Inquilinos aislados y acotados.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_lecturas.py: listados con instancias ORM vs modelos de lectura
+(backend/lecturas.py).
+
+Para cada listado se mide el camino completo hasta los bytes JSON:
+- orm      → db.query(Modelo) + relaciones perezosas + cálculos + pydantic (from_attributes)
+- lectura  → consultas Core a objetos con __slots__ + cálculos + dicts directos a orjson
+
+Se reporta filas/s (mediana de varias corridas) y memoria pico por fila
+(tracemalloc, en una corrida aparte para no distorsionar los tiempos).
+
+Ejemplo:
+    python -m benchmarks.bench_lecturas --clientes 1000 --prestamos 20000
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Listados: ORM vs modelos de lectura")
+    parser.add_argument("--clientes", type=int, default=1_000)
+    parser.add_argument("--prestamos", type=int, default=20_000)
+    parser.add_argument("--inversores", type=int, default=200)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    import orjson
+    from pydantic import TypeAdapter
+    from backend import crud, lecturas, models, schemas
+    from backend.database import SessionLocal, inicializar_esquema
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    generar_cartera(db, clientes=args.clientes, prestamos=args.prestamos, inversores=args.inversores)
+    db.close()
+    print(f"Cartera sintética en {directorio}")
+
+    def _orm(modelo, schema, preparar=None):
+        adaptador = TypeAdapter(list[schema])
+
+        def correr():
+            sesion = SessionLocal()
+            try:
+                filas = sesion.query(modelo).order_by(modelo.id.desc()).all()
+                if preparar:
+                    for fila in filas:
+                        preparar(fila)
+                cuerpo = adaptador.dump_json(adaptador.validate_python(filas, from_attributes=True))
+                return len(filas), cuerpo
+            finally:
+                sesion.close()
+        return correr
+
+    def _lectura(listar, schema):
+        def correr():
+            sesion = SessionLocal()
+            try:
+                filas = listar(sesion)
+                cuerpo = orjson.dumps(lecturas.a_dicts(filas, schema))
+                return len(filas), cuerpo
+            finally:
+                sesion.close()
+        return correr
+
+    casos = {
+        "prestamos": (
+            _orm(models.Prestamo, schemas.PrestamoOut, crud.aplicar_finanzas),
+            _lectura(crud.listar_prestamos, schemas.PrestamoOut),
+        ),
+        "clientes": (
+            _orm(models.Cliente, schemas.ClienteOut),
+            _lectura(crud.listar_clientes, schemas.ClienteOut),
+        ),
+        "inversores": (
+            _orm(models.Inversor, schemas.InversorOut, crud.aplicar_calculos_inversor),
+            _lectura(crud.listar_inversores, schemas.InversorOut),
+        ),
+    }
+
+    resultados = {}
+    for listado, caminos in casos.items():
+        cuerpos = []
+        for modo, correr in zip(("orm", "lectura"), caminos):
+            correr()  # calentamiento
+            tiempos = []
+            for _ in range(args.repeticiones):
+                gc.collect()
+                inicio = time.perf_counter()
+                filas, cuerpo = correr()
+                tiempos.append(time.perf_counter() - inicio)
+
+            gc.collect()
+            tracemalloc.start()
+            correr()
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            r = resumir(tiempos)
+            r["filas"] = filas
+            r["filas_por_segundo"] = round(filas / (r["mediana_ms"] / 1000), 1) if r["mediana_ms"] else None
+            r["bytes_pico_por_fila"] = round(pico / max(1, filas), 1)
+            resultados[f"lecturas.{listado}.{modo}"] = r
+            cuerpos.append(orjson.loads(cuerpo))
+            print(
+                f"  {listado:<11} {modo:<8} {r['filas_por_segundo']:>12,.0f} filas/s   "
+                f"mediana {r['mediana_ms']:>9.2f} ms   pico {r['bytes_pico_por_fila']:>8,.0f} B/fila"
+            )
+        if cuerpos[0] != cuerpos[1]:
+            print(f"  ¡{listado}: la salida de los dos caminos NO coincide!")
+            return 1
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
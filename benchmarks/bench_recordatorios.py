@@ -0,0 +1,134 @@
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from itertools import islice
+
+from benchmarks import entorno
+from benchmarks.medicion import guardar_resultados
+
+"""
+bench_recordatorios.py: outbox de recordatorios de pago
+(backend/recordatorios.py).
+
+1. Genera una cartera de --prestamos préstamos.
+2. Escribe el outbox en CSV y en JSONL y mide el tiempo. Aparte (tracemalloc
+   frena mucho) mide el pico de memoria de Python del pipeline completo y
+   con la cuarta parte de los clientes: si es constante, casi no cambia.
+3. Lo compara con crud.listar_prestamos: los mismos clientes, los mismos
+   préstamos y los mismos totales (punitorios incluidos).
+4. Baja GET /recordatorios y verifica que trae lo mismo que el archivo.
+
+Termina con código 1 si algo no coincide.
+
+Ejemplo:
+    python -m benchmarks.bench_recordatorios --prestamos 100000
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Recordatorios de pago: tiempo, memoria y verificación")
+    parser.add_argument("--clientes", type=int, default=5_000)
+    parser.add_argument("--prestamos", type=int, default=100_000)
+    parser.add_argument("--dias", type=int, default=3)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def _pico_mb(funcion) -> float:
+    """Pico de memoria de Python (MB) de funcion()."""
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 1e6
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    import orjson
+    from fastapi.testclient import TestClient
+    from backend import crud, recordatorios
+    from backend.database import SessionLocal, inicializar_esquema
+    from backend.main import app
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    generar_cartera(db, clientes=args.clientes, prestamos=args.prestamos, inversores=0, archivos_por_cliente=0)
+    hasta = date.today() + timedelta(days=args.dias)
+    esperados: dict[int, tuple] = {}
+    for p in crud.listar_prestamos(db):
+        if p.estado_pago == "PENDIENTE" and p.fecha_vencimiento <= hasta:
+            ids, total = esperados.get(p.cliente_id, ([], 0.0))
+            esperados[p.cliente_id] = (ids + [p.id], round(total + p.total_actualizado, 2))
+    db.close()
+    # El outbox lista los préstamos de cada cliente por id
+    esperados = {c: (sorted(ids), total) for c, (ids, total) in esperados.items()}
+    print(f"Cartera de {args.prestamos:,} préstamos en {directorio}: "
+          f"{sum(len(i) for i, _ in esperados.values()):,} a recordar, {len(esperados):,} clientes")
+
+    resultados = {}
+    fallas = []
+    rutas = {}
+    for formato in ("csv", "jsonl"):
+        ruta = os.path.join(directorio, f"outbox.{formato}")
+        inicio = time.perf_counter()
+        recordatorios.escribir_outbox(dias=args.dias, formato=formato, destino=ruta)
+        segundos = time.perf_counter() - inicio
+        rutas[formato] = ruta
+        resultados[f"recordatorios.{formato}"] = {"segundos": round(segundos, 3), "bytes": os.path.getsize(ruta)}
+        print(f"  {formato:<5} {segundos:6.2f} s   {os.path.getsize(ruta) / 1e6:6.1f} MB")
+
+    # El mismo pipeline cortado después de la cuarta parte de los clientes:
+    # el pico no debería depender de cuántos préstamos pasaron
+    cuarto = len(esperados) // 4
+    pico_cuarto = _pico_mb(lambda: sum(1 for _ in islice(recordatorios.generar(dias=args.dias), cuarto)))
+    pico_todo = _pico_mb(lambda: sum(len(b) for b in recordatorios.exportar(dias=args.dias, formato="csv")))
+    resultados["recordatorios.memoria"] = {"pico_cuarto_mb": round(pico_cuarto, 2), "pico_todo_mb": round(pico_todo, 2)}
+    print(f"  pico del pipeline: {pico_todo:.2f} MB (un cuarto de los clientes: {pico_cuarto:.2f} MB)")
+    if pico_todo > 2 * pico_cuarto + 1:
+        fallas.append("el pico de memoria crece con la cantidad de préstamos")
+
+    with open(rutas["jsonl"], "rb") as f:
+        obtenidos = {r["cliente_id"]: (r["prestamos"], r["total"]) for r in map(orjson.loads, f)}
+    if obtenidos != esperados:
+        distintos = [c for c in set(obtenidos) | set(esperados) if obtenidos.get(c) != esperados.get(c)]
+        fallas.append(f"{len(distintos)} clientes no coinciden con crud.listar_prestamos (p. ej. {distintos[:3]})")
+
+    with open(rutas["csv"], "rb") as f:
+        filas = list(csv.DictReader(io.StringIO(f.read().decode("utf-8-sig"))))
+    if len(filas) != len(esperados) or any(
+        [int(i) for i in fila["prestamos"].split()] != esperados[int(fila["cliente_id"])][0] for fila in filas
+    ):
+        fallas.append("el CSV no coincide con el JSONL")
+
+    with TestClient(app) as cliente:
+        for formato, ruta in rutas.items():
+            r = cliente.get("/recordatorios", params={"dias": args.dias, "formato": formato})
+            with open(ruta, "rb") as f:
+                if r.status_code != 200 or r.content != f.read():
+                    fallas.append(f"GET /recordatorios?formato={formato} no coincide con el archivo")
+        if cliente.get("/recordatorios", params={"formato": "xml"}).status_code != 400:
+            fallas.append("un formato inválido no dio 400")
+
+    if fallas:
+        for falla in fallas:
+            print(f"  ¡{falla}!")
+        return 1
+    print("  Recordatorios completos y en memoria constante.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import argparse
+import csv
+import io
+import sys
+import time
+
+from benchmarks import entorno
+from benchmarks.medicion import resumir, guardar_resultados
+
+"""
+bench_reportes.py: reportes en segundo plano (backend/reportes.py).
+
+1. Mide la latencia de un request interactivo (GET /clientes/{id}/completo)
+   con el servidor ocioso.
+2. Encola la cartera mensual del período más grande y repite la medición
+   MIENTRAS el reporte corre: la diferencia es lo que el reporte le cuesta
+   a los usuarios.
+3. Baja el CSV y lo compara con crud.listar_prestamos(incluir_archivados):
+   mismos préstamos, mismos saldos y un TOTAL que cierra.
+4. Hace lo mismo con la liquidación de inversores contra
+   crud.listar_inversores.
+
+Termina con código 1 si algún reporte no coincide.
+
+Ejemplo:
+    python -m benchmarks.bench_reportes --prestamos 60000 --meses 2
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Reportes en segundo plano: latencia y verificación")
+    parser.add_argument("--clientes", type=int, default=2_000)
+    parser.add_argument("--prestamos", type=int, default=40_000)
+    parser.add_argument("--meses", type=int, default=2, help="Pocos meses = períodos grandes")
+    parser.add_argument("--inversores", type=int, default=200)
+    parser.add_argument("--muestras", type=int, default=50, help="Requests medidos con el servidor ocioso")
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def _leer_csv(contenido: bytes) -> list[list[str]]:
+    return list(csv.reader(io.StringIO(contenido.decode("utf-8-sig"))))
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    from fastapi.testclient import TestClient
+    from backend import crud
+    from backend.database import SessionLocal, inicializar_esquema
+    from backend.main import app
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    cartera = generar_cartera(db, clientes=args.clientes, prestamos=args.prestamos,
+                              inversores=args.inversores, meses=args.meses)
+    prestamos = crud.listar_prestamos(db, incluir_archivados=True)
+    inversores = crud.listar_inversores(db)
+    db.close()
+    print(f"Cartera sintética en {directorio}")
+
+    por_periodo: dict = {}
+    for p in prestamos:
+        por_periodo.setdefault(p.periodo_origen, []).append(p)
+    periodo = max(por_periodo, key=lambda k: len(por_periodo[k]))
+    clientes = cartera["cliente_ids_habilitados"]
+    cliente = TestClient(app)
+
+    def _pedir(i: int) -> float:
+        inicio = time.perf_counter()
+        r = cliente.get(f"/clientes/{clientes[i % len(clientes)]}/completo")
+        r.raise_for_status()
+        return time.perf_counter() - inicio
+
+    resultados = {"reportes.interactivo.ocioso": resumir(_pedir(i) for i in range(args.muestras))}
+
+    def _esperar(reporte_id: str, medir: bool) -> tuple[dict, list[float]]:
+        tiempos = []
+        while True:
+            estado = cliente.get(f"/reportes/{reporte_id}").json()
+            if estado["estado"] in ("terminado", "error"):
+                return estado, tiempos
+            if medir:
+                tiempos.append(_pedir(len(tiempos)))
+            else:
+                time.sleep(0.01)
+
+    r = cliente.post("/reportes", json={"tipo": "cartera_mensual", "periodo": periodo})
+    estado, tiempos = _esperar(r.json()["id"], medir=True)
+    resultados["reportes.interactivo.con_reporte"] = resumir(tiempos)
+    resultados["reportes.cartera_mensual"] = {
+        "filas": estado["filas"], "bytes": estado["bytes"], "duracion_ms": estado["duracion_ms"],
+    }
+    for nombre in ("ocioso", "con_reporte"):
+        m = resultados[f"reportes.interactivo.{nombre}"]
+        print(f"  interactivo {nombre:<12} n={m['n']:>4}  mediana {m['mediana_ms']:>8.2f} ms  p95 {m['p95_ms']:>8.2f} ms")
+    print(f"  cartera {periodo}: {estado['filas']:,} filas en {estado['duracion_ms']:,.0f} ms")
+
+    fallas = []
+    if estado["estado"] != "terminado":
+        fallas.append(f"cartera_mensual: {estado['error']}")
+    else:
+        filas = _leer_csv(cliente.get(estado["descarga"]).content)
+        corte = filas.index([])
+        encabezado, detalle, resumen = filas[0], filas[1:corte], filas[corte + 2:]
+        columna = {nombre: i for i, nombre in enumerate(encabezado)}
+        esperados = {p.id: p for p in por_periodo[periodo]}
+        if sorted(int(f[columna["prestamo_id"]]) for f in detalle) != sorted(esperados):
+            fallas.append("cartera_mensual: los préstamos no coinciden con crud.listar_prestamos")
+        for f in detalle:
+            p = esperados.get(int(f[columna["prestamo_id"]]))
+            if p is not None and float(f[columna["total_actualizado"]]) != p.total_actualizado:
+                fallas.append(f"cartera_mensual: total_actualizado distinto en el préstamo {p.id}")
+                break
+        total = next(f for f in resumen if f[0] == "TOTAL")
+        saldo = round(sum(float(f[columna["saldo"]]) for f in detalle), 2)
+        if int(total[1]) != len(detalle) or abs(float(total[5]) - saldo) > 0.005:
+            fallas.append("cartera_mensual: la fila TOTAL no cierra con el detalle")
+
+    r = cliente.post("/reportes", json={"tipo": "liquidacion_inversores"})
+    estado, _ = _esperar(r.json()["id"], medir=False)
+    if estado["estado"] != "terminado":
+        fallas.append(f"liquidacion_inversores: {estado['error']}")
+    else:
+        filas = _leer_csv(cliente.get(estado["descarga"]).content)
+        detalle, total = filas[1:-1], filas[-1]
+        esperado = round(sum(i.total_a_devolver for i in inversores), 2)
+        if len(detalle) != len(inversores) or abs(float(total[9]) - esperado) > 0.005:
+            fallas.append("liquidacion_inversores: no coincide con crud.listar_inversores")
+
+    if fallas:
+        for falla in fallas:
+            print(f"  ¡{falla}!")
+        return 1
+    print("  Reportes idénticos a crud.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
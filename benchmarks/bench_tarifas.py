@@ -0,0 +1,261 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks import entorno
+from benchmarks.medicion import guardar_resultados
+
+"""
+bench_tarifas.py: plazo y tarifa guardados + registro de tarifas en memoria
+(backend/tarifas.py, migración 9).
+
+1. Genera una cartera de --prestamos préstamos y archiva los cerrados
+   viejos (archivo.py copia plazo y tarifa_id). Lo generado es la verdad.
+2. La lleva a como estaría antes de la migración 9 (plazo y tarifa_id en
+   NULL, versión 8) mezclando casos viejos: préstamos sin tasa guardada,
+   préstamos dados con fecha de inicio anterior al alta y tasas pactadas a
+   mano. Corre la migración, mide el tiempo y compara el plazo y la tarifa
+   completados con la verdad, y con lo que daba la inferencia anterior
+   (tasa implícita del total, 7 días si no coincidía).
+3. Mide la búsqueda de la tarifa de un plazo: registro en memoria contra
+   una consulta por búsqueda.
+4. Cambia una tarifa por POST /tarifas y verifica que GET /tarifas y los
+   préstamos nuevos la usan enseguida, y que agregar monto a un préstamo
+   sin tasa guardada usa la de su tarifa.
+5. Otro proceso (como otro worker) cambia una tarifa: una pasada del
+   relevo de coordinacion.py descarta el registro de este proceso.
+
+Termina con código 1 si algo no coincide.
+
+Ejemplo:
+    python -m benchmarks.bench_tarifas --prestamos 50000
+"""
+
+# Tasa pactada a mano en los casos de prueba (no es la de ninguna tarifa)
+TASA_A_MANO = 0.33
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lo que hace el otro worker: una tarifa nueva de 30 días
+_OTRO_WORKER = """
+from backend import crud, schemas
+from backend.database import SessionLocal
+db = SessionLocal()
+crud.crear_tarifa(db, schemas.TarifaCreate(plazo=30, tasa=0.9))
+db.close()
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Plazo/tarifa guardados y registro de tarifas")
+    parser.add_argument("--clientes", type=int, default=2_000)
+    parser.add_argument("--prestamos", type=int, default=50_000)
+    parser.add_argument("--busquedas", type=int, default=100_000)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def _inferencia_anterior(monto: int, total: int) -> int:
+    """La deducción de plazo que usaba agregar_monto antes de guardar el plazo."""
+    if monto <= 0:
+        return 7
+    tasa = (total - monto) / monto
+    for plazo, esperada in ((7, 0.20), (14, 0.40), (30, 1.00)):
+        if abs(tasa - esperada) < 0.01:
+            return plazo
+    return 7
+
+
+def _preparar_version_8(engine, tablas) -> dict:
+    """
+    Mezcla casos viejos, borra plazo/tarifa_id y deja la base en versión 8.
+    Devuelve {(tabla, id): (plazo, tarifa_id esperados, plazo inferido antes)}.
+    """
+    from backend import migraciones
+
+    esperados = {}
+    with engine.begin() as conn:
+        for tabla in tablas:
+            filas = conn.exec_driver_sql(
+                f"SELECT id, plazo, tarifa_id, estado_pago FROM {tabla} ORDER BY id"
+            ).fetchall()
+            for id_, plazo, tarifa_id, estado in filas:
+                caso = id_ % 10
+                if caso == 0:
+                    # Anterior a tasa_interes: la tarifa sale de reproducir el total
+                    conn.exec_driver_sql(f"UPDATE {tabla} SET tasa_interes = NULL WHERE id = ?", (id_,))
+                    if estado == "RENOVADO":
+                        tarifa_id = None  # el total ya es solo el interés cobrado
+                elif caso == 3:
+                    # Dado con fecha de inicio dos días antes del alta
+                    conn.exec_driver_sql(
+                        f"UPDATE {tabla} SET fecha_creacion = date(fecha_creacion, '+2 days') WHERE id = ?",
+                        (id_,),
+                    )
+                elif caso == 5 and estado == "PENDIENTE":
+                    # Tasa pactada a mano
+                    conn.exec_driver_sql(
+                        f"UPDATE {tabla} SET tasa_interes = ?, total_a_pagar = CAST(ROUND(monto_prestado * ?) AS INTEGER), "
+                        f"por_cobrar = CAST(ROUND(monto_prestado * ?) AS INTEGER) WHERE id = ?",
+                        (TASA_A_MANO, 1 + TASA_A_MANO, 1 + TASA_A_MANO, id_),
+                    )
+                    tarifa_id = None
+                esperados[(tabla, id_)] = [plazo, tarifa_id]
+            for id_, monto, total in conn.exec_driver_sql(
+                f"SELECT id, monto_prestado, total_a_pagar FROM {tabla}"
+            ):
+                esperados[(tabla, id_)].append(_inferencia_anterior(monto, total))
+            conn.exec_driver_sql(f"UPDATE {tabla} SET plazo = NULL, tarifa_id = NULL")
+    migraciones._registrar(engine, 8)
+    return esperados
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    from fastapi.testclient import TestClient
+    from backend import archivo, migraciones, models, tarifas
+    from backend.database import SessionLocal, engine, inicializar_esquema
+    from backend.main import app
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    if engine.dialect.name != "sqlite":
+        print("bench_tarifas prepara la versión 8 con SQL de SQLite")
+        return 1
+
+    inicializar_esquema()
+    db = SessionLocal()
+    generar_cartera(db, clientes=args.clientes, prestamos=args.prestamos, inversores=0, archivos_por_cliente=0)
+    db.close()
+    archivados = archivo.archivar_cerrados(dias=180)
+    print(f"Cartera de {args.prestamos:,} préstamos ({archivados:,} archivados) en {directorio}")
+
+    resultados = {}
+    fallas = []
+
+    # ---------- migración 9 sobre una base en versión 8 ----------
+    tablas = ("prestamos", "prestamos_archivo")
+    esperados = _preparar_version_8(engine, tablas)
+    inicio = time.perf_counter()
+    aplicadas = migraciones.aplicar_pendientes(engine)
+    segundos = time.perf_counter() - inicio
+    nombres = [nombre for numero, nombre, _ in migraciones.MIGRACIONES if numero > 8]
+    if aplicadas != nombres:
+        fallas.append(f"desde la versión 8 se esperaban {nombres} y se aplicaron {aplicadas}")
+
+    mal_plazo = mal_tarifa = mal_antes = 0
+    with engine.connect() as conn:
+        for tabla in tablas:
+            for id_, plazo, tarifa_id in conn.exec_driver_sql(f"SELECT id, plazo, tarifa_id FROM {tabla}"):
+                plazo_ok, tarifa_ok, inferido = esperados[(tabla, id_)]
+                mal_plazo += plazo != plazo_ok
+                mal_tarifa += tarifa_id != tarifa_ok
+                mal_antes += inferido != plazo_ok
+    total = len(esperados)
+    resultados["tarifas.migracion"] = {
+        "prestamos": total,
+        "segundos": round(segundos, 3),
+        "plazos_incorrectos": mal_plazo,
+        "tarifas_incorrectas": mal_tarifa,
+        "plazos_incorrectos_inferencia_anterior": mal_antes,
+    }
+    print(f"  migración 9: {total:,} préstamos en {segundos:.2f} s")
+    print(f"    plazos incorrectos: {mal_plazo:,} (la inferencia anterior: {mal_antes:,}), "
+          f"tarifas incorrectas: {mal_tarifa:,}")
+    if mal_plazo or mal_tarifa:
+        fallas.append("la migración completó plazos o tarifas distintos de los generados")
+    if migraciones.version_actual(engine) != migraciones.MIGRACIONES[-1][0]:
+        fallas.append("la base no quedó en la última versión")
+
+    # ---------- búsqueda de la tarifa de un plazo ----------
+    db = SessionLocal()
+    plazos = [t.plazo for t in tarifas.vigentes(db)]
+    inicio = time.perf_counter()
+    for i in range(args.busquedas):
+        tarifas.vigente(db, plazos[i % len(plazos)])
+    registro_us = (time.perf_counter() - inicio) / args.busquedas * 1e6
+
+    consultas = max(1, args.busquedas // 50)
+    inicio = time.perf_counter()
+    for i in range(consultas):
+        db.query(models.Tarifa).filter(
+            models.Tarifa.plazo == plazos[i % len(plazos)], models.Tarifa.vigente_hasta.is_(None)
+        ).first()
+    consulta_us = (time.perf_counter() - inicio) / consultas * 1e6
+    db.close()
+    resultados["tarifas.busqueda"] = {"registro_us": round(registro_us, 3), "consulta_us": round(consulta_us, 1)}
+    print(f"  tarifa de un plazo: {registro_us:.2f} µs en memoria, {consulta_us:.0f} µs con una consulta")
+
+    # ---------- cambio de tarifa y préstamos sin tasa guardada ----------
+    with TestClient(app) as cliente:
+        r = cliente.post("/tarifas", json={"plazo": 14, "tasa": 0.45})
+        nueva = r.json() if r.status_code == 200 else {}
+        vigentes = {t["plazo"]: t for t in cliente.get("/tarifas").json()}
+        if vigentes.get(14, {}).get("tasa") != 0.45:
+            fallas.append("GET /tarifas no mostró la tarifa nueva enseguida")
+        if len(cliente.get("/tarifas", params={"todas": True}).json()) != len(vigentes) + 1:
+            fallas.append("la tarifa anterior no quedó en el historial")
+
+        cliente_id = cliente.post("/clientes", json={
+            "nombre_completo": "Cliente Tarifas", "dni": "tarifas", "direccion": "-", "telefono": "-",
+        }).json()["id"]
+        p = cliente.post("/prestamos", json={"cliente_id": cliente_id, "monto_prestado": 1000, "plazo": 14}).json()
+        if p.get("total_a_pagar") != 1450.0 or p.get("tarifa_id") != nueva.get("id") or p.get("plazo") != 14:
+            fallas.append(f"el préstamo nuevo no usó la tarifa nueva: {p}")
+
+        # Préstamo viejo sin tasa guardada: agregar monto usa la de su tarifa
+        db = SessionLocal()
+        viejo = (
+            db.query(models.Prestamo)
+            .filter(models.Prestamo.tasa_interes.is_(None), models.Prestamo.tarifa_id.isnot(None),
+                    models.Prestamo.estado_pago == "PENDIENTE")
+            .first()
+        )
+        tasa = tarifas.por_id(db, viejo.tarifa_id).tasa if viejo else None
+        db.close()
+        if viejo is None:
+            fallas.append("no quedó ningún préstamo sin tasa con tarifa para probar agregar monto")
+        else:
+            r = cliente.put(f"/prestamos/{viejo.id}/agregar-monto", json={"monto_extra": 1000}).json()
+            esperado = round(r["monto_prestado"] * (1 + tasa), 2)
+            if r["total_a_pagar"] != esperado:
+                fallas.append(f"agregar monto sin tasa guardada: {r['total_a_pagar']} en lugar de {esperado}")
+
+    # ---------- tarifa cambiada por otro worker ----------
+    from backend import coordinacion, sincronizacion
+
+    db = SessionLocal()
+    cursor = sincronizacion.version_actual(db)
+    antes = tarifas.vigente(db, 30).tasa
+    proceso = subprocess.run([sys.executable, "-c", _OTRO_WORKER], cwd=RAIZ, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        fallas.append(f"el otro proceso no pudo crear la tarifa: {proceso.stderr.strip()[-300:]}")
+    sin_relevo = tarifas.vigente(db, 30).tasa
+    inicio = time.perf_counter()
+    coordinacion._retransmitir(SessionLocal, cursor)
+    relevo_ms = (time.perf_counter() - inicio) * 1000
+    con_relevo = tarifas.vigente(db, 30).tasa
+    db.close()
+    resultados["tarifas.relevo"] = {"relevo_ms": round(relevo_ms, 1)}
+    print(f"  tarifa de 30 días cambiada en otro proceso: {sin_relevo} antes del relevo, "
+          f"{con_relevo} después ({relevo_ms:.1f} ms)")
+    if sin_relevo != antes or con_relevo != 0.9:
+        fallas.append("el relevo no descartó el registro de tarifas")
+
+    if fallas:
+        for falla in fallas:
+            print(f"  ¡{falla}!")
+        return 1
+    print("  Plazos y tarifas completos; el registro sigue los cambios.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
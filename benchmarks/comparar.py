@@ -0,0 +1,49 @@
+import argparse
+import sys
+
+from benchmarks.medicion import cargar_resultados
+
+"""
+comparar.py: muestra la variación de la mediana entre dos corridas.
+
+    python -m benchmarks.comparar base.json nuevo.json --umbral 10
+
+Sale con código 1 si algún escenario empeoró más que el umbral (en %),
+para poder usarlo como chequeo antes de mergear.
+"""
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Comparar dos corridas de benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=10.0, help="% de empeoramiento tolerado")
+    parser.add_argument("--metrica", default="mediana_ms")
+    args = parser.parse_args(argv)
+
+    base = cargar_resultados(args.base)
+    nuevo = cargar_resultados(args.nuevo)
+
+    print(f"base:  {base['meta'].get('commit')}  ({base['meta'].get('fecha')})")
+    print(f"nuevo: {nuevo['meta'].get('commit')}  ({nuevo['meta'].get('fecha')})")
+    print()
+
+    regresiones = []
+    for nombre in sorted(set(base["resultados"]) | set(nuevo["resultados"])):
+        a = base["resultados"].get(nombre, {}).get(args.metrica)
+        b = nuevo["resultados"].get(nombre, {}).get(args.metrica)
+        if a is None or b is None:
+            print(f"  {nombre:<28} {'—':>12} (solo en una corrida)")
+            continue
+        delta = ((b - a) / a * 100.0) if a else 0.0
+        marca = ""
+        if delta > args.umbral:
+            marca = "  ← REGRESIÓN"
+            regresiones.append(nombre)
+        print(f"  {nombre:<28} {a:>10.3f} → {b:>10.3f} ms  ({delta:+6.1f}%){marca}")
+
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from backend import models
+
+"""
+datos_sinteticos.py genera carteras ficticias DETERMINÍSTICAS.
+
+Misma semilla + mismos parámetros = mismos clientes, préstamos, inversores
+y archivos. Así dos corridas en commits distintos miden exactamente lo mismo.
+
+Distribución aproximada de los préstamos:
+- 55% PENDIENTE (una parte ya vencidos → morosos)
+- 25% SI (cobrados)
+- 15% RENOVADO
+-  5% BLOQUEADO
+repartidos en `meses` períodos de origen hacia atrás desde `fecha_referencia`.
+Plazos y tasas: los de las tarifas vigentes de la base (tabla tarifas).
+"""
+
+ESTADOS = (
+    ("PENDIENTE", 0.55),
+    ("SI", 0.25),
+    ("RENOVADO", 0.15),
+    ("BLOQUEADO", 0.05),
+)
+
+TIPOS_ARCHIVO = ("dni_frente", "dni_dorso", "selfie_dni", "comprobante")
+
+
+def _elegir_estado(rng: random.Random) -> str:
+    r = rng.random()
+    acumulado = 0.0
+    for estado, peso in ESTADOS:
+        acumulado += peso
+        if r < acumulado:
+            return estado
+    return ESTADOS[0][0]
+
+
+def _fila_prestamo(rng: random.Random, cliente_id: int, hoy: date, meses: int, tarifas: list) -> dict:
+    plazo, tasa, tarifa_id = rng.choice(tarifas)
+    monto = float(rng.randrange(10_000, 500_000, 5_000))
+    total = monto * (1 + tasa)
+
+    fecha_creacion = hoy - timedelta(days=rng.randrange(0, max(1, meses * 30)))
+    fecha_vencimiento = fecha_creacion + timedelta(days=plazo)
+    estado = _elegir_estado(rng)
+
+    fila = {
+        "cliente_id": cliente_id,
+        "monto_prestado": monto,
+        "total_a_pagar": total,
+        "total_cobrado": 0.0,
+        "por_cobrar": total,
+        "fecha_creacion": fecha_creacion,
+        "fecha_vencimiento": fecha_vencimiento,
+        "estado_pago": estado,
+        "fecha_pago": None,
+        "monto_cobrado_final": None,
+        "periodo_origen": fecha_creacion.strftime("%Y-%m"),
+        "tasa_interes": tasa,
+        "plazo": plazo,
+        "tarifa_id": tarifa_id,
+    }
+
+    if estado == "SI":
+        fila["total_cobrado"] = total
+        fila["por_cobrar"] = 0.0
+        fila["monto_cobrado_final"] = total
+        fila["fecha_pago"] = min(hoy, fecha_vencimiento)
+    elif estado == "RENOVADO":
+        intereses = total - monto
+        fila["total_a_pagar"] = intereses
+        fila["total_cobrado"] = intereses
+        fila["por_cobrar"] = 0.0
+        fila["monto_cobrado_final"] = intereses
+        fila["fecha_pago"] = min(hoy, fecha_vencimiento)
+
+    return fila
+
+
+def generar_cartera(
+    db: Session,
+    clientes: int = 500,
+    prestamos: int = 5_000,
+    inversores: int = 50,
+    archivos_por_cliente: int = 2,
+    meses: int = 24,
+    semilla: int = 42,
+    fecha_referencia: date | None = None,
+) -> dict:
+    """
+    Inserta una cartera sintética completa y devuelve un resumen con conteos
+    e IDs útiles para los escenarios (p. ej. préstamos pendientes a cobrar).
+    """
+    rng = random.Random(semilla)
+    hoy = fecha_referencia or date.today()
+
+    # Clientes
+    filas_clientes = [
+        {
+            "nombre_completo": f"Cliente Sintético {i:06d}",
+            "dni": f"{semilla:02d}{i:08d}",
+            "direccion": f"Calle {rng.randint(1, 999)} N° {rng.randint(1, 9999)}",
+            "telefono": f"11{rng.randint(10_000_000, 99_999_999)}",
+            "telefono_respaldo_1": f"11{rng.randint(10_000_000, 99_999_999)}" if rng.random() < 0.5 else None,
+            "telefono_respaldo_2": None,
+            "observaciones": "Generado para benchmarks" if rng.random() < 0.2 else None,
+        }
+        for i in range(clientes)
+    ]
+    db.execute(insert(models.Cliente), filas_clientes)
+    cliente_ids = list(db.scalars(select(models.Cliente.id).order_by(models.Cliente.id)))
+
+    # Archivos (solo filas; los benchmarks no necesitan los binarios)
+    filas_archivos = [
+        {
+            "cliente_id": cid,
+            "tipo": TIPOS_ARCHIVO[n % len(TIPOS_ARCHIVO)],
+            "url": f"/uploads/clientes/{cid}/{TIPOS_ARCHIVO[n % len(TIPOS_ARCHIVO)]}_{n}.jpg",
+        }
+        for cid in cliente_ids
+        for n in range(archivos_por_cliente)
+    ]
+    if filas_archivos:
+        db.execute(insert(models.ClienteArchivo), filas_archivos)
+
+    # Préstamos
+    tarifas = db.execute(
+        select(models.Tarifa.plazo, models.Tarifa.tasa, models.Tarifa.id)
+        .where(models.Tarifa.vigente_hasta.is_(None))
+        .order_by(models.Tarifa.plazo)
+    ).all()
+    filas_prestamos = [
+        _fila_prestamo(rng, rng.choice(cliente_ids), hoy, meses, tarifas)
+        for _ in range(prestamos)
+    ]
+    if filas_prestamos:
+        db.execute(insert(models.Prestamo), filas_prestamos)
+
+    # Inversores
+    filas_inversores = []
+    for i in range(inversores):
+        inicio = hoy - timedelta(days=rng.randrange(0, max(1, meses * 30)))
+        filas_inversores.append({
+            "nombre": f"Inversor Sintético {i:04d}",
+            "monto_invertido": float(rng.randrange(100_000, 5_000_000, 50_000)),
+            "tasa_diaria": rng.choice((0.001, 0.0015, 0.002, 0.003)),
+            "fecha_inicio": inicio,
+            "fecha_fin": inicio + timedelta(days=rng.choice((30, 60, 90, 180))),
+            "estado": "ACTIVO" if rng.random() < 0.7 else "LIQUIDADO",
+            "monto_devuelto": None,
+        })
+    if filas_inversores:
+        db.execute(insert(models.Inversor), filas_inversores)
+
+    db.commit()
+
+    # Clientes sin préstamos BLOQUEADO: pueden recibir préstamos nuevos
+    bloqueados = set(db.scalars(
+        select(models.Prestamo.cliente_id).where(models.Prestamo.estado_pago == "BLOQUEADO")
+    ))
+    pendientes = list(db.scalars(
+        select(models.Prestamo.id)
+        .where(models.Prestamo.estado_pago == "PENDIENTE")
+        .order_by(models.Prestamo.id)
+    ))
+
+    return {
+        "semilla": semilla,
+        "clientes": len(cliente_ids),
+        "prestamos": len(filas_prestamos),
+        "inversores": len(filas_inversores),
+        "archivos": len(filas_archivos),
+        "cliente_ids_habilitados": [c for c in cliente_ids if c not in bloqueados],
+        "prestamo_ids_pendientes": pendientes,
+    }
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+"""
+entorno.py aísla los benchmarks de los datos reales.
+
+database.py y main.py resuelven sus rutas a partir de LOCALAPPDATA al
+importarse, así que hay que apuntar esa variable a un directorio temporal
+ANTES de importar cualquier módulo de `backend`.
+
+Si DATABASE_URL está definida (por ejemplo, una base PostgreSQL vacía de
+pruebas), los escenarios corren contra ese motor. verificar_respaldos y
+verificar_mantenimiento son propios de SQLite.
+"""
+
+
+def aislar(directorio: str | None = None) -> str:
+    """
+    Redirige LOCALAPPDATA a un directorio temporal (o al indicado).
+    Debe llamarse antes del primer `import backend.*`.
+    """
+    import sys
+
+    if any(nombre.startswith("backend.") for nombre in sys.modules):
+        raise RuntimeError("aislar() debe llamarse antes de importar el backend")
+
+    directorio = directorio or tempfile.mkdtemp(prefix="prestamos_bench_")
+    os.makedirs(directorio, exist_ok=True)
+    os.environ["LOCALAPPDATA"] = directorio
+    return directorio
@@ -0,0 +1,113 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, Iterable
+
+"""
+medicion.py: cronometraje mínimo y persistencia de resultados.
+
+No depende de pytest-benchmark para que los escenarios se puedan correr
+con el mismo intérprete que empaqueta el backend.
+
+Formato del JSON guardado:
+{
+  "meta": {"commit": ..., "fecha": ..., "python": ..., "parametros": {...}},
+  "resultados": {"crud.listar_prestamos": {"n": ..., "min_ms": ..., ...}, ...}
+}
+"""
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p
+    inf = int(k)
+    sup = min(inf + 1, len(ordenados) - 1)
+    return ordenados[inf] + (ordenados[sup] - ordenados[inf]) * (k - inf)
+
+
+def resumir(tiempos_s: Iterable[float]) -> dict:
+    """Convierte una lista de duraciones (segundos) en estadísticas en ms."""
+    ms = [t * 1000.0 for t in tiempos_s]
+    if not ms:
+        return {"n": 0}
+    return {
+        "n": len(ms),
+        "min_ms": round(min(ms), 4),
+        "mediana_ms": round(statistics.median(ms), 4),
+        "media_ms": round(statistics.fmean(ms), 4),
+        "p95_ms": round(_percentil(ms, 0.95), 4),
+        "p99_ms": round(_percentil(ms, 0.99), 4),
+        "max_ms": round(max(ms), 4),
+    }
+
+
+def medir(
+    fn: Callable[[int], object],
+    repeticiones: int = 20,
+    calentamiento: int = 2,
+) -> dict:
+    """
+    Ejecuta `fn(i)` `repeticiones` veces y devuelve estadísticas.
+    `i` es el índice de la iteración (útil para escenarios de escritura
+    que consumen un préstamo distinto en cada vuelta).
+    """
+    for i in range(calentamiento):
+        fn(-(i + 1))
+
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        fn(i)
+        tiempos.append(time.perf_counter() - inicio)
+    return resumir(tiempos)
+
+
+def commit_actual() -> str | None:
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        )
+        return salida.stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def guardar_resultados(resultados: dict, parametros: dict, ruta: str | None = None) -> str:
+    """
+    Guarda los resultados en JSON. Si no se indica ruta se usa
+    benchmarks/resultados/<commit>_<fecha>.json.
+    """
+    commit = commit_actual()
+    fecha = datetime.now()
+
+    if ruta is None:
+        carpeta = os.path.join(os.path.dirname(__file__), "resultados")
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = f"{commit or 'sin_commit'}_{fecha.strftime('%Y%m%d_%H%M%S')}.json"
+        ruta = os.path.join(carpeta, nombre)
+
+    documento = {
+        "meta": {
+            "commit": commit,
+            "fecha": fecha.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": parametros,
+        },
+        "resultados": resultados,
+    }
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(documento, f, indent=2, ensure_ascii=False)
+    return ruta
+
+
+def cargar_resultados(ruta: str) -> dict:
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,200 @@
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import entorno
+
+"""
+stress_concurrencia.py: prueba de estrés del control de concurrencia
+optimista sobre préstamos (columna `version`, If-Match, 409).
+
+Muchos hilos (cajas) operan A LA VEZ sobre los mismos préstamos, cada uno
+con su propia sesión, igual que los workers del threadpool de FastAPI.
+Al final se verifican invariantes sobre la base; si alguno falla el
+script termina con código 1.
+
+Escenarios:
+- cobro_doble        N cajas cobran el mismo préstamo: exactamente UN cobro
+                     confirmado y total_cobrado igual a ese monto.
+- agregar_monto      N cajas suman capital al mismo préstamo, reintentando
+                     ante 409: ningún incremento se pierde.
+- renovar_vs_cobrar  la mitad renueva y la otra mitad cobra: gana una sola
+                     operación y, si ganó la renovación, hay UN préstamo nuevo.
+
+Ejemplo:
+    python -m benchmarks.stress_concurrencia --hilos 32 --prestamos 50
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Estrés de concurrencia optimista sobre préstamos")
+    parser.add_argument("--hilos", type=int, default=16, help="Cajas operando en paralelo sobre cada préstamo")
+    parser.add_argument("--prestamos", type=int, default=20, help="Préstamos por escenario")
+    parser.add_argument("--incrementos", type=int, default=5, help="Agregados por hilo en agregar_monto")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    from fastapi import HTTPException
+    from sqlalchemy.exc import OperationalError
+    from backend import crud, models, schemas
+    from backend.database import SessionLocal, inicializar_esquema
+
+    inicializar_esquema()
+    print(f"Base temporal en {directorio}; {args.hilos} hilos por préstamo")
+
+    def _crear_prestamos(cantidad: int, monto: float = 1000.0) -> list[int]:
+        db = SessionLocal()
+        try:
+            ids = []
+            for i in range(cantidad):
+                cliente = crud.crear_cliente(db, schemas.ClienteCreate(
+                    nombre_completo=f"Stress {time.monotonic_ns()}-{i}",
+                    dni=f"S{time.monotonic_ns()}{i}",
+                    direccion="-", telefono="-",
+                ))
+                prestamo = crud.crear_prestamo(db, schemas.PrestamoCreate(
+                    cliente_id=cliente.id, monto_prestado=monto, plazo=7,
+                ))
+                ids.append(prestamo.id)
+            return ids
+        finally:
+            db.close()
+
+    def _en_sesion(fn):
+        """Corre `fn(db)` con una sesión propia y clasifica el resultado."""
+        db = SessionLocal()
+        try:
+            fn(db)
+            return "ok"
+        except HTTPException as e:
+            return str(e.status_code)
+        except OperationalError:
+            return "bloqueada"
+        finally:
+            db.close()
+
+    def _correr(tareas) -> dict[str, int]:
+        barrera = threading.Barrier(len(tareas))
+
+        def _tarea(fn):
+            barrera.wait()
+            return fn()
+
+        conteo: dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=len(tareas)) as pool:
+            for resultado in pool.map(_tarea, tareas):
+                conteo[resultado] = conteo.get(resultado, 0) + 1
+        return conteo
+
+    fallas: list[str] = []
+    totales: dict[str, dict[str, int]] = {}
+
+    def _acumular(escenario: str, conteo: dict[str, int]) -> None:
+        destino = totales.setdefault(escenario, {})
+        for clave, n in conteo.items():
+            destino[clave] = destino.get(clave, 0) + n
+
+    # ---- cobro_doble ----
+    inicio = time.perf_counter()
+    for prestamo_id in _crear_prestamos(args.prestamos):
+        conteo = _correr([
+            (lambda pid=prestamo_id: _en_sesion(lambda db: crud.cobrar_prestamo(db, pid, 1200.0)))
+            for _ in range(args.hilos)
+        ])
+        _acumular("cobro_doble", conteo)
+        db = SessionLocal()
+        p = db.get(models.Prestamo, prestamo_id)
+        if conteo.get("ok", 0) != 1 or p.total_cobrado != 1200.0:
+            fallas.append(
+                f"cobro_doble #{prestamo_id}: {conteo.get('ok', 0)} cobros, total_cobrado={p.total_cobrado}"
+            )
+        db.close()
+    totales["cobro_doble"]["segundos"] = round(time.perf_counter() - inicio, 3)
+
+    # ---- agregar_monto (con reintento ante 409) ----
+    def _agregar_con_reintento(pid: int) -> str:
+        # Lo que haría la UI ante un 409: releer y volver a intentar
+        reintentos = 0
+        for _ in range(args.incrementos):
+            while True:
+                resultado = _en_sesion(lambda db: crud.agregar_monto(db, pid, 10.0))
+                if resultado == "ok":
+                    break
+                if resultado not in ("409", "bloqueada"):
+                    return resultado
+                reintentos += 1
+        return f"ok ({reintentos} reintentos)" if reintentos else "ok"
+
+    inicio = time.perf_counter()
+    for prestamo_id in _crear_prestamos(args.prestamos):
+        conteo = _correr([
+            (lambda pid=prestamo_id: _agregar_con_reintento(pid))
+            for _ in range(args.hilos)
+        ])
+        for clave, n in conteo.items():
+            _acumular("agregar_monto", {("ok" if clave.startswith("ok") else clave): n})
+        db = SessionLocal()
+        p = db.get(models.Prestamo, prestamo_id)
+        esperado = 1000.0 + 10.0 * args.hilos * args.incrementos
+        if p.monto_prestado != esperado:
+            fallas.append(f"agregar_monto #{prestamo_id}: monto_prestado={p.monto_prestado}, esperado {esperado}")
+        if p.version != 1 + args.hilos * args.incrementos:
+            fallas.append(f"agregar_monto #{prestamo_id}: version={p.version}")
+        db.close()
+    totales["agregar_monto"]["segundos"] = round(time.perf_counter() - inicio, 3)
+
+    # ---- renovar_vs_cobrar ----
+    inicio = time.perf_counter()
+    for prestamo_id in _crear_prestamos(args.prestamos):
+        db = SessionLocal()
+        cliente_id = db.get(models.Prestamo, prestamo_id).cliente_id
+        db.close()
+
+        tareas = []
+        for i in range(args.hilos):
+            if i % 2:
+                tareas.append(lambda pid=prestamo_id: _en_sesion(
+                    lambda db: crud.renovar_prestamo(db, pid, 1000.0, 7, 0.20)))
+            else:
+                tareas.append(lambda pid=prestamo_id: _en_sesion(
+                    lambda db: crud.cobrar_prestamo(db, pid, 1200.0)))
+        conteo = _correr(tareas)
+        _acumular("renovar_vs_cobrar", conteo)
+
+        db = SessionLocal()
+        p = db.get(models.Prestamo, prestamo_id)
+        nuevos = db.query(models.Prestamo).filter(
+            models.Prestamo.cliente_id == cliente_id, models.Prestamo.id != prestamo_id
+        ).count()
+        ganadores = conteo.get("ok", 0)
+        if ganadores != 1:
+            fallas.append(f"renovar_vs_cobrar #{prestamo_id}: {ganadores} operaciones confirmadas")
+        elif p.estado_pago == "RENOVADO" and nuevos != 1:
+            fallas.append(f"renovar_vs_cobrar #{prestamo_id}: renovado con {nuevos} préstamos nuevos")
+        elif p.estado_pago == "SI" and (nuevos != 0 or p.total_cobrado != 1200.0):
+            fallas.append(f"renovar_vs_cobrar #{prestamo_id}: cobrado con {nuevos} nuevos, total={p.total_cobrado}")
+        db.close()
+    totales["renovar_vs_cobrar"]["segundos"] = round(time.perf_counter() - inicio, 3)
+
+    for escenario, conteo in totales.items():
+        detalle = ", ".join(f"{k}={v}" for k, v in sorted(conteo.items()))
+        print(f"  {escenario:20} {detalle}")
+
+    if fallas:
+        print(f"\n{len(fallas)} INVARIANTES VIOLADOS:")
+        for falla in fallas[:20]:
+            print(f"  - {falla}")
+        return 1
+
+    print("\nSin actualizaciones perdidas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
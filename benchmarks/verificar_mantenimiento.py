@@ -0,0 +1,124 @@
+import argparse
+import os
+import sys
+
+from benchmarks import entorno
+from benchmarks.medicion import guardar_resultados
+
+"""
+verificar_mantenimiento.py: mantenimiento automático de SQLite
+(backend/mantenimiento.py).
+
+1. Genera una cartera de varios años y archiva los préstamos viejos.
+2. Borra la mitad más vieja del archivo (como una depuración) para dejar
+   páginas libres: sin auto_vacuum el archivo no se achicaría. Verifica
+   que alcancen el umbral y que el planificador pida incremental_vacuum.
+3. Corre cada tarea y reporta su duración. Verifica que:
+   - ANALYZE deja estadísticas (sqlite_stat1);
+   - incremental_vacuum devuelve las páginas libres (el archivo se achica);
+   - quick_check da ok antes y después;
+   - el planificador no pide nada más una vez hecho todo.
+
+Termina con código 1 si algo no se cumple.
+
+Ejemplo:
+    python -m benchmarks.verificar_mantenimiento --prestamos 200000
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Verificación del mantenimiento de SQLite")
+    parser.add_argument("--clientes", type=int, default=2_000)
+    parser.add_argument("--prestamos", type=int, default=50_000)
+    parser.add_argument("--meses", type=int, default=48)
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    from sqlalchemy import text
+    from backend import archivo, mantenimiento
+    from backend.database import DB_PATH, SessionLocal, engine, inicializar_esquema
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    mantenimiento.instalar(engine)
+    db = SessionLocal()
+    generar_cartera(db, clientes=args.clientes, prestamos=args.prestamos, inversores=0,
+                    archivos_por_cliente=1, meses=args.meses)
+    db.close()
+    print(f"Cartera sintética en {directorio}")
+    archivados = archivo.archivar_cerrados(365)
+
+    db = SessionLocal()
+    ids = db.execute(text("SELECT id FROM prestamos_archivo ORDER BY id")).scalars().all()
+    borrados = db.execute(
+        text("DELETE FROM prestamos_archivo WHERE id < :corte"), {"corte": ids[len(ids) // 2]}
+    ).rowcount
+    db.commit()
+    db.close()
+
+    fallas = []
+    resultados = {}
+
+    def _archivo() -> dict:
+        return mantenimiento.estado()["archivo"]
+
+    antes = _archivo()
+    print(f"  {archivados:,} archivados, {borrados:,} borrados: {antes['bytes'] / 1e6:.1f} MB, "
+          f"{antes['paginas_libres']:,} páginas libres ({antes['auto_vacuum']})")
+    if antes["auto_vacuum"] != "INCREMENTAL":
+        fallas.append(f"auto_vacuum = {antes['auto_vacuum']}")
+    umbral = mantenimiento.umbral_libres(antes["paginas"])
+    if antes["paginas_libres"] < umbral:
+        fallas.append(f"el borrado dejó {antes['paginas_libres']:,} páginas libres "
+                      f"y el vacuum pide {umbral:,}")
+    else:
+        mantenimiento.OCIOSO_SEGUNDOS = 0
+        if "incremental_vacuum" not in mantenimiento._pendientes():
+            fallas.append("el planificador no pide incremental_vacuum")
+
+    for tarea in mantenimiento.TAREAS:
+        r = mantenimiento.ejecutar(tarea)
+        resultados[f"mantenimiento.{tarea}"] = {"ms": r["duracion_ms"], "resultado": r["resultado"]}
+        print(f"  {tarea:<20} {r['duracion_ms']:>9.1f} ms   {r['resultado']}")
+        if r["resultado"].startswith("error"):
+            fallas.append(f"{tarea}: {r['resultado']}")
+
+    despues = _archivo()
+    print(f"  después: {despues['bytes'] / 1e6:.1f} MB, {despues['paginas_libres']:,} páginas libres "
+          f"(archivo en disco: {os.path.getsize(DB_PATH) / 1e6:.1f} MB)")
+    resultados["mantenimiento.archivo"] = {"bytes_antes": antes["bytes"], "bytes_despues": despues["bytes"]}
+
+    with engine.connect() as conn:
+        if not conn.exec_driver_sql("SELECT COUNT(*) FROM sqlite_stat1").scalar():
+            fallas.append("ANALYZE no dejó estadísticas")
+    if despues["paginas_libres"] or despues["bytes"] >= antes["bytes"]:
+        fallas.append("incremental_vacuum no achicó el archivo")
+    if os.path.getsize(DB_PATH) != despues["bytes"]:
+        fallas.append("el tamaño en disco no coincide con page_count")
+    if mantenimiento.estado()["tareas"][-1]["resultado"] != "ok":
+        fallas.append("quick_check no dio ok")
+
+    mantenimiento.OCIOSO_SEGUNDOS = 0
+    pendientes = mantenimiento._pendientes()
+    if pendientes:
+        fallas.append(f"el planificador sigue pidiendo {pendientes}")
+
+    if fallas:
+        for falla in fallas:
+            print(f"  ¡{falla}!")
+        return 1
+    print("  Mantenimiento verificado.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import os
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import entorno
+from benchmarks.medicion import guardar_resultados
+
+"""
+verificar_respaldos.py: verificación de los backups incrementales
+(backend/respaldos.py).
+
+1. Genera una cartera sintética y toma la base.
+2. Repite varias rondas de escrituras reales (crud: préstamos nuevos,
+   cobros, cobros por lote) seguidas de un incremento, y guarda el sha256
+   de la base en uso en ese momento.
+3. Restaura CADA punto (base + incrementos hasta esa fecha) y compara el
+   checksum con el guardado, corre PRAGMA integrity_check y cuenta filas.
+4. Compacta todo en la base y vuelve a restaurar el último punto.
+
+También reporta los bytes escritos por incremento contra el tamaño de la
+base (la E/S debe seguir a lo que cambió, no al tamaño).
+Termina con código 1 si alguna restauración no coincide.
+
+Ejemplo:
+    python -m benchmarks.verificar_respaldos --prestamos 20000 --rondas 5
+"""
+
+
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Verificación de respaldos incrementales")
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--prestamos", type=int, default=10_000)
+    parser.add_argument("--rondas", type=int, default=4)
+    parser.add_argument("--operaciones", type=int, default=50, help="Escrituras por ronda")
+    parser.add_argument("--salida", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def _sha256(ruta: str) -> str:
+    with open(ruta, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def main(argv=None) -> int:
+    args = _parsear_args(argv)
+    directorio = entorno.aislar()
+
+    import sqlite3
+    from backend import crud, respaldos, schemas
+    from backend.database import DB_PATH, SessionLocal, inicializar_esquema
+    from benchmarks.datos_sinteticos import generar_cartera
+
+    inicializar_esquema()
+    db = SessionLocal()
+    cartera = generar_cartera(db, clientes=args.clientes, prestamos=args.prestamos, inversores=10)
+    db.close()
+    habilitados = cartera["cliente_ids_habilitados"]
+    pendientes = iter(cartera["prestamo_ids_pendientes"])
+    print(f"Base en {directorio}: {os.path.getsize(DB_PATH) / 1e6:.1f} MB")
+
+    def _contar(ruta: str) -> int:
+        conn = sqlite3.connect(ruta)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM prestamos").fetchone()[0]
+        finally:
+            conn.close()
+
+    esperados = []
+
+    def _respaldar(etiqueta: str) -> dict:
+        inicio = time.perf_counter()
+        resultado = respaldos.crear_respaldo()
+        segundos = time.perf_counter() - inicio
+        esperados.append((resultado["creado"], _sha256(DB_PATH), _contar(DB_PATH)))
+        print(
+            f"  {etiqueta:<10} {resultado['tipo']:<11} {resultado['paginas_escritas']:>7,} páginas "
+            f"{resultado['bytes_escritos'] / 1e3:>10,.1f} KB   de {os.path.getsize(DB_PATH) / 1e3:>10,.1f} KB   "
+            f"{segundos * 1000:>8.1f} ms"
+        )
+        return {"tipo": resultado["tipo"], "bytes_escritos": resultado["bytes_escritos"],
+                "bytes_base": os.path.getsize(DB_PATH), "ms": round(segundos * 1000, 2)}
+
+    resultados = {"respaldos.base": _respaldar("base")}
+    for ronda in range(1, args.rondas + 1):
+        db = SessionLocal()
+        try:
+            for i in range(args.operaciones):
+                if i % 3 == 0:
+                    crud.crear_prestamo(db, schemas.PrestamoCreate(
+                        cliente_id=habilitados[(ronda * args.operaciones + i) % len(habilitados)],
+                        monto_prestado=10_000, plazo=14,
+                    ))
+                else:
+                    crud.cobrar_prestamo(db, next(pendientes), 1_000)
+        finally:
+            db.close()
+        resultados[f"respaldos.incremento_{ronda}"] = _respaldar(f"ronda {ronda}")
+
+    fallas = []
+
+    def _restaurar_y_comparar(creado: str, sha: str, filas: int, etiqueta: str) -> None:
+        destino = os.path.join(directorio, "restaurada.db")
+        try:
+            info = respaldos.restaurar(destino, datetime.fromisoformat(creado))
+        except Exception as e:
+            fallas.append(f"{etiqueta} {creado}: {e}")
+            return
+        if info["creado"] != creado:
+            fallas.append(f"{etiqueta} {creado}: se restauró {info['creado']}")
+        if _sha256(destino) != sha:
+            fallas.append(f"{etiqueta} {creado}: checksum distinto al de la base original")
+        conn = sqlite3.connect(destino)
+        try:
+            integridad = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            conn.close()
+        if integridad != "ok":
+            fallas.append(f"{etiqueta} {creado}: integrity_check = {integridad}")
+        if _contar(destino) != filas:
+            fallas.append(f"{etiqueta} {creado}: {_contar(destino)} préstamos, esperados {filas}")
+        os.remove(destino)
+
+    for creado, sha, filas in esperados:
+        _restaurar_y_comparar(creado, sha, filas, "restaurar")
+
+    compactados = respaldos.compactar(retencion_dias=-1)
+    print(f"  compactados {compactados} incrementos en la base")
+    _restaurar_y_comparar(*esperados[-1], "post-compactación")
+
+    for r in respaldos.verificar(directorio):
+        if not r["ok"]:
+            fallas.append(f"verificar {r['punto']}: {r['detalle']}")
+
+    if fallas:
+        print(f"\n{len(fallas)} RESTAURACIONES FALLIDAS:")
+        for falla in fallas:
+            print(f"  - {falla}")
+        return 1
+    print(f"\n{len(esperados)} puntos restaurados con checksum idéntico.")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    ruta = guardar_resultados(resultados, parametros, args.salida)
+    print(f"Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,19 @@
 import React from 'react';
 
+// Forma de GET /clientes/{id}/completo (cliente + prestamos + totales)
 interface Archivo {
   id: number;
   tipo: string;
-  ruta: string;
+  url: string;
 }
 
 interface Prestamo {
   id: number;
   monto_prestado: number;
   total_a_pagar: number;
+  total_actualizado: number;
   estado_pago: string;
+  estado_prestamo: string;
   fecha_vencimiento: string;
 }
 
@@ -54,7 +57,7 @@ const ClientDetail = ({ cliente, onClose }: { cliente: Cliente; onClose: () => v
           <ul className="list-disc ml-6">
             {cliente.prestamos.map(p => (
               <li key={p.id}>
-                ${p.monto_prestado} → {p.estado_pago} (vence {p.fecha_vencimiento})
+                ${p.monto_prestado} → {p.estado_prestamo} (vence {p.fecha_vencimiento})
               </li>
             ))}
           </ul>
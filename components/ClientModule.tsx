@@ -22,6 +22,33 @@ interface Cliente {
   archivos?: ClienteArchivo[];
 }
 
+interface PrestamoCliente {
+  id: number;
+  monto_prestado: number;
+  total_actualizado: number;
+  total_cobrado?: number;
+  estado_prestamo: string;
+  fecha_vencimiento: string;
+  dias_atraso: number;
+}
+
+interface TotalesCliente {
+  cantidad: number;
+  activos: number;
+  morosos: number;
+  bloqueados: number;
+  total_prestado: number;
+  total_cobrado: number;
+  total_adeudado: number;
+  punitorios: number;
+}
+
+// Respuesta de GET /clientes/{id}/completo
+interface ClienteDetalle extends Cliente {
+  prestamos: PrestamoCliente[];
+  totales: TotalesCliente;
+}
+
 interface ClientModuleProps {
   clientes: Cliente[];
   onClienteCreado: () => void;
@@ -37,7 +64,7 @@ const ClientModule: React.FC<ClientModuleProps> = ({
   onClienteCreado,
   onClienteChange
 }) => {
-  const [clienteActivo, setClienteActivo] = useState<Cliente | null>(null);
+  const [clienteActivo, setClienteActivo] = useState<ClienteDetalle | null>(null);
   const [showForm, setShowForm] = useState(false);
 
   const [form, setForm] = useState({
@@ -53,6 +80,19 @@ const ClientModule: React.FC<ClientModuleProps> = ({
   const [archivo, setArchivo] = useState<File | null>(null);
   const [tipoArchivo, setTipoArchivo] = useState('');
 
+  const formatCurrency = (val: number) => {
+    return new Intl.NumberFormat('es-AR', { style: 'currency', currency: 'ARS' }).format(val);
+  };
+
+  // Un solo request: cliente, archivos, préstamos y totales
+  const cargarDetalle = async (clienteId: number) => {
+    const res = await fetch(
+      `http://127.0.0.1:8000/clientes/${clienteId}/completo`
+    );
+    const data = await res.json();
+    setClienteActivo({ ...data.cliente, prestamos: data.prestamos, totales: data.totales });
+  };
+
   /* =============================
      CREAR CLIENTE
   ============================== */
@@ -95,12 +135,7 @@ const ClientModule: React.FC<ClientModuleProps> = ({
       { method: 'POST', body: formData }
     );
 
-    const res = await fetch(
-      `http://127.0.0.1:8000/clientes/${clienteActivo.id}`
-    );
-    const data = await res.json();
-
-    setClienteActivo(data);
+    await cargarDetalle(clienteActivo.id);
     setArchivo(null);
     setTipoArchivo('');
     onClienteChange();
@@ -141,13 +176,7 @@ const ClientModule: React.FC<ClientModuleProps> = ({
               <tr
                 key={c.id}
                 className="border-t hover:bg-slate-50 cursor-pointer"
-                onClick={async () => {
-                  const res = await fetch(
-                    `http://127.0.0.1:8000/clientes/${c.id}`
-                  );
-                  const data = await res.json();
-                  setClienteActivo(data);
-                }}
+                onClick={() => cargarDetalle(c.id)}
               >
                 <td className="px-4 py-3 font-semibold">{c.nombre_completo}</td>
                 <td className="px-4 py-3">{c.dni}</td>
@@ -236,6 +265,29 @@ const ClientModule: React.FC<ClientModuleProps> = ({
                 {clienteActivo.observaciones || 'Sin observaciones'}
               </p>
             </div>
+            {/* PRÉSTAMOS DEL CLIENTE */}
+            <div className="space-y-2">
+              <h4 className="font-bold">Préstamos</h4>
+              <div className="grid grid-cols-2 md:grid-cols-4 gap-3 text-sm">
+                <div><b>Activos:</b> {clienteActivo.totales.activos} / {clienteActivo.totales.cantidad}</div>
+                <div><b>Morosos:</b> {clienteActivo.totales.morosos}</div>
+                <div><b>Prestado:</b> {formatCurrency(clienteActivo.totales.total_prestado)}</div>
+                <div><b>Adeudado:</b> {formatCurrency(clienteActivo.totales.total_adeudado)}</div>
+              </div>
+              {clienteActivo.prestamos.length > 0 && (
+                <ul className="max-h-40 overflow-y-auto text-sm divide-y">
+                  {clienteActivo.prestamos.map(p => (
+                    <li key={p.id} className="py-1 flex justify-between">
+                      <span>#{p.id} · {formatCurrency(p.monto_prestado)} · vence {p.fecha_vencimiento}</span>
+                      <span className="font-semibold">
+                        {p.estado_prestamo}{p.dias_atraso > 0 ? ` (${p.dias_atraso} d)` : ''}
+                      </span>
+                    </li>
+                  ))}
+                </ul>
+              )}
+            </div>
+
             {/* ARCHIVOS DEL CLIENTE */}
             {clienteActivo.archivos && clienteActivo.archivos.length > 0 && (
               <div className="space-y-2">
@@ -1,5 +1,7 @@
-import React, { useState } from 'react';
-// import { PlazoDias } from '../types';
+import React, { useState, useEffect } from 'react';
+import { Tarifa } from '../types';
+import { fetchTarifas } from '../services/loanService';
+import { tasaDelPlazo } from '../utils/loanCalculations';
 
 /* =============================
    TIPOS
@@ -61,6 +63,24 @@ const LoanForm: React.FC<LoanFormProps> = ({
   // Tasa de interés libre (%)
   const [tasa, setTasa] = useState<number>(0);
 
+  // Tarifas vigentes (GET /tarifas): proponen la tasa de cada plazo
+  const [tarifas, setTarifas] = useState<Tarifa[]>([]);
+
+  useEffect(() => {
+    fetchTarifas()
+      .then(setTarifas)
+      .catch(() => setTarifas([])); // Sin tarifas, la tasa se ingresa a mano
+  }, []);
+
+  /**
+   * Al elegir un plazo con tarifa se propone su tasa (se puede cambiar)
+   */
+  const handlePlazo = (dias: number) => {
+    setPlazo(dias);
+    const tasaTarifa = tasaDelPlazo(tarifas, dias);
+    if (tasaTarifa !== undefined) setTasa(Math.round(tasaTarifa * 10000) / 100);
+  };
+
   // Fecha de inicio del préstamo
   const [fecha, setFecha] = useState(
     new Date().toISOString().split('T')[0]
@@ -160,8 +180,13 @@ const LoanForm: React.FC<LoanFormProps> = ({
           min={1}
           className="w-full border rounded-lg p-2"
           value={plazo || ''}
-          onChange={e => setPlazo(Number(e.target.value))}
+          onChange={e => handlePlazo(Number(e.target.value))}
         />
+        {tarifas.length > 0 && (
+          <p className="text-xs text-gray-500 mt-1">
+            Tarifas: {tarifas.map(t => `${t.plazo} días ${Math.round(t.tasa * 10000) / 100}%`).join(' · ')}
+          </p>
+        )}
       </div>
 
       {/* TASA DE INTERÉS */}
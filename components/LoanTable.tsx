@@ -6,7 +6,9 @@ import {
   obtenerCalculosPunitorios,
   cobrarPrestamoAPI,
   agregarMontoAPI,
-  renovarPrestamoAPI
+  renovarPrestamoAPI,
+  headersPrestamo,
+  ConflictoVersionError
 } from '../services/loanService';
 
 const API_URL = "http://127.0.0.1:8000";
@@ -106,12 +108,18 @@ const LoanTable: React.FC<LoanTableProps> = ({
     try {
       const actualizado = await cobrarPrestamoAPI(
         prestamo.id,
-        montoFinal
+        montoFinal,
+        prestamo.version
       );
 
       // Avisamos a App.tsx que actualice el estado global
       onUpdate(prestamo.id, actualizado);
-    } catch {
+    } catch (error) {
+      if (error instanceof ConflictoVersionError) {
+        // El feed de cambios ya trajo la versión nueva del préstamo
+        alert(error.message);
+        return;
+      }
       alert('Error al cobrar el préstamo');
     }
   };
@@ -125,13 +133,19 @@ const LoanTable: React.FC<LoanTableProps> = ({
     try {
       const actualizado = await agregarMontoAPI(
         prestamoEditar.id,
-        montoExtra
+        montoExtra,
+        prestamoEditar.version
       );
 
       onUpdate(prestamoEditar.id, actualizado);
       setPrestamoEditar(null);
       setMontoExtra(0);
-    } catch {
+    } catch (error) {
+      if (error instanceof ConflictoVersionError) {
+        alert(error.message);
+        setPrestamoEditar(null);
+        return;
+      }
       alert('Error al agregar monto');
     }
   };
@@ -143,9 +157,8 @@ const LoanTable: React.FC<LoanTableProps> = ({
     // Limpiar modal
     setPrestamoRenovar(null);
 
-    // Refrescar la lista completa desde el backend
-    // (no asumir valores locales)
-    onRefresh();
+    // No hace falta recargar la lista: el feed de cambios (/eventos)
+    // trae el préstamo original RENOVADO y el préstamo nuevo
   };
 
   /**
@@ -155,6 +168,7 @@ const LoanTable: React.FC<LoanTableProps> = ({
     try {
       const res = await fetch(`${API_URL}/prestamos/${prestamo.id}/bloquear`, {
         method: 'POST',
+        headers: headersPrestamo(prestamo.version),
       });
       if (!res.ok) {
         const data = await res.json();
@@ -164,7 +178,6 @@ const LoanTable: React.FC<LoanTableProps> = ({
       const actualizado = await res.json();
       onUpdate(prestamo.id, actualizado);
       setBloquearConfirm(null);
-      onRefresh();
     } catch {
       alert('Error al bloquear el préstamo');
     }
@@ -92,7 +92,8 @@ const RenovationModal: React.FC<RenovationModalProps> = ({
         prestamo.id,
         montoRenovado,
         plazo,
-        tasa / 100 // Enviar como decimal
+        tasa / 100, // Enviar como decimal
+        prestamo.version
       );
       onSuccess(nuevoPrestamo);
     } catch (error) {
@@ -1,4 +1,4 @@
-import { Prestamo, PlazoDias, EstadoPago, EstadoPrestamo, Inversor } from '../types';
+import { Prestamo, EstadoPago, EstadoPrestamo, Inversor, ResumenPeriodoArchivo, Tarifa } from '../types';
 
 /* ==============================
    CONFIGURACIÓN GENERAL API
@@ -14,17 +14,7 @@ const API_URL = 'http://127.0.0.1:8000';
    REGLAS DE NEGOCIO – INTERESES
 ================================ */
 
-/**
- * Intereses por plazo (valores relativos)
- * Ej: 0.20 = 20%
- * 
- * ⚠️ DEPRECATED: Usar calcularTotalAPagarNuevo() de utils/loanCalculations.ts
- */
-export const INTERESES = {
-  [PlazoDias.SIETE]: 0.20,
-  [PlazoDias.CATORCE]: 0.40,
-  [PlazoDias.TREINTA]: 1.00
-};
+// Las tasas por plazo las define el backend (tabla tarifas): ver fetchTarifas()
 
 /**
  * Tasa punitoria diaria (5% diario)
@@ -102,6 +92,25 @@ export async function fetchPrestamos(): Promise<Prestamo[]> {
   return res.json();
 }
 
+/**
+ * Totales por período de los préstamos cerrados que el backend archivó
+ * (ya no vienen en GET /prestamos)
+ */
+export async function fetchResumenArchivo(): Promise<ResumenPeriodoArchivo[]> {
+  const res = await fetch(`${API_URL}/prestamos/archivo/resumen`);
+  if (!res.ok) throw new Error('Error al obtener el resumen del archivo');
+  return res.json();
+}
+
+/**
+ * Tarifas vigentes hoy: la tasa de cada plazo
+ */
+export async function fetchTarifas(): Promise<Tarifa[]> {
+  const res = await fetch(`${API_URL}/tarifas`);
+  if (!res.ok) throw new Error('Error al obtener tarifas');
+  return res.json();
+}
+
 /**
  * Crear un préstamo en backend
  */
@@ -118,19 +127,44 @@ export async function crearPrestamoAPI(
   return res.json();
 }
 
+/**
+ * Error 409: otra caja modificó el préstamo desde que se cargó.
+ */
+export class ConflictoVersionError extends Error {
+  constructor() {
+    super('El préstamo fue modificado por otra operación. Se actualizó la lista; revise y vuelva a intentar.');
+    this.name = 'ConflictoVersionError';
+  }
+}
+
+/**
+ * Headers para modificar un préstamo. Con `version` se manda If-Match:
+ * si el préstamo cambió en el medio, el backend responde 409 en lugar de
+ * pisar la otra operación.
+ */
+export function headersPrestamo(version?: number): Record<string, string> {
+  const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+  if (version !== undefined && version !== null) {
+    headers['If-Match'] = `"${version}"`;
+  }
+  return headers;
+}
+
 /**
  * Cobrar un préstamo
  */
 export async function cobrarPrestamoAPI(
   id: number,
-  monto_cobrado_final: number
+  monto_cobrado_final: number,
+  version?: number
 ): Promise<Prestamo> {
   const res = await fetch(`${API_URL}/prestamos/${id}/cobrar`, {
     method: 'PUT',
-    headers: { 'Content-Type': 'application/json' },
+    headers: headersPrestamo(version),
     body: JSON.stringify({ monto_cobrado_final })
   });
 
+  if (res.status === 409) throw new ConflictoVersionError();
   if (!res.ok) throw new Error('Error cobrando préstamo');
   return res.json();
 }
@@ -140,14 +174,16 @@ export async function cobrarPrestamoAPI(
  */
 export async function agregarMontoAPI(
   id: number,
-  monto_extra: number
+  monto_extra: number,
+  version?: number
 ): Promise<Prestamo> {
   const res = await fetch(`${API_URL}/prestamos/${id}/agregar-monto`, {
     method: 'PUT',
-    headers: { 'Content-Type': 'application/json' },
+    headers: headersPrestamo(version),
     body: JSON.stringify({ monto_extra })
   });
 
+  if (res.status === 409) throw new ConflictoVersionError();
   if (!res.ok) throw new Error('Error agregando monto');
   return res.json();
 }
@@ -159,11 +195,12 @@ export async function renovarPrestamoAPI(
   id: number,
   monto_renovado: number,
   plazo: number,
-  tasa_interes: number
+  tasa_interes: number,
+  version?: number
 ): Promise<Prestamo> {
   const res = await fetch(`${API_URL}/prestamos/${id}/renovar`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers: headersPrestamo(version),
     body: JSON.stringify({
       monto_renovado,
       plazo,
@@ -171,6 +208,7 @@ export async function renovarPrestamoAPI(
     })
   });
 
+  if (res.status === 409) throw new ConflictoVersionError();
   if (!res.ok) throw new Error('Error renovando préstamo');
   return res.json();
 }
@@ -215,3 +253,39 @@ export async function liquidarInversorAPI(id: number): Promise<Inversor> {
   if (!res.ok) throw new Error('Error liquidando inversor');
   return res.json();
 }
+
+/* ==============================
+   FEED DE CAMBIOS (SSE)
+================================ */
+
+/**
+ * Evento publicado por el backend después de cada escritura
+ * (ver backend/eventos.py)
+ */
+export interface EventoCambio {
+  seq: number;
+  entidad: 'prestamo' | 'cliente' | 'archivo' | 'inversor';
+  accion: 'creado' | 'actualizado' | 'eliminado';
+  id: number;
+  datos: Record<string, any> | null;
+}
+
+/**
+ * Suscribe a GET /eventos.
+ * - onCambio: parchear el estado local con el evento
+ * - onResync: el servidor perdió eventos para este cliente → recargar listas
+ * Devuelve la función para cerrar la suscripción.
+ */
+export function suscribirCambios(
+  onCambio: (evento: EventoCambio) => void,
+  onResync: () => void
+): () => void {
+  const fuente = new EventSource(`${API_URL}/eventos`);
+
+  fuente.addEventListener('cambio', (e) => {
+    onCambio(JSON.parse((e as MessageEvent).data));
+  });
+  fuente.addEventListener('resync', () => onResync());
+
+  return () => fuente.close();
+}
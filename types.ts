@@ -4,7 +4,7 @@
 
 /**
  * Plazos estándar en días para préstamos
- * (no obligatorio usarlo todavía, pero queda listo)
+ * (las tasas de cada plazo vienen del backend: GET /tarifas)
  */
 export enum PlazoDias {
   SIETE = 7,
@@ -118,6 +118,24 @@ export interface Prestamo {
   // FASE 2: Período de origen y tasa de interés
   periodo_origen?: string;  // Formato YYYY-MM
   tasa_interes?: number;    // Tasa decimal (ej: 0.20 para 20%)
+
+  // Plazo pactado (días) y tarifa aplicada (null si la tasa se pactó a mano)
+  plazo?: number | null;
+  tarifa_id?: number | null;
+
+  // Concurrencia optimista: se envía en If-Match al modificar el préstamo
+  version?: number;
+}
+
+/**
+ * Tasa de un plazo (GET /tarifas). vigente_hasta null = sigue vigente
+ */
+export interface Tarifa {
+  id: number;
+  plazo: number;          // días
+  tasa: number;           // Tasa decimal (ej: 0.20 para 20%)
+  vigente_desde: string;
+  vigente_hasta?: string | null;
 }
 
 /* =========================
@@ -136,6 +154,20 @@ export interface ResumenGeneral {
   cantidad_morosos: number;
 }
 
+/**
+ * Totales de un período ya archivado en el backend
+ * (GET /prestamos/archivo/resumen). periodo_origen null = sin período.
+ */
+export interface ResumenPeriodoArchivo {
+  periodo_origen: string | null;
+  cantidad: number;
+  cantidad_renovados: number;
+  monto_prestado: number;
+  total_a_pagar: number;
+  total_cobrado: number;
+  monto_cobrado_final: number;
+}
+
 /* =========================
    INVERSORES
    ========================= */
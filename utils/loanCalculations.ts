@@ -1,40 +1,47 @@
+import { Tarifa } from '../types';
+
 /**
  * Utilidades para cálculos de préstamos
  * Centraliza lógica de tasas e intereses
  */
 
 /**
- * Tasas de interés por plazo
- * Se aplican tanto en creación como en renovación de préstamos
- * Ej: 7 días → 20% → monto * 1.2
+ * Tasa de interés de un plazo según las tarifas vigentes
+ * (las que devuelve fetchTarifas(), GET /tarifas).
+ * Se aplica tanto en creación como en renovación de préstamos.
+ *
+ * @param tarifas - Tarifas vigentes
+ * @param plazo - Plazo en días
+ * @returns Tasa decimal (ej: 0.20), o undefined si el plazo no tiene tarifa
  */
-export const INTERESES_TASA = {
-  7: 0.20,    // 20%
-  14: 0.40,   // 40%
-  30: 1.00    // 100%
-};
+export const tasaDelPlazo = (
+  tarifas: Tarifa[],
+  plazo: number
+): number | undefined => tarifas.find(t => t.plazo === plazo)?.tasa;
 
 /**
  * Calcula el total a pagar de un préstamo
- * basado en monto y plazo usando tasas de interés.
- * 
+ * basado en monto y plazo usando las tarifas vigentes.
+ * Solo para mostrar: el total definitivo lo calcula el backend.
+ *
  * Se usa para:
  * - Creación de préstamos nuevos
  * - Renovación de préstamos
- * 
+ *
  * @param monto - Monto del préstamo o monto a renovar
- * @param plazo - Plazo en días (7, 14, 30)
- * @returns Total a pagar
- * 
+ * @param plazo - Plazo en días
+ * @param tarifas - Tarifas vigentes
+ * @returns Total a pagar (el monto solo si el plazo no tiene tarifa)
+ *
  * @example
- * calcularTotalAPagarNuevo(1000, 7)  // 1000 * (1 + 0.20) = 1200
- * calcularTotalAPagarNuevo(1000, 14) // 1000 * (1 + 0.40) = 1400
- * calcularTotalAPagarNuevo(1000, 30) // 1000 * (1 + 1.00) = 2000
+ * // con la tarifa de 7 días al 20%
+ * calcularTotalAPagarNuevo(1000, 7, tarifas)  // 1000 * (1 + 0.20) = 1200
  */
 export const calcularTotalAPagarNuevo = (
   monto: number,
-  plazo: 7 | 14 | 30
+  plazo: number,
+  tarifas: Tarifa[]
 ): number => {
-  const tasa = INTERESES_TASA[plazo] ?? 0;
+  const tasa = tasaDelPlazo(tarifas, plazo) ?? 0;
   return monto * (1 + tasa);
 };